@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+Deterministic synthetic Franca model generator for benchmarking.
+"""
+
+import argparse
+import os
+import random
+
+
+class ModelGenerator(object):
+    """
+    Synthetic Franca model generator.
+
+    Every package consists of a number of files. Each file defines a type
+    collection with a typedef chain, nested structures, an enumeration, an
+    array and a map, and a number of interfaces using them. Files import
+    type collections of files in earlier packages, so the import graph is
+    acyclic. The output depends only on the parameters and the seed.
+    """
+
+    def __init__(self, packages=4, files_per_package=4, imports=2,
+                 interfaces=2, methods=8, struct_depth=3, typedef_chain=4,
+                 comment_lines=2, seed=0):
+        """
+        Constructor.
+
+        :param packages: Number of packages.
+        :param files_per_package: Number of files per package.
+        :param imports: Number of type collection imports per file.
+        :param interfaces: Number of interfaces per file.
+        :param methods: Number of methods per interface.
+        :param struct_depth: Nesting depth of the structures per file.
+        :param typedef_chain: Length of the typedef chain per file.
+        :param comment_lines: Number of comment lines per member.
+        :param seed: Random generator seed.
+        """
+        self.packages = packages
+        self.files_per_package = files_per_package
+        self.imports = imports
+        self.interfaces = interfaces
+        self.methods = methods
+        self.struct_depth = struct_depth
+        self.typedef_chain = typedef_chain
+        self.comment_lines = comment_lines
+        self.seed = seed
+
+    _PRIMITIVES = ["Int8", "Int16", "Int32", "Int64", "UInt8", "UInt16",
+                   "UInt32", "UInt64", "Boolean", "Float", "Double",
+                   "String", "ByteBuffer"]
+
+    @staticmethod
+    def package_name(package):
+        return "bench.p{}".format(package)
+
+    @staticmethod
+    def file_name(package, index):
+        return "p{}_f{}.fidl".format(package, index)
+
+    @staticmethod
+    def typecollection_name(index):
+        return "TC{}".format(index)
+
+    def _comment(self, rnd, lines, indent):
+        for line in range(self.comment_lines):
+            style = rnd.randint(0, 2)
+            if style == 0:
+                lines.append("{}// Comment line {} {}".format(
+                    indent, line, "x" * rnd.randint(10, 60)))
+            elif style == 1:
+                lines.append("{}/* Block comment {}\n{} */".format(
+                    indent, "y" * rnd.randint(10, 60), indent))
+            else:
+                lines.append("{}<** @description: {} **>".format(
+                    indent, "z" * rnd.randint(10, 60)))
+
+    def _types(self, rnd, lines, imported):
+        """
+        Generate the type collection members.
+
+        :return: A list of type names usable as argument types.
+        """
+        indent = "    "
+        names = []
+        # Typedef chain
+        for i in range(self.typedef_chain):
+            self._comment(rnd, lines, indent)
+            base = "T{}".format(i - 1) if i else rnd.choice(self._PRIMITIVES)
+            lines.append("{}typedef T{} is {}".format(indent, i, base))
+            names.append("T{}".format(i))
+        # Nested structures
+        for i in range(self.struct_depth):
+            self._comment(rnd, lines, indent)
+            lines.append("{}struct S{} {{".format(indent, i))
+            fields = ["{} f{}".format(rnd.choice(self._PRIMITIVES), j)
+                      for j in range(rnd.randint(2, 5))]
+            if i:
+                fields.append("S{} inner".format(i - 1))
+                fields.append("S{}[] inners".format(i - 1))
+            if imported:
+                fields.append("{} ext".format(rnd.choice(imported)))
+            for field in fields:
+                lines.append("{}    {}".format(indent, field))
+            lines.append("{}}}".format(indent))
+            names.append("S{}".format(i))
+        self._comment(rnd, lines, indent)
+        lines.append("{}enumeration E {{".format(indent))
+        for i in range(rnd.randint(3, 10)):
+            if rnd.randint(0, 1):
+                lines.append("{}    E{} = {}".format(indent, i, i * 2))
+            else:
+                lines.append("{}    E{}".format(indent, i))
+        lines.append("{}}}".format(indent))
+        names.append("E")
+        lines.append("{}array A of {}".format(
+            indent, rnd.choice(names + self._PRIMITIVES)))
+        lines.append("{}map M {{ String to {} }}".format(
+            indent, rnd.choice(names)))
+        names += ["A", "M"]
+        return names
+
+    def _interface(self, rnd, lines, name, types):
+        indent = "    "
+        self._comment(rnd, lines, "")
+        lines.append("interface {} {{".format(name))
+        lines.append("{}version {{ major 1 minor 0 }}".format(indent))
+        lines.append("{}attribute {} a".format(indent, rnd.choice(types)))
+        for i in range(self.methods):
+            self._comment(rnd, lines, indent)
+            lines.append("{}method m{} {{".format(indent, i))
+            lines.append("{}    in {{".format(indent))
+            for j in range(rnd.randint(1, 4)):
+                lines.append("{}        {} a{}".format(
+                    indent, rnd.choice(types), j))
+            lines.append("{}    }}".format(indent))
+            lines.append("{}    out {{ {} r }}".format(
+                indent, rnd.choice(types)))
+            lines.append("{}}}".format(indent))
+        lines.append("{}broadcast b {{ out {{ {}[] v }} }}".format(
+            indent, rnd.choice(types)))
+        lines.append("}")
+
+    def generate_file(self, package, index):
+        """
+        Generate the contents of a single model file.
+
+        :param package: Package index.
+        :param index: File index within the package.
+        :return: FIDL string.
+        """
+        rnd = random.Random("{}:{}:{}".format(self.seed, package, index))
+        lines = ["package {}".format(self.package_name(package))]
+        imported = []
+        if package:
+            for i in range(self.imports):
+                imported_package = rnd.randrange(package)
+                imported_index = rnd.randrange(self.files_per_package)
+                lines.append('import {}.{}.* from "{}"'.format(
+                    self.package_name(imported_package),
+                    self.typecollection_name(imported_index),
+                    self.file_name(imported_package, imported_index)))
+                imported.append("{}.{}.T0".format(
+                    self.package_name(imported_package),
+                    self.typecollection_name(imported_index)))
+        lines.append("typeCollection {} {{".format(
+            self.typecollection_name(index)))
+        types = self._types(rnd, lines, imported)
+        lines.append("}")
+        for i in range(self.interfaces):
+            self._interface(rnd, lines, "I{}_{}".format(index, i), types)
+        return "\n".join(lines) + "\n"
+
+    def generate(self, directory):
+        """
+        Write the model files into a directory.
+
+        :param directory: Output directory.
+        :return: A list of the generated file specifications.
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fspecs = []
+        for package in range(self.packages):
+            for index in range(self.files_per_package):
+                fspec = os.path.join(directory,
+                                     self.file_name(package, index))
+                with open(fspec, "w") as f:
+                    f.write(self.generate_file(package, index))
+                fspecs.append(fspec)
+        return fspecs
+
+
+def add_arguments(parser):
+    """
+    Add the generator parameters to an argparse.ArgumentParser.
+    """
+    parser.add_argument("--packages", type=int, default=4)
+    parser.add_argument("--files-per-package", type=int, default=4)
+    parser.add_argument("--imports", type=int, default=2)
+    parser.add_argument("--interfaces", type=int, default=2)
+    parser.add_argument("--methods", type=int, default=8)
+    parser.add_argument("--struct-depth", type=int, default=3)
+    parser.add_argument("--typedef-chain", type=int, default=4)
+    parser.add_argument("--comment-lines", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def from_arguments(args):
+    """
+    Construct a ModelGenerator from parsed command line arguments.
+    """
+    return ModelGenerator(
+        packages=args.packages, files_per_package=args.files_per_package,
+        imports=args.imports, interfaces=args.interfaces,
+        methods=args.methods, struct_depth=args.struct_depth,
+        typedef_chain=args.typedef_chain, comment_lines=args.comment_lines,
+        seed=args.seed)
+
+
+def parse_command_line():
+    parser = argparse.ArgumentParser(
+        description="Synthetic Franca model generator.")
+    parser.add_argument("directory", help="Output directory.")
+    add_arguments(parser)
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_command_line()
+    fspecs = from_arguments(args).generate(args.directory)
+    print("Generated {} files in '{}'.".format(len(fspecs), args.directory))
+
+
+if __name__ == "__main__":
+    main()
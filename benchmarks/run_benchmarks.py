@@ -0,0 +1,573 @@
+#!/usr/bin/env python
+"""
+Pyfranca benchmark suite.
+
+Generates a synthetic model and measures lexing, parsing, linking and
+end-to-end model loading throughput and peak memory. Results can be written
+to a JSON file and compared against the results of another commit.
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import OrderedDict
+
+import generator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from pyfranca import Lexer, Parser, Processor, ast  # noqa: E402
+from pyfranca.franca_stats import ProcessorStats, clock  # noqa: E402
+from pyfranca.franca_incremental import IncrementalParser, \
+    TextEdit  # noqa: E402
+from pyfranca.franca_lsp import Workspace  # noqa: E402
+from pyfranca.franca_classes import ClassGenerator  # noqa: E402
+from pyfranca.franca_codec import Codec  # noqa: E402
+from pyfranca.franca_numpy import NumpyCodec, numpy  # noqa: E402
+from pyfranca.franca_payload import INTEGER_RANGES, PayloadValidator, \
+    enumerator_values, struct_fields  # noqa: E402
+from pyfranca.franca_sizes import SizeAnalyzer  # noqa: E402
+from pyfranca.franca_prune import unused_types  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+
+def count_nodes(packages):
+    """
+    Count the AST nodes of a model.
+
+    :param packages: A dictionary of ast.Package objects.
+    :return: Node count.
+    """
+    seen = set()
+    stack = list(packages.values())
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, ast.Package):
+            stack.extend(node.imports)
+            stack.extend(node.typecollections.values())
+            stack.extend(node.interfaces.values())
+        elif isinstance(node, ast.Namespace):
+            for members in (node.typedefs, node.enumerations, node.structs,
+                            node.arrays, node.maps):
+                stack.extend(members.values())
+            if isinstance(node, ast.Interface):
+                for members in (node.attributes, node.methods,
+                                node.broadcasts):
+                    stack.extend(members.values())
+        elif isinstance(node, (ast.Typedef, ast.Array, ast.Attribute)):
+            stack.append(node.type)
+        elif isinstance(node, ast.Map):
+            stack.append(node.key_type)
+            stack.append(node.value_type)
+        elif isinstance(node, ast.Struct):
+            for field in node.fields.values():
+                stack.append(field)
+                stack.append(field.type)
+        elif isinstance(node, ast.Enumeration):
+            stack.extend(node.enumerators.values())
+        elif isinstance(node, (ast.Method, ast.Broadcast)):
+            args = list(node.out_args.values())
+            if isinstance(node, ast.Method):
+                args += list(node.in_args.values())
+            for arg in args:
+                stack.append(arg)
+                stack.append(arg.type)
+    return len(seen)
+
+
+def best_of(repeat, function):
+    """
+    Run a function several times.
+
+    :return: The shortest run time in seconds and the last result.
+    """
+    best = None
+    result = None
+    for i in range(repeat):
+        gc.collect()
+        start = clock()
+        result = function()
+        elapsed = clock() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def peak_memory(function):
+    """
+    Measure the peak memory allocated by a function.
+
+    :return: Peak memory in bytes or None if not supported.
+    """
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def read_files(fspecs):
+    sources = OrderedDict()
+    for fspec in fspecs:
+        with open(fspec, "r") as f:
+            sources[fspec] = f.read()
+    return sources
+
+
+def bench_lex(sources):
+    lexer = Lexer().lexer
+
+    def run():
+        tokens = 0
+        for fidl in sources.values():
+            lexer.input(fidl)
+            while lexer.token():
+                tokens += 1
+        return tokens
+    return run
+
+
+def bench_parse(sources):
+    parser = Parser()
+
+    def run():
+        return [parser.parse(fidl) for fidl in sources.values()]
+    return run
+
+
+def bench_parse_mapped(fspecs):
+    parser = Parser()
+
+    def run():
+        return [parser.parse_file(fspec) for fspec in fspecs]
+    return run
+
+
+def bench_reparse(sources):
+    parsers = []
+    for fspec, fidl in sources.items():
+        parser = IncrementalParser(fspec)
+        parser.parse(fidl)
+        parsers.append(parser)
+
+    def run():
+        # Type and delete a character in the middle of every file.
+        for parser in parsers:
+            offset = parser.text.rfind("\n", 0, len(parser.text) // 2)
+            parser.edit([TextEdit(offset, offset, u" ")])
+            parser.edit([TextEdit(offset, offset + 1, u"")])
+        return parsers
+    return run
+
+
+def bench_load(directory, fspecs, stats=False):
+    def run():
+        processor = Processor()
+        processor.package_paths.append(directory)
+        if stats:
+            processor.stats = ProcessorStats()
+        for fspec in fspecs:
+            processor.import_file(os.path.basename(fspec))
+        return processor
+    return run
+
+
+def bench_lsp_index(fspecs, jobs):
+    def run():
+        workspace = Workspace([os.path.dirname(fspecs[0])], jobs)
+        workspace.index(fspecs)
+        return workspace
+    return run
+
+
+def bench_lsp_requests(workspace, sources):
+    """
+    Measure the slowest language server request in the last file.
+
+    :return: Latency in seconds.
+    """
+    fspec, text = list(sources.items())[-1]
+    uri = "file://" + fspec
+    workspace.open(uri, text)
+    workspace.check(workspace.documents[uri])
+    lines = text.split("\n")
+    # Positions of the type names of the last interface
+    positions = []
+    for index, line in enumerate(lines):
+        words = line.split()
+        if len(words) >= 2 and words[0] in ("attribute", "typedef"):
+            positions.append({"line": index,
+                              "character": line.index(words[1]) + 1})
+    slowest = 0.0
+    for position in positions[-10:]:
+        for request in (workspace.definition, workspace.hover,
+                        workspace.completion, workspace.references):
+            start = clock()
+            request(uri, position)
+            slowest = max(slowest, clock() - start)
+        # Type a character, and link the document as when publishing the
+        #   diagnostics.
+        start = clock()
+        workspace.change(uri, [{"range": {"start": position,
+                                          "end": position},
+                                "text": " "}])
+        workspace.check(workspace.documents[uri])
+        slowest = max(slowest, clock() - start)
+    workspace.close(uri)
+    return slowest
+
+
+def sample_payload(the_type):
+    """
+    Generate a valid payload value for a linked type.
+    """
+    while isinstance(the_type, (ast.Reference, ast.Typedef)):
+        the_type = the_type.reference \
+            if isinstance(the_type, ast.Reference) else the_type.type
+    if type(the_type) in INTEGER_RANGES:
+        return INTEGER_RANGES[type(the_type)][1]
+    elif isinstance(the_type, (ast.Float, ast.Double)):
+        return 1.5
+    elif isinstance(the_type, ast.Boolean):
+        return True
+    elif isinstance(the_type, ast.String):
+        return "text"
+    elif isinstance(the_type, ast.ByteBuffer):
+        return b"bytes"
+    elif isinstance(the_type, ast.Enumeration):
+        return enumerator_values(the_type)[-1][0]
+    elif isinstance(the_type, ast.Struct):
+        return {field.name: sample_payload(field.type)
+                for field in struct_fields(the_type)}
+    elif isinstance(the_type, ast.Array):
+        return [sample_payload(the_type.type) for _ in range(4)]
+    elif isinstance(the_type, ast.Map):
+        return {sample_payload(the_type.key_type):
+                sample_payload(the_type.value_type)}
+    raise ValueError(the_type)
+
+
+def sample_messages(packages):
+    """
+    Generate sample input arguments of all methods.
+
+    :return: A list of tuples - ast.Method object and input argument
+        values by name.
+    """
+    messages = []
+    for package in packages.values():
+        for interface in package.interfaces.values():
+            for method in interface.methods.values():
+                messages.append((method, {
+                    arg.name: sample_payload(arg.type)
+                    for arg in method.in_args.values()}))
+    return messages
+
+
+def bench_validate(packages):
+    """
+    Validate sample input arguments of all methods.
+
+    :return: Seconds and the number of validated messages.
+    """
+    validator = PayloadValidator()
+    messages = [(validator.compile_arguments(method.in_args), values)
+                for method, values in sample_messages(packages)]
+    start = clock()
+    for check, values in messages:
+        check(values)
+    return clock() - start, len(messages)
+
+
+def bench_classes(packages):
+    """
+    Build message objects of generated classes from sample input
+    arguments of all methods.
+
+    :return: Seconds and the number of built messages.
+    """
+    generator = ClassGenerator()
+    messages = [(generator.arguments_class(method, "in").from_dict, values)
+                for method, values in sample_messages(packages)]
+    start = clock()
+    for from_dict, values in messages:
+        from_dict(values)
+    return clock() - start, len(messages)
+
+
+def bench_codec(packages):
+    """
+    Encode and decode sample input arguments of all methods.
+
+    :return: Encoding seconds, decoding seconds, the number of messages and
+        their encoded size.
+    """
+    codec = Codec()
+    messages = [(codec.compile_arguments(method.in_args), values)
+                for method, values in sample_messages(packages)]
+    start = clock()
+    encoded = [(args_codec, args_codec.encode(values))
+               for args_codec, values in messages]
+    encode_seconds = clock() - start
+    start = clock()
+    for args_codec, data in encoded:
+        args_codec.decode(data)
+    decode_seconds = clock() - start
+    return encode_seconds, decode_seconds, len(messages), \
+        sum(len(data) for _, data in encoded)
+
+
+def bench_sizes(packages):
+    """
+    Compute the encoded sizes of the messages of all interfaces.
+
+    :return: Seconds and the number of analyzed messages.
+    """
+    analyzer = SizeAnalyzer()
+    interfaces = [interface for package in packages.values()
+                  for interface in package.interfaces.values()]
+    messages = 0
+    start = clock()
+    for interface in interfaces:
+        messages += len(analyzer.messages(interface))
+    return clock() - start, messages
+
+
+def bench_prune(packages):
+    """
+    Find the types not used by the interfaces of the first package.
+
+    :return: Seconds.
+    """
+    roots = list(next(iter(packages.values())).interfaces.values())
+    start = clock()
+    unused_types(packages, roots)
+    return clock() - start
+
+
+TELEMETRY_FIDL = """
+package Telemetry
+typeCollection Types {
+    struct Sample { Float x Float y UInt16 id Boolean valid }
+    array Floats of Float
+    array Samples of Sample
+}
+"""
+
+
+def bench_bulk(codec, count):
+    """
+    Encode and decode large telemetry arrays.
+
+    :param codec: Codec object.
+    :param count: Number of elements per array.
+    :return: Seconds and the encoded size.
+    """
+    processor = Processor()
+    types = processor.import_string(
+        "telemetry.fidl", TELEMETRY_FIDL).typecollections["Types"]
+    floats = [float(i) for i in range(count)]
+    samples = [{"x": 1.0, "y": 2.0, "id": i % 65536, "valid": True}
+               for i in range(count)]
+    if isinstance(codec, NumpyCodec):
+        floats = numpy.array(floats, numpy.float32)
+        samples = numpy.zeros(count, codec.dtype(types.structs["Sample"]))
+    payloads = [(codec.compile(types.arrays["Floats"]), floats),
+                (codec.compile(types.arrays["Samples"]), samples)]
+    size = 0
+    start = clock()
+    for array_codec, value in payloads:
+        data = array_codec.encode(value)
+        array_codec.decode(data)
+        size += len(data)
+    return clock() - start, size
+
+
+def result(seconds, size, nodes, memory=None):
+    res = OrderedDict([
+        ("seconds", seconds),
+        ("bytes_per_second", size / seconds if seconds and size else None),
+        ("nodes_per_second", nodes / seconds if seconds and nodes else None),
+    ])
+    if memory is not None:
+        res["peak_memory"] = memory
+    return res
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(model_generator, directory, repeat):
+    fspecs = model_generator.generate(directory)
+    sources = read_files(fspecs)
+    size = sum(len(fidl) for fidl in sources.values())
+
+    benchmarks = OrderedDict()
+    seconds, tokens = best_of(repeat, bench_lex(sources))
+    benchmarks["lex"] = result(seconds, size, None)
+    benchmarks["lex"]["tokens_per_second"] = tokens / seconds
+    seconds, packages = best_of(repeat, bench_parse(sources))
+    parsed = {str(i): package for i, package in enumerate(packages)}
+    benchmarks["parse"] = result(seconds, size, count_nodes(parsed),
+                                 peak_memory(bench_parse(sources)))
+    # Files are lexed directly from memory maps.
+    seconds, packages = best_of(repeat, bench_parse_mapped(fspecs))
+    benchmarks["parse_mapped"] = result(
+        seconds, size, count_nodes(parsed),
+        peak_memory(bench_parse_mapped(fspecs)))
+    # Incremental parsing of two edits per file
+    seconds, parsers = best_of(repeat, bench_reparse(sources))
+    benchmarks["reparse"] = result(seconds, size, None)
+    seconds, processor = best_of(repeat, bench_load(directory, fspecs))
+    nodes = count_nodes(processor.packages)
+    benchmarks["load"] = result(seconds, size, nodes,
+                                peak_memory(bench_load(directory, fspecs)))
+    # Linking is measured by the processor itself.
+    seconds = min(
+        bench_load(directory, fspecs, stats=True)().stats.link_seconds
+        for i in range(repeat))
+    benchmarks["link"] = result(seconds, size, nodes)
+    # Language server workspace indexing and the slowest request
+    seconds, workspace = best_of(
+        repeat, bench_lsp_index(fspecs, multiprocessing.cpu_count()))
+    benchmarks["lsp_index"] = result(seconds, size, nodes)
+    benchmarks["lsp_request"] = result(
+        bench_lsp_requests(workspace, sources), None, None)
+    # Payload validation with compiled validators
+    seconds, messages = min(bench_validate(processor.packages)
+                            for i in range(repeat))
+    benchmarks["validate"] = result(seconds, None, None)
+    benchmarks["validate"]["messages_per_second"] = messages / seconds
+    # Message objects of generated classes
+    seconds, messages = min(bench_classes(processor.packages)
+                            for i in range(repeat))
+    benchmarks["classes"] = result(seconds, None, None)
+    benchmarks["classes"]["messages_per_second"] = messages / seconds
+    # Binary encoding and decoding with compiled codecs
+    runs = [bench_codec(processor.packages) for i in range(repeat)]
+    messages, encoded_size = runs[0][2:]
+    for name, index in (("encode", 0), ("decode", 1)):
+        seconds = min(run[index] for run in runs)
+        benchmarks[name] = result(seconds, encoded_size, None)
+        benchmarks[name]["messages_per_second"] = messages / seconds
+    # Static wire size analysis of all interfaces
+    seconds, messages = min(bench_sizes(processor.packages)
+                            for i in range(repeat))
+    benchmarks["sizes"] = result(seconds, None, None)
+    benchmarks["sizes"]["messages_per_second"] = messages / seconds
+    # Unused type detection
+    benchmarks["prune"] = result(
+        min(bench_prune(processor.packages) for i in range(repeat)), None,
+        nodes)
+    # Encoding and decoding of large arrays, element by element and with
+    #   NumPy if available
+    codecs = [("bulk_scalar", Codec())]
+    if numpy is not None:
+        codecs.append(("bulk_numpy", NumpyCodec()))
+    for name, codec in codecs:
+        seconds, bulk_size = min(bench_bulk(codec, 100000)
+                                 for i in range(repeat))
+        benchmarks[name] = result(seconds, bulk_size, None)
+
+    return OrderedDict([
+        ("commit", git_commit()),
+        ("python", platform.python_version()),
+        ("model", OrderedDict([
+            ("files", len(fspecs)),
+            ("bytes", size),
+            ("tokens", tokens),
+            ("nodes", nodes),
+            ("parameters", model_generator.__dict__),
+        ])),
+        ("benchmarks", benchmarks),
+    ])
+
+
+def print_results(results, baseline=None):
+    model = results["model"]
+    print("Model: {} files, {} bytes, {} tokens, {} nodes".format(
+        model["files"], model["bytes"], model["tokens"], model["nodes"]))
+    for name, values in results["benchmarks"].items():
+        line = "{:12} {:9.4f}s".format(name, values["seconds"])
+        if values["bytes_per_second"]:
+            line += " {:10.0f} B/s".format(values["bytes_per_second"])
+        if values["nodes_per_second"]:
+            line += " {:10.0f} nodes/s".format(values["nodes_per_second"])
+        if "messages_per_second" in values:
+            line += " {:10.0f} msgs/s".format(values["messages_per_second"])
+        if "peak_memory" in values:
+            line += " {:8.1f} MiB peak".format(
+                values["peak_memory"] / 1024.0 / 1024.0)
+        if baseline and name in baseline["benchmarks"]:
+            old = baseline["benchmarks"][name]["seconds"]
+            line += "  x{:.2f} vs baseline".format(old / values["seconds"])
+        print(line)
+
+
+def parse_command_line():
+    parser = argparse.ArgumentParser(
+        description="Pyfranca benchmark suite.")
+    generator.add_arguments(parser)
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3,
+        help="Number of runs per benchmark; the best one is reported.")
+    parser.add_argument(
+        "-o", "--output", metavar="results_file",
+        help="Write the results to a JSON file.")
+    parser.add_argument(
+        "-c", "--compare", metavar="results_file",
+        help="Compare against the results of a previous run.")
+    parser.add_argument(
+        "-d", "--directory",
+        help="Model output directory. A temporary one is used by default.")
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_command_line()
+    directory = args.directory or tempfile.mkdtemp()
+    try:
+        results = run_benchmarks(generator.from_arguments(args), directory,
+                                 args.repeat)
+    finally:
+        if not args.directory:
+            shutil.rmtree(directory)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
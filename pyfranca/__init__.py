@@ -5,6 +5,7 @@ Pyfranca package.
 from pyfranca.franca_lexer import LexerException, Lexer
 from pyfranca.franca_parser import ParserException, Parser
 from pyfranca.franca_processor import ProcessorException, Processor
+from pyfranca.franca_diff import Change, Differ
 
 
 __version__ = "0.3.0"
@@ -5,6 +5,12 @@ Franca abstract syntax tree representation.
 from abc import ABCMeta
 from collections import OrderedDict
 
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    # Python 3
+    _STRING_TYPES = (str,)
+
 
 class ASTException(Exception):
 
@@ -39,13 +45,13 @@ class Package(object):
             item.package = self
 
     def __contains__(self, namespace):
-        if not isinstance(namespace, str):
+        if not isinstance(namespace, _STRING_TYPES):
             raise TypeError
         res = namespace in self.typecollections or namespace in self.interfaces
         return res
 
     def __getitem__(self, namespace):
-        if not isinstance(namespace, str):
+        if not isinstance(namespace, _STRING_TYPES):
             raise TypeError
         elif namespace in self.typecollections:
             return self.typecollections[namespace]
@@ -57,8 +63,9 @@ class Package(object):
     def __iadd__(self, package):
         if not isinstance(package, Package):
             raise TypeError
-        # Ignore the name and imports
+        # Ignore the name
         self.files += package.files
+        self.imports += package.imports
         for item in package.interfaces.values():
             if item.name in self:
                 raise ASTException("Interface member defined more than"
@@ -81,6 +88,7 @@ class Import(object):
         self.namespace = namespace          # None for "import model"
         self.package_reference = None
         self.namespace_reference = None
+        self.location = None                # See franca_locations
 
 
 class Namespace(object):
@@ -90,6 +98,7 @@ class Namespace(object):
     def __init__(self, name, flags=None, members=None):
         self.package = None
         self.name = name
+        self.location = None                        # See franca_locations
         self.flags = flags if flags else []         # Unused
         self.version = None
         self.typedefs = OrderedDict()
@@ -97,12 +106,14 @@ class Namespace(object):
         self.structs = OrderedDict()
         self.arrays = OrderedDict()
         self.maps = OrderedDict()
+        # Anonymous arrays by element type.
+        self._anonymous_arrays = {}
         if members:
             for member in members:
                 self._add_member(member)
 
     def __contains__(self, name):
-        if not isinstance(name, str):
+        if not isinstance(name, _STRING_TYPES):
             raise TypeError
         res = name in self.typedefs or \
             name in self.enumerations or \
@@ -112,7 +123,7 @@ class Namespace(object):
         return res
 
     def __getitem__(self, name):
-        if not isinstance(name, str):
+        if not isinstance(name, _STRING_TYPES):
             raise TypeError
         elif name in self.typedefs:
             return self.typedefs[name]
@@ -127,6 +138,34 @@ class Namespace(object):
         else:
             raise KeyError
 
+    def _intern(self, owner, name="type"):
+        """
+        Intern an anonymous array type of a definition.
+
+        Structurally identical anonymous arrays (e.g. all "Int32[]"
+        occurrences) in a namespace are replaced by a single shared
+        ast.Array object, so that each distinct element reference is
+        resolved only once. The shared element reference has the location
+        of the first occurrence - the location of the element type of each
+        occurrence is stored in the "<name>_location" attribute of the
+        definition instead, e.g. StructField.type_location.
+
+        :param owner: Definition with a type attribute, e.g. an
+            ast.StructField or ast.Argument object.
+        :param name: Name of the type attribute.
+        """
+        the_type = getattr(owner, name)
+        if not isinstance(the_type, Array) or the_type.name is not None:
+            return
+        setattr(owner, name + "_location", the_type.type.location)
+        key = (the_type.type.__class__, the_type.type.name)
+        interned = self._anonymous_arrays.get(key)
+        if interned is None:
+            the_type.namespace = self
+            self._anonymous_arrays[key] = the_type
+            interned = the_type
+        setattr(owner, name, interned)
+
     def _add_member(self, member):
         if isinstance(member, Version):
             if not self.version:
@@ -140,28 +179,23 @@ class Namespace(object):
             if isinstance(member, Typedef):
                 self.typedefs[member.name] = member
                 # Handle anonymous array special case.
-                if isinstance(member.type, Array):
-                    member.type.namespace = self
+                self._intern(member)
             elif isinstance(member, Enumeration):
                 self.enumerations[member.name] = member
             elif isinstance(member, Struct):
                 self.structs[member.name] = member
                 # Handle anonymous array special case.
                 for field in member.fields.values():
-                    if isinstance(field.type, Array):
-                        field.type.namespace = self
+                    self._intern(field)
             elif isinstance(member, Array):
                 self.arrays[member.name] = member
                 # Handle anonymous array special case.
-                if isinstance(member.type, Array):
-                    member.type.namespace = self
+                self._intern(member)
             elif isinstance(member, Map):
                 self.maps[member.name] = member
                 # Handle anonymous array special case.
-                if isinstance(member.key_type, Array):
-                    member.key_type.namespace = self
-                if isinstance(member.value_type, Array):
-                    member.value_type.namespace = self
+                self._intern(member, "key_type")
+                self._intern(member, "value_type")
             else:
                 raise ASTException("Unexpected namespace member type.")
             member.namespace = self
@@ -183,6 +217,7 @@ class Type(object):
     def __init__(self, name=None):
         self.namespace = None
         self.name = name if name else self.__class__.__name__
+        self.location = None        # See franca_locations
 
 
 class Typedef(Type):
@@ -190,6 +225,7 @@ class Typedef(Type):
     def __init__(self, name, base_type):
         super(Typedef, self).__init__(name)
         self.type = base_type
+        self.type_location = None   # See Namespace._intern()
 
 
 class PrimitiveType(Type):
@@ -294,6 +330,7 @@ class Enumeration(ComplexType):
         self.enumerators = enumerators if enumerators else OrderedDict()
         self.extends = extends
         self.reference = None
+        self.table = None           # See franca_inheritance
         self.flags = flags if flags else []         # Unused
 
 
@@ -302,6 +339,7 @@ class Enumerator(object):
     def __init__(self, name, value=None):
         self.name = name
         self.value = value
+        self.location = None        # See franca_locations
 
 
 class Struct(ComplexType):
@@ -312,6 +350,7 @@ class Struct(ComplexType):
         self.fields = fields if fields else OrderedDict()
         self.extends = extends
         self.reference = None
+        self.table = None           # See franca_inheritance
         self.flags = flags if flags else []
 
 
@@ -320,6 +359,8 @@ class StructField(object):
     def __init__(self, name, field_type):
         self.name = name
         self.type = field_type
+        self.location = None        # See franca_locations
+        self.type_location = None   # See Namespace._intern()
 
 
 class Array(ComplexType):
@@ -328,6 +369,7 @@ class Array(ComplexType):
         super(Array, self).__init__()
         self.name = name            # None for implicit arrays.
         self.type = element_type
+        self.type_location = None   # See Namespace._intern()
 
 
 class Map(ComplexType):
@@ -337,6 +379,8 @@ class Map(ComplexType):
         self.name = name
         self.key_type = key_type
         self.value_type = value_type
+        self.key_type_location = None       # See Namespace._intern()
+        self.value_type_location = None
 
 
 class Reference(Type):
@@ -356,12 +400,13 @@ class Interface(Namespace):
         self.broadcasts = OrderedDict()
         self.extends = extends
         self.reference = None
+        self.table = None           # See franca_inheritance
         if members:
             for member in members:
                 self._add_member(member)
 
     def __contains__(self, name):
-        if not isinstance(name, str):
+        if not isinstance(name, _STRING_TYPES):
             raise TypeError
         res = super(Interface, self).__contains__(name) or \
             name in self.attributes or \
@@ -370,7 +415,7 @@ class Interface(Namespace):
         return res
 
     def __getitem__(self, name):
-        if not isinstance(name, str):
+        if not isinstance(name, _STRING_TYPES):
             raise TypeError
         elif name in self.attributes:
             return self.attributes[name]
@@ -389,23 +434,19 @@ class Interface(Namespace):
             if isinstance(member, Attribute):
                 self.attributes[member.name] = member
                 # Handle anonymous array special case.
-                if isinstance(member.type, Array):
-                    member.type.namespace = self
+                self._intern(member)
             elif isinstance(member, Method):
                 self.methods[member.name] = member
                 # Handle anonymous array special case.
                 for arg in member.in_args.values():
-                    if isinstance(arg.type, Array):
-                        arg.type.namespace = self
+                    self._intern(arg)
                 for arg in member.out_args.values():
-                    if isinstance(arg.type, Array):
-                        arg.type.namespace = self
+                    self._intern(arg)
             elif isinstance(member, Broadcast):
                 self.broadcasts[member.name] = member
                 # Handle anonymous array special case.
                 for arg in member.out_args.values():
-                    if isinstance(arg.type, Array):
-                        arg.type.namespace = self
+                    self._intern(arg)
             else:
                 super(Interface, self)._add_member(member)
             member.namespace = self
@@ -428,6 +469,7 @@ class Attribute(Type):
     def __init__(self, name, attr_type, flags=None):
         super(Attribute, self).__init__(name)
         self.type = attr_type
+        self.type_location = None   # See Namespace._intern()
         self.flags = flags if flags else []
 
 
@@ -456,3 +498,5 @@ class Argument(object):
     def __init__(self, name, arg_type):
         self.name = name
         self.type = arg_type
+        self.location = None        # See franca_locations
+        self.type_location = None   # See Namespace._intern()
@@ -0,0 +1,165 @@
+"""
+Franca asynchronous model loading.
+
+Requires Python 3.5 or later, and is not installed on earlier versions. Use
+Processor.import_file_async() and Processor.import_files_async() instead of
+this module directly.
+"""
+
+import asyncio
+from pyfranca.ast import ASTException
+from pyfranca.franca_lexer import LexerException
+from pyfranca.franca_parser import ParserException, Parser
+from pyfranca.franca_processor import ProcessorException
+from pyfranca.franca_stats import clock
+
+try:
+    _running_loop = asyncio.get_running_loop
+except AttributeError:
+    # Python 3.5 and 3.6, returning the running loop in coroutines
+    _running_loop = asyncio.get_event_loop
+
+
+async def _run_in_executor(loop, function, *args):
+    """
+    Run a function in the default executor.
+
+    On cancellation, the function is waited for before the cancellation is
+    propagated, so that it does not change the processor afterwards.
+    """
+    future = loop.run_in_executor(None, function, *args)
+    try:
+        # Cancellation must not detach the executor future.
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+
+class _Loader(object):
+    """
+    Reads and parses model files in advance.
+
+    Files are read concurrently in the default executor, using the
+    processor's loaders. Parsing is serialized, as the parser is not
+    thread-safe. Errors are not reported here - the affected files are
+    loaded again, and the errors raised, when importing them in order.
+    """
+
+    def __init__(self, processor, loop):
+        self.processor = processor
+        self.loop = loop
+        self.tasks = {}
+        self.parse_lock = asyncio.Lock()
+
+    def schedule(self, fspec):
+        """
+        Start loading a file and, subsequently, the files it imports.
+
+        :param fspec: File specification.
+        """
+        processor = self.processor
+        if fspec in processor.files:
+            return
+        try:
+            loader, fspec = processor.find_loader(fspec)
+        except ProcessorException:
+            return
+        if fspec in processor.files or fspec in self.tasks:
+            return
+        self.tasks[fspec] = self.loop.create_task(self._load(loader, fspec))
+
+    async def _parse(self, fspec, fidl):
+        processor = self.processor
+        async with self.parse_lock:
+            if processor.parser is None:
+                processor.parser = await _run_in_executor(self.loop, Parser)
+            return await _run_in_executor(
+                self.loop, processor._parse, fspec, fidl, processor.parser)
+
+    async def _load(self, loader, fspec):
+        processor = self.processor
+        start = clock()
+        try:
+            fidl = await _run_in_executor(self.loop, loader.read, fspec)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return
+        read_seconds = clock() - start
+        try:
+            package = await self._parse(fspec, fidl)
+        except (LexerException, ParserException, ASTException):
+            return
+        if processor.stats is not None:
+            file_stats = processor.stats.file(fspec)
+            file_stats.bytes += len(fidl)
+            file_stats.read_seconds += read_seconds
+        processor.add_parsed(fspec, package)
+        if package is None:
+            # Invalid, reported in processor.diagnostics
+            return
+        for package_import in package.imports:
+            self.schedule(package_import.file)
+
+    async def wait(self):
+        """
+        Wait until all scheduled files, and the files they import, are
+        loaded.
+        """
+        while True:
+            pending = [task for task in self.tasks.values()
+                       if not task.done()]
+            if not pending:
+                return
+            await asyncio.wait(pending)
+
+    async def close(self):
+        """
+        Cancel loading the scheduled files and wait until the cancelled
+        tasks are finished.
+        """
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def import_files(processor, fspecs):
+    """
+    Import FIDL files without blocking the event loop.
+
+    The packages are merged and linked in the default executor. The
+    processor must not be used otherwise until the coroutine is finished.
+
+    :param processor: Processor object.
+    :param fspecs: A list of file specifications.
+    :return: A list of the parsed ast.Package objects.
+    """
+    loader = _Loader(processor, _running_loop())
+    try:
+        for fspec in fspecs:
+            loader.schedule(fspec)
+        await loader.wait()
+        # Merge and link in order, including the imported files.
+        packages = []
+        for fspec in fspecs:
+            packages.append(await _run_in_executor(
+                loader.loop, processor.import_file, fspec))
+        return packages
+    finally:
+        await loader.close()
+        processor.discard_parsed()
+
+
+async def import_file(processor, fspec):
+    """
+    Import an FIDL file without blocking the event loop.
+
+    :param processor: Processor object.
+    :param fspec: File specification.
+    :return: The parsed ast.Package.
+    """
+    packages = await import_files(processor, [fspec])
+    return packages[0]
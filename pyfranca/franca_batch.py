@@ -0,0 +1,266 @@
+"""
+Franca batch model validation.
+"""
+
+import multiprocessing
+import os
+import pickle
+from collections import OrderedDict
+from pyfranca.ast import ASTException
+from pyfranca.franca_lexer import LexerException
+from pyfranca.franca_locations import SourceMap
+from pyfranca.franca_parser import ParserException, Parser
+from pyfranca.franca_processor import ProcessorException, Processor
+from pyfranca.franca_stats import clock
+
+
+class ValidationResult(object):
+    """
+    Validation result of a single model entry file.
+    """
+
+    def __init__(self, fspec, errors=None, seconds=0.0):
+        """
+        Constructor.
+
+        :param fspec: Entry file specification.
+        :param errors: A list of error message strings.
+        :param seconds: Validation time.
+        """
+        self.fspec = fspec
+        self.errors = errors if errors else []
+        self.seconds = seconds
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def as_dict(self):
+        """
+        Convert to a dictionary, e.g. for JSON serialization.
+        """
+        return OrderedDict([
+            ("file", self.fspec),
+            ("valid", self.valid),
+            ("errors", self.errors),
+            ("seconds", self.seconds),
+        ])
+
+
+class Validator(object):
+    """
+    Validates independent model entry files with a warm parser.
+
+    Each entry is validated with a new processor, so entries do not see
+    each other's definitions, but the parser and its tables are kept. Parsed
+    files are cached until they are modified, so files imported by several
+    entries are parsed once - each processor links its own copy of them. A
+    resident validator keeps the processor across entries instead, so files
+    already loaded for previous entries are not linked again. Its processor
+    is replaced after a failed entry, as it may be left partially linked.
+
+    All model errors of an entry are reported, as with
+    Processor.diagnostics.
+    """
+
+    def __init__(self, package_paths=None, resident=False):
+        """
+        Constructor.
+
+        :param package_paths: A list of model import directories.
+        :param resident: True to keep the processor across entries.
+        """
+        self.package_paths = package_paths if package_paths else []
+        self.resident = resident
+        # Processor of the last validated entry, or of all entries if
+        #   resident.
+        self.processor = None
+        # Import graph of all validated files.
+        self.imports = {}
+        # Source map shared by the processors, locating the cached files.
+        self.sources = SourceMap()
+        # Parsed files by unique file specification - tuples of the
+        #   modification time, the pickled ast.Package and the parser
+        #   diagnostics.
+        self._cache = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Replace the processor, keeping its parser.
+        """
+        parser = self.processor.parser if self.processor else None
+        self.processor = Processor()
+        self.processor.package_paths.extend(self.package_paths)
+        self.processor.parser = parser
+        self.processor.sources = self.sources
+
+    def _parse(self, loader, fspec, mtime):
+        """
+        Parse a file and cache it.
+
+        :param loader: Loader of the file.
+        :param fspec: Unique file specification.
+        :param mtime: Modification time of the file.
+        :return: A tuple - the parsed ast.Package or None if it is invalid,
+            and the parser diagnostics. None if the file cannot be parsed -
+            import_file() loads it again and raises the error.
+        """
+        processor = self.processor
+        if processor.parser is None:
+            processor.parser = Parser()
+        try:
+            fidl = loader.read(fspec)
+            processor.parser.file_index = self.sources.add(fspec, fidl)
+            diagnostics = []
+            package = processor.parser.parse(fidl, None, diagnostics)
+        except (LexerException, ParserException, ASTException,
+                EnvironmentError, ValueError):
+            return None
+        for diagnostic in diagnostics:
+            diagnostic.file = fspec
+        if package is not None:
+            package.files = [fspec]
+        # Pickle the package before it is linked.
+        self._cache[fspec] = (
+            mtime, pickle.dumps(package, pickle.HIGHEST_PROTOCOL),
+            diagnostics)
+        return package, diagnostics
+
+    def _load(self, fspec):
+        """
+        Provide an entry file and the files it imports to the processor in
+        advance, parsed or copied from the cache.
+
+        :param fspec: Entry file specification.
+        """
+        processor = self.processor
+        pending = [fspec]
+        loaded = set()
+        while pending:
+            fspec = pending.pop()
+            if fspec in processor.files:
+                continue
+            try:
+                loader, fspec = processor.find_loader(fspec)
+            except ProcessorException:
+                # Reported by import_file()
+                continue
+            if fspec in processor.files or fspec in loaded:
+                continue
+            loaded.add(fspec)
+            try:
+                mtime = os.stat(fspec).st_mtime
+            except OSError:
+                continue
+            cached = self._cache.get(fspec)
+            if cached is not None and cached[0] == mtime:
+                package = pickle.loads(cached[1])
+                diagnostics = cached[2]
+            else:
+                parsed = self._parse(loader, fspec, mtime)
+                if parsed is None:
+                    continue
+                package, diagnostics = parsed
+            processor.diagnostics.extend(diagnostics)
+            processor.add_parsed(fspec, package)
+            if package is not None:
+                pending.extend(package_import.file
+                               for package_import in package.imports)
+
+    def validate(self, fspec):
+        """
+        Validate a model entry file.
+
+        :param fspec: Entry file specification.
+        :return: ValidationResult object.
+        """
+        start = clock()
+        if not self.resident:
+            self.reset()
+        processor = self.processor
+        processor.diagnostics = []
+        errors = []
+        try:
+            self._load(fspec)
+            processor.import_file(fspec)
+        except (LexerException, ParserException, ProcessorException,
+                ASTException, EnvironmentError, ValueError) as e:
+            # Unreadable files raise EnvironmentError, and files that are
+            #   not valid text UnicodeDecodeError.
+            errors.append(str(e))
+        finally:
+            processor.discard_parsed()
+        errors = [str(diagnostic) for diagnostic in processor.diagnostics] \
+            + errors
+        self.imports.update(processor.imports)
+        if errors and self.resident:
+            self.reset()
+        return ValidationResult(fspec, errors, clock() - start)
+
+
+# Per worker process validator.
+_validator = None
+
+
+def _init_worker(package_paths):
+    global _validator
+    _validator = Validator(package_paths)
+
+
+def _validate_in_worker(fspec):
+    return _validator.validate(fspec)
+
+
+class BatchValidator(object):
+    """
+    Validates many independent model entry files, optionally in parallel.
+    """
+
+    def __init__(self, package_paths=None, jobs=1):
+        """
+        Constructor.
+
+        :param package_paths: A list of model import directories.
+        :param jobs: Number of worker processes.
+        """
+        self.package_paths = package_paths if package_paths else []
+        self.jobs = jobs
+
+    def validate(self, fspecs):
+        """
+        Validate model entry files.
+
+        Errors do not stop the validation of the remaining files.
+
+        :param fspecs: A list of entry file specifications.
+        :return: A list of ValidationResult objects in input order.
+        """
+        if self.jobs <= 1 or len(fspecs) <= 1:
+            validator = Validator(self.package_paths)
+            return [validator.validate(fspec) for fspec in fspecs]
+        # Contiguous chunks keep related entries on the same warm worker.
+        chunk_size = max(1, len(fspecs) // (self.jobs * 4))
+        pool = multiprocessing.Pool(self.jobs, initializer=_init_worker,
+                                    initargs=(self.package_paths,))
+        try:
+            return pool.map(_validate_in_worker, fspecs, chunk_size)
+        finally:
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def summary(results):
+        """
+        Construct a machine-readable summary of validation results.
+
+        :param results: A list of ValidationResult objects.
+        :return: A dictionary, e.g. for JSON serialization.
+        """
+        invalid = sum(1 for result in results if not result.valid)
+        return OrderedDict([
+            ("files", [result.as_dict() for result in results]),
+            ("valid", len(results) - invalid),
+            ("invalid", invalid),
+            ("seconds", sum(result.seconds for result in results)),
+        ])
@@ -0,0 +1,436 @@
+"""
+Franca runtime class generation.
+
+Generates lightweight Python classes from linked model types:
+
+- structs and method and broadcast arguments become classes with __slots__
+  and positional constructors. Derived structs subclass the class of their
+  base struct.
+- enumerations become IntEnum classes with the enumerators of the
+  enumeration and its base enumerations, and a precomputed table resolving
+  enumerator names and values to members.
+
+Struct classes convert from and to the payload representation described in
+franca_payload with from_dict() and to_dict(). Fields named like Python
+keywords or the generated methods get a "_" suffix, as do enumerators named
+like Python keywords or reserved Enum attributes.
+
+The classes are either emitted once as the source of a Python module with
+ClassGenerator.source() or built in memory and cached. Enumerations require
+the enum module (Python 3.4 or later, or the enum34 package), which is only
+imported when an enumeration class is created.
+"""
+
+import keyword
+
+from pyfranca import ast
+from pyfranca.franca_inheritance import InheritanceException, \
+    enumeration_table, struct_table
+from pyfranca.franca_types import fqn, resolve_alias
+
+# Keywords of Python 2 and 3
+_KEYWORDS = frozenset(keyword.kwlist) | frozenset([
+    "True", "False", "None", "async", "await", "exec", "nonlocal", "print"])
+
+# Names that cannot be attributes or constructor parameters of the
+#   generated classes
+RESERVED = _KEYWORDS | frozenset(["self", "from_dict", "to_dict"])
+
+# Names that cannot be members of the generated IntEnum classes
+ENUMERATOR_RESERVED = _KEYWORDS | frozenset(["mro"])
+
+# Helpers shared by the generated classes
+HEADER = '''"""
+Classes generated by pyfranca from Franca model types.
+"""
+
+
+class _Record(object):
+    __slots__ = ()
+    _fields = ()
+    __hash__ = None
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name)
+            for name in self._fields)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(name, getattr(self, name))
+            for name in self._fields))
+
+
+def _enumeration(name, members):
+    from enum import IntEnum
+    # The module is looked up in the caller's globals otherwise, which
+    #   namespaces passed to exec() may lack on Python 3.6 and earlier.
+    return IntEnum(name, members,
+                   module=globals().get("__name__", "<pyfranca classes>"))
+
+
+def _table(enumeration, renamed):
+    table = dict((member.value, member) for member in enumeration)
+    for name, member in enumeration.__members__.items():
+        table[renamed.get(name, name)] = member
+    return table
+'''
+
+
+class GeneratorException(Exception):
+
+    def __init__(self, message):
+        super(GeneratorException, self).__init__()
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def attribute_name(name):
+    """
+    Get the Python attribute name of a struct field or argument.
+
+    :param name: Field or argument name.
+    :return: The name, with a "_" suffix if it is reserved.
+    """
+    return name + "_" if name in RESERVED else name
+
+
+def enumerator_name(name):
+    """
+    Get the Python member name of an enumerator.
+
+    :param name: Enumerator name.
+    :return: The name, with a "_" suffix if it is reserved.
+    """
+    return name + "_" if name in ENUMERATOR_RESERVED else name
+
+
+def _resolve(the_type):
+    return resolve_alias(the_type, GeneratorException)
+
+
+class ClassGenerator(object):
+    """
+    Generates Python classes from linked model types.
+
+    Classes are identified by the FQN of their type with "." replaced by
+    "_", e.g. P_TC_S for struct S of type collection P.TC. Argument classes
+    append "_in" or "_out" to the FQN of their method or broadcast.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        # Module namespace of the classes built in memory
+        self.namespace = {}
+        exec(compile(HEADER, "<pyfranca classes>", "exec"), self.namespace)
+        # Identifiers of the built classes by (node id, direction), with
+        #   the node kept alive so that its id is not reused.
+        self._built = {}
+
+    def struct_class(self, struct):
+        """
+        Get the class of a struct, building it in memory if necessary.
+
+        :param struct: Linked ast.Struct object.
+        :return: Class with __slots__.
+        """
+        return self._get(struct, None)
+
+    def enumeration_class(self, enumeration):
+        """
+        Get the class of an enumeration, building it in memory if
+        necessary.
+
+        :param enumeration: Linked ast.Enumeration object.
+        :return: IntEnum class.
+        """
+        return self._get(enumeration, None)
+
+    def arguments_class(self, node, direction):
+        """
+        Get the class of method or broadcast arguments, building it in
+        memory if necessary.
+
+        :param node: Linked ast.Method or ast.Broadcast object.
+        :param direction: "in" or "out".
+        :return: Class with __slots__ and an attribute per argument.
+        """
+        if direction not in ("in", "out") or \
+                (direction == "in" and isinstance(node, ast.Broadcast)):
+            raise ValueError("Invalid direction '{}'.".format(direction))
+        return self._get(node, direction)
+
+    def source(self, nodes):
+        """
+        Generate the source of a Python module defining classes.
+
+        :param nodes: A list of ast.Struct, ast.Enumeration, ast.Method,
+            ast.Broadcast, ast.Namespace or ast.Package objects. The module
+            also defines the classes of the types they use.
+        :return: Module source.
+        """
+        items = []
+        for node in nodes:
+            items.extend(self._expand(node))
+        return "\n".join([HEADER.rstrip("\n")] +
+                         self._source(items, {})) + "\n"
+
+    def _get(self, node, direction):
+        key = (id(node), direction)
+        if key not in self._built:
+            built = {}
+            lines = self._source([(node, direction)], self._built, built)
+            exec(compile("\n".join(lines), "<pyfranca classes>", "exec"),
+                 self.namespace)
+            self._built.update(built)
+        return self.namespace[self._built[key][1]]
+
+    @staticmethod
+    def _expand(node):
+        if isinstance(node, ast.Package):
+            namespaces = list(node.typecollections.values()) + \
+                list(node.interfaces.values())
+        elif isinstance(node, ast.Namespace):
+            namespaces = [node]
+        elif isinstance(node, ast.Method):
+            return [(node, "in"), (node, "out")]
+        elif isinstance(node, ast.Broadcast):
+            return [(node, "out")]
+        else:
+            return [(node, None)]
+        items = []
+        for namespace in namespaces:
+            for members in (namespace.enumerations, namespace.structs):
+                items.extend((member, None) for member in members.values())
+            if isinstance(namespace, ast.Interface):
+                for method in namespace.methods.values():
+                    items.extend([(method, "in"), (method, "out")])
+                items.extend((broadcast, "out")
+                             for broadcast in namespace.broadcasts.values())
+        return items
+
+    def _source(self, items, skip, built=None):
+        """
+        Generate class definitions.
+
+        :param items: A list of tuples - node and argument direction or
+            None.
+        :param skip: Dictionary of the (node id, direction) keys of classes
+            that are already defined.
+        :param built: Dictionary to add the keys of the generated classes
+            to, mapped to tuples - node and identifier.
+        :return: A list of source lines.
+        """
+        if built is None:
+            built = {}
+        enumerations = []
+        structs = []
+        arguments = []
+        identifiers = {}
+
+        def add(node, direction, target):
+            key = (id(node), direction)
+            if key in skip or key in built:
+                return False
+            identifier = fqn(node).replace(".", "_")
+            if direction is not None:
+                identifier += "_" + direction
+            if identifier in identifiers:
+                raise GeneratorException(
+                    "Conflicting class name '{}'.".format(identifier))
+            identifiers[identifier] = node
+            built[key] = (node, identifier)
+            target.append((node, direction, identifier))
+            return True
+
+        def visit(the_type):
+            the_type = _resolve(the_type)
+            if isinstance(the_type, ast.Enumeration):
+                add(the_type, None, enumerations)
+            elif isinstance(the_type, ast.Struct):
+                if (id(the_type), None) in skip or \
+                        (id(the_type), None) in built:
+                    return
+                fields = self._struct_fields(the_type)
+                # Base struct classes are defined first.
+                if the_type.reference is not None:
+                    visit(the_type.reference)
+                add(the_type, None, structs)
+                for field in fields:
+                    visit(field.type)
+            elif isinstance(the_type, ast.Array):
+                visit(the_type.type)
+            elif isinstance(the_type, ast.Map):
+                visit(the_type.key_type)
+                visit(the_type.value_type)
+
+        for node, direction in items:
+            if direction is None:
+                visit(node)
+            elif add(node, direction, arguments):
+                args = node.in_args if direction == "in" else node.out_args
+                for arg in args.values():
+                    visit(arg.type)
+
+        lines = []
+        for enumeration, _, identifier in enumerations:
+            lines.extend(self._enumeration_source(enumeration, identifier))
+        for struct, _, identifier in structs:
+            base = built.get((id(struct.reference), None)) or \
+                skip.get((id(struct.reference), None))
+            lines.extend(self._record_source(
+                identifier, "Struct " + fqn(struct),
+                base[1] if base else "_Record",
+                [field.name for field in struct.fields.values()],
+                self._struct_fields(struct), built, skip))
+        for node, direction, identifier in arguments:
+            args = node.in_args if direction == "in" else node.out_args
+            lines.extend(self._record_source(
+                identifier, "{} arguments of {}".format(
+                    "Input" if direction == "in" else "Output", fqn(node)),
+                "_Record", [arg.name for arg in args.values()],
+                list(args.values()), built, skip))
+        return lines
+
+    @staticmethod
+    def _struct_fields(struct):
+        try:
+            return struct_table(struct).fields
+        except InheritanceException as e:
+            raise GeneratorException(e.message)
+
+    @staticmethod
+    def _enumeration_source(enumeration, identifier):
+        try:
+            values = list(enumeration_table(enumeration).items())
+        except InheritanceException as e:
+            raise GeneratorException(e.message)
+        names = set(name for name, _ in values)
+        members = []
+        # Original names of the renamed members
+        renamed = []
+        for name, value in values:
+            member = enumerator_name(name)
+            if member != name:
+                if member in names:
+                    raise GeneratorException(
+                        "Conflicting enumerator name '{}' in '{}'.".format(
+                            member, enumeration.name))
+                renamed.append("{!r}: {!r}".format(str(member), str(name)))
+            members.append("    ({!r}, {!r}),".format(str(member), value))
+        return [
+            "",
+            "",
+            "{} = _enumeration({!r}, [".format(identifier, identifier),
+        ] + members + [
+            "])",
+            "_{}_table = _table({}, {{{}}})".format(
+                identifier, identifier, ", ".join(renamed)),
+        ]
+
+    def _record_source(self, identifier, title, base, own, members, built,
+                       skip):
+        """
+        Generate a class with __slots__.
+
+        :param identifier: Class name.
+        :param title: Docstring.
+        :param base: Base class name.
+        :param own: Names of the members defined by the class itself.
+        :param members: ast.StructField or ast.Argument objects of all
+            members, base struct fields first.
+        """
+        classes = {}
+        classes.update(skip)
+        classes.update(built)
+        names = [member.name for member in members]
+        attributes = [attribute_name(name) for name in names]
+        for name, attribute in zip(names, attributes):
+            if attribute != name and attribute in names:
+                raise GeneratorException(
+                    "Conflicting attribute name '{}' in '{}'.".format(
+                        attribute, identifier))
+        lines = [
+            "",
+            "",
+            "class {}({}):".format(identifier, base),
+            '    """{}."""'.format(title),
+            "    __slots__ = ({})".format(self._tuple(
+                [attribute_name(name) for name in own])),
+            "    _fields = ({})".format(self._tuple(attributes)),
+            "",
+            "    def __init__({}):".format(", ".join(
+                ["self"] + ["{}=None".format(attribute)
+                            for attribute in attributes])),
+        ]
+        lines.extend("        self.{0} = {0}".format(attribute)
+                     for attribute in attributes)
+        if not attributes:
+            lines.append("        pass")
+        lines.extend([
+            "",
+            "    @classmethod",
+            "    def from_dict(cls, values):",
+            "        return cls({})".format(", ".join(
+                self._convert(member.type, "values[{!r}]".format(
+                    str(member.name)), True, classes, 0)
+                for member in members)),
+            "",
+            "    def to_dict(self):",
+            "        return {{{}}}".format(", ".join(
+                "{!r}: {}".format(str(member.name), self._convert(
+                    member.type, "self." + attribute, False, classes, 0))
+                for member, attribute in zip(members, attributes))),
+        ])
+        return lines
+
+    @staticmethod
+    def _tuple(names):
+        if len(names) == 1:
+            return "{!r},".format(str(names[0]))
+        return ", ".join("{!r}".format(str(name)) for name in names)
+
+    def _convert(self, the_type, expression, from_dict, classes, depth):
+        """
+        Generate an expression converting a payload value to objects of the
+        generated classes, or back.
+
+        :return: The expression, or the original expression if the value
+            needs no conversion.
+        """
+        the_type = _resolve(the_type)
+        if isinstance(the_type, ast.Enumeration):
+            identifier = classes[(id(the_type), None)][1]
+            if from_dict:
+                return "_{}_table[{}]".format(identifier, expression)
+            return "int({})".format(expression)
+        elif isinstance(the_type, ast.Struct):
+            identifier = classes[(id(the_type), None)][1]
+            if from_dict:
+                return "{}.from_dict({})".format(identifier, expression)
+            return "{}.to_dict()".format(expression)
+        elif isinstance(the_type, ast.Array):
+            item = "item{}".format(depth)
+            converted = self._convert(the_type.type, item, from_dict,
+                                      classes, depth + 1)
+            if converted != item:
+                return "[{} for {} in {}]".format(converted, item,
+                                                  expression)
+        elif isinstance(the_type, ast.Map):
+            key = "key{}".format(depth)
+            value = "value{}".format(depth)
+            converted_key = self._convert(the_type.key_type, key,
+                                          from_dict, classes, depth + 1)
+            converted_value = self._convert(the_type.value_type, value,
+                                            from_dict, classes, depth + 1)
+            if converted_key != key or converted_value != value:
+                return "{{{}: {} for {}, {} in {}.items()}}".format(
+                    converted_key, converted_value, key, value, expression)
+        return expression
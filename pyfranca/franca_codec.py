@@ -0,0 +1,500 @@
+"""
+Franca binary payload codec.
+
+Encodes and decodes payloads, represented as described in franca_payload,
+in a SOME/IP-style binary format. Each type is compiled once into
+precompiled struct.Struct formats and specialized encoding and decoding
+functions.
+
+Wire format:
+
+- integer types, Float and Double with their fixed size in the byte order
+  of the codec, big endian by default, and Boolean as one byte,
+- enumerations as enumerator values of the enumeration backing type,
+  UInt32 by default. Enumerations are decoded to enumerator names.
+- String as a UInt32 length followed by the UTF-8 encoded text and a
+  terminating NUL byte, included in the length,
+- ByteBuffer as a UInt32 length followed by the bytes,
+- arrays and maps as a UInt32 length in bytes followed by the elements, or
+  the keys and values,
+- structs as their fields, base struct fields first, without padding,
+- method and broadcast arguments as a struct of the arguments.
+
+Encoding does not validate payloads beyond what the format requires - use
+franca_payload.PayloadValidator for detailed errors.
+"""
+
+import struct
+from operator import itemgetter
+
+from pyfranca import ast
+from pyfranca.franca_inheritance import enumeration_table, struct_table
+from pyfranca.franca_types import TypeCache
+
+# struct module format characters of the fixed-size types
+FORMATS = {
+    ast.Int8: "b",
+    ast.Int16: "h",
+    ast.Int32: "i",
+    ast.Int64: "q",
+    ast.UInt8: "B",
+    ast.UInt16: "H",
+    ast.UInt32: "I",
+    ast.UInt64: "Q",
+    ast.Boolean: "?",
+    ast.Float: "f",
+    ast.Double: "d",
+}
+
+
+class CodecException(Exception):
+
+    def __init__(self, message):
+        super(CodecException, self).__init__()
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class TypeCodec(object):
+    """
+    Compiled encoding and decoding functions of a type.
+    """
+
+    def __init__(self, pack=None, unpack=None, fmt=None, to_wire=None,
+                 from_wire=None):
+        """
+        Constructor.
+
+        :param pack: Function appending the encoding of a value to a
+            bytearray.
+        :param unpack: Function decoding a value from a buffer at an
+            offset, returning the value and the offset after it.
+        :param fmt: struct module format character of fixed-size types.
+        :param to_wire: Function converting values of fixed-size types
+            before packing, or None.
+        :param from_wire: Function converting unpacked values of fixed-size
+            types, or None.
+        """
+        self.pack = pack
+        self.unpack = unpack
+        self.format = fmt
+        self.to_wire = to_wire
+        self.from_wire = from_wire
+
+    def encode(self, value):
+        """
+        Encode a payload value.
+
+        :param value: Payload value.
+        :return: Encoded bytes.
+        :raises CodecException: If the value cannot be encoded.
+        """
+        out = bytearray()
+        try:
+            self.pack(value, out)
+        except KeyError as e:
+            raise CodecException("Missing field {!r}.".format(e.args[0]))
+        except (struct.error, OverflowError, TypeError, AttributeError) as e:
+            raise CodecException("Cannot encode payload: {}".format(e))
+        return bytes(out)
+
+    def decode(self, data):
+        """
+        Decode a payload value.
+
+        :param data: Encoded bytes or bytearray.
+        :return: Payload value.
+        :raises CodecException: If the data is invalid.
+        """
+        try:
+            value, offset = self.unpack(data, 0)
+        except struct.error:
+            raise CodecException("Truncated payload.")
+        except UnicodeDecodeError as e:
+            raise CodecException("Invalid string: {}".format(e))
+        if offset != len(data):
+            raise CodecException("Trailing bytes after payload: {}.".format(
+                len(data) - offset))
+        return value
+
+
+class Codec(object):
+    """
+    Compiles linked model types into binary codecs.
+
+    Codecs are cached per type, so each type is compiled once.
+    """
+
+    def __init__(self, byte_order=">", enumeration_type=ast.UInt32):
+        """
+        Constructor.
+
+        :param byte_order: ">" for big endian or "<" for little endian.
+        :param enumeration_type: ast.Type subclass of the enumeration
+            backing type.
+        """
+        if byte_order not in (">", "<"):
+            raise ValueError("Invalid byte order '{}'.".format(byte_order))
+        if enumeration_type not in FORMATS or \
+                enumeration_type in (ast.Boolean, ast.Float, ast.Double):
+            raise ValueError("Invalid enumeration type '{}'.".format(
+                enumeration_type.__name__))
+        self.byte_order = byte_order
+        self.enumeration_format = FORMATS[enumeration_type]
+        self._length = struct.Struct(byte_order + "I")
+        # TypeCodec objects by type
+        self._cache = TypeCache(self._compile, CodecException)
+
+    def encode(self, the_type, value):
+        """
+        Encode a payload value.
+
+        :param the_type: Linked ast.Type object.
+        :param value: Payload value.
+        :return: Encoded bytes.
+        """
+        return self.compile(the_type).encode(value)
+
+    def decode(self, the_type, data):
+        """
+        Decode a payload value.
+
+        :param the_type: Linked ast.Type object.
+        :param data: Encoded bytes.
+        :return: Payload value.
+        """
+        return self.compile(the_type).decode(data)
+
+    def encode_arguments(self, args, values):
+        """
+        Encode method or broadcast arguments.
+
+        :param args: OrderedDict of ast.Argument objects, e.g.
+            ast.Method.in_args or ast.Broadcast.out_args.
+        :param values: Dictionary of argument values by name.
+        :return: Encoded bytes.
+        """
+        return self.compile_arguments(args).encode(values)
+
+    def decode_arguments(self, args, data):
+        """
+        Decode method or broadcast arguments.
+
+        :param args: OrderedDict of ast.Argument objects.
+        :param data: Encoded bytes.
+        :return: Dictionary of argument values by name.
+        """
+        return self.compile_arguments(args).decode(data)
+
+    def compile(self, the_type):
+        """
+        Compile a type into a codec.
+
+        :param the_type: Linked ast.Type object.
+        :return: TypeCodec object.
+        :raises CodecException: If the type is not linked or recursive
+            without an indirection.
+        """
+        return self._cache.get_type(the_type)
+
+    def compile_arguments(self, args):
+        """
+        Compile method or broadcast arguments into a codec.
+
+        :param args: OrderedDict of ast.Argument objects.
+        :return: TypeCodec object for dictionaries of argument values by
+            name.
+        """
+        return self._cache.get(args, self._compile_arguments)
+
+    def _compile_arguments(self, args):
+        codec = TypeCodec()
+        self._record(codec, [(arg.name, arg.type) for arg in args.values()])
+        return codec
+
+    def _compile(self, the_type):
+        if type(the_type) in FORMATS:
+            return self._fixed(FORMATS[type(the_type)])
+        elif isinstance(the_type, ast.String):
+            return self._bytes(True)
+        elif isinstance(the_type, ast.ByteBuffer):
+            return self._bytes(False)
+        elif isinstance(the_type, ast.Enumeration):
+            return self._enumeration(the_type)
+        elif isinstance(the_type, ast.Struct):
+            # The fields are compiled after caching the codec, for recursive
+            #   structs.
+            codec = TypeCodec()
+            self._cache.set(the_type, codec)
+            self._record(codec, [(field.name, field.type)
+                                 for field in struct_table(the_type).fields])
+            return codec
+        elif isinstance(the_type, ast.Array):
+            return self._array(the_type)
+        elif isinstance(the_type, ast.Map):
+            return self._map(the_type)
+        raise CodecException("Unsupported type '{}'.".format(
+            the_type.__class__.__name__))
+
+    def _fixed(self, fmt, to_wire=None, from_wire=None):
+        packer = struct.Struct(self.byte_order + fmt)
+        pack_value = packer.pack
+        unpack_from = packer.unpack_from
+        size = packer.size
+
+        if to_wire is None:
+            def pack(value, out):
+                out += pack_value(value)
+        else:
+            def pack(value, out):
+                out += pack_value(to_wire(value))
+
+        if from_wire is None:
+            def unpack(data, offset):
+                return unpack_from(data, offset)[0], offset + size
+        else:
+            def unpack(data, offset):
+                return from_wire(unpack_from(data, offset)[0]), offset + size
+
+        return TypeCodec(pack, unpack, fmt, to_wire, from_wire)
+
+    def _bytes(self, text):
+        pack_length = self._length.pack
+        unpack_length = self._length.unpack_from
+
+        def pack(value, out):
+            if text:
+                value = value.encode("utf-8") + b"\x00"
+            out += pack_length(len(value))
+            out += value
+
+        def unpack(data, offset):
+            length, = unpack_length(data, offset)
+            offset += 4
+            end = offset + length
+            if end > len(data):
+                raise struct.error("Truncated payload.")
+            if text:
+                if not length or data[end - 1:end] != b"\x00":
+                    raise CodecException("Unterminated string.")
+                return data[offset:end - 1].decode("utf-8"), end
+            return bytes(data[offset:end]), end
+
+        return TypeCodec(pack, unpack)
+
+    def _enumeration(self, enumeration):
+        table = enumeration_table(enumeration)
+        by_name = table.by_name
+        by_value = table.by_value
+        enumeration_name = enumeration.name
+
+        def to_wire(value):
+            if value in by_value:
+                return value
+            try:
+                return by_name[value]
+            except (KeyError, TypeError):
+                raise CodecException("Invalid enumerator {!r} for {}.".format(
+                    value, enumeration_name))
+
+        def from_wire(value):
+            try:
+                return by_value[value]
+            except KeyError:
+                raise CodecException("Invalid enumerator {!r} for {}.".format(
+                    value, enumeration_name))
+
+        return self._fixed(self.enumeration_format, to_wire, from_wire)
+
+    def _record(self, codec, members):
+        """
+        Fill in a codec for dictionaries of named values.
+
+        Consecutive fixed-size members are packed with one struct.Struct.
+
+        :param codec: TypeCodec object to fill in.
+        :param members: A list of tuples - name and ast.Type object.
+        """
+        packers = []
+        unpackers = []
+        run = []
+        for name, the_type in members + [(None, None)]:
+            member = self.compile(the_type) if the_type is not None \
+                else None
+            if member is not None and member.format is not None:
+                run.append((name, member))
+                continue
+            if run:
+                self._run(run, packers, unpackers)
+                run = []
+            if member is not None:
+                self._member(name, member, packers, unpackers)
+
+        def pack(value, out):
+            for pack_member in packers:
+                pack_member(value, out)
+
+        def unpack(data, offset):
+            value = {}
+            for unpack_member in unpackers:
+                offset = unpack_member(data, offset, value)
+            return value, offset
+
+        codec.pack = pack
+        codec.unpack = unpack
+
+    def _run(self, run, packers, unpackers):
+        names = [name for name, _ in run]
+        packer = struct.Struct(self.byte_order + "".join(
+            member.format for _, member in run))
+        pack_values = packer.pack
+        unpack_from = packer.unpack_from
+        size = packer.size
+        getter = itemgetter(*names)
+        to_wire = [(index, member.to_wire)
+                   for index, (_, member) in enumerate(run)
+                   if member.to_wire is not None]
+        from_wire = [(index, member.from_wire)
+                     for index, (_, member) in enumerate(run)
+                     if member.from_wire is not None]
+
+        if len(names) == 1 and not to_wire:
+            def pack(value, out):
+                out += pack_values(getter(value))
+        elif not to_wire:
+            def pack(value, out):
+                out += pack_values(*getter(value))
+        else:
+            single = len(names) == 1
+
+            def pack(value, out):
+                items = [getter(value)] if single else list(getter(value))
+                for index, convert in to_wire:
+                    items[index] = convert(items[index])
+                out += pack_values(*items)
+
+        def unpack(data, offset, value):
+            items = unpack_from(data, offset)
+            if from_wire:
+                items = list(items)
+                for index, convert in from_wire:
+                    items[index] = convert(items[index])
+            value.update(zip(names, items))
+            return offset + size
+
+        packers.append(pack)
+        unpackers.append(unpack)
+
+    @staticmethod
+    def _member(name, member, packers, unpackers):
+        # Look the functions up on use - the member codec may still be
+        #   being compiled.
+        def pack(value, out):
+            member.pack(value[name], out)
+
+        def unpack(data, offset, value):
+            value[name], offset = member.unpack(data, offset)
+            return offset
+
+        packers.append(pack)
+        unpackers.append(unpack)
+
+    def _sequence(self, pack_items, unpack_items):
+        length = self._length
+        pack_length = length.pack
+        pack_into = length.pack_into
+        unpack_length = length.unpack_from
+
+        def pack(value, out):
+            start = len(out)
+            out += pack_length(0)
+            pack_items(value, out)
+            pack_into(out, start, len(out) - start - 4)
+
+        def unpack(data, offset):
+            size, = unpack_length(data, offset)
+            offset += 4
+            end = offset + size
+            if end > len(data):
+                raise struct.error("Truncated payload.")
+            return unpack_items(data, offset, end), end
+
+        return TypeCodec(pack, unpack)
+
+    def _array(self, array):
+        # The element type is compiled after caching the codec, for
+        #   recursive arrays.
+        codec = TypeCodec()
+        self._cache.set(array, codec)
+        element = self.compile(array.type)
+        if element.format is not None and element.to_wire is None:
+            # Arrays of primitive types are packed with one call.
+            fmt = element.format
+            size = struct.calcsize(fmt)
+            byte_order = self.byte_order
+
+            def pack_items(value, out):
+                out += struct.pack("{}{}{}".format(
+                    byte_order, len(value), fmt), *value)
+
+            def unpack_items(data, offset, end):
+                count, rest = divmod(end - offset, size)
+                if rest:
+                    raise CodecException(
+                        "Array length {} is not a multiple of {}.".format(
+                            end - offset, size))
+                return list(struct.unpack_from("{}{}{}".format(
+                    byte_order, count, fmt), data, offset))
+        else:
+            def pack_items(value, out):
+                pack_element = element.pack
+                for item in value:
+                    pack_element(item, out)
+
+            def unpack_items(data, offset, end):
+                unpack_element = element.unpack
+                items = []
+                while offset < end:
+                    item, offset = unpack_element(data, offset)
+                    items.append(item)
+                if offset != end:
+                    raise CodecException("Array element exceeds array.")
+                return items
+
+        sequence = self._sequence(pack_items, unpack_items)
+        codec.pack = sequence.pack
+        codec.unpack = sequence.unpack
+        return codec
+
+    def _map(self, the_map):
+        # The key and value types are compiled after caching the codec, for
+        #   recursive maps.
+        codec = TypeCodec()
+        self._cache.set(the_map, codec)
+        key = self.compile(the_map.key_type)
+        item = self.compile(the_map.value_type)
+
+        def pack_items(value, out):
+            pack_key = key.pack
+            pack_item = item.pack
+            for map_key, map_value in value.items():
+                pack_key(map_key, out)
+                pack_item(map_value, out)
+
+        def unpack_items(data, offset, end):
+            unpack_key = key.unpack
+            unpack_item = item.unpack
+            items = {}
+            while offset < end:
+                map_key, offset = unpack_key(data, offset)
+                items[map_key], offset = unpack_item(data, offset)
+            if offset != end:
+                raise CodecException("Map entry exceeds map.")
+            return items
+
+        sequence = self._sequence(pack_items, unpack_items)
+        codec.pack = sequence.pack
+        codec.unpack = sequence.unpack
+        return codec
@@ -0,0 +1,373 @@
+"""
+Franca validator daemon.
+
+Keeps a linked model resident and answers requests over a local Unix domain
+socket. Requests and responses are JSON objects, one per line:
+
+    {"command": "validate", "files": ["/abs/model.fidl"]}
+    {"command": "dump", "file": "/abs/model.fidl"}
+    {"command": "query", "fqn": "Package.Interface.method"}
+    {"command": "ping"}
+    {"command": "shutdown"}
+
+Responses have an "ok" member and either a "result" or an "error" member.
+"""
+
+import json
+import os
+import socket
+import stat
+import threading
+from collections import OrderedDict
+from pyfranca import ast
+from pyfranca.ast import ASTException
+from pyfranca.franca_batch import BatchValidator, Validator
+from pyfranca.franca_diff import Differ
+from pyfranca.franca_lexer import LexerException
+from pyfranca.franca_parser import ParserException
+from pyfranca.franca_processor import ProcessorException
+
+try:
+    import socketserver
+except ImportError:
+    # Python 2
+    import SocketServer as socketserver
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    # Python 3
+    _STRING_TYPES = (str,)
+
+
+class DaemonException(Exception):
+
+    def __init__(self, message):
+        super(DaemonException, self).__init__()
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def _describe_args(args):
+    return OrderedDict((arg.name, Differ.type_name(arg.type))
+                       for arg in args.values())
+
+
+def describe(node):
+    """
+    Describe a package, namespace or namespace member.
+
+    :param node: ast.Package, ast.Namespace or ast.Type object.
+    :return: A dictionary, e.g. for JSON serialization.
+    """
+    if isinstance(node, ast.Package):
+        return OrderedDict([
+            ("kind", "package"),
+            ("name", node.name),
+            ("files", node.files),
+            ("imports", [OrderedDict([("namespace", item.namespace),
+                                      ("file", item.file)])
+                         for item in node.imports]),
+            ("interfaces", [describe(item)
+                            for item in node.interfaces.values()]),
+            ("typecollections", [describe(item)
+                                 for item in node.typecollections.values()]),
+        ])
+    res = OrderedDict([("kind", Differ.element_kind(node)),
+                       ("name", node.name)])
+    if isinstance(node, ast.Namespace):
+        res["fqn"] = Differ.namespace_fqn(node)
+        res["version"] = str(node.version) if node.version else None
+        if isinstance(node, ast.Interface):
+            res["extends"] = node.extends
+            res["attributes"] = list(node.attributes.keys())
+            res["methods"] = list(node.methods.keys())
+            res["broadcasts"] = list(node.broadcasts.keys())
+        res["typedefs"] = list(node.typedefs.keys())
+        res["enumerations"] = list(node.enumerations.keys())
+        res["structs"] = list(node.structs.keys())
+        res["arrays"] = list(node.arrays.keys())
+        res["maps"] = list(node.maps.keys())
+        return res
+    res["fqn"] = "{}.{}".format(Differ.namespace_fqn(node.namespace),
+                                node.name)
+    if isinstance(node, (ast.Typedef, ast.Array, ast.Attribute)):
+        res["type"] = Differ.type_name(node.type)
+    elif isinstance(node, ast.Map):
+        res["key_type"] = Differ.type_name(node.key_type)
+        res["value_type"] = Differ.type_name(node.value_type)
+    elif isinstance(node, ast.Struct):
+        res["extends"] = node.extends
+        res["fields"] = OrderedDict(
+            (field.name, Differ.type_name(field.type))
+            for field in node.fields.values())
+    elif isinstance(node, ast.Enumeration):
+        res["extends"] = node.extends
+        res["enumerators"] = OrderedDict(
+            (item.name, item.value) for item in node.enumerators.values())
+    elif isinstance(node, ast.Method):
+        res["in_args"] = _describe_args(node.in_args)
+        res["out_args"] = _describe_args(node.out_args)
+    elif isinstance(node, ast.Broadcast):
+        res["out_args"] = _describe_args(node.out_args)
+    if getattr(node, "flags", None):
+        res["flags"] = node.flags
+    return res
+
+
+def find(packages, fqn):
+    """
+    Find a namespace or a namespace member by FQN.
+
+    :param packages: A dictionary of ast.Package objects.
+    :param fqn: Namespace or namespace member FQN.
+    :return: ast.Namespace or ast.Type object.
+    """
+    for package in packages.values():
+        if not fqn.startswith(package.name + "."):
+            continue
+        parts = fqn[len(package.name) + 1:].split(".")
+        if parts[0] not in package:
+            continue
+        namespace = package[parts[0]]
+        if len(parts) == 1:
+            return namespace
+        if len(parts) == 2 and parts[1] in namespace:
+            return namespace[parts[1]]
+    raise DaemonException("'{}' not found.".format(fqn))
+
+
+class ValidatorDaemon(object):
+    """
+    Resident model validator.
+
+    Loaded files are checked for modifications before every request. The
+    model is reloaded on the next request if any of them changed.
+    """
+
+    def __init__(self, package_paths=None):
+        """
+        Constructor.
+
+        :param package_paths: A list of model import directories.
+        """
+        self.validator = Validator(
+            [os.path.abspath(path) for path in package_paths or []],
+            resident=True)
+        self._mtimes = {}
+        self.running = True
+
+    @staticmethod
+    def _mtime(fspec):
+        try:
+            return os.stat(fspec).st_mtime
+        except OSError:
+            return None
+
+    def check_changes(self):
+        """
+        Reset the model if any of the loaded files changed.
+
+        :return: True if the model was reset.
+        """
+        for fspec, mtime in self._mtimes.items():
+            if self._mtime(fspec) != mtime:
+                self.validator.reset()
+                self._mtimes = {}
+                return True
+        return False
+
+    def _record_mtimes(self):
+        for fspec in self.validator.processor.files:
+            if fspec not in self._mtimes:
+                self._mtimes[fspec] = self._mtime(fspec)
+
+    def validate(self, fspecs):
+        results = [self.validator.validate(fspec) for fspec in fspecs]
+        self._record_mtimes()
+        return BatchValidator.summary(results)
+
+    def dump(self, fspec):
+        result = self.validator.validate(fspec)
+        self._record_mtimes()
+        if not result.valid:
+            raise DaemonException(result.errors[0])
+        processor = self.validator.processor
+        return describe(processor.files[processor.find_file(fspec)])
+
+    def query(self, fqn):
+        return describe(find(self.validator.processor.packages, fqn))
+
+    @staticmethod
+    def _argument(request, name, many=False):
+        """
+        Get a string or string list argument of a request.
+        """
+        value = request.get(name)
+        values = value if many and isinstance(value, list) else [value]
+        if not all(isinstance(item, _STRING_TYPES) for item in values):
+            raise DaemonException("Invalid or missing argument '{}'.".format(
+                name))
+        return value
+
+    def handle(self, request):
+        """
+        Handle a request.
+
+        :param request: Request dictionary.
+        :return: Response dictionary.
+        """
+        try:
+            if not isinstance(request, dict):
+                raise DaemonException("Invalid request.")
+            command = request.get("command")
+            self.check_changes()
+            if command == "validate":
+                result = self.validate(
+                    self._argument(request, "files", many=True))
+            elif command == "dump":
+                result = self.dump(self._argument(request, "file"))
+            elif command == "query":
+                result = self.query(self._argument(request, "fqn"))
+            elif command == "ping":
+                result = "pong"
+            elif command == "shutdown":
+                self.running = False
+                result = None
+            else:
+                raise DaemonException(
+                    "Unknown command '{}'.".format(command))
+        except (DaemonException, LexerException, ParserException,
+                ProcessorException, ASTException, EnvironmentError,
+                ValueError) as e:
+            # As in Validator.validate(), e.g. for unreadable files
+            return OrderedDict([("ok", False), ("error", str(e))])
+        return OrderedDict([("ok", True), ("result", result)])
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        daemon = self.server.daemon
+        for line in self.rfile:
+            try:
+                request = json.loads(line.decode("utf-8"))
+            except ValueError:
+                response = {"ok": False, "error": "Invalid request."}
+            else:
+                with self.server.lock:
+                    response = daemon.handle(request)
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+            if not daemon.running:
+                self.server.shutdown()
+                break
+
+
+class ValidatorServer(socketserver.ThreadingMixIn,
+                      socketserver.UnixStreamServer):
+    """
+    Unix domain socket server of a ValidatorDaemon.
+
+    Every connection is served by its own thread, so an idle client does
+    not block the others. Requests are handled one at a time, so the
+    resident model is never accessed concurrently.
+    """
+
+    # Connections still open on shutdown do not keep the process alive.
+    daemon_threads = True
+
+    def __init__(self, socket_path, package_paths=None):
+        """
+        Constructor.
+
+        :param socket_path: Socket file specification.
+        :param package_paths: A list of model import directories.
+        """
+        if os.path.exists(socket_path):
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise DaemonException("'{}' is not a socket.".format(
+                    socket_path))
+            try:
+                ValidatorClient(socket_path).close()
+            except socket.error:
+                # Remove a stale socket.
+                os.unlink(socket_path)
+            else:
+                raise DaemonException(
+                    "A daemon is already listening on '{}'.".format(
+                        socket_path))
+        self.socket_path = socket_path
+        self.daemon = ValidatorDaemon(package_paths)
+        # Serializes the requests of all connections.
+        self.lock = threading.Lock()
+        socketserver.UnixStreamServer.__init__(self, socket_path,
+                                               _RequestHandler)
+
+    def serve(self):
+        """
+        Serve requests until a shutdown request is received.
+        """
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+class ValidatorClient(object):
+    """
+    Thin ValidatorDaemon client.
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        """
+        Constructor.
+
+        :param socket_path: Socket file specification.
+        :param timeout: Socket timeout in seconds.
+        """
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_path)
+        self._file = self._socket.makefile("rwb")
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def request(self, command, **kwargs):
+        """
+        Send a request and wait for the response.
+
+        :param command: Command name.
+        :param kwargs: Command arguments.
+        :return: Command result.
+        """
+        kwargs["command"] = command
+        self._file.write(json.dumps(kwargs).encode("utf-8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise DaemonException("Connection closed.")
+        response = json.loads(line.decode("utf-8"))
+        if not response["ok"]:
+            raise DaemonException(response["error"])
+        return response["result"]
+
+    def validate(self, fspecs):
+        return self.request("validate",
+                            files=[os.path.abspath(fspec)
+                                   for fspec in fspecs])
+
+    def dump(self, fspec):
+        return self.request("dump", file=os.path.abspath(fspec))
+
+    def query(self, fqn):
+        return self.request("query", fqn=fqn)
+
+    def shutdown(self):
+        return self.request("shutdown")
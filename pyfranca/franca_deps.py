@@ -0,0 +1,130 @@
+"""
+Franca model dependency files.
+
+Dependencies are written in the Make format also produced by C compilers
+(e.g. "gcc -MD -MP"), so build systems can include them directly:
+
+    target: entry.fidl imported.fidl
+    imported.fidl:
+"""
+
+import os
+
+
+def closure(imports, fspecs):
+    """
+    Find the files imported by entry files, directly or indirectly.
+
+    :param imports: Import graph, i.e. a dictionary of imported file lists.
+    :param fspecs: A list of entry file specifications.
+    :return: A list of the entry and imported file specifications, in
+        depth-first import order.
+    """
+    result = []
+    seen = set()
+    for fspec in fspecs:
+        stack = [fspec]
+        while stack:
+            fspec = stack.pop()
+            if fspec in seen:
+                continue
+            seen.add(fspec)
+            result.append(fspec)
+            stack.extend(reversed(imports.get(fspec, [])))
+    return result
+
+
+def _escape(fspec):
+    return fspec.replace(" ", "\\ ").replace("#", "\\#").replace(
+        "$", "$$")
+
+
+def format_dependencies(target, dependencies):
+    """
+    Format a Make dependency rule.
+
+    An empty rule is added for every dependency, so deleted files do not
+    break the build.
+
+    :param target: Target file specification.
+    :param dependencies: A list of file specifications.
+    :return: Dependency file contents.
+    """
+    lines = ["{}:{}".format(_escape(target), "".join(
+        " \\\n " + _escape(fspec) for fspec in dependencies))]
+    for fspec in dependencies:
+        lines.append("")
+        lines.append("{}:".format(_escape(fspec)))
+    return "\n".join(lines) + "\n"
+
+
+def write_dependencies(dep_fspec, target, dependencies):
+    """
+    Write a Make dependency file.
+
+    :param dep_fspec: Dependency file specification.
+    :param target: Target file specification.
+    :param dependencies: A list of file specifications.
+    """
+    with open(dep_fspec, "w") as f:
+        f.write(format_dependencies(target, dependencies))
+
+
+def read_dependencies(dep_fspec):
+    """
+    Read the first rule of a Make dependency file.
+
+    :param dep_fspec: Dependency file specification.
+    :return: A tuple - target and a list of dependencies.
+    """
+    with open(dep_fspec, "r") as f:
+        contents = f.read()
+    rule = contents.replace("\\\n", " ").split("\n", 1)[0]
+    # Split at unescaped whitespace.
+    words = []
+    word = ""
+    escaped = False
+    for char in rule:
+        if escaped:
+            word += char if char in " #" else "\\" + char
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char.isspace():
+            if word:
+                words.append(word.replace("$$", "$"))
+            word = ""
+        else:
+            word += char
+    if word:
+        words.append(word.replace("$$", "$"))
+    if not words or not words[0].endswith(":"):
+        raise ValueError("Invalid dependency file '{}'.".format(dep_fspec))
+    return words[0][:-1], words[1:]
+
+
+def up_to_date(stamp_fspec, fspecs):
+    """
+    Check whether a stamp file is newer than all of its dependencies.
+
+    The stamp file contains the dependencies of its previous update in the
+    Make format, so no model file has to be parsed.
+
+    :param stamp_fspec: Stamp file specification.
+    :param fspecs: A list of entry file specifications, as recorded in the
+        stamp file. Use Processor.up_to_date() to look entry files up in
+        the package paths.
+    :return: True if no entry or imported file changed since the stamp file
+        was written.
+    """
+    try:
+        stamp_mtime = os.stat(stamp_fspec).st_mtime
+        _, dependencies = read_dependencies(stamp_fspec)
+        if not set(fspecs) <= set(dependencies):
+            return False
+        for fspec in dependencies:
+            if os.stat(fspec).st_mtime > stamp_mtime:
+                return False
+    except (OSError, IOError, ValueError):
+        return False
+    return True
@@ -0,0 +1,76 @@
+"""
+Franca model diagnostics.
+"""
+
+from collections import OrderedDict
+
+
+class Diagnostic(object):
+    """
+    A model error collected instead of being raised.
+    """
+
+    def __init__(self, message, file_name=None, line=None):
+        """
+        Constructor.
+
+        :param message: Error message.
+        :param file_name: File specification or None if unknown.
+        :param line: Line number or None if unknown.
+        """
+        self.message = message
+        self.file = file_name
+        self.line = line
+
+    def __str__(self):
+        location = [str(item) for item in (self.file, self.line)
+                    if item is not None]
+        if location:
+            return "{}: {}".format(":".join(location), self.message)
+        return self.message
+
+    def __repr__(self):
+        return "Diagnostic({!r}, {!r}, {!r})".format(
+            self.message, self.file, self.line)
+
+    def as_dict(self):
+        """
+        Convert to a dictionary, e.g. for JSON serialization.
+        """
+        return OrderedDict([
+            ("file", self.file),
+            ("line", self.line),
+            ("message", self.message),
+        ])
+
+
+class DiagnosticList(list):
+    """
+    A list of diagnostics reporting each error once.
+
+    Errors are identified by message and line. The keys of the added
+    diagnostics are kept in a set, so adding is independent of the number
+    of errors.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        super(DiagnosticList, self).__init__()
+        self._keys = set()
+
+    def add(self, diagnostic):
+        """
+        Add a diagnostic unless an error with the same message and line is
+        already reported.
+
+        :param diagnostic: Diagnostic object.
+        :return: True if the diagnostic is added.
+        """
+        key = (diagnostic.line, diagnostic.message)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self.append(diagnostic)
+        return True
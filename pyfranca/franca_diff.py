@@ -0,0 +1,467 @@
+"""
+Franca model comparison.
+"""
+
+from collections import OrderedDict
+from pyfranca import ast
+
+
+class Change(object):
+    """
+    A single difference between two Franca models.
+    """
+
+    # Actions
+    ADDED = "added"
+    REMOVED = "removed"
+    KIND_CHANGED = "kind changed"
+    TYPE_CHANGED = "type changed"
+    VALUE_CHANGED = "value changed"
+    FLAGS_CHANGED = "flags changed"
+    EXTENDS_CHANGED = "extends changed"
+    ORDER_CHANGED = "order changed"
+    ERRORS_CHANGED = "errors changed"
+    VERSION_BUMP_MISSING = "version bump missing"
+
+    # Additions which keep existing clients working.
+    _COMPATIBLE = {
+        ("package", ADDED),
+        ("interface", ADDED),
+        ("typeCollection", ADDED),
+        ("typedef", ADDED),
+        ("enumeration", ADDED),
+        ("struct", ADDED),
+        ("array", ADDED),
+        ("map", ADDED),
+        ("attribute", ADDED),
+        ("method", ADDED),
+        ("broadcast", ADDED),
+        ("enumerator", ADDED),
+    }
+
+    def __init__(self, element, action, fqn, old=None, new=None):
+        """
+        Constructor.
+
+        :param element: Changed element kind, e.g. "method" or "enumerator".
+        :param action: One of the Change action constants.
+        :param fqn: FQN of the changed element.
+        :param old: Old value, if applicable.
+        :param new: New value, if applicable.
+        """
+        self.element = element
+        self.action = action
+        self.fqn = fqn
+        self.old = old
+        self.new = new
+
+    @property
+    def breaking(self):
+        """
+        Defines whether the change breaks compatibility with existing
+        clients.
+        """
+        return (self.element, self.action) not in self._COMPATIBLE
+
+    def __str__(self):
+        res = "{} '{}' {}".format(self.element.capitalize(), self.fqn,
+                                  self.action)
+        if self.old is not None or self.new is not None:
+            res += " ({} -> {})".format(self.old, self.new)
+        return res + "."
+
+    def __repr__(self):
+        return "Change({!r}, {!r}, {!r}, {!r}, {!r})".format(
+            self.element, self.action, self.fqn, self.old, self.new)
+
+
+class Differ(object):
+    """
+    Franca model comparator.
+
+    Namespaces and their members are matched by FQN. Every node gets a
+    memoized structural signature and hash so that unchanged subtrees are
+    skipped without being compared member by member.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        # Tuples - signature and hash, by node id, with the node kept alive
+        #   so that its id is not reused.
+        self._signatures = {}
+
+    @staticmethod
+    def namespace_fqn(namespace):
+        """
+        Construct the FQN of a namespace.
+        """
+        return "{}.{}".format(namespace.package.name, namespace.name)
+
+    @staticmethod
+    def type_name(the_type):
+        """
+        Construct a stable, context-independent name of a type.
+
+        :param the_type: ast.Type object.
+        :return: Type name string.
+        """
+        if isinstance(the_type, ast.Reference):
+            target = the_type.reference
+            if target is None or target.namespace is None:
+                return the_type.name
+            return "{}.{}".format(Differ.namespace_fqn(target.namespace),
+                                  target.name)
+        elif isinstance(the_type, ast.Array) and the_type.name is None:
+            return Differ.type_name(the_type.type) + "[]"
+        elif isinstance(the_type, ast.Type) and the_type.namespace:
+            return "{}.{}".format(Differ.namespace_fqn(the_type.namespace),
+                                  the_type.name)
+        else:
+            return the_type.name
+
+    @staticmethod
+    def base_name(node):
+        """
+        Construct a stable, context-independent name of the base of an
+        enumeration, struct or interface.
+
+        :param node: ast.Enumeration, ast.Struct or ast.Interface object.
+        :return: FQN of the base, the base name as written if it is not
+            resolved, or None.
+        """
+        base = node.reference
+        if base is None:
+            return node.extends
+        elif isinstance(base, ast.Namespace):
+            return Differ.namespace_fqn(base)
+        return Differ.type_name(base)
+
+    @staticmethod
+    def enumerator_values(enumerators):
+        """
+        Compute the effective enumerator values, numbering implicit
+        enumerators after their predecessor.
+
+        :param enumerators: OrderedDict of ast.Enumerator objects.
+        :return: OrderedDict of enumerator names to values.
+        """
+        values = OrderedDict()
+        value = 0
+        for enumerator in enumerators.values():
+            if enumerator.value is not None:
+                value = enumerator.value
+            values[enumerator.name] = value
+            value += 1
+        return values
+
+    @staticmethod
+    def _args_signature(args):
+        return tuple((arg.name, Differ.type_name(arg.type))
+                     for arg in args.values())
+
+    @staticmethod
+    def _errors_signature(errors):
+        if isinstance(errors, ast.Reference):
+            return Differ.type_name(errors)
+        return tuple(Differ.enumerator_values(errors).items())
+
+    @staticmethod
+    def _member_signature(member):
+        """
+        Construct a hashable structural signature of a namespace member.
+        """
+        if isinstance(member, ast.Typedef):
+            return "typedef", Differ.type_name(member.type)
+        elif isinstance(member, ast.Enumeration):
+            return ("enumeration", Differ.base_name(member),
+                    tuple(Differ.enumerator_values(
+                        member.enumerators).items()))
+        elif isinstance(member, ast.Struct):
+            return ("struct", Differ.base_name(member), tuple(member.flags),
+                    tuple((field.name, Differ.type_name(field.type))
+                          for field in member.fields.values()))
+        elif isinstance(member, ast.Array):
+            return "array", Differ.type_name(member.type)
+        elif isinstance(member, ast.Map):
+            return ("map", Differ.type_name(member.key_type),
+                    Differ.type_name(member.value_type))
+        elif isinstance(member, ast.Attribute):
+            return ("attribute", Differ.type_name(member.type),
+                    tuple(member.flags))
+        elif isinstance(member, ast.Method):
+            return ("method", tuple(member.flags),
+                    Differ._args_signature(member.in_args),
+                    Differ._args_signature(member.out_args),
+                    Differ._errors_signature(member.errors))
+        elif isinstance(member, ast.Broadcast):
+            return ("broadcast", tuple(member.flags),
+                    Differ._args_signature(member.out_args))
+        else:
+            assert False
+
+    def signature(self, node):
+        """
+        Construct the structural signature of a namespace or a namespace
+        member. Nodes with equal signatures have no differences.
+
+        The signatures are memoized, so comparing a model against several
+        others computes them only once.
+
+        :param node: ast.Namespace or ast.Type object.
+        :return: Hashable tuple.
+        """
+        return self._signature(node)[0]
+
+    def structural_hash(self, node):
+        """
+        Compute the structural hash of a namespace or a namespace member,
+        i.e. the hash of its signature.
+
+        :param node: ast.Namespace or ast.Type object.
+        :return: Hash integer.
+        """
+        return self._signature(node)[1]
+
+    def _signature(self, node):
+        key = id(node)
+        if key not in self._signatures:
+            if isinstance(node, ast.Namespace):
+                version = (node.version.major, node.version.minor) \
+                    if node.version else None
+                extends = self.base_name(node) \
+                    if isinstance(node, ast.Interface) else None
+                members = frozenset(
+                    (name, self.signature(member))
+                    for name, member in self._members(node).items())
+                signature = (node.__class__.__name__, version, extends,
+                             members)
+            else:
+                signature = self._member_signature(node)
+            self._signatures[key] = (node, (signature, hash(signature)))
+        return self._signatures[key][1]
+
+    def _same(self, old, new):
+        """
+        Check whether two nodes have no differences, comparing the hashes
+        first.
+        """
+        old_signature, old_hash = self._signature(old)
+        new_signature, new_hash = self._signature(new)
+        return old_hash == new_hash and old_signature == new_signature
+
+    @staticmethod
+    def _members(namespace):
+        """
+        Collect all members of a namespace by name.
+        """
+        members = OrderedDict()
+        for members_dict in (namespace.typedefs, namespace.enumerations,
+                             namespace.structs, namespace.arrays,
+                             namespace.maps):
+            members.update(members_dict)
+        if isinstance(namespace, ast.Interface):
+            for members_dict in (namespace.attributes, namespace.methods,
+                                 namespace.broadcasts):
+                members.update(members_dict)
+        return members
+
+    @staticmethod
+    def element_kind(node):
+        """
+        Get the Franca element kind of a node, e.g. "interface" or "method".
+        """
+        if isinstance(node, ast.Interface):
+            return "interface"
+        elif isinstance(node, ast.TypeCollection):
+            return "typeCollection"
+        return node.__class__.__name__.lower()
+
+    @staticmethod
+    def _index(packages):
+        """
+        Index the namespaces of a model by FQN.
+        """
+        index = OrderedDict()
+        for package in packages.values():
+            for namespace in package.typecollections.values():
+                index[Differ.namespace_fqn(namespace)] = namespace
+            for namespace in package.interfaces.values():
+                index[Differ.namespace_fqn(namespace)] = namespace
+        return index
+
+    def compare(self, old, new):
+        """
+        Compare two Franca models.
+
+        :param old: Old Processor object.
+        :param new: New Processor object.
+        :return: A list of Change objects.
+        """
+        changes = []
+        for name in old.packages:
+            if name not in new.packages:
+                changes.append(Change("package", Change.REMOVED, name))
+        for name in new.packages:
+            if name not in old.packages:
+                changes.append(Change("package", Change.ADDED, name))
+        old_index = self._index(old.packages)
+        new_index = self._index(new.packages)
+        for fqn, namespace in old_index.items():
+            if fqn not in new_index:
+                changes.append(
+                    Change(self.element_kind(namespace), Change.REMOVED, fqn))
+        for fqn, namespace in new_index.items():
+            if fqn not in old_index:
+                changes.append(
+                    Change(self.element_kind(namespace), Change.ADDED, fqn))
+            else:
+                self._compare_namespace(fqn, old_index[fqn], namespace,
+                                        changes)
+        return changes
+
+    def _compare_namespace(self, fqn, old, new, changes):
+        if self._same(old, new):
+            return
+        first = len(changes)
+        element = self.element_kind(new)
+        if self.element_kind(old) != element:
+            changes.append(Change(self.element_kind(old), Change.KIND_CHANGED,
+                                  fqn, self.element_kind(old), element))
+        elif element == "interface" and \
+                self.base_name(old) != self.base_name(new):
+            changes.append(Change(element, Change.EXTENDS_CHANGED, fqn,
+                                  self.base_name(old), self.base_name(new)))
+        old_members = self._members(old)
+        new_members = self._members(new)
+        for name, member in old_members.items():
+            if name not in new_members:
+                changes.append(Change(self.element_kind(member),
+                                      Change.REMOVED,
+                                      "{}.{}".format(fqn, name)))
+        for name, member in new_members.items():
+            member_fqn = "{}.{}".format(fqn, name)
+            if name not in old_members:
+                changes.append(Change(self.element_kind(member), Change.ADDED,
+                                      member_fqn))
+                continue
+            old_member = old_members[name]
+            if self._same(old_member, member):
+                continue
+            if type(old_member) is not type(member):
+                changes.append(Change(self.element_kind(old_member),
+                                      Change.KIND_CHANGED, member_fqn,
+                                      self.element_kind(old_member),
+                                      self.element_kind(member)))
+            else:
+                self._compare_member(member_fqn, old_member, member, changes)
+        self._check_version(fqn, old, new, changes[first:], changes)
+
+    @staticmethod
+    def _check_version(fqn, old, new, namespace_changes, changes):
+        if not namespace_changes:
+            return
+        old_version = (old.version.major, old.version.minor) \
+            if old.version else (0, 0)
+        new_version = (new.version.major, new.version.minor) \
+            if new.version else (0, 0)
+        if any(change.breaking for change in namespace_changes):
+            bumped = new_version[0] > old_version[0]
+        else:
+            bumped = new_version > old_version
+        if not bumped:
+            changes.append(Change(Differ.element_kind(new),
+                                  Change.VERSION_BUMP_MISSING, fqn,
+                                  "{}.{}".format(*old_version),
+                                  "{}.{}".format(*new_version)))
+
+    def _compare_member(self, fqn, old, new, changes):
+        element = self.element_kind(new)
+        if isinstance(new, (ast.Typedef, ast.Array, ast.Attribute)):
+            self._compare_type(element, fqn, old.type, new.type, changes)
+        elif isinstance(new, ast.Map):
+            self._compare_type(element, fqn + ".key", old.key_type,
+                               new.key_type, changes)
+            self._compare_type(element, fqn + ".value", old.value_type,
+                               new.value_type, changes)
+        elif isinstance(new, ast.Enumeration):
+            if self.base_name(old) != self.base_name(new):
+                changes.append(Change(element, Change.EXTENDS_CHANGED, fqn,
+                                      self.base_name(old),
+                                      self.base_name(new)))
+            self._compare_enumerators(fqn, old.enumerators, new.enumerators,
+                                      changes)
+        elif isinstance(new, ast.Struct):
+            if self.base_name(old) != self.base_name(new):
+                changes.append(Change(element, Change.EXTENDS_CHANGED, fqn,
+                                      self.base_name(old),
+                                      self.base_name(new)))
+            self._compare_fields("field", fqn, old.fields, new.fields,
+                                 changes)
+        elif isinstance(new, ast.Method):
+            self._compare_fields("argument", fqn + ".in", old.in_args,
+                                 new.in_args, changes)
+            self._compare_fields("argument", fqn + ".out", old.out_args,
+                                 new.out_args, changes)
+            if isinstance(old.errors, ast.Reference) and \
+                    isinstance(new.errors, ast.Reference):
+                self._compare_type("error", fqn + ".error", old.errors,
+                                   new.errors, changes)
+            elif isinstance(old.errors, OrderedDict) and \
+                    isinstance(new.errors, OrderedDict):
+                self._compare_enumerators(fqn + ".error", old.errors,
+                                          new.errors, changes)
+            else:
+                changes.append(Change(element, Change.ERRORS_CHANGED, fqn))
+        elif isinstance(new, ast.Broadcast):
+            self._compare_fields("argument", fqn + ".out", old.out_args,
+                                 new.out_args, changes)
+        if getattr(old, "flags", None) != getattr(new, "flags", None):
+            changes.append(Change(element, Change.FLAGS_CHANGED, fqn,
+                                  " ".join(old.flags), " ".join(new.flags)))
+
+    @staticmethod
+    def _compare_type(element, fqn, old, new, changes):
+        old_name = Differ.type_name(old)
+        new_name = Differ.type_name(new)
+        if old_name != new_name:
+            changes.append(Change(element, Change.TYPE_CHANGED, fqn,
+                                  old_name, new_name))
+
+    @staticmethod
+    def _compare_fields(element, fqn, old, new, changes):
+        """
+        Compare struct fields or method arguments.
+        """
+        for name in old:
+            if name not in new:
+                changes.append(Change(element, Change.REMOVED,
+                                      "{}.{}".format(fqn, name)))
+        for name, item in new.items():
+            item_fqn = "{}.{}".format(fqn, name)
+            if name not in old:
+                changes.append(Change(element, Change.ADDED, item_fqn))
+            else:
+                Differ._compare_type(element, item_fqn, old[name].type,
+                                     item.type, changes)
+        old_order = [name for name in old if name in new]
+        new_order = [name for name in new if name in old]
+        if old_order != new_order:
+            changes.append(Change(element, Change.ORDER_CHANGED, fqn))
+
+    @staticmethod
+    def _compare_enumerators(fqn, old, new, changes):
+        old_values = Differ.enumerator_values(old)
+        new_values = Differ.enumerator_values(new)
+        for name in old_values:
+            if name not in new_values:
+                changes.append(Change("enumerator", Change.REMOVED,
+                                      "{}.{}".format(fqn, name)))
+        for name, value in new_values.items():
+            item_fqn = "{}.{}".format(fqn, name)
+            if name not in old_values:
+                changes.append(Change("enumerator", Change.ADDED, item_fqn))
+            elif old_values[name] != value:
+                changes.append(Change("enumerator", Change.VALUE_CHANGED,
+                                      item_fqn, old_values[name], value))
@@ -0,0 +1,164 @@
+"""
+Franca model graphs.
+
+Finds cycles in the import graph of model files and in the type dependency
+graph of linked models. Strongly connected components are found with an
+iterative version of Tarjan's algorithm, in time linear in the number of
+nodes and edges and without recursion, so large models do not hit the
+recursion limit.
+
+In the type dependency graph, typedefs depend on their type, structs on
+their base struct and the types of their fields, and arrays and maps on
+their element, key and value types. Cycles through arrays or maps are
+valid recursive types, e.g. trees. Other cycles, e.g. a struct containing
+itself, describe types of infinite size.
+"""
+
+from pyfranca import ast
+from pyfranca.franca_types import resolve
+
+
+def _components(nodes, successors):
+    """
+    Find the strongly connected components of a directed graph.
+
+    :return: A list of the components and a set of the nodes depending on
+        themselves.
+    """
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+    loops = set()
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors(child))))
+                    break
+                elif child in on_stack:
+                    if index[child] < lowlink[node]:
+                        lowlink[node] = index[child]
+                    elif child is node:
+                        loops.add(node)
+            else:
+                # All successors are visited.
+                work.pop()
+                if work and lowlink[node] < lowlink[work[-1][0]]:
+                    lowlink[work[-1][0]] = lowlink[node]
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member is node:
+                            break
+                    components.append(component)
+    return components, loops
+
+
+def strongly_connected_components(nodes, successors):
+    """
+    Find the strongly connected components of a directed graph.
+
+    :param nodes: Iterable of the start nodes. Nodes must be hashable.
+    :param successors: Function returning an iterable of the successors of
+        a node.
+    :return: A list of lists of nodes, in reverse topological order, i.e.
+        components come after the components they depend on.
+    """
+    return _components(nodes, successors)[0]
+
+
+def cycles(nodes, successors):
+    """
+    Find the cycles of a directed graph.
+
+    :param nodes: Iterable of the start nodes.
+    :param successors: Function returning an iterable of the successors of
+        a node.
+    :return: A list of the strongly connected components with more than
+        one node or a node depending on itself.
+    """
+    components, loops = _components(nodes, successors)
+    return [component for component in components
+            if len(component) > 1 or component[0] in loops]
+
+
+def import_cycles(imports):
+    """
+    Find import cycles.
+
+    :param imports: Import graph, i.e. a dictionary of imported file lists.
+    :return: A list of lists of the file specifications in a cycle.
+    """
+    return cycles(list(imports), lambda fspec: imports.get(fspec, ()))
+
+
+# Types with dependencies
+_DEPENDENT = (ast.Typedef, ast.Struct, ast.Array, ast.Map)
+# Types with dependencies other than through arrays and maps
+_DIRECT = (ast.Typedef, ast.Struct)
+
+
+def _dependencies(the_type):
+    if isinstance(the_type, ast.Typedef):
+        return [the_type.type]
+    elif isinstance(the_type, ast.Struct):
+        types = [field.type for field in the_type.fields.values()]
+        # Bases with inheritance errors are reported separately.
+        if the_type.table is not None and the_type.reference is not None:
+            types.append(the_type.reference)
+        return types
+    elif isinstance(the_type, ast.Array):
+        return [the_type.type]
+    elif isinstance(the_type, ast.Map):
+        return [the_type.key_type, the_type.value_type]
+    return []
+
+
+def _successors(the_type):
+    return [item for item in map(resolve, _dependencies(the_type))
+            if isinstance(item, _DEPENDENT)]
+
+
+def _direct_successors(the_type):
+    return [item for item in map(resolve, _dependencies(the_type))
+            if isinstance(item, _DIRECT)]
+
+
+def type_cycles(namespaces, infinite=False):
+    """
+    Find recursive types.
+
+    :param namespaces: A list of linked ast.Namespace objects. Types
+        defined elsewhere are followed, but only cycles including types of
+        the namespaces are returned.
+    :param infinite: True to find only cycles that do not go through an
+        array or map, i.e. types of infinite size.
+    :return: A list of lists of the ast.Typedef, ast.Struct, ast.Array and
+        ast.Map objects in a cycle.
+    """
+    roots = []
+    for namespace in namespaces:
+        roots.extend(namespace.typedefs.values())
+        roots.extend(namespace.structs.values())
+        if not infinite:
+            roots.extend(namespace.arrays.values())
+            roots.extend(namespace.maps.values())
+    own = set(roots)
+    return [component for component in cycles(
+                roots, _direct_successors if infinite else _successors)
+            if any(member in own for member in component)]
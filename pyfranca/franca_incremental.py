@@ -0,0 +1,315 @@
+"""
+Franca incremental parsing.
+
+Editors change model files with small edits. The incremental parser keeps
+the top-level definitions of the previous parse together with their text
+spans, and parses only the definitions touched by an edit again. The other
+definitions are reused as they are - their node locations are relative to
+their spans, which are moved in the SourceMap instead. Comments and strings
+changed by an edit may extend over other definitions, which are then parsed
+again as well.
+"""
+
+from pyfranca.franca_diagnostics import DiagnosticList
+from pyfranca.franca_locations import SourceMap, pack
+from pyfranca.franca_parser import Parser
+
+
+class TextEdit(object):
+    """
+    A text replacement.
+    """
+
+    def __init__(self, start, end, text):
+        """
+        Constructor.
+
+        :param start: Offset of the first replaced character.
+        :param end: Offset after the last replaced character.
+        :param text: Replacement text.
+        """
+        self.start = start
+        self.end = end
+        self.text = text
+
+
+class _Definition(object):
+    """
+    A parsed top-level definition and its text span.
+    """
+
+    def __init__(self, start, end, span, tok):
+        self.start = start
+        self.end = end
+        # SourceMap span index of the node locations
+        self.span = span
+        # First token, or None if the span contains no tokens.
+        self.token = tok
+        # ast.Package of a package statement or None
+        self.header = None
+        # Parsed ast.Import, ast.TypeCollection and ast.Interface objects
+        self.nodes = []
+        # Lexer and parser errors
+        self.lexer_diagnostics = []
+        self.diagnostics = DiagnosticList()
+
+
+class IncrementalParser(object):
+    """
+    Parses an editor buffer incrementally.
+
+    Errors are collected in diagnostics, as with Processor.diagnostics, and
+    parsing resumes after them.
+    """
+
+    def __init__(self, fspec, sources=None, parser=None):
+        """
+        Constructor.
+
+        :param fspec: File specification of the buffer.
+        :param sources: SourceMap to register the buffer in, e.g. the one of
+            a Processor to locate nodes with Processor.location().
+        :param parser: Parser to use.
+        """
+        self.fspec = fspec
+        self.sources = sources if sources is not None else SourceMap()
+        self.parser = parser if parser is not None else Parser()
+        self.text = u""
+        # Result of the last parse
+        self.package = None
+        self.diagnostics = []
+        # Number of definitions parsed by the last parse() or edit() call
+        self.reparsed = 0
+        self._file_index = None
+        self._definitions = []
+
+    def parse(self, text):
+        """
+        Parse the whole buffer.
+
+        :param text: Buffer contents.
+        :return: The parsed ast.Package or None if the package statement is
+            invalid.
+        """
+        self._release(self._definitions)
+        self.text = text
+        self._file_index = self.sources.add(self.fspec, text)
+        self._definitions = self._parse(0, len(text), None)
+        self.reparsed = len(self._definitions)
+        return self._update()
+
+    def edit(self, edits):
+        """
+        Apply text edits to the buffer and parse the affected definitions.
+
+        :param edits: A list of TextEdit objects, applied in order. The
+            offsets of each edit refer to the buffer after the previous
+            ones.
+        :return: The updated ast.Package or None if the package statement
+            is invalid. Definitions not affected by the edits are the same
+            objects as in the previous package.
+        """
+        if self._file_index is None:
+            raise ValueError("Buffer not parsed.")
+        self.reparsed = 0
+        for text_edit in edits:
+            self._edit(text_edit)
+        return self._update()
+
+    def offset(self, line, column):
+        """
+        Find the buffer offset of a line and column.
+
+        :param line: Line, starting at 1.
+        :param column: Column, starting at 1.
+        :return: Buffer offset, limited to the end of the buffer.
+        """
+        if self._file_index is None:
+            raise ValueError("Buffer not parsed.")
+        return min(self.sources.offset(self._file_index, line, column),
+                   len(self.text))
+
+    def position(self, offset):
+        """
+        Find the line and column of a buffer offset.
+
+        :param offset: Buffer offset.
+        :return: A tuple - line and column, both starting at 1.
+        """
+        if self._file_index is None:
+            raise ValueError("Buffer not parsed.")
+        return self.sources.resolve(pack(self._file_index, offset))[1:]
+
+    def nodes_at(self, offset):
+        """
+        Find the top-level definitions parsed from the text at an offset.
+
+        :param offset: Buffer offset.
+        :return: A list of ast.Import, ast.TypeCollection and ast.Interface
+            objects. Empty if the text is not part of a valid definition.
+        """
+        for definition in self._definitions:
+            if definition.start <= offset < definition.end:
+                return list(definition.nodes)
+        if self._definitions and offset == self._definitions[-1].end:
+            return list(self._definitions[-1].nodes)
+        return []
+
+    def _edit(self, text_edit):
+        text = self.text
+        if not 0 <= text_edit.start <= text_edit.end <= len(text):
+            raise ValueError("Invalid edit {}-{}.".format(
+                text_edit.start, text_edit.end))
+        self.text = text[:text_edit.start] + text_edit.text + \
+            text[text_edit.end:]
+        delta = len(text_edit.text) - (text_edit.end - text_edit.start)
+        # The edit and the characters around it
+        changed = self.text[max(0, text_edit.start - 2):
+                            text_edit.start + len(text_edit.text) + 2]
+        lines = self._line(len(text))
+        self.sources.add(self.fspec, self.text)
+        line_delta = self._line(len(self.text)) - lines
+        definitions = self._definitions
+        # Find the definitions touching the edit.
+        first = 0
+        while first < len(definitions) - 1 and \
+                definitions[first].end < text_edit.start:
+            first += 1
+        tok = definitions[first].token
+        if first and text_edit.start <= \
+                definitions[first].start + len(tok.value):
+            # The edit changes the definition keyword and may continue the
+            #   preceding definition.
+            first -= 1
+        last = first
+        while last < len(definitions) and \
+                definitions[last].start <= text_edit.end:
+            last += 1
+        if "*/" in changed or "**>" in changed or "\"" in changed or \
+                "\n" in text[text_edit.start:text_edit.end]:
+            # The edit may end a comment or string that is unterminated in
+            #   a preceding definition.
+            for index in range(first):
+                if definitions[index].lexer_diagnostics:
+                    first = index
+                    break
+        start = definitions[first].start if definitions else 0
+        # Comments and strings changed by the edit may continue into the
+        #   following definitions. Parse these up to the first one lexed
+        #   from its first token as before.
+        offsets = [definition.start + delta + definition.token.lexpos
+                   for definition in definitions[last:]
+                   if definition.token is not None]
+        synchronized = self.parser.synchronize(self.text, start, offsets)
+        if synchronized < len(offsets):
+            last += synchronized
+        else:
+            last = len(definitions)
+        if line_delta:
+            # Error messages contain line numbers - parse the definitions
+            #   with errors below the edit again.
+            for index in range(last, len(definitions)):
+                if definitions[index].lexer_diagnostics or \
+                        definitions[index].diagnostics:
+                    last = index + 1
+        following = definitions[last:]
+        for definition in following:
+            definition.start += delta
+            definition.end += delta
+            self.sources.move_span(definition.span, definition.start)
+            if definition.token is not None:
+                definition.token.lineno += line_delta
+        end = following[0].start if following else len(self.text)
+        self._release(definitions[first:last])
+        parsed = self._parse(start, end,
+                             following[0].token if following else None)
+        self.reparsed += len(parsed)
+        self._definitions = definitions[:first] + parsed + following
+
+    def _line(self, offset):
+        return self.sources.resolve(pack(self._file_index, offset))[1]
+
+    def _release(self, definitions):
+        for definition in definitions:
+            self.sources.remove_span(definition.span)
+
+    def _parse(self, start, end, next_token):
+        """
+        Parse the definitions in a span of the buffer.
+
+        :param start: Start offset of the first definition.
+        :param end: End offset of the last definition.
+        :param next_token: First token after the span or None.
+        :return: A list of _Definition objects.
+        """
+        errors = []
+        tokens = self.parser.tokenize(self.text[start:end], errors,
+                                      self._line(start), start)
+        chunks = Parser.split_definitions(tokens)
+        if not chunks:
+            chunks = [[]]
+        definitions = []
+        for index, chunk in enumerate(chunks):
+            chunk_start = chunk[0].lexpos if index else start
+            chunk_end = chunks[index + 1][0].lexpos \
+                if index + 1 < len(chunks) else end
+            definitions.append(_Definition(
+                chunk_start, chunk_end,
+                self.sources.add_span(self._file_index, chunk_start),
+                chunk[0] if chunk else None))
+        for offset, diagnostic in errors:
+            for definition in definitions:
+                if offset < definition.end or definition is definitions[-1]:
+                    definition.lexer_diagnostics.append(diagnostic)
+                    break
+        for index, (definition, chunk) in enumerate(zip(definitions,
+                                                        chunks)):
+            if not chunk:
+                continue
+            if index + 1 < len(chunks):
+                following = chunks[index + 1][0]
+            else:
+                following = next_token
+            # Node locations are relative to the definition.
+            for tok in chunk:
+                tok.lexpos -= definition.start
+            self.parser.file_index = definition.span
+            if definition.start == 0 and chunk[0].type == "PACKAGE":
+                definition.header = self.parser.parse_header(
+                    chunk, following, definition.diagnostics)
+            else:
+                definition.nodes = self.parser.parse_definition(
+                    chunk, following, definition.diagnostics)
+        return definitions
+
+    def _update(self):
+        # Report errors as Parser.parse() does.
+        diagnostics = []
+        nodes = []
+        for definition in self._definitions:
+            diagnostics += definition.lexer_diagnostics
+            nodes += definition.nodes
+        reported = DiagnosticList()
+        # Definitions without tokens, e.g. comments, may precede the package
+        #   statement.
+        first = next((definition for definition in self._definitions
+                      if definition.token is not None),
+                     self._definitions[0])
+        header = first.header
+        if first.token is None or first.token.type != "PACKAGE":
+            # Missing package statement
+            self.parser.parse_header([], first.token, reported)
+        for definition in self._definitions:
+            for diagnostic in definition.diagnostics:
+                reported.add(diagnostic)
+        diagnostics += reported
+        diagnostics.sort(key=lambda item: item.line or 0)
+        for diagnostic in diagnostics:
+            diagnostic.file = self.fspec
+        self.diagnostics = diagnostics
+        if header is None:
+            self.package = None
+        else:
+            self.package = Parser.build_package(header.name, nodes)
+            self.package.files = [self.fspec]
+        return self.package
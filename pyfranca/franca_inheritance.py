@@ -0,0 +1,315 @@
+"""
+Franca inheritance tables.
+
+Enumerations, structs and interfaces extend base definitions. Instead of
+walking the reference chains on every use, the processor computes the
+flattened members of each definition once after linking and stores them in
+the table attribute of ast.Enumeration, ast.Struct and ast.Interface
+objects. Tables are computed again when the definition or one of its bases
+is linked again.
+"""
+
+from collections import OrderedDict
+
+from pyfranca import ast
+
+
+class InheritanceException(Exception):
+
+    def __init__(self, message, node=None):
+        super(InheritanceException, self).__init__()
+        self.message = message
+        # Definition the error was detected in
+        self.node = node
+
+    def __str__(self):
+        return self.message
+
+
+class EnumerationTable(object):
+    """
+    Flattened enumerators of an enumeration and its base enumerations.
+    """
+
+    __slots__ = ("names", "values", "by_name", "by_value", "aliases",
+                 "base")
+
+    def __init__(self, names, values, base=None, aliases=()):
+        """
+        Constructor.
+
+        :param names: Tuple of enumerator names, base enumerators first.
+        :param values: Tuple of the effective enumerator values.
+        :param base: EnumerationTable object of the base enumeration or
+            None.
+        :param aliases: Tuple of tuples - name and value of each enumerator
+            of the enumeration itself repeating the value of a preceding
+            enumerator, and the name of the first enumerator with the value.
+        """
+        self.names = names
+        self.values = values
+        self.by_name = dict(zip(names, values))
+        # Values map to the first enumerator with the value.
+        self.by_value = dict(zip(reversed(values), reversed(names)))
+        self.aliases = aliases
+        self.base = base
+
+    def __len__(self):
+        return len(self.names)
+
+    def items(self):
+        """
+        :return: A list of tuples - enumerator name and value.
+        """
+        return list(zip(self.names, self.values))
+
+
+class StructTable(object):
+    """
+    Flattened fields of a struct and its base structs.
+    """
+
+    __slots__ = ("fields", "by_name", "base")
+
+    def __init__(self, fields, base=None):
+        """
+        Constructor.
+
+        :param fields: Tuple of ast.StructField objects, base struct fields
+            first.
+        :param base: StructTable object of the base struct or None.
+        """
+        self.fields = fields
+        self.by_name = dict((field.name, field) for field in fields)
+        self.base = base
+
+    def __len__(self):
+        return len(self.fields)
+
+
+class InterfaceTable(object):
+    """
+    Members of an interface including the inherited ones.
+    """
+
+    __slots__ = ("attributes", "methods", "broadcasts", "base")
+
+    def __init__(self, attributes, methods, broadcasts, base=None):
+        """
+        Constructor.
+
+        :param attributes: OrderedDict of ast.Attribute objects by name,
+            inherited members first.
+        :param methods: OrderedDict of ast.Method objects.
+        :param broadcasts: OrderedDict of ast.Broadcast objects.
+        :param base: InterfaceTable object of the base interface or None.
+        """
+        self.attributes = attributes
+        self.methods = methods
+        self.broadcasts = broadcasts
+        self.base = base
+
+
+def _table(node, kind, build):
+    """
+    Get the table of a definition, computing and storing the tables of the
+    definition and its bases if necessary.
+
+    The base chain is walked up to the first definition with a table, and
+    the tables are built from there down, so long chains do not recurse.
+
+    :param node: Linked ast.Enumeration, ast.Struct or ast.Interface
+        object.
+    :param kind: Name of the definition kind, e.g. "struct".
+    :param build: Function building the table from the definition and the
+        table of its base or None.
+    """
+    # Definitions without a table, derived definitions first
+    chain = []
+    seen = set()
+    table = None
+    while node is not None:
+        if node.table is not None:
+            table = node.table
+            break
+        reference = node.reference
+        if node.extends and reference is None:
+            raise InheritanceException("Unresolved reference '{}'.".format(
+                node.extends), node)
+        if reference is not None and not isinstance(reference, type(node)):
+            raise InheritanceException("Invalid {} reference '{}'.".format(
+                kind, node.extends), node)
+        chain.append(node)
+        seen.add(id(node))
+        if reference is not None and id(reference) in seen:
+            raise InheritanceException(
+                "{} inheritance cycle at '{}'.".format(
+                    kind.capitalize(), reference.name), reference)
+        node = reference
+    for node in reversed(chain):
+        table = build(node, table)
+        node.table = table
+    return table
+
+
+def _enumeration_table(enumeration, base):
+    if base is not None:
+        names = list(base.names)
+        values = list(base.values)
+        by_value = dict(base.by_value)
+    else:
+        names = []
+        values = []
+        by_value = {}
+    aliases = []
+    value = values[-1] + 1 if values else 0
+    for enumerator in enumeration.enumerators.values():
+        if enumerator.value is not None:
+            value = enumerator.value
+        if base is not None and enumerator.name in base.by_name:
+            raise InheritanceException(
+                "Duplicate enumerator '{}' in '{}'.".format(
+                    enumerator.name, enumeration.name), enumeration)
+        if value in by_value:
+            aliases.append((enumerator.name, value, by_value[value]))
+        else:
+            by_value[value] = enumerator.name
+        names.append(enumerator.name)
+        values.append(value)
+        value += 1
+    return EnumerationTable(tuple(names), tuple(values), base,
+                            tuple(aliases))
+
+
+def _struct_table(struct, base):
+    fields = list(base.fields) if base is not None else []
+    for field in struct.fields.values():
+        if base is not None and field.name in base.by_name:
+            raise InheritanceException(
+                "Duplicate struct field '{}' in '{}'.".format(
+                    field.name, struct.name), struct)
+        fields.append(field)
+    return StructTable(tuple(fields), base)
+
+
+def _interface_table(interface, base):
+    if base is None:
+        # Share the members of the interface.
+        return InterfaceTable(interface.attributes, interface.methods,
+                              interface.broadcasts)
+    members = []
+    for name in ("attributes", "methods", "broadcasts"):
+        merged = OrderedDict(getattr(base, name))
+        # Redeclared members shadow the inherited ones.
+        merged.update(getattr(interface, name))
+        members.append(merged)
+    return InterfaceTable(members[0], members[1], members[2], base)
+
+
+def enumeration_table(enumeration):
+    """
+    Get the flattened enumerators of an enumeration.
+
+    Implicit values number the enumerators after their predecessor,
+    continuing after the base enumerators. Enumerators repeating a value
+    are recorded as aliases.
+
+    :param enumeration: Linked ast.Enumeration object.
+    :return: EnumerationTable object.
+    :raises InheritanceException: If the enumeration is not linked, its
+        inheritance is cyclic or enumerator names conflict.
+    """
+    return _table(enumeration, "enumeration", _enumeration_table)
+
+
+def struct_table(struct):
+    """
+    Get the flattened fields of a struct.
+
+    :param struct: Linked ast.Struct object.
+    :return: StructTable object.
+    :raises InheritanceException: If the struct is not linked, its
+        inheritance is cyclic or field names conflict.
+    """
+    return _table(struct, "struct", _struct_table)
+
+
+def interface_table(interface):
+    """
+    Get the members of an interface including the inherited ones.
+
+    Members redeclared by a derived interface replace the inherited members
+    of the same kind and name.
+
+    :param interface: Linked ast.Interface object.
+    :return: InterfaceTable object.
+    :raises InheritanceException: If the interface is not linked or its
+        inheritance is cyclic.
+    """
+    return _table(interface, "interface", _interface_table)
+
+
+def _stale(node, results):
+    """
+    Check whether the table of a definition is missing or outdated, e.g.
+    because its base was linked again.
+
+    :param results: Dictionary of the results by definition id.
+    """
+    first = node
+    # Definitions to check, derived definitions first
+    chain = []
+    while id(node) not in results:
+        # Definitions in cycles are stale.
+        results[id(node)] = True
+        chain.append(node)
+        if node.table is None or \
+                not isinstance(node.reference, type(node)):
+            break
+        node = node.reference
+    for node in reversed(chain):
+        table = node.table
+        reference = node.reference
+        if table is None:
+            stale = True
+        elif reference is None:
+            stale = table.base is not None or bool(node.extends)
+        elif isinstance(reference, type(node)):
+            stale = results[id(reference)] or \
+                table.base is not reference.table
+        else:
+            stale = True
+        results[id(node)] = stale
+    return results[id(first)]
+
+
+def update_tables(namespaces):
+    """
+    Compute the missing and outdated tables of the enumerations and structs
+    in namespaces and of the interfaces among them, e.g. after linking
+    them.
+
+    :param namespaces: A list of ast.Namespace objects.
+    :return: A list of tuples - definition and the InheritanceException
+        raised for it.
+    """
+    results = {}
+    stale = []
+    for namespace in namespaces:
+        nodes = [(item, enumeration_table)
+                 for item in namespace.enumerations.values()]
+        nodes += [(item, struct_table) for item in namespace.structs.values()]
+        if isinstance(namespace, ast.Interface):
+            nodes.append((namespace, interface_table))
+        for node, get_table in nodes:
+            if _stale(node, results):
+                stale.append((node, get_table))
+    for node, _ in stale:
+        node.table = None
+    errors = []
+    for node, get_table in stale:
+        try:
+            get_table(node)
+        except InheritanceException as e:
+            errors.append((node, e))
+    return errors
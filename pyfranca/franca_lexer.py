@@ -2,14 +2,18 @@
 Franca lexer.
 """
 
+import mmap
+import os
+import re
 import ply.lex as lex
 
 
 class LexerException(Exception):
 
-    def __init__(self, message):
+    def __init__(self, message, lineno=None):
         super(LexerException, self).__init__()
         self.message = message
+        self.lineno = lineno
 
     def __str__(self):
         return self.message
@@ -75,8 +79,8 @@ class Lexer(object):
         "FILE_NAME",
     ]
 
-    # Ignored characters
-    t_ignore = " \t"
+    # Ignored characters, including the carriage returns of CRLF line ends
+    t_ignore = " \t\r"
 
     # Literals
     literals = [".", "{", "}", "*", "=", "[", "]"]
@@ -147,7 +151,7 @@ class Lexer(object):
     @staticmethod
     def t_error(t):
         raise LexerException("Illegal character '{}' at line {}.".format(
-                             t.value[0], t.lineno))
+                             t.value[0], t.lineno), t.lineno)
 
     def __init__(self, **kwargs):
         """
@@ -172,8 +176,132 @@ class Lexer(object):
         """
         Tokenize input file to stdout for testing purposes.
 
+        The file is lexed directly from a memory map.
+
         :param fspec: Input file to parse.
         """
-        with open(fspec, "r") as f:
-            data = f.read()
-        return self.tokenize(data)
+        with open(fspec, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            lexer = MappedLexer()
+            lexer.input(data)
+            while True:
+                tok = lexer.token()
+                if not tok:
+                    break
+                print(tok)
+        finally:
+            data.close()
+
+
+if str is bytes:
+    # Python 2 - token values are native strings, as when lexing text read
+    #   from files.
+    def _text(value):
+        return value
+else:
+    def _text(value):
+        return value.decode("utf-8")
+
+
+class MappedLexer(object):
+    """
+    Franca IDL lexer for UTF-8 encoded bytes, e.g. memory-mapped files.
+
+    Produces the same tokens as Lexer, using its rules, without decoding the
+    input as a whole. Only the matched tokens and comments are decoded, so
+    whitespace is never copied into strings.
+    """
+
+    # Master regular expression, compiled on first use.
+    _regex = None
+
+    @classmethod
+    def _compile(cls):
+        # Function rules are matched in definition order, as by PLY.
+        functions = sorted(
+            (getattr(Lexer, name) for name in dir(Lexer)
+             if name.startswith("t_") and name != "t_error" and
+             callable(getattr(Lexer, name))),
+            key=lambda function: function.__code__.co_firstlineno)
+        pattern = "|".join(
+            "(?P<{}>{})".format(function.__name__[2:], function.__doc__)
+            for function in functions)
+        cls._regex = re.compile(pattern.encode("ascii"), re.VERBOSE)
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        if MappedLexer._regex is None:
+            MappedLexer._compile()
+        self._ignore = set(bytearray(Lexer.t_ignore.encode("ascii")))
+        self._literals = set(bytearray("".join(Lexer.literals).encode(
+            "ascii")))
+        self.data = None
+        self.lexpos = 0
+        self.lineno = 1
+
+    def input(self, data):
+        """
+        Set the input.
+
+        :param data: UTF-8 encoded bytes, e.g. a mmap.mmap object.
+        """
+        self.data = data
+        self.lexpos = 0
+        self.lineno = 1
+
+    def skip(self, count):
+        """
+        Skip input bytes, e.g. after an illegal character.
+
+        :param count: Number of bytes to skip.
+        """
+        self.lexpos += count
+
+    def _token(self, kind, value, pos):
+        tok = lex.LexToken()
+        tok.type = kind
+        tok.value = value
+        tok.lineno = self.lineno
+        tok.lexpos = pos
+        tok.lexer = self
+        return tok
+
+    def token(self):
+        """
+        Get the next token.
+
+        :return: ply.lex.LexToken object or None at the end of the input.
+        """
+        data = self.data
+        size = len(data)
+        pos = self.lexpos
+        while pos < size:
+            char = data[pos:pos + 1]
+            if ord(char) in self._ignore:
+                pos += 1
+                continue
+            match = self._regex.match(data, pos)
+            if not match:
+                if ord(char) in self._literals:
+                    self.lexpos = pos + 1
+                    return self._token(_text(char), _text(char), pos)
+                self.lexpos = pos
+                raise LexerException(
+                    "Illegal character '{}' at line {}.".format(
+                        data[pos:pos + 4].decode("utf-8", "replace")[0],
+                        self.lineno), self.lineno)
+            self.lexpos = match.end()
+            # Tokens are built by the rule functions of Lexer.
+            tok = self._token(match.lastgroup, _text(match.group()), pos)
+            tok = getattr(Lexer, "t_" + match.lastgroup)(tok)
+            if tok is not None:
+                return tok
+            # Newlines and comments
+            pos = self.lexpos
+        self.lexpos = pos
+        return None
@@ -0,0 +1,259 @@
+"""
+Franca model file loaders.
+
+A loader finds model files by their import file specifications and reads
+them. The processor tries its loaders in order.
+"""
+
+import mmap
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+
+
+class Loader(object):
+    """
+    Model file loader interface.
+    """
+
+    def find(self, fspec):
+        """
+        Find a model file.
+
+        :param fspec: File specification as given in an import statement or
+            to Processor.import_file().
+        :return: Unique file specification of the model file or None if not
+            found.
+        """
+        raise NotImplementedError
+
+    def read(self, fspec):
+        """
+        Read a model file.
+
+        :param fspec: File specification returned by find().
+        :return: FIDL string.
+        """
+        raise NotImplementedError
+
+    def map(self, fspec, min_size):
+        """
+        Memory-map a large model file.
+
+        :param fspec: File specification returned by find().
+        :param min_size: Minimum size of files to map.
+        :return: mmap.mmap object or None if the file is smaller than
+            min_size or mapping is not supported.
+        """
+        return None
+
+    def close(self):
+        """
+        Release the resources of the loader.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class DirectoryLoader(Loader):
+    """
+    Loads model files from the file system.
+
+    Files are looked up relative to the working directory first and then in
+    the package paths.
+    """
+
+    def __init__(self, package_paths=None):
+        """
+        Constructor.
+
+        :param package_paths: A list of model import directories, or a
+            function returning the current list, e.g. the package paths of
+            a processor. A list is referenced, not copied.
+        """
+        self._package_paths = package_paths if package_paths is not None \
+            else []
+
+    @property
+    def package_paths(self):
+        """
+        :return: The list of model import directories.
+        """
+        if callable(self._package_paths):
+            return self._package_paths()
+        return self._package_paths
+
+    def find(self, fspec):
+        if os.path.exists(fspec):
+            return fspec
+        if not os.path.isabs(fspec):
+            # Relative specification - check in the package path list.
+            for path in self.package_paths:
+                temp_fspec = os.path.join(path, fspec)
+                if os.path.exists(temp_fspec):
+                    return temp_fspec
+        return None
+
+    def read(self, fspec):
+        with open(fspec, "r") as f:
+            data = f.read()
+        if str is bytes:
+            # Python 2 reads bytes - fail on invalid UTF-8 like Python 3.
+            data.decode("utf-8")
+        return data
+
+    def map(self, fspec, min_size):
+        with open(fspec, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size or size < min_size:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class DictLoader(Loader):
+    """
+    Loads model files from in-memory strings.
+    """
+
+    def __init__(self, files=None):
+        """
+        Constructor.
+
+        :param files: A dictionary of FIDL strings by file specification.
+        """
+        self.files = files if files is not None else {}
+
+    def find(self, fspec):
+        return fspec if fspec in self.files else None
+
+    def read(self, fspec):
+        return self.files[fspec]
+
+
+class ArchiveLoader(Loader):
+    """
+    Base class of loaders reading model files directly from an archive.
+
+    Files are identified as "<archive>/<member>", similar to modules
+    imported from ZIP archives. Relative specifications are looked up in
+    the archive root and then in the package paths within the archive.
+    """
+
+    def __init__(self, name, names, package_paths=None):
+        """
+        Constructor.
+
+        :param name: Archive name used in the file specifications.
+        :param names: A list of the archive member names.
+        :param package_paths: A list of model import directories within
+            the archive.
+        """
+        self.name = name
+        self.package_paths = package_paths if package_paths else []
+        self._members = {}
+        for member in names:
+            self._members[posixpath.normpath(member)] = member
+        # Archive objects are not safe for concurrent reads.
+        self._lock = threading.Lock()
+
+    def _member(self, path):
+        path = posixpath.normpath(path.replace(os.sep, "/"))
+        return path if path in self._members else None
+
+    def find(self, fspec):
+        prefix = self.name + "/"
+        if fspec.startswith(prefix):
+            member = self._member(fspec[len(prefix):])
+        elif os.path.isabs(fspec):
+            member = None
+        else:
+            member = self._member(fspec)
+            for path in self.package_paths:
+                if member is not None:
+                    break
+                member = self._member(posixpath.join(path, fspec))
+        return prefix + member if member is not None else None
+
+    def read(self, fspec):
+        member = self._members[fspec[len(self.name) + 1:]]
+        with self._lock:
+            data = self._read(member)
+        return data.decode("utf-8")
+
+    def _read(self, member):
+        raise NotImplementedError
+
+
+def _archive_name(archive):
+    if isinstance(archive, str):
+        return archive
+    return getattr(archive, "name", "<archive>")
+
+
+class ZipLoader(ArchiveLoader):
+    """
+    Loads model files from a ZIP archive without extracting it.
+    """
+
+    def __init__(self, archive, package_paths=None):
+        """
+        Constructor.
+
+        :param archive: Archive file specification or file object.
+        :param package_paths: A list of model import directories within
+            the archive.
+        """
+        self._zip = zipfile.ZipFile(archive)
+        super(ZipLoader, self).__init__(
+            _archive_name(archive),
+            [info.filename for info in self._zip.infolist()
+             if not info.filename.endswith("/")], package_paths)
+
+    def _read(self, member):
+        return self._zip.read(member)
+
+    def close(self):
+        self._zip.close()
+
+
+class TarLoader(ArchiveLoader):
+    """
+    Loads model files from a, possibly compressed, tar archive without
+    extracting it.
+    """
+
+    def __init__(self, archive, package_paths=None):
+        """
+        Constructor.
+
+        :param archive: Archive file specification or file object.
+        :param package_paths: A list of model import directories within
+            the archive.
+        """
+        if isinstance(archive, str):
+            self._tar = tarfile.open(archive)
+        else:
+            self._tar = tarfile.open(fileobj=archive)
+        self._tar_members = dict((member.name, member)
+                                 for member in self._tar.getmembers()
+                                 if member.isfile())
+        super(TarLoader, self).__init__(
+            _archive_name(archive), list(self._tar_members), package_paths)
+
+    def _read(self, member):
+        f = self._tar.extractfile(self._tar_members[member])
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def close(self):
+        self._tar.close()
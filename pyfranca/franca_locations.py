@@ -0,0 +1,198 @@
+"""
+Franca source locations.
+
+AST nodes record their source location as one packed integer - the index of
+the model file in a SourceMap and the offset of the node's name in the file.
+Lines and columns are computed on demand from per-file line offset arrays,
+so locating a node does not read the model file again.
+"""
+
+import itertools
+import operator
+import re
+from array import array
+from bisect import bisect_right
+
+# Number of bits of the file offset in a packed location. Locations in files
+#   of 4 GiB or more are not supported.
+OFFSET_BITS = 32
+
+_OFFSET_MASK = (1 << OFFSET_BITS) - 1
+
+_NEWLINE = re.compile("\n")
+_NEWLINE_BYTES = re.compile(b"\n")
+
+
+def pack(file_index, offset):
+    """
+    Pack a source location.
+
+    :param file_index: Index of the file in a SourceMap.
+    :param offset: Offset in the file.
+    :return: Packed location.
+    """
+    return (file_index << OFFSET_BITS) | offset
+
+
+def unpack(location):
+    """
+    Unpack a source location.
+
+    :param location: Packed location.
+    :return: A tuple - file index and offset.
+    """
+    return location >> OFFSET_BITS, location & _OFFSET_MASK
+
+
+def line_offsets(fidl):
+    """
+    Find the start offsets of the lines of a model file.
+
+    :param fidl: FIDL string or a bytes-like object, e.g. a mmap.mmap
+        object, of an UTF-8 encoded file.
+    :return: An array of line start offsets, in characters for strings and
+        in bytes otherwise.
+    """
+    offsets = array("I", [0])
+    if isinstance(fidl, type(u"")) and hasattr(itertools, "accumulate"):
+        # Sum the line lengths without a loop in Python.
+        lines = fidl.split("\n")
+        lines.pop()
+        offsets.extend(map(operator.add,
+                           itertools.accumulate(map(len, lines)),
+                           itertools.count(1)))
+        return offsets
+    newline = _NEWLINE if isinstance(fidl, type(u"")) else _NEWLINE_BYTES
+    offsets.extend(match.end() for match in newline.finditer(fidl))
+    return offsets
+
+
+class SourceMap(object):
+    """
+    Maps packed source locations to files, lines and columns.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        # File specifications by file or span index
+        self.files = []
+        self._indices = {}
+        self._line_offsets = []
+        # File index and offset base of each file or span index
+        self._parents = []
+        self._bases = []
+        self._free = []
+
+    def add(self, fspec, fidl):
+        """
+        Register a model file before parsing it.
+
+        A file registered again, e.g. after it changed, keeps its index.
+
+        :param fspec: File specification.
+        :param fidl: FIDL string or a bytes-like object of the file.
+        :return: File index for packing the locations in the file.
+        """
+        offsets = line_offsets(fidl)
+        index = self._indices.get(fspec)
+        if index is None:
+            index = self._new(fspec, offsets, None, 0)
+            self._indices[fspec] = index
+        else:
+            self._line_offsets[index] = offsets
+        return index
+
+    def _new(self, fspec, offsets, parent, base):
+        if self._free:
+            index = self._free.pop()
+            self.files[index] = fspec
+            self._line_offsets[index] = offsets
+            self._parents[index] = parent if parent is not None else index
+            self._bases[index] = base
+            return index
+        index = len(self.files)
+        self.files.append(fspec)
+        self._line_offsets.append(offsets)
+        self._parents.append(parent if parent is not None else index)
+        self._bases.append(base)
+        return index
+
+    def add_span(self, file_index, base):
+        """
+        Register a span of a file, e.g. a definition parsed separately.
+
+        Offsets in locations packed with the span index are relative to the
+        span, so moving the span moves all of them.
+
+        :param file_index: File index returned by add().
+        :param base: Offset of the span in the file.
+        :return: Span index for packing the locations in the span.
+        """
+        return self._new(self.files[file_index], None, file_index, base)
+
+    def move_span(self, span_index, base):
+        """
+        Move a span within its file.
+
+        :param span_index: Span index returned by add_span().
+        :param base: New offset of the span in the file.
+        """
+        self._bases[span_index] = base
+
+    def remove_span(self, span_index):
+        """
+        Release a span index for reuse.
+
+        :param span_index: Span index returned by add_span().
+        """
+        self.files[span_index] = None
+        self._free.append(span_index)
+
+    def resolve(self, location):
+        """
+        Resolve a packed source location.
+
+        :param location: Packed location.
+        :return: A tuple - file specification, line and column, both
+            starting at 1. None if the location is unknown.
+        """
+        if location is None:
+            return None
+        index, offset = unpack(location)
+        if index >= len(self.files) or self.files[index] is None:
+            return None
+        offset += self._bases[index]
+        offsets = self._line_offsets[self._parents[index]]
+        line = bisect_right(offsets, offset)
+        return self.files[index], line, offset - offsets[line - 1] + 1
+
+    def offset(self, file_index, line, column):
+        """
+        Find the offset of a line and column in a file.
+
+        :param file_index: File or span index.
+        :param line: Line, starting at 1.
+        :param column: Column, starting at 1. Columns past the end of the
+            line are limited to its end.
+        :return: Offset in the file.
+        """
+        offsets = self._line_offsets[self._parents[file_index]]
+        line = max(1, min(line, len(offsets)))
+        offset = offsets[line - 1] + max(0, column - 1)
+        if line < len(offsets):
+            offset = min(offset, offsets[line] - 1)
+        return offset
+
+    def format(self, location):
+        """
+        Format a packed source location as "file:line:column".
+
+        :param location: Packed location.
+        :return: Location string or None if the location is unknown.
+        """
+        resolved = self.resolve(location)
+        if resolved is None:
+            return None
+        return "{}:{}:{}".format(*resolved)
@@ -0,0 +1,1423 @@
+"""
+Franca language server.
+
+Implements the Language Server Protocol for model files over a pair of
+streams, e.g. stdin and stdout: diagnostics, go to definition, find
+references, hover and completion.
+
+The workspace files are loaded into a resident Processor, parsed in parallel
+worker processes, and their resolved references are indexed by target. Open
+documents are parsed incrementally on every change and linked against the
+resident model, so that requests only look up names in the document's scope
+and in the reference index. Other files are seen as saved - once files are
+saved or changed on disk, they are reloaded into the resident model with
+the files importing them.
+
+Positions are counted in characters instead of UTF-16 code units, which only
+differs for characters outside the Basic Multilingual Plane.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from pyfranca import ast, __version__
+from pyfranca.franca_diagnostics import Diagnostic
+from pyfranca.franca_diff import Differ
+from pyfranca.franca_incremental import IncrementalParser, TextEdit
+from pyfranca.franca_lexer import Lexer
+from pyfranca.franca_locations import SourceMap
+from pyfranca.franca_parser import Parser
+from pyfranca.franca_processor import Processor, ProcessorException
+from pyfranca.franca_types import fqn
+
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+try:
+    from urllib.parse import urlparse
+    from urllib.request import pathname2url, url2pathname
+except ImportError:
+    # Python 2
+    from urllib import pathname2url, url2pathname
+    from urlparse import urlparse
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    # Python 3
+    _STRING_TYPES = (str,)
+
+_logger = logging.getLogger(__name__)
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SERVER_NOT_INITIALIZED = -32002
+
+# LSP completion item kinds
+_COMPLETION_KINDS = [
+    (ast.Interface, 8),
+    (ast.TypeCollection, 9),
+    (ast.Struct, 22),
+    (ast.Enumeration, 13),
+    (ast.Typedef, 25),
+    (ast.Array, 7),
+    (ast.Map, 7),
+    (ast.Attribute, 10),
+    (ast.Method, 2),
+    (ast.Broadcast, 23),
+]
+_KEYWORD_KIND = 14
+_PRIMITIVE_KIND = 25
+
+_PRIMITIVE_TYPES = Lexer.keywords[Lexer.keywords.index("Int8"):]
+_KEYWORDS = Lexer.keywords[:Lexer.keywords.index("Int8")]
+
+
+class LspException(Exception):
+
+    def __init__(self, message, code=INTERNAL_ERROR):
+        super(LspException, self).__init__()
+        self.message = message
+        self.code = code
+
+    def __str__(self):
+        return self.message
+
+
+def read_message(stream):
+    """
+    Read a JSON-RPC message with a Content-Length header.
+
+    :param stream: Binary input stream.
+    :return: Message dictionary or None at the end of the stream.
+    :raises LspException: If the message is invalid.
+    """
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            try:
+                length = int(value)
+            except ValueError:
+                raise LspException("Invalid Content-Length header.",
+                                   PARSE_ERROR)
+    if length is None:
+        raise LspException("Missing Content-Length header.", PARSE_ERROR)
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    try:
+        message = json.loads(body.decode("utf-8"))
+    except ValueError:
+        raise LspException("Invalid JSON message.", PARSE_ERROR)
+    if not isinstance(message, dict):
+        raise LspException("Invalid message.", INVALID_REQUEST)
+    return message
+
+
+def write_message(stream, message):
+    """
+    Write a JSON-RPC message with a Content-Length header.
+
+    :param stream: Binary output stream.
+    :param message: Message dictionary.
+    """
+    body = json.dumps(message).encode("utf-8")
+    stream.write("Content-Length: {}\r\n\r\n".format(len(body)).encode(
+        "ascii") + body)
+    stream.flush()
+
+
+def _param(params, name, kind=dict, optional=False):
+    """
+    Get a parameter of a client message.
+
+    :param params: Parameter dictionary.
+    :param name: Parameter name.
+    :param kind: Expected type or tuple of types.
+    :param optional: True if the parameter may be missing.
+    :return: Parameter value or None if it is missing and optional.
+    :raises LspException: If the parameter is missing or invalid.
+    """
+    value = params.get(name)
+    if value is None and optional:
+        return None
+    if not isinstance(value, kind):
+        raise LspException("Invalid or missing parameter '{}'.".format(name),
+                           INVALID_PARAMS)
+    return value
+
+
+def _uri(params):
+    return _param(_param(params, "textDocument"), "uri", _STRING_TYPES)
+
+
+def _position(params, name="position"):
+    position = _param(params, name)
+    for key in ("line", "character"):
+        if _param(position, key, int) < 0:
+            raise LspException("Invalid parameter '{}'.".format(name),
+                               INVALID_PARAMS)
+    return position
+
+
+def path_to_uri(fspec):
+    """
+    Convert a file specification to a file URI.
+    """
+    url = pathname2url(os.path.abspath(fspec))
+    if url.startswith("///"):
+        # Windows drive
+        return "file:" + url
+    return "file://" + url
+
+
+def uri_to_path(uri):
+    """
+    Convert a file URI to a file specification.
+
+    :return: File specification or None for other URI schemes.
+    """
+    parsed = urlparse(uri)
+    if parsed.scheme != "file":
+        return None
+    return url2pathname(parsed.path)
+
+
+def _members(namespace):
+    for members in (namespace.typedefs, namespace.enumerations,
+                    namespace.structs, namespace.arrays, namespace.maps):
+        for member in members.values():
+            yield member
+    if isinstance(namespace, ast.Interface):
+        for members in (namespace.attributes, namespace.methods,
+                        namespace.broadcasts):
+            for member in members.values():
+                yield member
+
+
+def _typed(member):
+    """
+    Get the definitions holding the types of a namespace member.
+
+    :return: A list of tuples - definition and name of its type attribute.
+    """
+    if isinstance(member, (ast.Typedef, ast.Array, ast.Attribute)):
+        return [(member, "type")]
+    elif isinstance(member, ast.Map):
+        return [(member, "key_type"), (member, "value_type")]
+    elif isinstance(member, ast.Struct):
+        return [(field, "type") for field in member.fields.values()]
+    elif isinstance(member, ast.Method):
+        typed = [(arg, "type") for arg in member.in_args.values()]
+        typed += [(arg, "type") for arg in member.out_args.values()]
+        if isinstance(member.errors, ast.Reference):
+            typed.append((member, "errors"))
+        return typed
+    elif isinstance(member, ast.Broadcast):
+        return [(arg, "type") for arg in member.out_args.values()]
+    return []
+
+
+def _occurrences(namespace):
+    """
+    Generate the type references of a namespace, including the ones in
+    anonymous arrays. Anonymous arrays are shared, see
+    ast.Namespace._intern(), so their element references are generated
+    for each occurrence, located at the occurrence.
+
+    :return: Tuples - packed location and ast.Reference object.
+    """
+    for member in _members(namespace):
+        for owner, name in _typed(member):
+            the_type = getattr(owner, name)
+            location = None
+            if isinstance(the_type, ast.Array) and the_type.name is None:
+                location = getattr(owner, name + "_location")
+                the_type = the_type.type
+            if isinstance(the_type, ast.Reference):
+                if location is None:
+                    location = the_type.location
+                yield location, the_type
+
+
+def _references(namespace):
+    """
+    Generate the type references of a namespace, including the ones in
+    anonymous arrays. Each reference is generated once, even if its
+    node is shared by several definitions.
+    """
+    seen = set()
+    for _, reference in _occurrences(namespace):
+        if id(reference) not in seen:
+            seen.add(id(reference))
+            yield reference
+
+
+def _links(namespace):
+    """
+    Generate the resolved references of a namespace.
+
+    Extended types and interfaces are referenced at the name of the
+    extending definition.
+
+    :return: Tuples - packed location and length of the referencing name,
+        and referenced node.
+    """
+    for location, reference in _occurrences(namespace):
+        if reference.reference is not None:
+            yield location, len(reference.name), reference.reference
+    for members in (namespace.enumerations, namespace.structs):
+        for member in members.values():
+            if member.reference is not None:
+                yield member.location, len(member.name), member.reference
+    if isinstance(namespace, ast.Interface) and \
+            namespace.reference is not None:
+        yield namespace.location, len(namespace.name), namespace.reference
+
+
+def _namespaces(package):
+    return list(package.typecollections.values()) + \
+        list(package.interfaces.values())
+
+
+def _args(keyword, args):
+    return "    {} {{ {} }}".format(keyword, " ".join(
+        "{} {}".format(Differ.type_name(arg.type), arg.name)
+        for arg in args.values()))
+
+
+def describe(node):
+    """
+    Describe a namespace or a namespace member in Franca syntax, e.g. for
+    hovers.
+
+    :param node: ast.Namespace or ast.Type object.
+    :return: Description string.
+    """
+    kind = Differ.element_kind(node)
+    lines = ["{} {}".format(kind, fqn(node))]
+    if isinstance(node, ast.Namespace):
+        if isinstance(node, ast.Interface) and node.extends:
+            lines[0] += " extends {}".format(node.extends)
+        if node.version:
+            lines.append("    version {}".format(node.version))
+    elif isinstance(node, ast.Typedef):
+        lines[0] += " is {}".format(Differ.type_name(node.type))
+    elif isinstance(node, ast.Array):
+        lines[0] += " of {}".format(Differ.type_name(node.type))
+    elif isinstance(node, ast.Map):
+        lines[0] += " {{ {} to {} }}".format(
+            Differ.type_name(node.key_type),
+            Differ.type_name(node.value_type))
+    elif isinstance(node, ast.Attribute):
+        lines[0] = "attribute {} {}".format(Differ.type_name(node.type),
+                                            fqn(node))
+    elif isinstance(node, ast.Struct):
+        if node.extends:
+            lines[0] += " extends {}".format(node.extends)
+        lines += ["    {} {}".format(Differ.type_name(field.type),
+                                     field.name)
+                  for field in node.fields.values()]
+    elif isinstance(node, ast.Enumeration):
+        if node.extends:
+            lines[0] += " extends {}".format(node.extends)
+        lines += ["    {} = {}".format(item.name, item.value)
+                  if item.value is not None else "    " + item.name
+                  for item in node.enumerators.values()]
+    elif isinstance(node, ast.Method):
+        if node.in_args:
+            lines.append(_args("in", node.in_args))
+        if node.out_args:
+            lines.append(_args("out", node.out_args))
+        if isinstance(node.errors, ast.Reference):
+            lines.append("    error {}".format(
+                Differ.type_name(node.errors)))
+    elif isinstance(node, ast.Broadcast):
+        if node.out_args:
+            lines.append(_args("out", node.out_args))
+    return "\n".join(lines)
+
+
+def _word_at(text, offset):
+    """
+    Find the name under a text offset.
+
+    Qualified names are cut after the part under the offset.
+
+    :return: A tuple - start offset and name. The name is empty if there is
+        none at the offset.
+    """
+    start = offset
+    while start > 0 and (text[start - 1].isalnum() or
+                         text[start - 1] in "_."):
+        start -= 1
+    end = offset
+    while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+        end += 1
+    while start < end and text[start] == ".":
+        start += 1
+    return start, text[start:end]
+
+
+# Per worker process parser.
+_parser = None
+
+
+def _init_worker():
+    global _parser
+    _parser = Parser()
+
+
+def _parse_in_worker(job):
+    fspec, fidl, file_index = job
+    _parser.file_index = file_index
+    diagnostics = []
+    package = _parser.parse(fidl, None, diagnostics)
+    if package is not None:
+        package.files = [fspec]
+    return package, diagnostics
+
+
+class Document(object):
+    """
+    An open model file.
+    """
+
+    def __init__(self, uri, text, sources, parser):
+        """
+        Constructor.
+
+        :param uri: Document URI.
+        :param text: Document contents.
+        :param sources: SourceMap to register the document in. Its nodes
+            are located by URI instead of by file.
+        :param parser: Parser to use.
+        """
+        self.uri = uri
+        self.fspec = uri_to_path(uri)
+        self.parser = IncrementalParser(uri, sources, parser)
+        self.parser.parse(text)
+        # Package of the document's definitions, with the namespaces of
+        #   other files of the same package added for lookups. Set by
+        #   Workspace.prepare().
+        self.package = None
+        # The document's own namespaces by name
+        self.namespaces = OrderedDict()
+        # Set by Workspace.check()
+        self.diagnostics = []
+        self.references = {}
+        self.prepared = False
+        self.checked = False
+
+    def offset(self, position):
+        """
+        Convert an LSP position to a document offset.
+        """
+        return self.parser.offset(position["line"] + 1,
+                                  position["character"] + 1)
+
+    def changed(self):
+        self.prepared = False
+        self.checked = False
+
+
+class Workspace(object):
+    """
+    Resident model of the workspace files and the open documents.
+    """
+
+    def __init__(self, package_paths=None, jobs=1):
+        """
+        Constructor.
+
+        :param package_paths: A list of model import directories.
+        :param jobs: Number of worker processes for indexing.
+        """
+        self.package_paths = list(package_paths or [])
+        self.jobs = jobs
+        self.sources = SourceMap()
+        self.parser = Parser()
+        self.processor = None
+        # Indexed workspace files
+        self.fspecs = []
+        # Open documents by URI
+        self.documents = OrderedDict()
+        # Model errors of the resident files by file
+        self.diagnostics = {}
+        self._changed = set()
+        # Open documents by file
+        self._paths = {}
+        # Locations and lengths of the resident references by target FQN
+        self._references = {}
+        self._reset()
+
+    def _reset(self):
+        processor = Processor()
+        processor.package_paths.extend(self.package_paths)
+        processor.sources = self.sources
+        processor.parser = self.parser
+        processor.diagnostics = []
+        self.processor = processor
+
+    @staticmethod
+    def find_files(directories):
+        """
+        Find the model files in directory trees.
+
+        :param directories: A list of directories.
+        :return: A sorted list of file specifications.
+        """
+        fspecs = []
+        for directory in directories:
+            for path, dirs, files in os.walk(directory):
+                dirs.sort()
+                fspecs.extend(os.path.join(path, name)
+                              for name in sorted(files)
+                              if name.endswith(".fidl"))
+        return fspecs
+
+    def index(self, fspecs):
+        """
+        Load model files into a new resident model and index their
+        references.
+
+        The files are parsed in parallel worker processes and merged and
+        linked in order.
+
+        :param fspecs: A list of file specifications.
+        """
+        self._reset()
+        self._changed.update(self.diagnostics)
+        self.diagnostics = {}
+        self.fspecs = list(fspecs)
+        if self.jobs > 1 and len(fspecs) > 1:
+            self._parse(fspecs)
+        for fspec in fspecs:
+            self.processor.import_file(fspec)
+        self._update()
+
+    def reload(self, fspecs, directories=()):
+        """
+        Reload changed model files into the resident model, together with
+        the files depending on them, i.e. the files importing them,
+        directly or indirectly, and the other files of their packages.
+        Other files are kept.
+
+        :param fspecs: A list of the specifications of the changed, created
+            or deleted files.
+        :param directories: A list of the directories indexed files are
+            found in. Created model files in them are indexed.
+        """
+        processor = self.processor
+        prefixes = tuple(os.path.join(os.path.abspath(directory), "")
+                         for directory in directories)
+        for fspec in fspecs:
+            if not os.path.isfile(fspec):
+                if fspec in self.fspecs:
+                    self.fspecs.remove(fspec)
+            elif fspec not in self.fspecs and fspec.endswith(".fidl") and \
+                    os.path.abspath(fspec).startswith(prefixes):
+                self.fspecs.append(fspec)
+        importers = {}
+        for fspec, imported_files in processor.imports.items():
+            for imported_file in imported_files:
+                importers.setdefault(imported_file, []).append(fspec)
+        affected = set()
+        stack = list(fspecs)
+        while stack:
+            fspec = stack.pop()
+            if fspec in affected:
+                continue
+            affected.add(fspec)
+            stack.extend(importers.get(fspec, []))
+            if fspec in processor.files:
+                stack.extend(processor.files[fspec].files)
+        for fspec in affected:
+            self._unload(fspec)
+        for fspec in self.fspecs:
+            if fspec in affected:
+                processor.import_file(fspec)
+        self._update()
+
+    def _unload(self, fspec):
+        """
+        Remove the definitions of a file from the resident model.
+        """
+        processor = self.processor
+        if fspec in self.diagnostics:
+            del self.diagnostics[fspec]
+            self._changed.add(fspec)
+        package = processor.files.pop(fspec, None)
+        processor.imports.pop(fspec, None)
+        if package is None:
+            return
+        if fspec in package.files:
+            package.files.remove(fspec)
+        if not package.files:
+            del processor.packages[package.name]
+            return
+        package.imports = [item for item in package.imports
+                           if self._file(item) != fspec]
+        for members in (package.typecollections, package.interfaces):
+            for name, namespace in list(members.items()):
+                if self._file(namespace) == fspec:
+                    del members[name]
+
+    def _update(self):
+        """
+        Index the references of the resident model.
+        """
+        references = {}
+        for package in self.processor.packages.values():
+            for namespace in _namespaces(package):
+                for location, length, target in _links(namespace):
+                    references.setdefault(fqn(target), []).append(
+                        (location, length))
+        self._references = references
+        for document in self.documents.values():
+            document.changed()
+
+    def _parse(self, fspecs):
+        """
+        Parse files in advance in worker processes.
+        """
+        processor = self.processor
+        jobs = []
+        for fspec in fspecs:
+            try:
+                loader, fspec = processor.find_loader(fspec)
+                fidl = loader.read(fspec)
+            except (ProcessorException, EnvironmentError):
+                # Reported by import_file()
+                continue
+            jobs.append((fspec, fidl, self.sources.add(fspec, fidl)))
+        chunk_size = max(1, len(jobs) // (self.jobs * 4))
+        pool = multiprocessing.Pool(self.jobs, initializer=_init_worker)
+        try:
+            results = pool.map(_parse_in_worker, jobs, chunk_size)
+        finally:
+            pool.close()
+            pool.join()
+        for (fspec, _, _), (package, diagnostics) in zip(jobs, results):
+            for diagnostic in diagnostics:
+                diagnostic.file = fspec
+            processor.diagnostics.extend(diagnostics)
+            processor.add_parsed(fspec, package)
+
+    def changed_diagnostics(self):
+        """
+        Collect the model errors of the resident files found since the last
+        call.
+
+        :return: A dictionary of Diagnostic lists by file, with the files
+            whose errors changed.
+        """
+        for diagnostic in self.processor.diagnostics:
+            if diagnostic.file is not None:
+                self.diagnostics.setdefault(diagnostic.file, []).append(
+                    diagnostic)
+                self._changed.add(diagnostic.file)
+        del self.processor.diagnostics[:]
+        changed = OrderedDict((fspec, self.diagnostics.get(fspec, []))
+                              for fspec in sorted(self._changed))
+        self._changed = set()
+        return changed
+
+    def open(self, uri, text):
+        """
+        Open a document.
+
+        :param uri: Document URI.
+        :param text: Document contents.
+        :return: Document object.
+        """
+        self.close(uri)
+        document = Document(uri, text, self.sources, self.parser)
+        self.documents[uri] = document
+        if document.fspec is not None:
+            self._paths[document.fspec] = document
+        return document
+
+    def close(self, uri):
+        """
+        Close a document.
+        """
+        document = self.documents.pop(uri, None)
+        if document is not None and document.fspec is not None:
+            self._paths.pop(document.fspec, None)
+
+    def change(self, uri, changes):
+        """
+        Apply LSP content changes to a document.
+
+        :param uri: Document URI.
+        :param changes: A list of TextDocumentContentChangeEvent
+            dictionaries.
+        :return: Document object.
+        """
+        document = self._document(uri)
+        for change in changes:
+            if "range" not in change:
+                document.parser.parse(change["text"])
+                continue
+            start = document.offset(change["range"]["start"])
+            end = document.offset(change["range"]["end"])
+            try:
+                document.parser.edit([TextEdit(start, end, change["text"])])
+            except ValueError as e:
+                # Range ending before its start
+                raise LspException(str(e), INVALID_PARAMS)
+        document.changed()
+        return document
+
+    def _document(self, uri):
+        try:
+            return self.documents[uri]
+        except KeyError:
+            raise LspException("Document '{}' is not open.".format(uri),
+                               INVALID_PARAMS)
+
+    def _file(self, node):
+        resolved = self.sources.resolve(node.location)
+        return resolved[0] if resolved else None
+
+    def _import(self, fspec):
+        processor = self.processor
+        try:
+            fspec = processor.find_file(fspec)
+        except ProcessorException:
+            return None
+        return processor.import_file(fspec)
+
+    def _link(self, document, imports, typecollections, interfaces,
+              diagnostics):
+        processor = self.processor
+        resident = processor.diagnostics
+        processor.diagnostics = diagnostics
+        try:
+            processor.link(document.uri, imports, typecollections,
+                           interfaces)
+        finally:
+            processor.diagnostics = resident
+
+    def prepare(self, document):
+        """
+        Link the imports of a document for name lookups.
+
+        :param document: Document object.
+        """
+        if document.prepared:
+            return
+        document.prepared = True
+        document.checked = False
+        parsed = document.parser.package
+        if parsed is None:
+            document.package = None
+            document.namespaces = OrderedDict()
+            return
+        namespaces = _namespaces(parsed)
+        document.namespaces = OrderedDict(
+            (namespace.name, namespace) for namespace in namespaces)
+        package = ast.Package(
+            parsed.name, document.uri, parsed.imports,
+            OrderedDict(parsed.interfaces),
+            OrderedDict(parsed.typecollections))
+        resident = self.processor.packages.get(package.name)
+        if resident is not None:
+            # Namespaces of the package in other files
+            for namespace in _namespaces(resident):
+                if namespace.name not in package and \
+                        self._file(namespace) != document.fspec:
+                    if isinstance(namespace, ast.Interface):
+                        package.interfaces[namespace.name] = namespace
+                    else:
+                        package.typecollections[namespace.name] = namespace
+        for package_import in package.imports:
+            package_import.package_reference = self._import(
+                package_import.file)
+            package_import.namespace_reference = None
+        self._link(document, package.imports, [], [], [])
+        document.package = package
+
+    def check(self, document):
+        """
+        Link a document, collecting its model errors and references.
+
+        :param document: Document object.
+        """
+        self.prepare(document)
+        if document.checked:
+            return
+        document.checked = True
+        diagnostics = []
+        references = {}
+        package = document.package
+        if package is not None:
+            for package_import in package.imports:
+                if package_import.package_reference is None:
+                    resolved = self.sources.resolve(package_import.location)
+                    diagnostics.append(Diagnostic(
+                        "Model '{}' not found.".format(package_import.file),
+                        document.uri, resolved[1] if resolved else None))
+            namespaces = list(document.namespaces.values())
+            for namespace in namespaces:
+                for reference in _references(namespace):
+                    # Names may resolve differently after an edit.
+                    reference.reference = None
+            self._link(document, package.imports,
+                       [item for item in namespaces
+                        if isinstance(item, ast.TypeCollection)],
+                       [item for item in namespaces
+                        if isinstance(item, ast.Interface)],
+                       diagnostics)
+            for namespace in namespaces:
+                for location, length, target in _links(namespace):
+                    references.setdefault(fqn(target), []).append(
+                        (location, length))
+        diagnostics = document.parser.diagnostics + diagnostics
+        diagnostics.sort(key=lambda item: item.line or 0)
+        document.diagnostics = diagnostics
+        document.references = references
+
+    def _current(self, node):
+        """
+        Replace a resident node of an open file by the open version.
+
+        :return: ast.Namespace or ast.Type object, or None if the node is
+            not defined in the open version.
+        """
+        document = self._paths.get(self._file(node))
+        if document is None:
+            return node
+        self.prepare(document)
+        namespace_fqn = fqn(node if isinstance(node, ast.Namespace)
+                            else node.namespace)
+        package_name, namespace_name = namespace_fqn.rsplit(".", 1)
+        if document.package is None or \
+                document.package.name != package_name or \
+                namespace_name not in document.namespaces:
+            return None
+        namespace = document.namespaces[namespace_name]
+        if isinstance(node, ast.Namespace):
+            return namespace
+        return namespace[node.name] if node.name in namespace else None
+
+    def _scope(self, document, offset):
+        """
+        Find the top-level definition at a document offset.
+
+        :return: ast.Import or ast.Namespace object or None.
+        """
+        nodes = document.parser.nodes_at(offset)
+        return nodes[0] if nodes else None
+
+    def target(self, uri, position):
+        """
+        Find the definition of the name at a position.
+
+        :param uri: Document URI.
+        :param position: LSP position.
+        :return: The defining ast.Namespace or ast.Type object or None if
+            not found.
+        """
+        document = self._document(uri)
+        self.prepare(document)
+        offset = document.offset(position)
+        word = _word_at(document.parser.text, offset)[1]
+        package = document.package
+        if package is None or not word:
+            return None
+        scope = self._scope(document, offset)
+        target = None
+        if isinstance(scope, ast.Import):
+            target = scope.namespace_reference
+        elif isinstance(scope, ast.Namespace):
+            try:
+                target = Processor.resolve(scope, str(word))
+            except ProcessorException:
+                pass
+        if target is None:
+            try:
+                target = Processor.resolve_namespace(package, str(word))
+            except ProcessorException:
+                pass
+        if target is None:
+            return None
+        return self._current(target)
+
+    def location(self, location, length):
+        """
+        Convert a packed source location to an LSP location.
+
+        :param location: Packed source location.
+        :param length: Length of the located name.
+        :return: LSP location dictionary or None if unknown.
+        """
+        resolved = self.sources.resolve(location)
+        if resolved is None:
+            return None
+        fspec, line, column = resolved
+        uri = fspec if fspec in self.documents else path_to_uri(fspec)
+        return OrderedDict([
+            ("uri", uri),
+            ("range", _range(line - 1, column - 1, length)),
+        ])
+
+    def definition(self, uri, position):
+        """
+        Handle textDocument/definition.
+        """
+        document = self._document(uri)
+        self.prepare(document)
+        scope = self._scope(document, document.offset(position))
+        if isinstance(scope, ast.Import) and \
+                scope.namespace_reference is None:
+            # Model import
+            try:
+                fspec = self.processor.find_file(scope.file)
+            except ProcessorException:
+                return None
+            return OrderedDict([("uri", path_to_uri(fspec)),
+                                ("range", _range(0, 0, 0))])
+        target = self.target(uri, position)
+        if target is None:
+            return None
+        return self.location(target.location, len(target.name))
+
+    def references(self, uri, position, include_declaration=True):
+        """
+        Handle textDocument/references.
+        """
+        target = self.target(uri, position)
+        if target is None:
+            return []
+        key = fqn(target)
+        found = []
+        if include_declaration:
+            found.append((target.location, len(target.name)))
+        for location, length in self._references.get(key, []):
+            # References in open files are taken from the open version.
+            if self.sources.resolve(location)[0] not in self._paths:
+                found.append((location, length))
+        for document in self.documents.values():
+            self.check(document)
+            found += document.references.get(key, [])
+        locations = []
+        for location, length in found:
+            location = self.location(location, length)
+            if location is not None and location not in locations:
+                locations.append(location)
+        return locations
+
+    def hover(self, uri, position):
+        """
+        Handle textDocument/hover.
+        """
+        target = self.target(uri, position)
+        if target is None:
+            return None
+        document = self.documents[uri]
+        start, word = _word_at(document.parser.text,
+                               document.offset(position))
+        line, column = document.parser.position(start)
+        return OrderedDict([
+            ("contents", OrderedDict([
+                ("kind", "markdown"),
+                ("value", "```franca\n{}\n```".format(describe(target))),
+            ])),
+            ("range", _range(line - 1, column - 1, len(word))),
+        ])
+
+    def completion(self, uri, position):
+        """
+        Handle textDocument/completion.
+        """
+        document = self._document(uri)
+        self.prepare(document)
+        offset = document.offset(position)
+        text = document.parser.text
+        start = offset
+        while start > 0 and (text[start - 1].isalnum() or
+                             text[start - 1] in "_."):
+            start -= 1
+        qualifier, _, prefix = text[start:offset].rpartition(".")
+        package = document.package
+        scope = self._scope(document, offset)
+        candidates = OrderedDict()
+
+        def add_members(namespace):
+            for member in _members(namespace):
+                candidates.setdefault(member.name, member)
+
+        def add_namespaces(package):
+            for namespace in _namespaces(package):
+                candidates.setdefault(namespace.name, namespace)
+
+        if qualifier:
+            if package is not None:
+                namespace = None
+                try:
+                    namespace = Processor.resolve_namespace(package,
+                                                            str(qualifier))
+                except ProcessorException:
+                    pass
+                if namespace is not None:
+                    add_members(namespace)
+                for package_import in package.imports:
+                    imported = package_import.package_reference
+                    namespace = package_import.namespace_reference
+                    if namespace is not None and fqn(namespace) == qualifier:
+                        add_members(namespace)
+                    if imported is not None and imported.name == qualifier:
+                        add_namespaces(imported)
+                if package.name == qualifier:
+                    add_namespaces(package)
+        else:
+            if isinstance(scope, ast.Namespace):
+                add_members(scope)
+            if package is not None:
+                for namespace in package.typecollections.values():
+                    add_members(namespace)
+                for package_import in package.imports:
+                    if package_import.namespace_reference is not None:
+                        add_members(package_import.namespace_reference)
+                add_namespaces(package)
+                for package_import in package.imports:
+                    if package_import.namespace_reference is None and \
+                            package_import.package_reference is not None:
+                        add_namespaces(package_import.package_reference)
+            for name in _PRIMITIVE_TYPES + _KEYWORDS:
+                candidates.setdefault(name, None)
+        items = []
+        for name, node in candidates.items():
+            if not name.startswith(prefix):
+                continue
+            item = OrderedDict([("label", name)])
+            if node is None:
+                item["kind"] = _PRIMITIVE_KIND if name in _PRIMITIVE_TYPES \
+                    else _KEYWORD_KIND
+            else:
+                for node_class, kind in _COMPLETION_KINDS:
+                    if isinstance(node, node_class):
+                        item["kind"] = kind
+                        break
+                item["detail"] = "{} {}".format(Differ.element_kind(node),
+                                                fqn(node))
+            items.append(item)
+        return items
+
+
+def _range(line, character, length):
+    return OrderedDict([
+        ("start", OrderedDict([("line", line), ("character", character)])),
+        ("end", OrderedDict([("line", line),
+                             ("character", character + length)])),
+    ])
+
+
+class LanguageServer(object):
+    """
+    Language server session.
+
+    Messages are read in a separate thread and handled one at a time, in
+    order. Diagnostics of changed documents are published once no message
+    arrived for a short delay, so that linking does not slow down typing.
+    """
+
+    def __init__(self, reader, writer, package_paths=None, jobs=None):
+        """
+        Constructor.
+
+        :param reader: Binary input stream of the client messages.
+        :param writer: Binary output stream for the server messages.
+        :param package_paths: A list of model import directories, in
+            addition to the workspace folders.
+        :param jobs: Number of worker processes for indexing. Defaults to
+            the number of CPUs.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.package_paths = list(package_paths or [])
+        self.jobs = jobs if jobs else multiprocessing.cpu_count()
+        # Diagnostics publication delay in seconds
+        self.delay = 0.2
+        self.workspace = None
+        self.folders = []
+        self.running = True
+        self._shutdown = False
+        # Documents with changed diagnostics, by URI
+        self._dirty = OrderedDict()
+        # Saved or changed files to reload into the resident model
+        self._saved = OrderedDict()
+        self._handlers = {
+            "initialize": self.initialize,
+            "initialized": self.initialized,
+            "shutdown": self.shutdown,
+            "exit": self.exit,
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close,
+            "textDocument/didSave": self.did_save,
+            "workspace/didChangeWatchedFiles":
+                self.did_change_watched_files,
+            "textDocument/definition": self.definition,
+            "textDocument/references": self.references,
+            "textDocument/hover": self.hover,
+            "textDocument/completion": self.completion,
+        }
+
+    def serve(self):
+        """
+        Serve the client until it exits or closes the input stream.
+        """
+        messages = queue.Queue()
+        thread = threading.Thread(target=self._read, args=(messages,))
+        thread.daemon = True
+        thread.start()
+        while self.running:
+            pending = self._dirty or self._saved
+            try:
+                message = messages.get(timeout=self.delay if pending
+                                       else None)
+            except queue.Empty:
+                self.idle()
+                continue
+            if message is None:
+                break
+            if isinstance(message, LspException):
+                self._send_error(None, message)
+                continue
+            self.handle(message)
+
+    @property
+    def exit_code(self):
+        """
+        Process exit code - 0 if the client shut the server down before it
+        exited, 1 otherwise.
+        """
+        return 0 if self._shutdown else 1
+
+    def _read(self, messages):
+        while True:
+            try:
+                message = read_message(self.reader)
+            except LspException as e:
+                messages.put(e)
+                continue
+            except (EnvironmentError, ValueError):
+                # Closed stream
+                message = None
+            messages.put(message)
+            if message is None:
+                return
+
+    def _send(self, message):
+        message["jsonrpc"] = "2.0"
+        write_message(self.writer, message)
+
+    def _send_error(self, msg_id, error):
+        self._send(OrderedDict([
+            ("id", msg_id),
+            ("error", OrderedDict([("code", error.code),
+                                   ("message", error.message)])),
+        ]))
+
+    def notify(self, method, params):
+        """
+        Send a notification to the client.
+        """
+        self._send(OrderedDict([("method", method), ("params", params)]))
+
+    def handle(self, message):
+        """
+        Handle a client message.
+
+        Invalid parameters are reported to the client as INVALID_PARAMS
+        errors, other failures as INTERNAL_ERROR errors, which are logged.
+
+        :param message: Request or notification dictionary.
+        """
+        if not isinstance(message, dict):
+            self._send_error(None, LspException("Invalid request.",
+                                                INVALID_REQUEST))
+            return
+        method = message.get("method")
+        msg_id = message.get("id")
+        if method is None:
+            # Response - the server sends no requests.
+            return
+        try:
+            handler = self._handlers.get(method)
+            if handler is None:
+                if msg_id is None:
+                    # Unsupported notification
+                    return
+                raise LspException("Unknown method '{}'.".format(method),
+                                   METHOD_NOT_FOUND)
+            if self.workspace is None and method not in ("initialize",
+                                                         "exit"):
+                raise LspException("Server not initialized.",
+                                   SERVER_NOT_INITIALIZED)
+            params = message.get("params") or {}
+            if not isinstance(params, dict):
+                raise LspException("Invalid parameters.", INVALID_PARAMS)
+            result = handler(params)
+        except LspException as e:
+            if msg_id is not None:
+                self._send_error(msg_id, e)
+            return
+        except Exception as e:
+            # Server bug, not to be reported as a client error
+            _logger.exception("Failed to handle '%s'.", method)
+            if msg_id is not None:
+                self._send_error(msg_id, LspException(
+                    "Internal error: {}".format(e), INTERNAL_ERROR))
+            return
+        if msg_id is not None:
+            self._send(OrderedDict([("id", msg_id), ("result", result)]))
+
+    def idle(self):
+        """
+        Reload the resident model if needed and publish changed
+        diagnostics.
+        """
+        workspace = self.workspace
+        if self._saved:
+            workspace.reload(list(self._saved), self.folders)
+            self._saved.clear()
+            for uri in workspace.documents:
+                self._dirty[uri] = True
+        for fspec, diagnostics in workspace.changed_diagnostics().items():
+            if fspec not in workspace._paths:
+                self.publish(path_to_uri(fspec), diagnostics)
+        for uri in list(self._dirty):
+            document = workspace.documents.get(uri)
+            if document is not None:
+                workspace.check(document)
+                self.publish(uri, document.diagnostics)
+        self._dirty.clear()
+
+    def publish(self, uri, diagnostics):
+        """
+        Publish the diagnostics of a file.
+
+        :param uri: File URI.
+        :param diagnostics: A list of Diagnostic objects.
+        """
+        items = []
+        for diagnostic in diagnostics:
+            line = diagnostic.line - 1 if diagnostic.line else 0
+            items.append(OrderedDict([
+                ("range", OrderedDict([
+                    ("start", OrderedDict([("line", line),
+                                           ("character", 0)])),
+                    ("end", OrderedDict([("line", line + 1),
+                                         ("character", 0)])),
+                ])),
+                ("severity", 1),
+                ("source", "pyfranca"),
+                ("message", diagnostic.message),
+            ]))
+        self.notify("textDocument/publishDiagnostics",
+                    OrderedDict([("uri", uri), ("diagnostics", items)]))
+
+    def initialize(self, params):
+        folders = []
+        for folder in _param(params, "workspaceFolders", list, True) or []:
+            if not isinstance(folder, dict):
+                raise LspException("Invalid parameter 'workspaceFolders'.",
+                                   INVALID_PARAMS)
+            folders.append(uri_to_path(_param(folder, "uri",
+                                              _STRING_TYPES)))
+        root_uri = _param(params, "rootUri", _STRING_TYPES, True)
+        root_path = _param(params, "rootPath", _STRING_TYPES, True)
+        if not folders and root_uri:
+            folders = [uri_to_path(root_uri)]
+        elif not folders and root_path:
+            folders = [root_path]
+        self.folders = [folder for folder in folders if folder]
+        options = _param(params, "initializationOptions", dict, True) or {}
+        package_paths = _param(options, "packagePaths", list, True) or []
+        if not all(isinstance(path, _STRING_TYPES) for path in package_paths):
+            raise LspException("Invalid parameter 'packagePaths'.",
+                               INVALID_PARAMS)
+        jobs = _param(options, "jobs", int, True)
+        self.workspace = Workspace(
+            self.folders + self.package_paths + package_paths,
+            jobs if jobs else self.jobs)
+        return OrderedDict([
+            ("capabilities", OrderedDict([
+                ("textDocumentSync", OrderedDict([
+                    ("openClose", True),
+                    # Incremental
+                    ("change", 2),
+                    ("save", True),
+                ])),
+                ("definitionProvider", True),
+                ("referencesProvider", True),
+                ("hoverProvider", True),
+                ("completionProvider", OrderedDict([
+                    ("triggerCharacters", ["."]),
+                ])),
+            ])),
+            ("serverInfo", OrderedDict([("name", "pyfranca"),
+                                        ("version", __version__)])),
+        ])
+
+    def initialized(self, params):
+        self.workspace.index(Workspace.find_files(self.folders))
+        for fspec, diagnostics in \
+                self.workspace.changed_diagnostics().items():
+            self.publish(path_to_uri(fspec), diagnostics)
+
+    def shutdown(self, params):
+        self._shutdown = True
+        return None
+
+    def exit(self, params):
+        self.running = False
+
+    def did_open(self, params):
+        uri = _uri(params)
+        self.workspace.open(uri, _param(params["textDocument"], "text",
+                                        _STRING_TYPES))
+        self._dirty[uri] = True
+
+    def did_change(self, params):
+        uri = _uri(params)
+        changes = _param(params, "contentChanges", list)
+        for change in changes:
+            if not isinstance(change, dict):
+                raise LspException("Invalid parameter 'contentChanges'.",
+                                   INVALID_PARAMS)
+            _param(change, "text", _STRING_TYPES)
+            change_range = _param(change, "range", dict, True)
+            if change_range is not None:
+                _position(change_range, "start")
+                _position(change_range, "end")
+        self.workspace.change(uri, changes)
+        self._dirty[uri] = True
+
+    def did_close(self, params):
+        uri = _uri(params)
+        self.workspace.close(uri)
+        self._dirty.pop(uri, None)
+        fspec = uri_to_path(uri)
+        self.publish(uri, self.workspace.diagnostics.get(fspec, []))
+
+    def did_save(self, params):
+        fspec = uri_to_path(_uri(params))
+        if fspec is not None:
+            self._saved[fspec] = True
+
+    def did_change_watched_files(self, params):
+        for change in _param(params, "changes", list):
+            if not isinstance(change, dict):
+                raise LspException("Invalid parameter 'changes'.",
+                                   INVALID_PARAMS)
+            fspec = uri_to_path(_param(change, "uri", _STRING_TYPES))
+            if fspec is not None:
+                self._saved[fspec] = True
+
+    def definition(self, params):
+        return self.workspace.definition(_uri(params), _position(params))
+
+    def references(self, params):
+        context = _param(params, "context", dict, True) or {}
+        include_declaration = _param(context, "includeDeclaration", bool,
+                                     True)
+        return self.workspace.references(
+            _uri(params), _position(params), include_declaration is not False)
+
+    def hover(self, params):
+        return self.workspace.hover(_uri(params), _position(params))
+
+    def completion(self, params):
+        return self.workspace.completion(_uri(params), _position(params))
+
+
+class LanguageClient(object):
+    """
+    Minimal scripted language client, e.g. for tests and benchmarks.
+    """
+
+    def __init__(self, reader, writer):
+        """
+        Constructor.
+
+        :param reader: Binary input stream of the server messages.
+        :param writer: Binary output stream for the client messages.
+        """
+        self.reader = reader
+        self.writer = writer
+        # Received notifications not consumed by notification() yet
+        self.notifications = []
+        self._next_id = 1
+
+    def _receive(self):
+        message = read_message(self.reader)
+        if message is None:
+            raise LspException("Connection closed.")
+        return message
+
+    def request(self, method, params=None):
+        """
+        Send a request and wait for the response.
+
+        :param method: Method name.
+        :param params: Parameter dictionary.
+        :return: Result.
+        :raises LspException: On an error response.
+        """
+        msg_id = self._next_id
+        self._next_id += 1
+        write_message(self.writer, OrderedDict([
+            ("jsonrpc", "2.0"), ("id", msg_id), ("method", method),
+            ("params", params or {})]))
+        while True:
+            message = self._receive()
+            if "method" in message:
+                self.notifications.append(message)
+            elif message.get("id") == msg_id:
+                break
+        if "error" in message:
+            raise LspException(message["error"]["message"],
+                               message["error"]["code"])
+        return message.get("result")
+
+    def notify(self, method, params=None):
+        """
+        Send a notification.
+        """
+        write_message(self.writer, OrderedDict([
+            ("jsonrpc", "2.0"), ("method", method), ("params", params or {})]))
+
+    def notification(self, method):
+        """
+        Wait for a notification.
+
+        :param method: Method name.
+        :return: Parameter dictionary of the first notification received.
+        """
+        while True:
+            for index, message in enumerate(self.notifications):
+                if message.get("method") == method:
+                    return self.notifications.pop(index)["params"]
+            self.notifications.append(self._receive())
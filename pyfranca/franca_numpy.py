@@ -0,0 +1,108 @@
+"""
+Franca NumPy bulk codec.
+
+Large arrays of fixed-size types, e.g. Float[] or arrays of structs with
+primitive fields only, are encoded and decoded with NumPy structured dtypes
+instead of element by element. Decoded arrays are numpy.ndarray views of the
+encoded data, and numpy.ndarray payloads are encoded with a single copy.
+Enumerations in these arrays are represented by their enumerator values.
+
+Arrays of variable-size types, and arrays given as lists, are handled by the
+scalar code of Codec. Requires NumPy.
+"""
+
+from pyfranca import ast
+from pyfranca.franca_codec import FORMATS, Codec, CodecException
+from pyfranca.franca_inheritance import struct_table
+from pyfranca.franca_types import TypeCache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class NumpyCodec(Codec):
+    """
+    Codec encoding and decoding arrays of fixed-size types with NumPy.
+    """
+
+    def __init__(self, byte_order=">", enumeration_type=ast.UInt32):
+        """
+        Constructor.
+
+        :param byte_order: ">" for big endian or "<" for little endian.
+        :param enumeration_type: ast.Type subclass of the enumeration
+            backing type.
+        """
+        if numpy is None:
+            raise CodecException("NumPy is not installed.")
+        super(NumpyCodec, self).__init__(byte_order, enumeration_type)
+        # dtypes or None by type. Structs containing themselves have no
+        #   fixed size.
+        self._dtypes = TypeCache(self._dtype, CodecException,
+                                 lambda the_type: None)
+
+    def dtype(self, the_type):
+        """
+        Derive the NumPy dtype of a fixed-size type.
+
+        Structs map to structured dtypes with the fields of the struct and
+        its base structs, without padding.
+
+        :param the_type: Linked ast.Type object.
+        :return: numpy.dtype object or None if the type is not of fixed
+            size.
+        :raises CodecException: If the type is not linked.
+        """
+        return self._dtypes.get_type(the_type)
+
+    def _dtype(self, the_type):
+        if type(the_type) in FORMATS:
+            return numpy.dtype(self.byte_order + FORMATS[type(the_type)])
+        elif isinstance(the_type, ast.Enumeration):
+            return numpy.dtype(self.byte_order + self.enumeration_format)
+        elif isinstance(the_type, ast.Struct):
+            fields = []
+            for field in struct_table(the_type).fields:
+                field_dtype = self.dtype(field.type)
+                if field_dtype is None:
+                    return None
+                fields.append((str(field.name), field_dtype))
+            return numpy.dtype(fields)
+        return None
+
+    def _array(self, array):
+        codec = super(NumpyCodec, self)._array(array)
+        element_dtype = self.dtype(array.type)
+        if element_dtype is None:
+            return codec
+        itemsize = element_dtype.itemsize
+
+        def pack_items(value, out):
+            out += numpy.ascontiguousarray(value, element_dtype).tobytes()
+
+        def unpack_items(data, offset, end):
+            count, rest = divmod(end - offset, itemsize)
+            if rest:
+                raise CodecException(
+                    "Array length {} is not a multiple of {}.".format(
+                        end - offset, itemsize))
+            if not count:
+                return numpy.empty(0, element_dtype)
+            return numpy.frombuffer(data, element_dtype, count, offset)
+
+        sequence = self._sequence(pack_items, unpack_items)
+        pack_list = codec.pack
+        pack_ndarray = sequence.pack
+        ndarray = numpy.ndarray
+
+        def pack(value, out):
+            if isinstance(value, ndarray):
+                pack_ndarray(value, out)
+            else:
+                pack_list(value, out)
+
+        codec.pack = pack
+        codec.unpack = sequence.unpack
+        return codec
@@ -2,11 +2,17 @@
 Franca parser.
 """
 
+import mmap
+import os
 from collections import OrderedDict
 from abc import ABCMeta
+import ply.lex as lex
 import ply.yacc as yacc
-from pyfranca import franca_lexer
+from pyfranca import franca_lexer, franca_locations
 from pyfranca import ast
+from pyfranca.franca_diagnostics import Diagnostic, DiagnosticList
+from pyfranca.franca_stats import clock
+from pyfranca.franca_trace import span
 
 
 class ArgumentGroup(object):
@@ -31,9 +37,10 @@ class ErrorArgumentGroup(ArgumentGroup):
 
 class ParserException(Exception):
 
-    def __init__(self, message):
+    def __init__(self, message, lineno=None):
         super(ParserException, self).__init__()
         self.message = message
+        self.lineno = lineno
 
     def __str__(self):
         return self.message
@@ -103,6 +110,7 @@ class Parser(object):
         fqn : ID '.' fqn
         """
         p[0] = "{}.{}".format(p[1], p[3])
+        p.set_lexpos(0, p.lexpos(1))
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -111,6 +119,7 @@ class Parser(object):
         fqn : ID
         """
         p[0] = p[1]
+        p.set_lexpos(0, p.lexpos(1))
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -127,6 +136,7 @@ class Parser(object):
         def : IMPORT fqn FROM FILE_NAME
         """
         p[0] = ast.Import(file_name=p[4], namespace=p[2])
+        p[0].location = Parser._location(p, 1)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -135,6 +145,7 @@ class Parser(object):
         def : IMPORT MODEL FILE_NAME
         """
         p[0] = ast.Import(file_name=p[3])
+        p[0].location = Parser._location(p, 1)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -146,6 +157,7 @@ class Parser(object):
             p[0] = ast.TypeCollection(name=p[2], flags=None, members=p[4])
         except ast.ASTException as e:
             raise ParserException(e.message)
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -200,6 +212,7 @@ class Parser(object):
         type_def : TYPEDEF ID IS type
         """
         p[0] = ast.Typedef(name=p[2], base_type=p[4])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -212,6 +225,7 @@ class Parser(object):
                                  extends=None)
         except ast.ASTException as e:
             raise ParserException(e.message)
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -224,6 +238,7 @@ class Parser(object):
                                  extends=p[4])
         except ast.ASTException as e:
             raise ParserException(e.message)
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -273,6 +288,7 @@ class Parser(object):
         attribute_def : ATTRIBUTE type ID flag_defs
         """
         p[0] = ast.Attribute(name=p[3], attr_type=p[2], flags=p[4])
+        p[0].location = Parser._location(p, 3)
 
     @staticmethod
     def _method_def(arg_groups):
@@ -313,6 +329,7 @@ class Parser(object):
         in_args, out_args, errors = Parser._method_def(p[5])
         p[0] = ast.Method(name=p[2], flags=p[3],
                           in_args=in_args, out_args=out_args, errors=errors)
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -419,6 +436,7 @@ class Parser(object):
             raise ParserException("In arguments and errors cannot be part "
                                   "of a broadcast definition.")
         p[0] = ast.Broadcast(name=p[2], flags=p[3], out_args=out_args)
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -448,6 +466,7 @@ class Parser(object):
         arg_def : type ID
         """
         p[0] = ast.Argument(name=p[2], arg_type=p[1])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -456,6 +475,7 @@ class Parser(object):
         enumeration_def : ENUMERATION ID '{' enumerators '}'
         """
         p[0] = ast.Enumeration(name=p[2], enumerators=p[4])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -464,6 +484,7 @@ class Parser(object):
         enumeration_def : ENUMERATION ID EXTENDS fqn '{' enumerators '}'
         """
         p[0] = ast.Enumeration(name=p[2], enumerators=p[6], extends=p[4])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -502,6 +523,7 @@ class Parser(object):
         enumerator : ID
         """
         p[0] = ast.Enumerator(name=p[1])
+        p[0].location = Parser._location(p, 1)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -510,6 +532,7 @@ class Parser(object):
         enumerator : ID '=' INTEGER
         """
         p[0] = ast.Enumerator(name=p[1], value=p[3])
+        p[0].location = Parser._location(p, 1)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -518,6 +541,7 @@ class Parser(object):
         struct_def : STRUCT ID flag_defs '{' struct_fields '}'
         """
         p[0] = ast.Struct(name=p[2], fields=p[5], flags=p[3])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -526,6 +550,7 @@ class Parser(object):
         struct_def : STRUCT ID EXTENDS fqn '{' struct_fields '}'
         """
         p[0] = ast.Struct(name=p[2], fields=p[6], extends=p[4])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -564,6 +589,7 @@ class Parser(object):
         struct_field : type ID
         """
         p[0] = ast.StructField(name=p[2], field_type=p[1])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -572,6 +598,7 @@ class Parser(object):
         array_def : ARRAY ID OF type
         """
         p[0] = ast.Array(name=p[2], element_type=p[4])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -580,6 +607,7 @@ class Parser(object):
         map_def : MAP ID '{' type TO type '}'
         """
         p[0] = ast.Map(name=p[2], key_type=p[4], value_type=p[6])
+        p[0].location = Parser._location(p, 2)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -630,6 +658,7 @@ class Parser(object):
         type : fqn
         """
         p[0] = ast.Reference(name=p[1])
+        p[0].location = Parser._location(p, 1)
 
     # noinspection PyIncorrectDocstring
     @staticmethod
@@ -638,6 +667,7 @@ class Parser(object):
         type : fqn '[' ']'
         """
         element_type = ast.Reference(name=p[1])
+        element_type.location = Parser._location(p, 1)
         p[0] = ast.Array(name=None, element_type=element_type)
 
     # noinspection PyUnusedLocal, PyIncorrectDocstring
@@ -648,14 +678,21 @@ class Parser(object):
         """
         pass
 
+    @staticmethod
+    def _location(p, n):
+        # The location base packs the file index, see parse().
+        return p.parser.location_base | p.lexpos(n)
+
+    _UNEXPECTED_END = "Reached unexpected end of file."
+
     # noinspection PyIncorrectDocstring
     @staticmethod
     def p_error(p):
         if p:
             raise ParserException("Syntax error at line {} near '{}'.".format(
-                                  p.lineno, p.value))
+                                  p.lineno, p.value), p.lineno)
         else:
-            raise ParserException("Reached unexpected end of file.")
+            raise ParserException(Parser._UNEXPECTED_END)
 
     def __init__(self, the_lexer=None, **kwargs):
         """
@@ -673,27 +710,383 @@ class Parser(object):
         if "write_tables" not in kwargs:
             kwargs["write_tables"] = False
         self._parser = yacc.yacc(module=self, **kwargs)
+        # Lexer of memory-mapped files, created on first use.
+        self._mapped_lexer = None
+        # Set to a franca_trace.Tracer object to record trace events.
+        self.tracer = None
+        # File index packed into the locations of parsed AST nodes, see
+        #   franca_locations.
+        self.file_index = 0
 
-    def parse(self, fidl):
+    def parse(self, fidl, stats=None, diagnostics=None):
         """
         Parse input text
 
-        :param fidl: Input text to parse.
-        :return: AST representation of the input.
+        :param fidl: Input text to parse or a mmap.mmap object of an UTF-8
+            encoded file, which is lexed without decoding it as a whole.
+        :param stats: FileStats object to record token statistics in.
+        :param diagnostics: A list to collect lexer and parser errors in, as
+            franca_diagnostics.Diagnostic objects, instead of raising them.
+            Parsing then resumes after erroneous definitions and members.
+        :return: AST representation of the input. None if the package
+            definition itself is invalid and diagnostics are collected.
+        """
+        if isinstance(fidl, mmap.mmap):
+            if self._mapped_lexer is None:
+                self._mapped_lexer = franca_lexer.MappedLexer()
+            lexer = self._mapped_lexer
+        else:
+            lexer = self._lexer.lexer
+        lexer.lineno = 1
+        self._prepare()
+        with span(self.tracer, "parse", "phase"):
+            try:
+                package = self._parse(lexer, fidl, stats)
+            except (franca_lexer.LexerException, ParserException):
+                if diagnostics is None:
+                    raise
+                # Parse again, resuming after errors. Valid input is
+                #   parsed only once.
+                package = self._recover(lexer, fidl, diagnostics)
+        return package
+
+    def _prepare(self):
+        # Pack the file index into node locations, see _location().
+        self._parser.location_base = franca_locations.pack(self.file_index, 0)
+
+    def _parse(self, lexer, fidl, stats):
+        if stats is None:
+            return self._parser.parse(fidl, lexer=lexer)
+        next_token = lexer.token
+
+        def token():
+            start = clock()
+            tok = next_token()
+            stats.lex_seconds += clock() - start
+            if tok:
+                stats.tokens += 1
+            return tok
+        return self._parser.parse(fidl, lexer=lexer, tokenfunc=token)
+
+    # Tokens starting top-level definitions
+    _DEFINITION_TOKENS = frozenset([
+        "PACKAGE", "IMPORT", "INTERFACE", "TYPECOLLECTION"])
+
+    # Tokens starting interface and type collection members
+    _MEMBER_TOKENS = frozenset([
+        "VERSION", "ATTRIBUTE", "METHOD", "BROADCAST", "TYPEDEF",
+        "ENUMERATION", "STRUCT", "ARRAY", "MAP"])
+
+    @staticmethod
+    def _token(kind, value, lineno):
+        tok = lex.LexToken()
+        tok.type = kind
+        tok.value = value
+        tok.lineno = lineno
+        tok.lexpos = 0
+        return tok
+
+    def tokenize(self, fidl, errors, lineno=1, offset=0):
+        """
+        Tokenize input text, skipping illegal characters.
+
+        :param fidl: Input text.
+        :param errors: A list to collect lexer errors in, as tuples - offset
+            of the illegal character and Diagnostic object.
+        :param lineno: Line number of the first line of the text.
+        :param offset: Offset of the text in the input, added to the
+            offsets of the tokens and errors.
+        :return: A list of tokens.
+        """
+        return self._tokens(self._lexer.lexer, fidl, errors, lineno, offset)
+
+    def synchronize(self, fidl, start, offsets):
+        """
+        Find where the tokens of a changed text are the same as before.
+
+        Tokens depend only on the text from their start on. After the first
+        token starting at the offset of a previous one, the changed text is
+        therefore tokenized as before - comments and strings changed before
+        may continue past other previous tokens.
+
+        :param fidl: Changed input text.
+        :param start: Offset of a token in the text, or 0, to lex from.
+        :param offsets: Ascending offsets of previous tokens after the
+            change.
+        :return: Index of the first offset at which a token starts, or the
+            number of offsets if there is none.
+        """
+        lexer = self._lexer.lexer
+        lexer.input(fidl)
+        lexer.lexpos = start
+        index = 0
+        while index < len(offsets):
+            try:
+                tok = lexer.token()
+            except franca_lexer.LexerException:
+                # Illegal characters are skipped, as by tokenize().
+                lexer.skip(1)
+                while index < len(offsets) and \
+                        offsets[index] < lexer.lexpos:
+                    index += 1
+                continue
+            if not tok:
+                break
+            while index < len(offsets) and offsets[index] < tok.lexpos:
+                index += 1
+            if index < len(offsets) and offsets[index] == tok.lexpos:
+                return index
+        return len(offsets)
+
+    @staticmethod
+    def _tokens(lexer, fidl, errors, lineno=1, offset=0):
+        lexer.input(fidl)
+        lexer.lineno = lineno
+        tokens = []
+        while True:
+            try:
+                tok = lexer.token()
+            except franca_lexer.LexerException as e:
+                errors.append((offset + lexer.lexpos,
+                               Diagnostic(e.message, line=e.lineno)))
+                lexer.skip(1)
+                continue
+            if not tok:
+                return tokens
+            tok.lexpos += offset
+            tokens.append(tok)
+
+    def _parse_tokens(self, tokens, next_token):
+        """
+        Parse a token list.
+
+        :param tokens: A list of tokens.
+        :param next_token: The token following the list in the input or
+            None.
+        :return: A tuple - ast.Package or None and Diagnostic or None.
+        """
+        remaining = iter(tokens)
+        try:
+            package = self._parser.parse(
+                lexer=self._lexer.lexer,
+                tokenfunc=lambda: next(remaining, None))
+        except ParserException as e:
+            message, lineno = e.message, e.lineno
+            if message == Parser._UNEXPECTED_END and next_token:
+                # The input continues.
+                message = "Syntax error at line {} near '{}'.".format(
+                    next_token.lineno, next_token.value)
+                lineno = next_token.lineno
+            elif message == Parser._UNEXPECTED_END and tokens:
+                lineno = tokens[-1].lineno
+            elif lineno is None and tokens:
+                # Invalid definition, e.g. with duplicate members
+                lineno = tokens[0].lineno
+            return None, Diagnostic(message, line=lineno)
+        return package, None
+
+    def _closing(self, next_token, lineno):
+        """
+        Create a closing brace token located at the following token.
+        """
+        if next_token:
+            return self._token("}", next_token.value, next_token.lineno)
+        return self._token("}", "}", lineno)
+
+    def _recover(self, lexer, fidl, diagnostics):
+        """
+        Parse input text, collecting errors.
+
+        The input is split at top-level definition keywords. Definitions
+        are parsed separately and invalid interfaces and type collections
+        are split further at member keywords, so only the invalid members
+        are dropped.
+        """
+        errors = []
+        tokens = self._tokens(lexer, fidl, errors)
+        # Definitions are parsed repeatedly - report each error once.
+        collected = DiagnosticList()
+        chunks = self.split_definitions(tokens) + [[]]
+        header = []
+        if chunks[0] and chunks[0][0].type == "PACKAGE":
+            header = chunks.pop(0)
+        package = self.parse_header(
+            header, chunks[0][0] if chunks[0] else None, collected)
+        definitions = []
+        for chunk, next_chunk in zip(chunks, chunks[1:]):
+            definitions += self.parse_definition(
+                chunk, next_chunk[0] if next_chunk else None, collected)
+        diagnostics.extend(sorted(
+            [diagnostic for _, diagnostic in errors] + collected,
+            key=lambda item: item.line or 0))
+        if package is None:
+            return None
+        return self.build_package(package.name, definitions)
+
+    @staticmethod
+    def build_package(name, definitions):
+        """
+        Create a package of parsed top-level definitions.
+
+        :param name: Package name.
+        :param definitions: A list of ast.Import, ast.TypeCollection and
+            ast.Interface objects, e.g. returned by parse_definition().
+        :return: ast.Package object.
         """
-        package = self._parser.parse(fidl)
+        imports, interfaces, typecollections = \
+            Parser._package_def(definitions)
+        return ast.Package(name=name, file_name=None, imports=imports,
+                           interfaces=interfaces,
+                           typecollections=typecollections)
+
+    @staticmethod
+    def split_definitions(tokens):
+        """
+        Split tokens at top-level definition keywords.
+
+        :param tokens: A list of tokens.
+        :return: A list of token lists.
+        """
+        chunks = []
+        for tok in tokens:
+            if tok.type in Parser._DEFINITION_TOKENS or not chunks:
+                chunks.append([])
+            chunks[-1].append(tok)
+        return chunks
+
+    def parse_header(self, header, next_token, diagnostics):
+        """
+        Parse a package statement.
+
+        Node locations are packed with file_index, see franca_locations.
+
+        :param header: A list of tokens, e.g. the first list returned by
+            split_definitions(). Empty if the package statement is missing.
+        :param next_token: The token following the list in the input or
+            None.
+        :param diagnostics: DiagnosticList to collect errors in.
+        :return: ast.Package without definitions or None if invalid.
+        """
+        self._prepare()
+        package, error = self._parse_tokens(header, next_token)
+        if error:
+            diagnostics.add(error)
         return package
 
+    def parse_definition(self, chunk, next_token, diagnostics):
+        """
+        Parse a top-level definition, dropping invalid members.
+
+        Node locations are packed with file_index, see franca_locations.
+
+        :param chunk: A non-empty list of tokens, e.g. returned by
+            split_definitions().
+        :param next_token: The token following the list in the input or
+            None.
+        :param diagnostics: DiagnosticList to collect errors in.
+        :return: A list of the parsed ast.Import, ast.TypeCollection and
+            ast.Interface objects.
+        """
+        self._prepare()
+        prefix = [self._token("PACKAGE", "package", chunk[0].lineno),
+                  self._token("ID", "_", chunk[0].lineno)]
+        parsed, error = self._parse_tokens(prefix + chunk, next_token)
+        if error and chunk[0].type in ("INTERFACE", "TYPECOLLECTION"):
+            parsed = self._recover_members(prefix, chunk, next_token,
+                                           diagnostics, error)
+        elif error:
+            diagnostics.add(error)
+        if not parsed:
+            return []
+        return parsed.imports + list(parsed.typecollections.values()) + \
+            list(parsed.interfaces.values())
+
+    def _recover_members(self, prefix, chunk, next_token, diagnostics,
+                         error):
+        """
+        Parse the valid members of an interface or a type collection.
+
+        :return: ast.Package with the parsed namespace or None.
+        """
+        types = [tok.type for tok in chunk]
+        if "{" not in types:
+            diagnostics.add(error)
+            return None
+        head = chunk[:types.index("{") + 1]
+        body = chunk[len(head):]
+        # The namespace header must be valid.
+        closing = self._closing(body[0] if body else next_token,
+                                head[-1].lineno)
+        parsed, head_error = self._parse_tokens(prefix + head + [closing],
+                                                None)
+        if head_error:
+            diagnostics.add(error)
+            return None
+        # Split the body at member keywords.
+        members = [[]]
+        depth = 0
+        end = len(body)
+        for index, tok in enumerate(body):
+            if tok.type == "{":
+                depth += 1
+            elif tok.type == "}":
+                depth -= 1
+                if depth < 0:
+                    end = index
+                    break
+            elif tok.type in self._MEMBER_TOKENS and depth == 0 and \
+                    members[-1]:
+                members.append([])
+            members[-1].append(tok)
+        following = body[end:] + ([next_token] if next_token else [])
+        count = len(diagnostics)
+        valid = []
+        for member, next_member in zip(members, members[1:] + [following]):
+            if not member:
+                continue
+            closing = self._closing(next_member[0] if next_member else None,
+                                    member[-1].lineno)
+            parsed, member_error = self._parse_tokens(
+                prefix + head + member + [closing], None)
+            if member_error:
+                diagnostics.add(member_error)
+            else:
+                valid += member
+        if end < len(body) - 1:
+            # Tokens after the closing brace
+            tok = body[end + 1]
+            diagnostics.add(Diagnostic(
+                "Syntax error at line {} near '{}'.".format(
+                    tok.lineno, tok.value), line=tok.lineno))
+        if end == len(body) or len(diagnostics) == count:
+            # Missing closing brace or an invalid namespace
+            diagnostics.add(error)
+        closing = self._closing(None, chunk[-1].lineno)
+        parsed, error = self._parse_tokens(prefix + head + valid + [closing],
+                                           None)
+        if error:
+            diagnostics.add(error)
+        return parsed
+
     def parse_file(self, fspec):
         """
         Parse input file
 
+        The file is memory-mapped rather than read into a string.
+
         :param fspec: Specification of a fidl to parse.
         :return: AST representation of the input.
         """
-        with open(fspec, "r") as f:
-            fidl = f.read()
-        package = self.parse(fidl)
+        with open(fspec, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                fidl = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                fidl = ""
+        try:
+            package = self.parse(fidl)
+        finally:
+            if fidl:
+                fidl.close()
         if package:
             package.files = [fspec]
         return package
@@ -0,0 +1,350 @@
+"""
+Franca payload validation.
+
+Validates runtime payloads, e.g. decoded JSON method arguments, against
+linked model types. Each type is compiled once into a specialized validation
+function, so validating a message does not walk the AST.
+
+Payloads are represented with plain Python values:
+
+- integer types as int objects within the range of the type,
+- Float and Double as float or int objects, Boolean as bool objects,
+- String as str objects and ByteBuffer as bytes or bytearray objects,
+- enumerations as enumerator names or values,
+- structs as dictionaries with exactly the fields of the struct and its
+  base structs,
+- arrays as lists or tuples and maps as dictionaries.
+"""
+
+from pyfranca import ast
+from pyfranca.franca_inheritance import InheritanceException, \
+    enumeration_table, struct_table
+from pyfranca.franca_types import TypeCache
+
+try:
+    _STRING_TYPES = (str, unicode)
+    _INTEGER_TYPES = (int, long)
+except NameError:
+    # Python 3
+    _STRING_TYPES = (str,)
+    _INTEGER_TYPES = (int,)
+
+_BYTES_TYPES = (bytes, bytearray)
+_NUMBER_TYPES = _INTEGER_TYPES + (float,)
+
+# Value ranges of the integer types
+INTEGER_RANGES = {
+    ast.Int8: (-2 ** 7, 2 ** 7 - 1),
+    ast.Int16: (-2 ** 15, 2 ** 15 - 1),
+    ast.Int32: (-2 ** 31, 2 ** 31 - 1),
+    ast.Int64: (-2 ** 63, 2 ** 63 - 1),
+    ast.UInt8: (0, 2 ** 8 - 1),
+    ast.UInt16: (0, 2 ** 16 - 1),
+    ast.UInt32: (0, 2 ** 32 - 1),
+    ast.UInt64: (0, 2 ** 64 - 1),
+}
+
+# Largest finite single precision value
+FLOAT_MAX = 3.4028234663852886e38
+
+
+class PayloadException(Exception):
+
+    def __init__(self, message, path=None):
+        super(PayloadException, self).__init__()
+        self.message = message
+        # Struct field names, array indices and map keys, as 1-tuples, of
+        #   the invalid value, outermost first
+        self.path = path if path else []
+
+    def __str__(self):
+        if not self.path:
+            return self.message
+        path = ""
+        for item in self.path:
+            if isinstance(item, _STRING_TYPES) and not path:
+                path = item
+            elif isinstance(item, _STRING_TYPES):
+                path += "." + item
+            elif isinstance(item, tuple):
+                path += "[{!r}]".format(item[0])
+            else:
+                path += "[{}]".format(item)
+        return "{}: {}".format(path, self.message)
+
+
+def _kind(value):
+    return type(value).__name__
+
+
+def struct_fields(struct):
+    """
+    Get the fields of a struct and its base structs.
+
+    :param struct: Linked ast.Struct object.
+    :return: A tuple of ast.StructField objects, base struct fields first.
+    """
+    try:
+        return struct_table(struct).fields
+    except InheritanceException as e:
+        raise PayloadException(e.message)
+
+
+def enumerator_values(enumeration):
+    """
+    Get the effective enumerator values of an enumeration and its base
+    enumerations.
+
+    :param enumeration: Linked ast.Enumeration object.
+    :return: A list of tuples - enumerator name and value, base enumerators
+        first.
+    """
+    return _table(enumeration).items()
+
+
+def _table(enumeration):
+    try:
+        return enumeration_table(enumeration)
+    except InheritanceException as e:
+        raise PayloadException(e.message)
+
+
+class PayloadValidator(object):
+    """
+    Compiles linked model types into payload validation functions.
+
+    Validation functions take a payload value and raise a PayloadException
+    if it is invalid. They are cached per type, so all validators sharing a
+    PayloadValidator compile each type once.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        # Validation functions by type
+        self._cache = TypeCache(self._compile, PayloadException)
+
+    def validate(self, the_type, value):
+        """
+        Validate a payload value.
+
+        :param the_type: Linked ast.Type object.
+        :param value: Payload value.
+        :raises PayloadException: If the value is invalid.
+        """
+        self.compile(the_type)(value)
+
+    def validate_arguments(self, args, values):
+        """
+        Validate method or broadcast arguments.
+
+        :param args: OrderedDict of ast.Argument objects, e.g.
+            ast.Method.in_args.
+        :param values: Dictionary of argument values by name.
+        :raises PayloadException: If the arguments are invalid.
+        """
+        self.compile_arguments(args)(values)
+
+    def compile(self, the_type):
+        """
+        Compile a type into a validation function.
+
+        :param the_type: Linked ast.Type object.
+        :return: Validation function.
+        :raises PayloadException: If the type is not linked or recursive
+            without an indirection.
+        """
+        return self._cache.get_type(the_type)
+
+    def compile_arguments(self, args):
+        """
+        Compile method or broadcast arguments into a validation function.
+
+        :param args: OrderedDict of ast.Argument objects.
+        :return: Validation function taking a dictionary of argument
+            values by name.
+        """
+        return self._cache.get(args, self._compile_arguments)
+
+    def _compile_arguments(self, args):
+        check = self._record("argument", [])
+        self._fill(check.fields, [(arg.name, arg.type)
+                                  for arg in args.values()])
+        return check
+
+    def _fill(self, fields, members):
+        fields.extend((name, self.compile(the_type))
+                      for name, the_type in members)
+
+    def _compile(self, the_type):
+        if type(the_type) in INTEGER_RANGES:
+            low, high = INTEGER_RANGES[type(the_type)]
+            return self._integer(the_type.name, low, high)
+        elif isinstance(the_type, (ast.Float, ast.Double)):
+            return self._float(the_type.name,
+                               isinstance(the_type, ast.Float))
+        elif isinstance(the_type, ast.Boolean):
+            return self._instance("Boolean", (bool,))
+        elif isinstance(the_type, ast.String):
+            return self._instance("String", _STRING_TYPES)
+        elif isinstance(the_type, ast.ByteBuffer):
+            return self._instance("ByteBuffer", _BYTES_TYPES)
+        elif isinstance(the_type, ast.Enumeration):
+            return self._enumeration(the_type)
+        elif isinstance(the_type, ast.Struct):
+            # The fields are compiled after caching the function, for
+            #   recursive structs.
+            check = self._record("struct", [])
+            self._cache.set(the_type, check)
+            self._fill(check.fields, [(field.name, field.type)
+                                      for field in struct_fields(the_type)])
+            return check
+        elif isinstance(the_type, ast.Array):
+            return self._array(the_type)
+        elif isinstance(the_type, ast.Map):
+            return self._map(the_type)
+        raise PayloadException("Unsupported type '{}'.".format(
+            the_type.__class__.__name__))
+
+    @staticmethod
+    def _integer(name, low, high):
+        def check(value):
+            if type(value) not in _INTEGER_TYPES:
+                raise PayloadException("Expected {}, got {}.".format(
+                    name, _kind(value)))
+            if not low <= value <= high:
+                raise PayloadException("Value {} out of range for {}.".format(
+                    value, name))
+        check.range = (low, high)
+        return check
+
+    @staticmethod
+    def _float(name, single):
+        def check(value):
+            if type(value) not in _NUMBER_TYPES:
+                raise PayloadException("Expected {}, got {}.".format(
+                    name, _kind(value)))
+            if single and abs(value) > FLOAT_MAX and \
+                    abs(value) != float("inf"):
+                raise PayloadException("Value {} out of range for {}.".format(
+                    value, name))
+        return check
+
+    @staticmethod
+    def _instance(name, types):
+        def check(value):
+            if not isinstance(value, types):
+                raise PayloadException("Expected {}, got {}.".format(
+                    name, _kind(value)))
+        return check
+
+    @staticmethod
+    def _enumeration(enumeration):
+        table = _table(enumeration)
+        names = table.by_name
+        numbers = table.by_value
+        name = enumeration.name
+
+        def check(value):
+            if type(value) in _INTEGER_TYPES:
+                if value in numbers:
+                    return
+            elif isinstance(value, _STRING_TYPES):
+                if value in names:
+                    return
+            else:
+                raise PayloadException("Expected {}, got {}.".format(
+                    name, _kind(value)))
+            raise PayloadException("Invalid enumerator {!r} for {}.".format(
+                value, name))
+        return check
+
+    @staticmethod
+    def _record(kind, fields):
+        """
+        Create a validation function for dictionaries of named values.
+
+        :param kind: "struct" or "argument".
+        :param fields: A list of tuples - name and validation function. It
+            may be filled in later.
+        """
+        names = set()
+
+        def check(value):
+            if not isinstance(value, dict):
+                raise PayloadException("Expected dict, got {}.".format(
+                    _kind(value)))
+            for name, check_field in fields:
+                try:
+                    item = value[name]
+                except KeyError:
+                    raise PayloadException("Missing {} '{}'.".format(
+                        kind, name))
+                try:
+                    check_field(item)
+                except PayloadException as e:
+                    e.path.insert(0, name)
+                    raise
+            if len(value) != len(fields):
+                if not names:
+                    names.update(name for name, _ in fields)
+                unknown = sorted(str(name) for name in value
+                                 if name not in names)
+                raise PayloadException("Unknown {} '{}'.".format(
+                    kind, unknown[0]))
+        check.fields = fields
+        return check
+
+    def _array(self, array):
+        # The element type is compiled after caching the function, for
+        #   recursive arrays.
+        element = []
+        integer_range = []
+
+        def check(value):
+            if not isinstance(value, (list, tuple)):
+                raise PayloadException("Expected list, got {}.".format(
+                    _kind(value)))
+            if integer_range and value:
+                # Check integer arrays in bulk, and locate errors
+                #   element by element.
+                low, high = integer_range
+                if all(type(item) is int for item in value) and \
+                        low <= min(value) and max(value) <= high:
+                    return
+            check_element = element[0]
+            for index, item in enumerate(value):
+                try:
+                    check_element(item)
+                except PayloadException as e:
+                    e.path.insert(0, index)
+                    raise
+
+        self._cache.set(array, check)
+        element.append(self.compile(array.type))
+        integer_range.extend(getattr(element[0], "range", ()))
+        return check
+
+    def _map(self, the_map):
+        # The key and value types are compiled after caching the function,
+        #   for recursive maps.
+        checks = []
+
+        def check(value):
+            if not isinstance(value, dict):
+                raise PayloadException("Expected dict, got {}.".format(
+                    _kind(value)))
+            check_key, check_value = checks
+            for key, item in value.items():
+                try:
+                    check_key(key)
+                    check_value(item)
+                except PayloadException as e:
+                    e.path.insert(0, (key,))
+                    raise
+
+        self._cache.set(the_map, check)
+        checks.append(self.compile(the_map.key_type))
+        checks.append(self.compile(the_map.value_type))
+        return check
@@ -2,9 +2,23 @@
 Franca processor.
 """
 
-import os
+import mmap
+import sys
 from collections import OrderedDict
-from pyfranca import franca_parser, ast
+from pyfranca import franca_parser, franca_deps, ast
+from pyfranca.franca_diagnostics import Diagnostic
+from pyfranca.franca_graph import import_cycles, type_cycles
+from pyfranca.franca_inheritance import update_tables
+from pyfranca.franca_loaders import DirectoryLoader
+from pyfranca.franca_locations import SourceMap
+from pyfranca.franca_stats import clock
+from pyfranca.franca_trace import span
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    # Python 3
+    _STRING_TYPES = (str,)
 
 
 class ProcessorException(Exception):
@@ -28,8 +42,36 @@ class Processor:
         """
         # Default package paths.
         self.package_paths = ["."]
+        # Model file loaders, tried in order. The default one looks up
+        #   files in the working directory and the current package paths.
+        self.loaders = [DirectoryLoader(lambda: self.package_paths)]
         self.files = {}
         self.packages = {}
+        # Imported files of each file, in import order.
+        self.imports = {}
+        # Set to a franca_stats.ProcessorStats object to collect
+        #   processing statistics.
+        self.stats = None
+        # Set to a franca_trace.Tracer object to record trace events.
+        self.tracer = None
+        # Franca parser, created on first use.
+        self.parser = None
+        # Files of at least this size are lexed directly from memory maps,
+        #   if supported by their loaders.
+        self.map_size = 16 * 1024 * 1024
+        # Files and line offsets of the parsed AST node locations.
+        self.sources = SourceMap()
+        # Set to a list to collect model errors as
+        #   franca_diagnostics.Diagnostic objects instead of raising them.
+        #   Invalid definitions and references are then skipped.
+        self.diagnostics = None
+        # Model issues that do not invalidate the model, e.g. enumerators
+        #   repeating a value, as franca_diagnostics.Diagnostic objects.
+        self.warnings = []
+        # Packages parsed in advance, by file.
+        self._parsed = {}
+        # File being processed, for diagnostics.
+        self._file = None
 
     @staticmethod
     def basename(namespace):
@@ -71,69 +113,94 @@ class Processor:
         return tuple(parts)
 
     @staticmethod
-    def resolve(namespace, fqn):
+    def _scopes(namespace, pkg, ns):
         """
-        Resolve type references.
+        Generate the namespaces to look up a type reference in, in order of
+        priority.
 
         :param namespace: context ast.Namespace object.
-        :param fqn: FQN or ID string.
-        :return: Dereferenced ast.Type object.
+        :param pkg: Package part of the reference or None.
+        :param ns: Namespace part of the reference or None.
         """
-        if not isinstance(namespace, ast.Namespace) or \
-                not isinstance(fqn, str):
-            raise ValueError("Unexpected input.")
-        pkg, ns, name = Processor.split_fqn(fqn)
+        package = namespace.package
         if pkg is None:
             # This is an ID
             # Look in the type's namespace
-            if name in namespace:
-                return namespace[name]
+            yield namespace
             # Look in other type collections in the type's package
-            for typecollection in namespace.package.typecollections.values():
-                if name in typecollection:
-                    return typecollection[name]
+            for typecollection in package.typecollections.values():
+                yield typecollection
             # Look in imports
-            for package_import in namespace.package.imports:
+            for package_import in package.imports:
                 if package_import.namespace_reference:
                     # Look in namespaces imported in the type's package
-                    if name in package_import.namespace_reference:
-                        return package_import.namespace_reference[name]
+                    yield package_import.namespace_reference
+        elif pkg == package.name:
+            # This is an FQN
+            # Check in the current package
+            if ns in package.typecollections:
+                yield package.typecollections[ns]
         else:
             # This is an FQN
-            if pkg == namespace.package.name:
-                # Check in the current package
-                if ns in namespace.package.typecollections:
-                    if name in namespace.package.typecollections[ns]:
-                        return namespace.package.typecollections[ns][name]
-            else:
-                # Look in typecollections of packages imported in the
-                #   type's package using FQNs.
-                for package_import in namespace.package.imports:
-                    if package_import.namespace == "{}.{}.*".format(pkg, ns):
-                        for typecollection in package_import.\
-                                package_reference.typecollections.values():
-                            if typecollection.name == ns and \
-                                    name in typecollection:
-                                return typecollection[name]
-                        for interface in package_import. \
-                                package_reference.interfaces.values():
-                            if name in interface:
-                                return interface[name]
-        # Give up
-        raise ProcessorException(
-            "Unresolved reference '{}'.".format(fqn))
+            # Look in typecollections of packages imported in the
+            #   type's package using FQNs.
+            selector = "{}.{}.*".format(pkg, ns)
+            for package_import in package.imports:
+                if package_import.namespace == selector and \
+                        package_import.package_reference is not None:
+                    package_reference = package_import.package_reference
+                    for typecollection in \
+                            package_reference.typecollections.values():
+                        if typecollection.name == ns:
+                            yield typecollection
+                    for interface in package_reference.interfaces.values():
+                        yield interface
+
+    @staticmethod
+    def resolve(namespace, fqn, stats=None):
+        """
+        Resolve type references.
+
+        :param namespace: context ast.Namespace object.
+        :param fqn: FQN or ID string.
+        :param stats: ProcessorStats object to record lookups in.
+        :return: Dereferenced ast.Type object.
+        """
+        if not isinstance(namespace, ast.Namespace) or \
+                not isinstance(fqn, _STRING_TYPES):
+            raise ValueError("Unexpected input.")
+        pkg, ns, name = Processor.split_fqn(fqn)
+        probes = 0
+        res = None
+        for scope in Processor._scopes(namespace, pkg, ns):
+            probes += 1
+            if name in scope:
+                res = scope[name]
+                break
+        if stats is not None:
+            stats.resolve_calls += 1
+            stats.lookup_probes += probes
+        if res is None:
+            # Give up
+            raise ProcessorException(
+                "Unresolved reference '{}'.".format(fqn))
+        return res
 
     @staticmethod
-    def resolve_namespace(package, fqn):
+    def resolve_namespace(package, fqn, stats=None):
         """
         Resolve namespace references.
 
         :param package: context ast.Package object.
         :param fqn: FQN or ID string.
+        :param stats: ProcessorStats object to record lookups in.
         :return: Dereferenced ast.Namespace object.
         """
-        if not isinstance(package, ast.Package) or not isinstance(fqn, str):
+        if not isinstance(package, ast.Package) or \
+                not isinstance(fqn, _STRING_TYPES):
             raise ValueError("Unexpected input.")
+        if stats is not None:
+            stats.resolve_calls += 1
         if fqn.count(".") > 0:
             pkg, name = fqn.rsplit(".", 2)
         else:
@@ -144,10 +211,9 @@ class Processor:
             if name in package:
                 return package[name]
             # Look in model imports
-            for package_import in package.imports:
-                if not package_import.namespace:
-                    if name in package_import.package_reference:
-                        return package_import.package_reference[name]
+            for package_import in Processor._model_imports(package):
+                if name in package_import.package_reference:
+                    return package_import.package_reference[name]
         else:
             # This is an FQN
             if pkg == package.name:
@@ -156,85 +222,168 @@ class Processor:
                     return package[name]
             else:
                 # Look in model imports
-                for package_import in package.imports:
-                    if not package_import.namespace:
-                        if name in package_import.package_reference:
-                            return package_import.package_reference[name]
+                for package_import in Processor._model_imports(package):
+                    if name in package_import.package_reference:
+                        return package_import.package_reference[name]
         # Give up
         raise ProcessorException(
             "Unresolved namespace reference '{}'.".format(fqn))
 
-    def _udpate_complextype_references(self, name):
+    @staticmethod
+    def _model_imports(package):
+        for package_import in package.imports:
+            if not package_import.namespace and \
+                    package_import.package_reference is not None:
+                yield package_import
+
+    def location(self, node):
+        """
+        Find the source location of an AST node.
+
+        :param node: AST node, e.g. an ast.Interface or ast.Reference
+            object.
+        :return: A tuple - file specification, line and column. None if the
+            location is unknown.
+        """
+        return self.sources.resolve(getattr(node, "location", None))
+
+    def _error(self, message, location=None):
+        """
+        Report a model error.
+
+        :param message: Error message.
+        :param location: Packed source location of the error or None.
+        :raises ProcessorException: Unless diagnostics are collected.
+        """
+        if self.diagnostics is None:
+            raise ProcessorException(message)
+        self.diagnostics.append(self._diagnostic(message, location))
+
+    def _warning(self, message, location=None):
+        """
+        Report a model issue that does not invalidate the model.
+
+        :param message: Warning message.
+        :param location: Packed source location of the issue or None.
+        """
+        self.warnings.append(self._diagnostic(message, location))
+
+    def _diagnostic(self, message, location):
+        resolved = self.sources.resolve(location)
+        if resolved is None:
+            return Diagnostic(message, self._file)
+        return Diagnostic(message, resolved[0], resolved[1])
+
+    def _resolve(self, namespace, fqn, location):
+        try:
+            return self.resolve(namespace, fqn, self.stats)
+        except ProcessorException as e:
+            self._error(e.message, location)
+            return None
+
+    def _resolve_namespace(self, package, fqn, location):
+        try:
+            return self.resolve_namespace(package, fqn, self.stats)
+        except ProcessorException as e:
+            self._error(e.message, location)
+            return None
+
+    def _udpate_complextype_references(self, name, location=None):
         """
         Update type references in a complex type.
 
         :param name: ast.ComplexType object.
+        :param location: Location of the element type of an anonymous
+            array occurrence, see ast.Namespace._intern().
         """
         if isinstance(name, ast.Enumeration):
             if name.extends:
-                name.reference = self.resolve(name.namespace, name.extends)
-                if not isinstance(name.reference, ast.Enumeration):
-                    raise ProcessorException(
-                        "Invalid enumeration reference '{}'.".format(
-                            name.extends))
+                name.reference = self._resolve(name.namespace, name.extends,
+                                               name.location)
+                if name.reference is not None and \
+                        not isinstance(name.reference, ast.Enumeration):
+                    self._error("Invalid enumeration reference '{}'.".format(
+                        name.extends), name.location)
         elif isinstance(name, ast.Struct):
             for field in name.fields.values():
-                self._update_type_references(name.namespace, field.type)
+                self._update_type_references(name.namespace, field.type,
+                                             field.type_location)
             if name.extends:
-                name.reference = self.resolve(name.namespace, name.extends)
-                if not isinstance(name.reference, ast.Struct):
-                    raise ProcessorException(
-                        "Invalid struct reference '{}'.".format(
-                            name.extends))
+                name.reference = self._resolve(name.namespace, name.extends,
+                                               name.location)
+                if name.reference is not None and \
+                        not isinstance(name.reference, ast.Struct):
+                    self._error("Invalid struct reference '{}'.".format(
+                        name.extends), name.location)
         elif isinstance(name, ast.Array):
-            self._update_type_references(name.namespace, name.type)
+            if name.name is None:
+                self._update_type_references(name.namespace, name.type,
+                                             location)
+            else:
+                self._update_type_references(name.namespace, name.type,
+                                             name.type_location)
         elif isinstance(name, ast.Map):
-            self._update_type_references(name.namespace, name.key_type)
-            self._update_type_references(name.namespace, name.value_type)
+            self._update_type_references(name.namespace, name.key_type,
+                                         name.key_type_location)
+            self._update_type_references(name.namespace, name.value_type,
+                                         name.value_type_location)
         else:
             assert False
 
-    def _update_type_references(self, namespace, name):
+    def _update_type_references(self, namespace, name, location=None):
         """
         Update type references in a type.
 
         :param namespace: ast.Namespace context.
         :param name: ast.Type object.
+        :param location: Location of the element type of an anonymous
+            array occurrence, see ast.Namespace._intern(). Anonymous arrays
+            are shared, so unresolved element references are reported at
+            each occurrence.
         """
         if isinstance(name, ast.Typedef):
-            self._update_type_references(name.namespace, name.type)
+            self._update_type_references(name.namespace, name.type,
+                                         name.type_location)
         elif isinstance(name, ast.PrimitiveType):
             pass
         elif isinstance(name, ast.ComplexType):
-            self._udpate_complextype_references(name)
+            self._udpate_complextype_references(name, location)
         elif isinstance(name, ast.Reference):
             if not name.namespace:
                 name.namespace = namespace
             if not name.reference:
-                resolved_name = self.resolve(namespace, name.name)
-                name.reference = resolved_name
+                name.reference = self._resolve(
+                    namespace, name.name,
+                    location if location is not None else name.location)
+            elif self.stats is not None:
+                self.stats.cache_hits += 1
         elif isinstance(name, ast.Attribute):
-            self._update_type_references(name.namespace, name.type)
+            self._update_type_references(name.namespace, name.type,
+                                         name.type_location)
         elif isinstance(name, ast.Method):
             for arg in name.in_args.values():
-                self._update_type_references(name.namespace, arg.type)
+                self._update_type_references(name.namespace, arg.type,
+                                             arg.type_location)
             for arg in name.out_args.values():
-                self._update_type_references(name.namespace, arg.type)
+                self._update_type_references(name.namespace, arg.type,
+                                             arg.type_location)
             if isinstance(name.errors, OrderedDict):
-                for arg in name.errors.values():
-                    self._update_type_references(name.namespace, arg.type)
+                # Inline error enumerators do not refer to types.
+                pass
             elif isinstance(name.errors, ast.Reference):
                 # Errors can be a reference to an enumeration
                 self._update_type_references(name.namespace, name.errors)
-                if not isinstance(name.errors.reference, ast.Enumeration):
-                    raise ProcessorException(
-                        "Invalid error reference '{}'.".format(
-                            name.errors.name))
+                if name.errors.reference is not None and \
+                        not isinstance(name.errors.reference,
+                                       ast.Enumeration):
+                    self._error("Invalid error reference '{}'.".format(
+                        name.errors.name), name.errors.location)
             else:
                 assert False
         elif isinstance(name, ast.Broadcast):
             for arg in name.out_args.values():
-                self._update_type_references(name.namespace, arg.type)
+                self._update_type_references(name.namespace, arg.type,
+                                             arg.type_location)
         else:
             assert False
 
@@ -269,12 +418,12 @@ class Processor:
         for name in namespace.broadcasts.values():
             self._update_type_references(namespace, name)
         if namespace.extends:
-            namespace.reference = self.resolve_namespace(
-                namespace.package, namespace.extends)
-            if not isinstance(namespace.reference, ast.Interface):
-                raise ProcessorException(
-                    "Invalid interface reference '{}'.".format(
-                        namespace.extends))
+            namespace.reference = self._resolve_namespace(
+                namespace.package, namespace.extends, namespace.location)
+            if namespace.reference is not None and \
+                    not isinstance(namespace.reference, ast.Interface):
+                self._error("Invalid interface reference '{}'.".format(
+                    namespace.extends), namespace.location)
 
     def _update_package_references(self, package):
         """
@@ -282,15 +431,30 @@ class Processor:
 
         :param package: ast.Package object.
         """
-        for package_import in package.imports:
-            assert package_import.package_reference is not None
+        self._update_references(package.imports,
+                                list(package.typecollections.values()),
+                                list(package.interfaces.values()))
+
+    def _update_references(self, imports, typecollections, interfaces):
+        """
+        Update references in package definitions.
+
+        :param imports: A list of ast.Import objects.
+        :param typecollections: A list of ast.TypeCollection objects.
+        :param interfaces: A list of ast.Interface objects.
+        """
+        for package_import in imports:
+            if package_import.package_reference is None:
+                # Not found, already reported
+                assert self.diagnostics is not None
+                continue
             if package_import.namespace:
                 # Namespace import
                 package_reference = package_import.package_reference
                 if not package_import.namespace.endswith(".*"):
-                    raise ProcessorException(
-                        "Invalid namespace import {}.".format(
-                            package_import.namespace))
+                    self._error("Invalid namespace import {}.".format(
+                        package_import.namespace), package_import.location)
+                    continue
                 namespace_name = \
                     package_import.namespace[len(package_reference.name)+1:-2]
                 # Update namespace reference
@@ -298,18 +462,44 @@ class Processor:
                     namespace = package_reference[namespace_name]
                     package_import.namespace_reference = namespace
                 else:
-                    raise ProcessorException(
-                        "Namespace '{}' not found.".format(
-                            package_import.namespace))
+                    self._error("Namespace '{}' not found.".format(
+                        package_import.namespace), package_import.location)
             else:
                 # Model import
                 assert package_import.namespace_reference is None
-        for namespace in package.typecollections:
-            self._update_namespace_references(
-                package.typecollections[namespace])
-        for namespace in package.interfaces:
-            self._update_interface_references(
-                package.interfaces[namespace])
+        for namespace in typecollections:
+            self._update_namespace_references(namespace)
+        for namespace in interfaces:
+            self._update_interface_references(namespace)
+        # Flatten the enumerations, structs and interfaces of the linked
+        #   namespaces.
+        for node, e in update_tables(list(typecollections) +
+                                     list(interfaces)):
+            if e.node is not node or (
+                    node.extends and
+                    not isinstance(node.reference, type(node))):
+                # Error in a base definition or an invalid reference,
+                #   reported separately
+                continue
+            self._error(e.message, node.location)
+        for namespace in list(typecollections) + list(interfaces):
+            for enumeration in namespace.enumerations.values():
+                if enumeration.table is None:
+                    continue
+                for name, value, first in enumeration.table.aliases:
+                    self._warning(
+                        "Enumerator '{}' in '{}' repeats the value {} of "
+                        "'{}'.".format(name, enumeration.name, value, first),
+                        enumeration.enumerators[name].location)
+        # Types of infinite size
+        for component in type_cycles(list(typecollections) +
+                                     list(interfaces), infinite=True):
+            for node in component:
+                if isinstance(node, ast.Typedef):
+                    message = "Circular reference '{}'."
+                else:
+                    message = "Recursive type '{}'."
+                self._error(message.format(node.name), node.location)
 
     def import_package(self, fspec, package, references=None):
         """
@@ -323,11 +513,26 @@ class Processor:
             ValueError("Expected ast.Package as input.")
         if not references:
             references = []
+        with span(self.tracer, package.name, "package", file=fspec):
+            self._import_package(fspec, package, references)
+
+    def _import_package(self, fspec, package, references):
+        file_imports = list(package.imports)
+        file_typecollections = list(package.typecollections.values())
+        file_interfaces = list(package.interfaces.values())
+        self._file = fspec
         # Check whether package is already imported
         if package.name in self.packages:
             if fspec not in self.packages[package.name].files:
                 # Merge the new package into the already existing one.
-                self.packages[package.name] += package
+                start = clock()
+                with span(self.tracer, "merge", "phase"):
+                    try:
+                        self.packages[package.name] += package
+                    except ast.ASTException as e:
+                        self._error(e.message)
+                if self.stats is not None:
+                    self.stats.file(fspec).merge_seconds += clock() - start
                 # Register the package file in the processor.
                 self.files[fspec] = self.packages[package.name]
                 package = self.packages[package.name]
@@ -338,14 +543,76 @@ class Processor:
             self.packages[package.name] = package
             # Register the package file in the processor.
             self.files[fspec] = package
+        # Record the imported files.
+        imported_files = self.imports.setdefault(fspec, [])
+        for package_import in file_imports:
+            imported_file = package_import.file
+            if imported_file not in self.files:
+                try:
+                    imported_file = self.find_file(imported_file)
+                except ProcessorException:
+                    if self.diagnostics is None:
+                        raise
+                    # Reported by import_file()
+                    continue
+            if imported_file not in imported_files:
+                imported_files.append(imported_file)
         # Process package imports
-        for package_import in package.imports:
+        if self.diagnostics is not None:
+            # Imports of merged files are processed already or reported.
+            package_imports = file_imports
+        else:
+            package_imports = package.imports
+        for package_import in package_imports:
             imported_package = self.import_file(
                 package_import.file, references + [package.name])
+            self._file = fspec
             # Update import reference
             package_import.package_reference = imported_package
         # Update type references
-        self._update_package_references(package)
+        start = clock()
+        with span(self.tracer, "link", "phase"):
+            if self.diagnostics is None:
+                self._update_package_references(package)
+            else:
+                # Link the file's definitions only, so that errors are
+                #   reported once.
+                self._update_references(file_imports, file_typecollections,
+                                        file_interfaces)
+        if self.stats is not None:
+            self.stats.file(fspec).link_seconds += clock() - start
+        self._file = None
+
+    def _parse(self, fspec, fidl, parser=None):
+        """
+        Parse an FIDL string.
+
+        :param fspec: File specification of the package.
+        :param fidl: FIDL string.
+        :param parser: Parser to use instead of the processor's one.
+        :return: The parsed ast.Package or None if it is invalid and
+            diagnostics are collected.
+        """
+        start = clock()
+        if parser is None:
+            if self.parser is None:
+                self.parser = franca_parser.Parser()
+            parser = self.parser
+        parser.tracer = self.tracer
+        parser.file_index = self.sources.add(fspec, fidl)
+        diagnostics = [] if self.diagnostics is not None else None
+        file_stats = self.stats.file(fspec) if self.stats is not None \
+            else None
+        package = parser.parse(fidl, file_stats, diagnostics)
+        if file_stats is not None:
+            file_stats.parse_seconds += clock() - start
+        if diagnostics:
+            for diagnostic in diagnostics:
+                diagnostic.file = fspec
+            self.diagnostics.extend(diagnostics)
+        if package is not None:
+            package.files = [fspec]
+        return package
 
     def import_string(self, fspec, fidl, references=None):
         """
@@ -354,45 +621,220 @@ class Processor:
         :param fspec: File specification of the package.
         :param fidl: FIDL string.
         :param references: A list of package references.
-        :return: The parsed ast.Package.
+        :return: The parsed ast.Package or None if it is invalid and
+            diagnostics are collected.
         """
+        if self.stats is not None:
+            self.stats.file(fspec).bytes += len(fidl)
         # Parse the string.
-        parser = franca_parser.Parser()
-        package = parser.parse(fidl)
-        package.files = [fspec]
+        package = self._parse(fspec, fidl)
         # Import the package in the processor.
-        self.import_package(fspec, package, references)
+        if package is not None:
+            self.import_package(fspec, package, references)
         return package
 
+    def find_loader(self, fspec):
+        """
+        Find an FIDL file using the loaders.
+
+        :param fspec: File specification.
+        :return: A tuple - the loader of the found file and its unique file
+            specification.
+        :raises ProcessorException: If the file is not found.
+        """
+        for loader in self.loaders:
+            found = loader.find(fspec)
+            if found is not None:
+                return loader, found
+        raise ProcessorException("Model '{}' not found.".format(fspec))
+
+    def find_file(self, fspec):
+        """
+        Find an FIDL file using the loaders.
+
+        :param fspec: File specification.
+        :return: Unique file specification of the found file.
+        """
+        return self.find_loader(fspec)[1]
+
+    def add_parsed(self, fspec, package):
+        """
+        Provide a file parsed in advance, e.g. in another process or thread.
+        The next import_file() call for the file imports the package instead
+        of reading and parsing the file.
+
+        :param fspec: Unique file specification, as returned by
+            find_loader().
+        :param package: The parsed ast.Package or None if it is invalid.
+        """
+        self._parsed[fspec] = package
+
+    def discard_parsed(self):
+        """
+        Drop the files parsed in advance that have not been imported.
+        """
+        self._parsed.clear()
+
+    def link(self, fspec, imports, typecollections, interfaces):
+        """
+        Link definitions against the loaded packages without importing
+        them, e.g. the unsaved version of a file.
+
+        :param fspec: File specification reported with model errors
+            without a source location.
+        :param imports: A list of ast.Import objects, with the package
+            references set.
+        :param typecollections: A list of ast.TypeCollection objects.
+        :param interfaces: A list of ast.Interface objects.
+        """
+        previous = self._file
+        self._file = fspec
+        try:
+            self._update_references(imports, typecollections, interfaces)
+        finally:
+            self._file = previous
+
     def import_file(self, fspec, references=None):
         """
         Parse an FIDL file and import it into the processor as package.
 
         :param fspec: File specification.
         :param references: A list of package references.
-        :return: The parsed ast.Package.
+        :return: The parsed ast.Package or None if it is not found or
+            invalid and diagnostics are collected.
         """
+        loader = None
+        if fspec not in self.files:
+            try:
+                loader, fspec = self.find_loader(fspec)
+            except ProcessorException as e:
+                self._error(e.message)
+                return None
         if fspec in self.files:
             # File already loaded.
+            if self.stats is not None:
+                self.stats.cache_hits += 1
             return self.files[fspec]
-        if not os.path.exists(fspec):
-            if os.path.isabs(fspec):
-                # Absolute specification
-                raise ProcessorException(
-                    "Model '{}' not found.".format(fspec))
-            else:
-                # Relative specification - check in the package path list.
-                for path in self.package_paths:
-                    temp_fspec = os.path.join(path, fspec)
-                    if os.path.exists(temp_fspec):
-                        fspec = temp_fspec
-                        break
-                else:
-                    raise ProcessorException(
-                        "Model '{}' not found.".format(fspec))
-        # Parse the file.
-        parser = franca_parser.Parser()
-        package = parser.parse_file(fspec)
-        # Import the package in the processor.
-        self.import_package(fspec, package, references)
+        if fspec in self._parsed:
+            # Parsed in advance by import_files_async().
+            package = self._parsed.pop(fspec)
+            if package is not None:
+                with span(self.tracer, fspec, "file"):
+                    self.import_package(fspec, package, references)
+            return package
+        with span(self.tracer, fspec, "file"):
+            # Read the file.
+            start = clock()
+            with span(self.tracer, "read", "phase"):
+                fidl = loader.map(fspec, self.map_size)
+                if fidl is None:
+                    fidl = loader.read(fspec)
+            if self.stats is not None:
+                file_stats = self.stats.file(fspec)
+                file_stats.bytes += len(fidl)
+                file_stats.read_seconds += clock() - start
+            # Parse the file.
+            try:
+                package = self._parse(fspec, fidl)
+            finally:
+                if isinstance(fidl, mmap.mmap):
+                    fidl.close()
+            # Import the package in the processor.
+            if package is not None:
+                self.import_package(fspec, package, references)
         return package
+
+    def import_file_async(self, fspec):
+        """
+        Import an FIDL file without blocking the asyncio event loop.
+
+        Requires Python 3.5 or later.
+
+        :param fspec: File specification.
+        :return: A coroutine returning the parsed ast.Package.
+        :raises ProcessorException: Below Python 3.5.
+        """
+        return self._franca_async().import_file(self, fspec)
+
+    def import_files_async(self, fspecs):
+        """
+        Import FIDL files without blocking the asyncio event loop.
+
+        The files and all files they import are read concurrently and parsed
+        in an executor. The packages are then merged and linked in the
+        executor, in the same order as by consecutive import_file() calls.
+        The processor must not be used otherwise until the coroutine is
+        finished.
+
+        Requires Python 3.5 or later.
+
+        :param fspecs: A list of file specifications.
+        :return: A coroutine returning a list of the parsed ast.Package
+            objects.
+        :raises ProcessorException: Below Python 3.5.
+        """
+        return self._franca_async().import_files(self, fspecs)
+
+    @staticmethod
+    def _franca_async():
+        if sys.version_info < (3, 5):
+            raise ProcessorException(
+                "Asynchronous loading requires Python 3.5 or later.")
+        from pyfranca import franca_async
+        return franca_async
+
+    def dependencies(self, fspecs=None):
+        """
+        Find the files loaded for entry files.
+
+        :param fspecs: A list of entry file specifications. All loaded files
+            are returned by default.
+        :return: A list of the entry and imported file specifications, in
+            import order.
+        """
+        if fspecs is None:
+            fspecs = list(self.files)
+        else:
+            fspecs = [fspec if fspec in self.files else self.find_file(fspec)
+                      for fspec in fspecs]
+        return franca_deps.closure(self.imports, fspecs)
+
+    def import_cycles(self):
+        """
+        Find cycles in the import graph of the loaded files.
+
+        :return: A list of lists of the file specifications in a cycle.
+        """
+        return import_cycles(self.imports)
+
+    def write_dependencies(self, dep_fspec, target, fspecs=None):
+        """
+        Write a Make dependency file.
+
+        :param dep_fspec: Dependency file specification.
+        :param target: Make target depending on the model files.
+        :param fspecs: A list of entry file specifications. All loaded
+            files are dependencies by default.
+        """
+        franca_deps.write_dependencies(dep_fspec, target,
+                                       self.dependencies(fspecs))
+
+    def up_to_date(self, stamp_fspec, fspecs):
+        """
+        Check whether a stamp file written by write_dependencies() is newer
+        than the entry files and all files they import.
+
+        The entry files are looked up with the loaders, as by
+        import_file(), but not parsed.
+
+        :param stamp_fspec: Stamp file specification.
+        :param fspecs: A list of entry file specifications.
+        :return: True if no entry or imported file changed since the stamp
+            file was written.
+        """
+        try:
+            fspecs = [fspec if fspec in self.files else self.find_file(fspec)
+                      for fspec in fspecs]
+        except ProcessorException:
+            return False
+        return franca_deps.up_to_date(stamp_fspec, fspecs)
@@ -0,0 +1,167 @@
+"""
+Franca model pruning.
+
+Finds the types used by root interfaces across all loaded packages, i.e.
+the types of their attributes and of their method and broadcast arguments
+and errors, including the members of base interfaces, and the types these
+depend on: typedef targets, base structs and enumerations, struct fields,
+and array elements and map keys and values. All other named types are
+unused and can be left out, e.g. of code generation.
+
+The model is traversed once, following linked references, so every type is
+visited at most once.
+"""
+
+import copy
+from collections import OrderedDict
+
+from pyfranca import ast
+from pyfranca.franca_types import resolve
+
+# Namespace attributes holding named types
+TYPE_MEMBERS = ("typedefs", "enumerations", "structs", "arrays", "maps")
+
+
+def _dependencies(node):
+    if isinstance(node, ast.Interface):
+        types = [attribute.type for attribute in node.attributes.values()]
+        for method in node.methods.values():
+            types.extend(arg.type for arg in method.in_args.values())
+            types.extend(arg.type for arg in method.out_args.values())
+            if isinstance(method.errors, ast.Reference):
+                # Inline error enumerators do not refer to types.
+                types.append(method.errors)
+        for broadcast in node.broadcasts.values():
+            types.extend(arg.type for arg in broadcast.out_args.values())
+        types.append(node.reference)
+        return types
+    elif isinstance(node, ast.Typedef):
+        return [node.type]
+    elif isinstance(node, ast.Struct):
+        return [field.type for field in node.fields.values()] + \
+            [node.reference]
+    elif isinstance(node, ast.Enumeration):
+        return [node.reference]
+    elif isinstance(node, ast.Array):
+        return [node.type]
+    elif isinstance(node, ast.Map):
+        return [node.key_type, node.value_type]
+    return []
+
+
+def _reachable(interfaces):
+    """
+    Find the types and interfaces used by interfaces.
+
+    :return: A set of the reachable types and a set of the interfaces and
+        their base interfaces.
+    """
+    seen = set()
+    types = set()
+    stack = list(interfaces)
+    while stack:
+        node = resolve(stack.pop())
+        if node is None or isinstance(node, ast.PrimitiveType) or \
+                node in seen:
+            continue
+        seen.add(node)
+        if not isinstance(node, ast.Interface):
+            types.add(node)
+        stack.extend(_dependencies(node))
+    return types, seen - types
+
+
+def reachable_types(interfaces):
+    """
+    Find the types used by interfaces, directly or indirectly.
+
+    :param interfaces: A list of linked ast.Interface objects.
+    :return: A set of the reachable ast.Typedef, ast.Enumeration,
+        ast.Struct, ast.Array and ast.Map objects, including anonymous
+        arrays.
+    """
+    return _reachable(interfaces)[0]
+
+
+def unused_types(packages, interfaces):
+    """
+    Find the named types not used by interfaces.
+
+    :param packages: Dictionary of ast.Package objects by name, e.g.
+        Processor.packages.
+    :param interfaces: A list of the linked root ast.Interface objects.
+    :return: A list of the unused ast.Typedef, ast.Enumeration, ast.Struct,
+        ast.Array and ast.Map objects, in package name, namespace and
+        definition order.
+    """
+    used = reachable_types(interfaces)
+    result = []
+    for _, package in sorted(packages.items()):
+        for namespace in list(package.typecollections.values()) + \
+                list(package.interfaces.values()):
+            for name in TYPE_MEMBERS:
+                result.extend(item for item
+                              in getattr(namespace, name).values()
+                              if item not in used)
+    return result
+
+
+def _copy_namespace(namespace, package, used):
+    """
+    Copy a namespace, leaving out the unused types.
+
+    :param namespace: ast.TypeCollection or ast.Interface object.
+    :param package: Pruned ast.Package object of the copy.
+    :param used: A set of the reachable types.
+    """
+    original = namespace
+    namespace = copy.copy(original)
+    namespace.package = package
+    namespace.flags = list(original.flags)
+    for name in TYPE_MEMBERS:
+        setattr(namespace, name, OrderedDict(
+            (type_name, item) for type_name, item
+            in getattr(original, name).items() if item in used))
+    namespace._anonymous_arrays = dict(
+        (key, item) for key, item in original._anonymous_arrays.items()
+        if item in used)
+    if isinstance(original, ast.Interface):
+        namespace.attributes = OrderedDict(original.attributes)
+        namespace.methods = OrderedDict(original.methods)
+        namespace.broadcasts = OrderedDict(original.broadcasts)
+    return namespace
+
+
+def prune(packages, interfaces):
+    """
+    Create a model of the root interfaces, their base interfaces and the
+    types they use. Other interfaces are left out with the types only they
+    use, so the pruned model has no references to removed definitions.
+
+    The original model is not modified. The packages and namespaces of the
+    pruned model are copies with their own member dictionaries and lists,
+    sharing the definitions of the original model, so the definitions refer
+    to their original namespaces.
+
+    :param packages: Dictionary of ast.Package objects by name, e.g.
+        Processor.packages.
+    :param interfaces: A list of the linked root ast.Interface objects.
+    :return: OrderedDict of the pruned ast.Package objects by name, sorted
+        by name.
+    """
+    used, kept = _reachable(interfaces)
+    result = OrderedDict()
+    for package_name, package in sorted(packages.items()):
+        pruned = copy.copy(package)
+        pruned.files = list(package.files)
+        pruned.imports = list(package.imports)
+        for members in ("typecollections", "interfaces"):
+            namespaces = OrderedDict()
+            for name, namespace in getattr(package, members).items():
+                if isinstance(namespace, ast.Interface) and \
+                        namespace not in kept:
+                    continue
+                namespaces[name] = _copy_namespace(namespace, pruned, used)
+            setattr(pruned, members, namespaces)
+        result[package_name] = pruned
+    return result
@@ -0,0 +1,243 @@
+"""
+Franca wire size analysis.
+
+Computes the minimum and maximum encoded size of linked model types, and of
+method requests and responses and broadcasts, in the wire format of
+franca_codec. Primitive types, enumerations and structs of fixed-size
+fields have a fixed size. String, ByteBuffer, arrays and maps, and structs
+containing them, have a minimum size and no maximum size.
+
+Sizes are computed once per type and cached, so analyzing all interfaces of
+a model visits each type once.
+"""
+
+import struct
+
+from pyfranca import ast
+from pyfranca.franca_codec import FORMATS
+from pyfranca.franca_inheritance import InheritanceException, \
+    interface_table, struct_table
+from pyfranca.franca_types import TypeCache, resolve_alias
+
+
+class SizeException(Exception):
+
+    def __init__(self, message):
+        super(SizeException, self).__init__()
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class WireSize(object):
+    """
+    Minimum and maximum encoded size in bytes.
+    """
+
+    __slots__ = ("minimum", "maximum")
+
+    def __init__(self, minimum, maximum=None):
+        """
+        Constructor.
+
+        :param minimum: Minimum size.
+        :param maximum: Maximum size or None if the size is unbounded.
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def fixed(self):
+        """
+        :return: True if the size does not depend on the value.
+        """
+        return self.minimum == self.maximum
+
+    def __add__(self, other):
+        if self.maximum is None or other.maximum is None:
+            maximum = None
+        else:
+            maximum = self.maximum + other.maximum
+        return WireSize(self.minimum + other.minimum, maximum)
+
+    def __eq__(self, other):
+        return isinstance(other, WireSize) and \
+            (self.minimum, self.maximum) == (other.minimum, other.maximum)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "WireSize({}, {})".format(self.minimum, self.maximum)
+
+
+# Size of the UInt32 length of strings, byte buffers, arrays and maps
+LENGTH_SIZE = 4
+
+
+class SizeAnalyzer(object):
+    """
+    Computes the encoded sizes of linked model types.
+    """
+
+    def __init__(self, enumeration_type=ast.UInt32):
+        """
+        Constructor.
+
+        :param enumeration_type: ast.Type subclass of the enumeration
+            backing type.
+        """
+        if enumeration_type not in FORMATS or \
+                enumeration_type in (ast.Boolean, ast.Float, ast.Double):
+            raise ValueError("Invalid enumeration type '{}'.".format(
+                enumeration_type.__name__))
+        self.enumeration_size = struct.calcsize(FORMATS[enumeration_type])
+        # WireSize objects by type or argument dictionary
+        self._cache = TypeCache(self._compute, SizeException,
+                                self._recursion)
+        # Stack depths of the array elements and map keys and values being
+        #   analyzed, outermost first
+        self._indirections = []
+
+    def size(self, the_type):
+        """
+        Get the encoded size of a type.
+
+        :param the_type: Linked ast.Type object.
+        :return: WireSize object.
+        :raises SizeException: If the type is not linked or recursive
+            without an array or map in between.
+        """
+        return self._size(the_type)
+
+    def arguments_size(self, args):
+        """
+        Get the encoded size of method or broadcast arguments.
+
+        :param args: OrderedDict of ast.Argument objects, e.g.
+            ast.Method.in_args or ast.Broadcast.out_args.
+        :return: WireSize object.
+        """
+        return self._cache.get(args, self._arguments_size)
+
+    def _arguments_size(self, args):
+        total = WireSize(0, 0)
+        for arg in args.values():
+            total += self.size(arg.type)
+        return total
+
+    def messages(self, interface):
+        """
+        Get the encoded sizes of the messages of an interface, including
+        inherited methods and broadcasts.
+
+        Method error enumerations are not part of the payload.
+
+        :param interface: Linked ast.Interface object.
+        :return: A list of tuples - ast.Method or ast.Broadcast object,
+            "in" for requests or "out" for responses and broadcasts, and
+            the WireSize object.
+        :raises SizeException: If the interface or a type is not linked,
+            or a type is recursive.
+        """
+        try:
+            table = interface_table(interface)
+        except InheritanceException as e:
+            raise SizeException(e.message)
+        result = []
+        for method in table.methods.values():
+            result.append((method, "in", self.arguments_size(method.in_args)))
+            result.append((method, "out",
+                           self.arguments_size(method.out_args)))
+        for broadcast in table.broadcasts.values():
+            result.append((broadcast, "out",
+                           self.arguments_size(broadcast.out_args)))
+        return result
+
+    def worst_case(self, interface):
+        """
+        Get the message of an interface with the largest maximum size.
+        Unbounded messages are the largest, followed by the message with
+        the largest minimum size among them.
+
+        :param interface: Linked ast.Interface object.
+        :return: A tuple as returned by messages() or None if the interface
+            has no methods or broadcasts.
+        """
+        messages = self.messages(interface)
+        if not messages:
+            return None
+        return max(messages, key=lambda message: (
+            message[2].maximum is None, message[2].maximum or 0,
+            message[2].minimum))
+
+    def _size(self, the_type):
+        """
+        Get the encoded size of a type.
+
+        :return: WireSize object, or None if the size depends on a valid
+            recursion.
+        """
+        # Aliases are resolved first, so long typedef chains do not
+        #   recurse.
+        the_type = resolve_alias(the_type, SizeException)
+        size = self._cache.get(the_type)
+        if size is None and self._cache.position(the_type) is None:
+            # Sizes depending on a type being analyzed are not cached.
+            self._cache.discard(the_type)
+        return size
+
+    def _recursion(self, the_type):
+        """
+        Handle a type being analyzed. It is a valid recursion if an array
+        or map lies between its two occurrences on the analysis stack.
+        """
+        if not self._indirections or \
+                self._indirections[-1] <= self._cache.position(the_type):
+            raise SizeException("Recursive type '{}'.".format(
+                the_type.name))
+        return None
+
+    def _element(self, the_type):
+        """
+        Analyze an array element or map key or value type for errors.
+        """
+        self._indirections.append(len(self._cache.stack))
+        try:
+            self._size(the_type)
+        finally:
+            self._indirections.pop()
+
+    def _compute(self, the_type):
+        if type(the_type) in FORMATS:
+            size = struct.calcsize(FORMATS[type(the_type)])
+            return WireSize(size, size)
+        elif isinstance(the_type, ast.Enumeration):
+            return WireSize(self.enumeration_size, self.enumeration_size)
+        elif isinstance(the_type, ast.String):
+            # Length and terminating NUL byte
+            return WireSize(LENGTH_SIZE + 1)
+        elif isinstance(the_type, ast.ByteBuffer):
+            return WireSize(LENGTH_SIZE)
+        elif isinstance(the_type, ast.Struct):
+            total = WireSize(0, 0)
+            for field in struct_table(the_type).fields:
+                size = self._size(field.type)
+                if size is None or total is None:
+                    total = None
+                else:
+                    total += size
+            return total
+        elif isinstance(the_type, ast.Array):
+            # Elements are analyzed for errors only - arrays may be empty.
+            self._element(the_type.type)
+            return WireSize(LENGTH_SIZE)
+        elif isinstance(the_type, ast.Map):
+            self._element(the_type.key_type)
+            self._element(the_type.value_type)
+            return WireSize(LENGTH_SIZE)
+        raise SizeException("Unsupported type '{}'.".format(
+            the_type.__class__.__name__))
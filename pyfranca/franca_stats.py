@@ -0,0 +1,151 @@
+"""
+Franca processing statistics.
+"""
+
+from collections import OrderedDict
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    # Python 2
+    from time import time as clock
+
+
+class FileStats(object):
+    """
+    Processing statistics for a single model file.
+    """
+
+    def __init__(self, fspec):
+        """
+        Constructor.
+
+        :param fspec: File specification.
+        """
+        self.fspec = fspec
+        self.bytes = 0
+        self.tokens = 0
+        self.read_seconds = 0.0
+        self.lex_seconds = 0.0          # Part of parse_seconds.
+        self.parse_seconds = 0.0
+        self.merge_seconds = 0.0
+        self.link_seconds = 0.0
+
+    @property
+    def total_seconds(self):
+        return self.read_seconds + self.parse_seconds + \
+            self.merge_seconds + self.link_seconds
+
+    def as_dict(self):
+        """
+        Convert to a dictionary, e.g. for JSON serialization.
+        """
+        return OrderedDict([
+            ("file", self.fspec),
+            ("bytes", self.bytes),
+            ("tokens", self.tokens),
+            ("read_seconds", self.read_seconds),
+            ("lex_seconds", self.lex_seconds),
+            ("parse_seconds", self.parse_seconds),
+            ("merge_seconds", self.merge_seconds),
+            ("link_seconds", self.link_seconds),
+            ("total_seconds", self.total_seconds),
+        ])
+
+
+class ProcessorStats(object):
+    """
+    Aggregate processing statistics of a Processor.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self.files = OrderedDict()
+        # Type and namespace resolution calls.
+        self.resolve_calls = 0
+        # Namespaces searched by type resolution.
+        self.lookup_probes = 0
+        # Already loaded files and already resolved references.
+        self.cache_hits = 0
+
+    def file(self, fspec):
+        """
+        Get the statistics of a file, creating them if necessary.
+
+        :param fspec: File specification.
+        :return: FileStats object.
+        """
+        file_stats = self.files.get(fspec)
+        if file_stats is None:
+            file_stats = FileStats(fspec)
+            self.files[fspec] = file_stats
+        return file_stats
+
+    def _sum(self, attribute):
+        return sum(getattr(file_stats, attribute)
+                   for file_stats in self.files.values())
+
+    @property
+    def bytes(self):
+        return self._sum("bytes")
+
+    @property
+    def tokens(self):
+        return self._sum("tokens")
+
+    @property
+    def read_seconds(self):
+        return self._sum("read_seconds")
+
+    @property
+    def lex_seconds(self):
+        return self._sum("lex_seconds")
+
+    @property
+    def parse_seconds(self):
+        return self._sum("parse_seconds")
+
+    @property
+    def merge_seconds(self):
+        return self._sum("merge_seconds")
+
+    @property
+    def link_seconds(self):
+        return self._sum("link_seconds")
+
+    @property
+    def total_seconds(self):
+        return self._sum("total_seconds")
+
+    def slowest(self, count):
+        """
+        Get the files that took the longest to process.
+
+        :param count: Maximum number of files to return.
+        :return: A list of FileStats objects, slowest first.
+        """
+        return sorted(self.files.values(),
+                      key=lambda file_stats: file_stats.total_seconds,
+                      reverse=True)[:count]
+
+    def as_dict(self):
+        """
+        Convert to a dictionary, e.g. for JSON serialization.
+        """
+        return OrderedDict([
+            ("files", [file_stats.as_dict()
+                       for file_stats in self.files.values()]),
+            ("bytes", self.bytes),
+            ("tokens", self.tokens),
+            ("read_seconds", self.read_seconds),
+            ("lex_seconds", self.lex_seconds),
+            ("parse_seconds", self.parse_seconds),
+            ("merge_seconds", self.merge_seconds),
+            ("link_seconds", self.link_seconds),
+            ("total_seconds", self.total_seconds),
+            ("resolve_calls", self.resolve_calls),
+            ("lookup_probes", self.lookup_probes),
+            ("cache_hits", self.cache_hits),
+        ])
@@ -0,0 +1,125 @@
+"""
+Franca processing tracer.
+
+Records nested begin/end events in the Chrome trace-event format, which can
+be loaded in chrome://tracing or https://ui.perfetto.dev .
+"""
+
+import json
+import os
+import threading
+from pyfranca.franca_stats import clock
+
+
+class _Span(object):
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.tracer.begin(self.name, self.category, self.args)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.end(self.name, self.category)
+        return False
+
+
+class _NullSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(tracer, name, category, **args):
+    """
+    Create a span context manager.
+
+    :param tracer: Tracer object or None to disable tracing.
+    :param name: Event name.
+    :param category: Event category, e.g. "file", "package" or "phase".
+    :param args: Event arguments.
+    :return: A context manager recording the begin and end events.
+    """
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, category, args)
+
+
+class Tracer(object):
+    """
+    Trace event recorder.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self.events = []
+        self._pid = os.getpid()
+        self._origin = clock()
+
+    def _event(self, phase, name, category, args=None):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": phase,
+            "ts": (clock() - self._origin) * 1e6,
+            "pid": self._pid,
+            "tid": threading.current_thread().ident,
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def begin(self, name, category, args=None):
+        """
+        Record a begin event.
+
+        :param name: Event name.
+        :param category: Event category.
+        :param args: A dictionary of event arguments.
+        """
+        self._event("B", name, category, args)
+
+    def end(self, name, category):
+        """
+        Record an end event.
+
+        :param name: Event name.
+        :param category: Event category.
+        """
+        self._event("E", name, category)
+
+    def span(self, name, category, **args):
+        """
+        Create a span context manager.
+        """
+        return _Span(self, name, category, args)
+
+    def as_dict(self):
+        """
+        Convert to a trace-event format dictionary.
+        """
+        return {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self, fspec):
+        """
+        Write the trace to a JSON file.
+
+        :param fspec: Output file specification.
+        """
+        with open(fspec, "w") as f:
+            json.dump(self.as_dict(), f)
@@ -0,0 +1,206 @@
+"""
+Franca type resolution and per-type caches.
+
+Helpers shared by the modules compiling or analyzing linked model types,
+e.g. franca_payload, franca_codec, franca_numpy, franca_sizes and
+franca_classes.
+"""
+
+from pyfranca import ast
+from pyfranca.franca_inheritance import InheritanceException
+
+
+def fqn(node):
+    """
+    Construct the FQN of a namespace or a namespace member.
+
+    :param node: ast.Namespace object or a member of a namespace, e.g. an
+        ast.Struct or ast.Method object.
+    :return: FQN string.
+    """
+    if isinstance(node, ast.Namespace):
+        return "{}.{}".format(node.package.name, node.name)
+    return "{}.{}".format(fqn(node.namespace), node.name)
+
+
+def resolve(the_type):
+    """
+    Follow type references.
+
+    :param the_type: ast.Type object.
+    :return: The referenced ast.Type object, the_type if it is not a
+        reference, or None if a reference is not resolved.
+    """
+    while isinstance(the_type, ast.Reference):
+        the_type = the_type.reference
+    return the_type
+
+
+def alias_target(the_type, exception):
+    """
+    Get the type a type reference, typedef or attribute stands for.
+
+    :param the_type: ast.Type or ast.Attribute object.
+    :param exception: Exception class to raise for unresolved references.
+    :return: The referenced type, the type of the typedef or attribute, or
+        None if the_type is none of them.
+    """
+    if isinstance(the_type, ast.Reference):
+        if the_type.reference is None:
+            raise exception("Unresolved reference '{}'.".format(
+                the_type.name))
+        return the_type.reference
+    elif isinstance(the_type, (ast.Typedef, ast.Attribute)):
+        return the_type.type
+    return None
+
+
+def resolve_alias(the_type, exception):
+    """
+    Follow type references, typedefs and attributes to the actual type.
+
+    :param the_type: ast.Type or ast.Attribute object.
+    :param exception: Exception class to raise for unresolved references
+        and circular typedefs.
+    :return: ast.Type object.
+    """
+    seen = set()
+    while True:
+        target = alias_target(the_type, exception)
+        if target is None:
+            return the_type
+        if id(the_type) in seen:
+            raise exception("Circular reference '{}'.".format(
+                the_type.name))
+        seen.add(id(the_type))
+        the_type = target
+
+
+# Value of the types being computed
+_PENDING = object()
+
+
+class TypeCache(object):
+    """
+    Values computed once per type, e.g. compiled functions.
+
+    Values are stored by node id, with the node kept alive so that its id
+    is not reused. Requesting a type while its value is being computed is a
+    recursion, handled by the recursion function. Compilers of recursive
+    types store the value of a type early with set() and fill it in later.
+
+    If computing a value fails, all values stored since the outermost get()
+    call are dropped, so that no cached value refers to one left
+    incomplete.
+    """
+
+    def __init__(self, compute, exception, recursion=None):
+        """
+        Constructor.
+
+        :param compute: Function computing the value of a node.
+        :param exception: Exception class of compute errors. Inheritance
+            errors are converted to it.
+        :param recursion: Function returning the value to use for a node
+            being computed. By default, a "Recursive type" exception is
+            raised.
+        """
+        self.compute = compute
+        self.exception = exception
+        self.recursion = recursion if recursion is not None \
+            else self._recursive
+        # Nodes being computed, outermost first
+        self.stack = []
+        # Tuples - node and value - by node id
+        self._values = {}
+        # Ids of the nodes stored since the outermost get() call
+        self._added = []
+
+    def _recursive(self, node):
+        raise self.exception("Recursive type '{}'.".format(node.name))
+
+    def get(self, node, compute=None):
+        """
+        Get the value of a node, computing it if necessary.
+
+        :param node: ast.Type object, or another node, e.g. an argument
+            dictionary.
+        :param compute: Function computing the value instead of the
+            default one.
+        :return: The value.
+        """
+        key = id(node)
+        if key in self._values:
+            value = self._values[key][1]
+            if value is _PENDING:
+                return self.recursion(node)
+            return value
+        self.set(node, _PENDING)
+        self.stack.append(node)
+        done = False
+        try:
+            try:
+                value = (compute or self.compute)(node)
+            except InheritanceException as e:
+                raise self.exception(e.message)
+            done = True
+        finally:
+            self.stack.pop()
+            if not done:
+                self._values.pop(key, None)
+                if not self.stack:
+                    for added in self._added:
+                        self._values.pop(added, None)
+            if not self.stack:
+                del self._added[:]
+        self._values[key] = (node, value)
+        return value
+
+    def get_type(self, the_type):
+        """
+        Get the value of a type, following type references, typedefs and
+        attributes to the actual type first. Long alias chains are followed
+        without recursion, and aliases are stored with the value of their
+        actual type.
+
+        :param the_type: ast.Type or ast.Attribute object.
+        :return: The value.
+        """
+        entry = self._values.get(id(the_type))
+        if entry is not None and entry[1] is not _PENDING:
+            return entry[1]
+        target = resolve_alias(the_type, self.exception)
+        value = self.get(target)
+        if target is not the_type:
+            entry = self._values.get(id(target))
+            # The value of a type being computed may still change.
+            if entry is not None and entry[1] is value:
+                self.set(the_type, value)
+        return value
+
+    def set(self, node, value):
+        """
+        Store the value of a node.
+        """
+        key = id(node)
+        if key not in self._values and self.stack:
+            self._added.append(key)
+        self._values[key] = (node, value)
+
+    def discard(self, node):
+        """
+        Drop the value of a node, e.g. a value depending on a node being
+        computed.
+        """
+        self._values.pop(id(node), None)
+
+    def position(self, node):
+        """
+        Find a node being computed.
+
+        :return: Index of the node in the stack or None.
+        """
+        for index, item in enumerate(self.stack):
+            if item is node:
+                return index
+        return None
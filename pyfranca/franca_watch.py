@@ -0,0 +1,182 @@
+"""
+Franca model watcher.
+"""
+
+import glob
+import os
+import time
+from pyfranca.franca_batch import Validator
+from pyfranca.franca_processor import ProcessorException
+from pyfranca.franca_stats import clock
+
+
+def dependents(imports, fspecs):
+    """
+    Find the files depending on a set of files.
+
+    :param imports: Import graph, i.e. a dictionary of imported file lists.
+    :param fspecs: A set of file specifications.
+    :return: A set of the files and all files importing them, directly or
+        indirectly.
+    """
+    importers = {}
+    for fspec, imported_files in imports.items():
+        for imported_file in imported_files:
+            importers.setdefault(imported_file, []).append(fspec)
+    result = set(fspecs)
+    stack = list(fspecs)
+    while stack:
+        for importer in importers.get(stack.pop(), []):
+            if importer not in result:
+                result.add(importer)
+                stack.append(importer)
+    return result
+
+
+class WatchCycle(object):
+    """
+    Result of a revalidation cycle.
+    """
+
+    def __init__(self, changed, results, seconds):
+        """
+        Constructor.
+
+        :param changed: A set of the changed file specifications.
+        :param results: A list of franca_batch.ValidationResult objects.
+        :param seconds: Revalidation time.
+        """
+        self.changed = changed
+        self.results = results
+        self.seconds = seconds
+
+
+class Watcher(object):
+    """
+    Polls model files and revalidates changed entries.
+
+    The entry files, all files they import, directly or indirectly, and the
+    FIDL files in the package path directories are polled for changes.
+    Bursts of changes are collected until no further change is seen for
+    the debounce period. Only the entries depending on changed files are
+    validated again.
+    """
+
+    def __init__(self, fspecs, package_paths=None, interval=0.5,
+                 debounce=0.2):
+        """
+        Constructor.
+
+        :param fspecs: A list of model entry file specifications.
+        :param package_paths: A list of model import directories.
+        :param interval: Polling interval in seconds.
+        :param debounce: Quiet period in seconds before revalidation.
+        """
+        self.fspecs = fspecs
+        self.package_paths = package_paths if package_paths else []
+        self.interval = interval
+        self.debounce = debounce
+        self.validator = Validator(self.package_paths)
+        # Latest validation result of each entry.
+        self.results = {}
+        self._snapshot = {}
+
+    @staticmethod
+    def _stat(fspec):
+        try:
+            stat = os.stat(fspec)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def _find(self, fspec):
+        try:
+            return self.validator.processor.find_file(fspec)
+        except ProcessorException:
+            return fspec
+
+    def snapshot(self):
+        """
+        Take a snapshot of the watched files.
+
+        :return: A dictionary of file modification times and sizes.
+        """
+        fspecs = set(self._find(fspec) for fspec in self.fspecs)
+        for importer, imported_files in self.validator.imports.items():
+            fspecs.add(importer)
+            fspecs.update(imported_files)
+        for path in self.package_paths:
+            fspecs.update(glob.glob(os.path.join(path, "*.fidl")))
+        return dict((fspec, self._stat(fspec)) for fspec in fspecs)
+
+    def check(self):
+        """
+        Poll the watched files once.
+
+        :return: A set of the files changed, added or removed since the
+            previous check.
+        """
+        snapshot = self.snapshot()
+        changed = set(fspec for fspec in set(snapshot) | set(self._snapshot)
+                      if snapshot.get(fspec) != self._snapshot.get(fspec))
+        self._snapshot = snapshot
+        return changed
+
+    def affected(self, changed):
+        """
+        Find the entries to validate again.
+
+        New files in the package paths may resolve missing imports, so
+        invalid entries are always validated again.
+
+        :param changed: A set of changed file specifications.
+        :return: A list of entry file specifications.
+        """
+        files = dependents(self.validator.imports, changed)
+        return [fspec for fspec in self.fspecs
+                if self._find(fspec) in files or fspec not in self.results or
+                not self.results[fspec].valid]
+
+    def revalidate(self, changed):
+        """
+        Validate the entries affected by changed files.
+
+        :param changed: A set of changed file specifications.
+        :return: WatchCycle object.
+        """
+        start = clock()
+        fspecs = self.affected(changed)
+        results = [self.validator.validate(fspec) for fspec in fspecs]
+        for result in results:
+            self.results[result.fspec] = result
+        # Start watching newly imported files. Known files keep their
+        #   previous state, so changes made meanwhile are not missed.
+        snapshot = self.snapshot()
+        snapshot.update(self._snapshot)
+        self._snapshot = snapshot
+        return WatchCycle(changed, results, clock() - start)
+
+    def run(self, report, cycles=None):
+        """
+        Validate all entries and revalidate them on changes.
+
+        :param report: Function called with a WatchCycle object after every
+            validation cycle.
+        :param cycles: Number of revalidation cycles to run, unlimited
+            by default.
+        """
+        self.check()
+        report(self.revalidate(set(self.fspecs)))
+        pending = set()
+        last_change = None
+        while cycles is None or cycles > 0:
+            time.sleep(self.interval)
+            changed = self.check()
+            if changed:
+                pending |= changed
+                last_change = clock()
+            elif pending and clock() - last_change >= self.debounce:
+                report(self.revalidate(pending))
+                pending = set()
+                if cycles is not None:
+                    cycles -= 1
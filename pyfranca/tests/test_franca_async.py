@@ -0,0 +1,183 @@
+"""
+Pyfranca asynchronous model loading tests.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from pyfranca import Processor, ProcessorException, ParserException
+from pyfranca.franca_loaders import DirectoryLoader
+
+try:
+    import asyncio
+except ImportError:
+    # Python 2
+    asyncio = None
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Requires Python 3.5 or later.")
+class TestImportAsync(unittest.TestCase):
+    """Test asynchronous model loading."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self._write("common.fidl", """
+            package C
+            typeCollection TC { typedef T is Int32 }
+        """)
+        self._write("a.fidl", """
+            package P
+            import C.TC.* from "common.fidl"
+            interface I { attribute T a }
+        """)
+        self._write("b.fidl", """
+            package P
+            import C.TC.* from "common.fidl"
+            import P.I.* from "a.fidl"
+            interface I2 extends I { attribute T b }
+        """)
+        self.loop = asyncio.new_event_loop()
+        self.processor = Processor()
+        self.processor.package_paths.append(self.tmp_dir)
+
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, file_name, fidl):
+        with open(os.path.join(self.tmp_dir, file_name), "w") as f:
+            f.write(fidl)
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_import_file(self):
+        package = self._run(self.processor.import_file_async("b.fidl"))
+        self.assertEqual(package.name, "P")
+        self.assertEqual(set(self.processor.files), set(
+            os.path.join(self.tmp_dir, name)
+            for name in ("a.fidl", "b.fidl", "common.fidl")))
+        i2 = self.processor.packages["P"].interfaces["I2"]
+        self.assertIs(i2.reference, self.processor.packages["P"]["I"])
+        self.assertEqual(self.processor._parsed, {})
+
+    def test_same_order_as_import_file(self):
+        fspecs = ["b.fidl", "a.fidl"]
+        packages = self._run(self.processor.import_files_async(fspecs))
+        self.assertEqual([package.name for package in packages], ["P", "P"])
+        processor = Processor()
+        processor.package_paths.append(self.tmp_dir)
+        for fspec in fspecs:
+            processor.import_file(fspec)
+        self.assertEqual(self.processor.packages["P"].files,
+                         processor.packages["P"].files)
+        self.assertEqual(list(self.processor.packages["P"].interfaces),
+                         list(processor.packages["P"].interfaces))
+
+    def test_loop_not_blocked(self):
+        ticks = []
+
+        def tick():
+            ticks.append(None)
+            self.loop.call_soon(tick)
+
+        self.loop.call_soon(tick)
+        self._run(self.processor.import_files_async(["a.fidl", "b.fidl"]))
+        self.assertGreater(len(ticks), 2)
+
+    def test_errors(self):
+        with self.assertRaises(ProcessorException) as context:
+            self._run(self.processor.import_file_async("nosuch.fidl"))
+        self.assertEqual(str(context.exception),
+                         "Model 'nosuch.fidl' not found.")
+        self._write("c.fidl", """
+            package P3
+            import model "a.fidl"
+            interface
+        """)
+        with self.assertRaises(ParserException):
+            self._run(self.processor.import_file_async("c.fidl"))
+        self.assertEqual(self.processor._parsed, {})
+
+    def test_cancel(self):
+        task = self.loop.create_task(
+            self.processor.import_files_async(["a.fidl", "b.fidl"]))
+        self.loop.call_soon(task.cancel)
+        with self.assertRaises(asyncio.CancelledError):
+            self._run(task)
+        self.assertEqual(self.processor._parsed, {})
+        # The processor remains usable.
+        self.processor.import_file("b.fidl")
+        self.assertIn("I2", self.processor.packages["P"].interfaces)
+
+    def test_cancel_waits_for_executor(self):
+        started = threading.Event()
+        finished = []
+
+        class SlowLoader(DirectoryLoader):
+            def read(self, fspec):
+                started.set()
+                time.sleep(0.1)
+                finished.append(fspec)
+                return super(SlowLoader, self).read(fspec)
+
+        self.processor.loaders = [SlowLoader([self.tmp_dir])]
+        task = self.loop.create_task(
+            self.processor.import_files_async(["b.fidl"]))
+
+        def cancel():
+            if started.is_set():
+                task.cancel()
+            else:
+                self.loop.call_later(0.01, cancel)
+
+        self.loop.call_soon(cancel)
+        with self.assertRaises(asyncio.CancelledError):
+            self._run(task)
+        # The running read is finished before the coroutine returns.
+        self.assertEqual(len(finished), 1)
+        self.assertEqual(self.processor.files, {})
+        self.assertEqual(self.processor._parsed, {})
+
+    def test_cancel_while_linking(self):
+        self._run(self.processor.import_files_async(["common.fidl"]))
+        linking = threading.Event()
+        import_file = self.processor.import_file
+
+        def slow_import_file(fspec, references=None):
+            linking.set()
+            time.sleep(0.1)
+            return import_file(fspec, references)
+
+        self.processor.import_file = slow_import_file
+        task = self.loop.create_task(
+            self.processor.import_files_async(["a.fidl"]))
+
+        def cancel():
+            if linking.is_set():
+                task.cancel()
+            else:
+                self.loop.call_later(0.01, cancel)
+
+        self.loop.call_soon(cancel)
+        with self.assertRaises(asyncio.CancelledError):
+            self._run(task)
+        # The import running in the executor is completed.
+        self.assertIn(os.path.join(self.tmp_dir, "a.fidl"),
+                      self.processor.files)
+
+
+@unittest.skipIf(sys.version_info >= (3, 5), "Requires Python below 3.5.")
+class TestUnsupported(unittest.TestCase):
+    """Test asynchronous loading on unsupported Python versions."""
+
+    def test_unsupported(self):
+        with self.assertRaises(ProcessorException) as context:
+            Processor().import_file_async("test.fidl")
+        self.assertEqual(str(context.exception),
+                         "Asynchronous loading requires Python 3.5 or later.")
@@ -0,0 +1,182 @@
+"""
+Pyfranca batch validation tests.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyfranca.franca_batch import BatchValidator, Validator
+
+
+class BaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self._write("common.fidl", """
+            package C
+            typeCollection TC { typedef T is Int32 }
+        """)
+        self._write("a.fidl", """
+            package A
+            import C.TC.* from "common.fidl"
+            interface I { attribute T a }
+        """)
+        self._write("b.fidl", """
+            package B
+            import C.TC.* from "common.fidl"
+            interface I { attribute Unknown a }
+        """)
+        self._write("c.fidl", """
+            package D
+            import C.TC.* from "common.fidl"
+            interface I { attribute T a }
+        """)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _fspec(self, file_name):
+        return os.path.join(self.tmp_dir, file_name)
+
+    def _write(self, file_name, fidl):
+        fspec = self._fspec(file_name)
+        mtime = os.stat(fspec).st_mtime if os.path.exists(fspec) else None
+        with open(fspec, "w") as f:
+            f.write(fidl)
+        if mtime is not None:
+            # Make sure the modification is visible on coarse clocks.
+            os.utime(fspec, (mtime + 1, mtime + 1))
+
+    def _unresolved(self):
+        return "{}:4: Unresolved reference 'Unknown'.".format(
+            self._fspec("b.fidl"))
+
+
+class TestValidator(BaseTestCase):
+    """Test validation with a warm parser."""
+
+    def test_independent_entries(self):
+        validator = Validator([self.tmp_dir])
+        self.assertTrue(validator.validate("a.fidl").valid)
+        processor = validator.processor
+        self.assertTrue(validator.validate("c.fidl").valid)
+        # Each entry is validated with a new processor and the same parser.
+        self.assertIsNot(validator.processor, processor)
+        self.assertIs(validator.processor.parser, processor.parser)
+        self.assertNotIn("A", validator.processor.packages)
+        self.assertEqual(sorted(validator.imports), [
+            os.path.join(self.tmp_dir, name)
+            for name in ("a.fidl", "c.fidl", "common.fidl")])
+
+    def test_parse_cache(self):
+        validator = Validator([self.tmp_dir])
+        self.assertTrue(validator.validate("a.fidl").valid)
+        common = validator.processor.packages["C"]
+        parse = validator.processor.parser.parse
+        parsed = []
+
+        def counting_parse(fidl, *args):
+            parsed.append(fidl)
+            return parse(fidl, *args)
+
+        validator.processor.parser.parse = counting_parse
+        self.assertTrue(validator.validate("c.fidl").valid)
+        # The common import is not parsed again, but each entry links its
+        #   own copy.
+        self.assertEqual(len(parsed), 1)
+        self.assertIsNot(validator.processor.packages["C"], common)
+        self.assertEqual(validator.processor.location(
+            validator.processor.packages["C"].typecollections["TC"]),
+            (self._fspec("common.fidl"), 3, 28))
+        # Only modified files are parsed again.
+        self._write("common.fidl", """
+            package C
+            typeCollection TC { typedef T2 is Int32 }
+        """)
+        result = validator.validate("a.fidl")
+        self.assertEqual(len(parsed), 2)
+        self.assertEqual(result.errors, [
+            "{}:4: Unresolved reference 'T'.".format(self._fspec("a.fidl"))])
+
+    def test_all_errors(self):
+        self._write("e.fidl", """
+            package E
+            import C.TC.* from "common.fidl"
+            import model "nosuch.fidl"
+            interface I {
+                attribute Unknown a
+                method M { in { Unknown2 b } }
+            }
+            interface J extends K { }
+            typeCollection X { typedef }
+        """)
+        validator = Validator([self.tmp_dir])
+        for _ in range(2):
+            # Parser errors are reported for cached files too.
+            self.assertEqual(validator.validate("e.fidl").errors, [
+                "{}:{}".format(self._fspec("e.fidl"), message)
+                for message in (
+                    "10: Syntax error at line 10 near '}'.",
+                    " Model 'nosuch.fidl' not found.",
+                    "6: Unresolved reference 'Unknown'.",
+                    "7: Unresolved reference 'Unknown2'.",
+                    "9: Unresolved namespace reference 'K'.")])
+
+    def test_resident_processor(self):
+        validator = Validator([self.tmp_dir], resident=True)
+        result = validator.validate("a.fidl")
+        self.assertTrue(result.valid)
+        processor = validator.processor
+        common = processor.files[os.path.join(self.tmp_dir, "common.fidl")]
+        result = validator.validate("c.fidl")
+        self.assertTrue(result.valid)
+        # The common import is reused.
+        self.assertIs(validator.processor, processor)
+        self.assertIs(processor.packages["C"], common)
+
+    def test_reset_after_error(self):
+        validator = Validator([self.tmp_dir], resident=True)
+        validator.validate("a.fidl")
+        parser = validator.processor.parser
+        result = validator.validate("b.fidl")
+        self.assertFalse(result.valid)
+        self.assertEqual(result.errors, [self._unresolved()])
+        self.assertNotIn("B", validator.processor.packages)
+        self.assertIs(validator.processor.parser, parser)
+        self.assertTrue(validator.validate("c.fidl").valid)
+
+    def test_unreadable(self):
+        with open(os.path.join(self.tmp_dir, "d.fidl"), "wb") as f:
+            f.write(b"package \xff\xfe\n")
+        validator = Validator([self.tmp_dir])
+        result = validator.validate("d.fidl")
+        self.assertFalse(result.valid)
+        self.assertEqual(len(result.errors), 1)
+        self.assertTrue(validator.validate("a.fidl").valid)
+
+
+class TestBatchValidator(BaseTestCase):
+    """Test batch validation."""
+
+    def _validate(self, jobs):
+        validator = BatchValidator([self.tmp_dir], jobs)
+        results = validator.validate(["a.fidl", "b.fidl", "nosuch.fidl",
+                                      "c.fidl"])
+        self.assertEqual([result.fspec for result in results],
+                         ["a.fidl", "b.fidl", "nosuch.fidl", "c.fidl"])
+        self.assertEqual([result.errors for result in results], [
+            [], [self._unresolved()],
+            ["Model 'nosuch.fidl' not found."], []])
+        summary = validator.summary(results)
+        self.assertEqual(summary["valid"], 2)
+        self.assertEqual(summary["invalid"], 2)
+        self.assertEqual(summary["files"][1]["file"], "b.fidl")
+        self.assertFalse(summary["files"][1]["valid"])
+
+    def test_serial(self):
+        self._validate(1)
+
+    def test_parallel(self):
+        self._validate(2)
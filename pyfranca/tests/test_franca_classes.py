@@ -0,0 +1,217 @@
+"""
+Pyfranca runtime class generation tests.
+"""
+
+import sys
+import unittest
+
+from pyfranca import Processor
+from pyfranca.franca_classes import ClassGenerator, GeneratorException
+from pyfranca.franca_payload import PayloadValidator
+
+try:
+    import enum
+except ImportError:
+    # Python 2 without the enum34 package
+    enum = None
+
+requires_enum = unittest.skipIf(enum is None, "Requires the enum module.")
+
+FIDL = """
+package P
+typeCollection TC {
+    enumeration Base { A B = 5 }
+    enumeration E extends Base { C }
+    struct S { UInt8 u E e }
+    struct D extends S { String class S[] items }
+    map M { E to S }
+    struct Node { UInt32 value Node[] children }
+}
+interface I {
+    method m { in { D d M m } out { Node n } }
+    broadcast b { out { Boolean flag } }
+}
+"""
+
+
+class TestClassGenerator(unittest.TestCase):
+    """Test generated struct, enumeration and argument classes."""
+
+    def setUp(self):
+        processor = Processor()
+        self.package = processor.import_string("test.fidl", FIDL)
+        self.tc = self.package.typecollections["TC"]
+        self.interface = self.package.interfaces["I"]
+        self.generator = ClassGenerator()
+
+    @requires_enum
+    def test_enumeration(self):
+        e = self.generator.enumeration_class(self.tc.enumerations["E"])
+        self.assertEqual(e.__name__, "P_TC_E")
+        self.assertEqual([(member.name, member.value) for member in e],
+                         [("A", 0), ("B", 5), ("C", 6)])
+        self.assertEqual(e.C, 6)
+        table = self.generator.namespace["_P_TC_E_table"]
+        self.assertIs(table["B"], e.B)
+        self.assertIs(table[5], e.B)
+
+    @requires_enum
+    def test_reserved_enumerators(self):
+        package = Processor().import_string("reserved.fidl", """
+            package Q
+            typeCollection TC {
+                enumeration E { mro class name }
+                struct S { E e }
+            }
+        """)
+        tc = package.typecollections["TC"]
+        e = self.generator.enumeration_class(tc.enumerations["E"])
+        self.assertEqual([member.name for member in e],
+                         ["mro_", "class_", "name"])
+        s = self.generator.struct_class(tc.structs["S"])
+        self.assertIs(s.from_dict({"e": "mro"}).e, e.mro_)
+        self.assertIs(s.from_dict({"e": "class"}).e, e.class_)
+        self.assertEqual(s(e.mro_).to_dict(), {"e": 0})
+
+    def test_conflicting_enumerators(self):
+        package = Processor().import_string("conflict.fidl", """
+            package Q
+            typeCollection TC {
+                enumeration E { mro mro_ }
+            }
+        """)
+        with self.assertRaises(GeneratorException) as context:
+            self.generator.enumeration_class(
+                package.typecollections["TC"].enumerations["E"])
+        self.assertEqual(str(context.exception),
+                         "Conflicting enumerator name 'mro_' in 'E'.")
+
+    def test_conflicting_attributes(self):
+        package = Processor().import_string("conflict.fidl", """
+            package Q
+            typeCollection TC {
+                struct S { UInt8 class UInt8 class_ }
+            }
+        """)
+        with self.assertRaises(GeneratorException) as context:
+            self.generator.struct_class(
+                package.typecollections["TC"].structs["S"])
+        self.assertEqual(str(context.exception),
+                         "Conflicting attribute name 'class_' in 'Q_TC_S'.")
+
+    def test_without_enum(self):
+        # Struct classes do not need the enum module.
+        package = Processor().import_string("plain.fidl", """
+            package Q
+            typeCollection TC {
+                struct S { UInt8 u }
+            }
+        """)
+        modules = sys.modules.copy()
+        sys.modules["enum"] = None
+        try:
+            generator = ClassGenerator()
+            s = generator.struct_class(
+                package.typecollections["TC"].structs["S"])
+            namespace = {}
+            exec(compile(generator.source([package]), "generated.py",
+                         "exec"), namespace)
+            with self.assertRaises(ImportError):
+                generator.enumeration_class(self.tc.enumerations["E"])
+        finally:
+            sys.modules.clear()
+            sys.modules.update(modules)
+        self.assertEqual(s(1).u, 1)
+        self.assertEqual(namespace["Q_TC_S"](1).u, 1)
+
+    @requires_enum
+    def test_struct(self):
+        s = self.generator.struct_class(self.tc.structs["S"])
+        d = self.generator.struct_class(self.tc.structs["D"])
+        self.assertTrue(issubclass(d, s))
+        self.assertEqual(d.__slots__, ("class_", "items"))
+        self.assertEqual(d._fields, ("u", "e", "class_", "items"))
+        obj = d(1, 5, "x", [])
+        self.assertEqual((obj.u, obj.e, obj.class_, obj.items),
+                         (1, 5, "x", []))
+        with self.assertRaises(AttributeError):
+            obj.other = 1
+        self.assertEqual(repr(s(1, 0)), "P_TC_S(u=1, e=0)")
+        self.assertEqual(s(1, 0), s(1, 0))
+        self.assertNotEqual(s(1, 0), s(2, 0))
+
+    @requires_enum
+    def test_dicts(self):
+        d = self.generator.struct_class(self.tc.structs["D"])
+        e = self.generator.enumeration_class(self.tc.enumerations["E"])
+        s = self.generator.struct_class(self.tc.structs["S"])
+        value = {"u": 1, "e": "C", "class": "x",
+                 "items": [{"u": 2, "e": 0}]}
+        obj = d.from_dict(value)
+        self.assertIs(obj.e, e.C)
+        self.assertEqual(obj.items, [s(2, e.A)])
+        result = obj.to_dict()
+        self.assertEqual(result, {"u": 1, "e": 6, "class": "x",
+                                  "items": [{"u": 2, "e": 0}]})
+        PayloadValidator().validate(self.tc.structs["D"], result)
+
+    @requires_enum
+    def test_arguments(self):
+        method = self.interface.methods["m"]
+        m_in = self.generator.arguments_class(method, "in")
+        self.assertEqual(m_in.__name__, "P_I_m_in")
+        obj = m_in.from_dict({"d": {"u": 1, "e": "A", "class": "",
+                                    "items": []},
+                              "m": {"B": {"u": 2, "e": "C"}}})
+        s = self.generator.struct_class(self.tc.structs["S"])
+        self.assertEqual(list(obj.m.values()), [s(2, 6)])
+        self.assertEqual(obj.to_dict()["m"], {5: {"u": 2, "e": 6}})
+        node = self.generator.arguments_class(method, "out").from_dict(
+            {"n": {"value": 1, "children": [{"value": 2, "children": []}]}})
+        self.assertEqual(node.n.children[0].value, 2)
+        b = self.generator.arguments_class(self.interface.broadcasts["b"],
+                                           "out")
+        self.assertEqual(b(True).flag, True)
+        with self.assertRaises(ValueError):
+            self.generator.arguments_class(self.interface.broadcasts["b"],
+                                           "in")
+
+    @requires_enum
+    def test_cache(self):
+        d = self.generator.struct_class(self.tc.structs["D"])
+        self.assertIs(self.generator.struct_class(self.tc.structs["D"]), d)
+        self.assertIs(d.__bases__[0],
+                      self.generator.struct_class(self.tc.structs["S"]))
+
+    @requires_enum
+    def test_source(self):
+        source = self.generator.source([self.package])
+        namespace = {}
+        exec(compile(source, "generated.py", "exec"), namespace)
+        for name in ("P_TC_E", "P_TC_S", "P_TC_D", "P_TC_Node", "P_I_m_in",
+                     "P_I_m_out", "P_I_b_out"):
+            self.assertIn(name, namespace)
+        self.assertEqual(source.count("class P_TC_S("), 1)
+        obj = namespace["P_TC_D"].from_dict(
+            {"u": 1, "e": "C", "class": "x", "items": []})
+        self.assertIs(obj.e, namespace["P_TC_E"].C)
+
+    def test_errors(self):
+        processor = Processor()
+        processor.diagnostics = []
+        package = processor.import_string("dup.fidl", """
+            package Q
+            typeCollection TC {
+                enumeration Base { A }
+                enumeration E extends Base { A }
+            }
+        """)
+        with self.assertRaises(GeneratorException) as context:
+            self.generator.enumeration_class(
+                package.typecollections["TC"].enumerations["E"])
+        self.assertEqual(str(context.exception),
+                         "Duplicate enumerator 'A' in 'E'.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Pyfranca binary codec tests.
+"""
+
+import unittest
+
+from pyfranca import Parser, Processor, ast
+from pyfranca.franca_codec import Codec, CodecException
+
+FIDL = """
+package P
+typeCollection TC {
+    enumeration E { A B = 5 C }
+    struct S { UInt8 u Int16 i E e }
+    struct D extends S { String name Boolean flag Double d ByteBuffer b
+                         UInt32 last }
+    array A of UInt16
+    map M { String to S }
+    struct Node { UInt32 value Node[] children }
+}
+interface I {
+    method m { in { UInt8 x A a M m } }
+    broadcast b { out { Float f E[] es } }
+}
+"""
+
+
+class TestCodec(unittest.TestCase):
+    """Test binary payload encoding and decoding."""
+
+    def setUp(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", FIDL)
+        self.tc = package.typecollections["TC"]
+        self.interface = package.interfaces["I"]
+        self.codec = Codec()
+
+    def _round_trip(self, the_type, value, expected):
+        data = self.codec.encode(the_type, value)
+        self.assertEqual(data, expected)
+        return self.codec.decode(the_type, data)
+
+    def test_primitives(self):
+        s = self.tc.structs["S"]
+        value = self._round_trip(s, {"u": 1, "i": -2, "e": "C"},
+                                 b"\x01\xff\xfe\x00\x00\x00\x06")
+        self.assertEqual(value, {"u": 1, "i": -2, "e": "C"})
+        # Enumerators are encoded from values, and decoded to names.
+        self.assertEqual(self.codec.decode(s, self.codec.encode(
+            s, {"u": 1, "i": -2, "e": 5}))["e"], "B")
+
+    def test_variable_size(self):
+        d = self.tc.structs["D"]
+        value = {"u": 1, "i": 2, "e": "A", "name": u"\xe4", "flag": True,
+                 "d": 0.5, "b": b"\x01\x02", "last": 7}
+        data = self.codec.encode(d, value)
+        self.assertEqual(data[7:18],
+                         b"\x00\x00\x00\x03\xc3\xa4\x00\x01\x3f\xe0\x00")
+        self.assertEqual(data[-10:],
+                         b"\x00\x00\x00\x02\x01\x02\x00\x00\x00\x07")
+        self.assertEqual(self.codec.decode(d, data), value)
+
+    def test_containers(self):
+        self.assertEqual(
+            self._round_trip(self.tc.arrays["A"], [1, 2],
+                             b"\x00\x00\x00\x04\x00\x01\x00\x02"),
+            [1, 2])
+        self.assertEqual(
+            self._round_trip(self.tc.maps["M"],
+                             {"k": {"u": 1, "i": 2, "e": "A"}},
+                             b"\x00\x00\x00\x0d"
+                             b"\x00\x00\x00\x02k\x00"
+                             b"\x01\x00\x02\x00\x00\x00\x00"),
+            {"k": {"u": 1, "i": 2, "e": "A"}})
+        node = {"value": 1, "children": [{"value": 2, "children": []}]}
+        self.assertEqual(self.codec.decode(
+            self.tc.structs["Node"],
+            self.codec.encode(self.tc.structs["Node"], node)), node)
+
+    def test_arguments(self):
+        method = self.interface.methods["m"]
+        values = {"x": 3, "a": [], "m": {}}
+        data = self.codec.encode_arguments(method.in_args, values)
+        self.assertEqual(data, b"\x03" + b"\x00" * 8)
+        self.assertEqual(self.codec.decode_arguments(method.in_args, data),
+                         values)
+        broadcast = self.interface.broadcasts["b"]
+        values = {"f": 1.5, "es": ["A", "C"]}
+        self.assertEqual(self.codec.decode_arguments(
+            broadcast.out_args,
+            self.codec.encode_arguments(broadcast.out_args, values)), values)
+
+    def test_options(self):
+        codec = Codec("<", ast.UInt8)
+        self.assertEqual(
+            codec.encode(self.tc.structs["S"], {"u": 1, "i": 2, "e": "B"}),
+            b"\x01\x02\x00\x05")
+        with self.assertRaises(ValueError):
+            Codec("!")
+        with self.assertRaises(ValueError):
+            Codec(enumeration_type=ast.Float)
+
+    def test_errors(self):
+        s = self.tc.structs["S"]
+        with self.assertRaises(CodecException) as context:
+            self.codec.encode(s, {"u": 1, "i": 2})
+        self.assertEqual(str(context.exception), "Missing field 'e'.")
+        with self.assertRaises(CodecException) as context:
+            self.codec.encode(s, {"u": 1, "i": 2, "e": "X"})
+        self.assertEqual(str(context.exception),
+                         "Invalid enumerator 'X' for E.")
+        with self.assertRaises(CodecException):
+            self.codec.encode(s, {"u": 256, "i": 2, "e": "A"})
+        with self.assertRaises(CodecException) as context:
+            self.codec.decode(s, b"\x01\x00")
+        self.assertEqual(str(context.exception), "Truncated payload.")
+        with self.assertRaises(CodecException) as context:
+            self.codec.decode(s, b"\x01\x00\x02\x00\x00\x00\x00\x00")
+        self.assertEqual(str(context.exception),
+                         "Trailing bytes after payload: 1.")
+        with self.assertRaises(CodecException) as context:
+            self.codec.decode(s, b"\x01\x00\x02\x00\x00\x00\x09")
+        self.assertEqual(str(context.exception),
+                         "Invalid enumerator 9 for E.")
+        with self.assertRaises(CodecException) as context:
+            self.codec.decode(self.tc.arrays["A"], b"\x00\x00\x00\x03abc")
+        self.assertEqual(str(context.exception),
+                         "Array length 3 is not a multiple of 2.")
+
+    def test_cache(self):
+        codec = self.codec.compile(self.tc.structs["D"])
+        self.assertIs(self.codec.compile(self.tc.structs["D"]), codec)
+        args = self.interface.methods["m"].in_args
+        self.assertIs(self.codec.compile_arguments(args),
+                      self.codec.compile_arguments(args))
+
+    def test_failed_compile(self):
+        package = Parser().parse("package P typeCollection TC { "
+                                 "struct S1 { S2[] arr X x } "
+                                 "struct S2 { S1 back } }")
+        structs = package.typecollections["TC"].structs
+        structs["S1"].fields["arr"].type.type.reference = structs["S2"]
+        structs["S2"].fields["back"].type.reference = structs["S1"]
+        with self.assertRaises(CodecException):
+            self.codec.compile(structs["S1"])
+        # Types compiled along the way do not refer to the failed struct.
+        with self.assertRaises(CodecException) as context:
+            self.codec.decode(structs["S2"], b"\x00\x00\x00\x00\x01")
+        self.assertEqual(str(context.exception), "Unresolved reference 'X'.")
+        structs["S1"].fields["x"].type.reference = ast.UInt8()
+        self.assertEqual(
+            self.codec.decode(structs["S2"], b"\x00\x00\x00\x00\x01"),
+            {"back": {"arr": [], "x": 1}})
+
+    def test_typedef_chain(self):
+        count = 3000
+        fidl = ["package Q", "typeCollection TC {"]
+        fidl += ["typedef T{} is T{}".format(index, index + 1)
+                 for index in range(count)]
+        fidl += ["typedef T{} is UInt16".format(count), "}"]
+        package = Processor().import_string("chain.fidl", "\n".join(fidl))
+        typedefs = package.typecollections["TC"].typedefs
+        self.assertEqual(self.codec.encode(typedefs["T0"], 7), b"\x00\x07")
+        self.assertIs(self.codec.compile(typedefs["T10"]),
+                      self.codec.compile(typedefs["T0"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Pyfranca validator daemon tests.
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from pyfranca import ParserException
+from pyfranca.franca_daemon import DaemonException, ValidatorDaemon, \
+    ValidatorClient, ValidatorServer
+
+
+class BaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self._write("common.fidl", """
+            package C
+            typeCollection TC { typedef T is Int32 }
+        """)
+        self._write("a.fidl", """
+            package A
+            import C.TC.* from "common.fidl"
+            interface I {
+                version { major 1 minor 2 }
+                method M { in { T a } out { String[] b } }
+            }
+        """)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _fspec(self, file_name):
+        return os.path.join(self.tmp_dir, file_name)
+
+    def _write(self, file_name, fidl):
+        fspec = self._fspec(file_name)
+        mtime = os.stat(fspec).st_mtime if os.path.exists(fspec) else None
+        with open(fspec, "w") as f:
+            f.write(fidl)
+        if mtime is not None:
+            # Make sure the modification is visible on coarse clocks.
+            os.utime(fspec, (mtime + 1, mtime + 1))
+
+
+class TestDaemon(BaseTestCase):
+    """Test request handling."""
+
+    def setUp(self):
+        super(TestDaemon, self).setUp()
+        self.daemon = ValidatorDaemon([self.tmp_dir])
+
+    def test_validate(self):
+        response = self.daemon.handle(
+            {"command": "validate", "files": [self._fspec("a.fidl")]})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["result"]["valid"], 1)
+        processor = self.daemon.validator.processor
+        self.assertIn(self._fspec("common.fidl"), processor.files)
+        # Unchanged files are not reloaded.
+        self.daemon.handle(
+            {"command": "validate", "files": [self._fspec("a.fidl")]})
+        self.assertIs(self.daemon.validator.processor, processor)
+
+    def test_reload_on_change(self):
+        self.daemon.handle(
+            {"command": "validate", "files": [self._fspec("a.fidl")]})
+        self._write("common.fidl", """
+            package C
+            typeCollection TC { typedef T2 is Int32 }
+        """)
+        response = self.daemon.handle(
+            {"command": "validate", "files": [self._fspec("a.fidl")]})
+        self.assertEqual(response["result"]["invalid"], 1)
+        self.assertEqual(
+            response["result"]["files"][0]["errors"],
+            ["{}:6: Unresolved reference 'T'.".format(self._fspec("a.fidl"))])
+
+    def test_dump_and_query(self):
+        response = self.daemon.handle(
+            {"command": "dump", "file": self._fspec("a.fidl")})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["result"]["name"], "A")
+        self.assertEqual(response["result"]["interfaces"][0]["methods"],
+                         ["M"])
+        response = self.daemon.handle({"command": "query", "fqn": "A.I.M"})
+        self.assertEqual(response["result"]["kind"], "method")
+        self.assertEqual(response["result"]["in_args"], {"a": "C.TC.T"})
+        self.assertEqual(response["result"]["out_args"], {"b": "String[]"})
+        response = self.daemon.handle({"command": "query", "fqn": "A.I"})
+        self.assertEqual(response["result"]["version"], "1.2")
+        response = self.daemon.handle({"command": "query", "fqn": "A.X"})
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["error"], "'A.X' not found.")
+
+    def test_invalid_request(self):
+        response = self.daemon.handle({"command": "nosuch"})
+        self.assertEqual(response["error"], "Unknown command 'nosuch'.")
+        response = self.daemon.handle({"command": "dump"})
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["error"],
+                         "Invalid or missing argument 'file'.")
+        response = self.daemon.handle({"command": "validate", "files": 1})
+        self.assertEqual(response["error"],
+                         "Invalid or missing argument 'files'.")
+        response = self.daemon.handle(["ping"])
+        self.assertEqual(response["error"], "Invalid request.")
+
+    def test_internal_errors(self):
+        errors = [ParserException("Syntax error."),
+                  EnvironmentError("Permission denied."),
+                  ValueError("Invalid value.")]
+
+        def validate(fspec):
+            raise errors.pop(0)
+
+        self.daemon.validator.validate = validate
+        for message in ("Syntax error.", "Permission denied.",
+                        "Invalid value."):
+            response = self.daemon.handle(
+                {"command": "dump", "file": self._fspec("a.fidl")})
+            self.assertEqual(response,
+                             {"ok": False, "error": message})
+
+
+class TestServer(BaseTestCase):
+    """Test the socket server and client."""
+
+    def test_round_trip(self):
+        socket_path = self._fspec("daemon.sock")
+        server = ValidatorServer(socket_path, [self.tmp_dir])
+        thread = threading.Thread(target=server.serve)
+        thread.start()
+        try:
+            client = ValidatorClient(socket_path, timeout=10)
+            self.assertEqual(client.request("ping"), "pong")
+            summary = client.validate([self._fspec("a.fidl")])
+            self.assertEqual(summary["valid"], 1)
+            start = time.time()
+            summary = client.validate([self._fspec("a.fidl")])
+            self.assertEqual(summary["valid"], 1)
+            self.assertLess(time.time() - start, 1.0)
+            with self.assertRaises(DaemonException):
+                client.query("No.Such")
+            client.shutdown()
+            client.close()
+        finally:
+            thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(socket_path))
+
+    def test_socket_path(self):
+        # Only stale sockets are removed.
+        fspec = self._fspec("a.fidl")
+        with self.assertRaises(DaemonException) as context:
+            ValidatorServer(fspec, [self.tmp_dir])
+        self.assertEqual(str(context.exception),
+                         "'{}' is not a socket.".format(fspec))
+        self.assertTrue(os.path.exists(fspec))
+        socket_path = self._fspec("daemon.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+        server = ValidatorServer(socket_path, [self.tmp_dir])
+        server.server_close()
+        os.unlink(socket_path)
+
+    def test_concurrent_clients(self):
+        socket_path = self._fspec("daemon.sock")
+        server = ValidatorServer(socket_path, [self.tmp_dir])
+        thread = threading.Thread(target=server.serve)
+        thread.start()
+        try:
+            idle = ValidatorClient(socket_path, timeout=10)
+            self.assertEqual(idle.request("ping"), "pong")
+            # An open connection does not block other clients.
+            client = ValidatorClient(socket_path, timeout=10)
+            self.assertEqual(client.request("ping"), "pong")
+            client.shutdown()
+            client.close()
+            idle.close()
+        finally:
+            thread.join(10)
+        self.assertFalse(thread.is_alive())
@@ -0,0 +1,130 @@
+"""
+Pyfranca dependency file tests.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyfranca import Processor
+from pyfranca.franca_deps import closure, format_dependencies, \
+    read_dependencies, up_to_date, write_dependencies
+
+
+class TestClosure(unittest.TestCase):
+    """Test the import closure."""
+
+    def test_closure(self):
+        imports = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "e": ["a"]}
+        self.assertEqual(closure(imports, ["a"]), ["a", "b", "d", "c"])
+        self.assertEqual(closure(imports, ["c", "e"]),
+                         ["c", "d", "e", "a", "b"])
+        self.assertEqual(closure(imports, ["x"]), ["x"])
+
+    def test_cycle(self):
+        imports = {"a": ["b"], "b": ["a"]}
+        self.assertEqual(closure(imports, ["a"]), ["a", "b"])
+
+
+class TestDependencyFiles(unittest.TestCase):
+    """Test dependency file writing and reading."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _fspec(self, file_name):
+        return os.path.join(self.tmp_dir, file_name)
+
+    def _write(self, file_name, fidl, mtime=None):
+        with open(self._fspec(file_name), "w") as f:
+            f.write(fidl)
+        if mtime is not None:
+            os.utime(self._fspec(file_name), (mtime, mtime))
+
+    def test_format(self):
+        self.assertEqual(
+            format_dependencies("out.h", ["a.fidl", "my dir/b$.fidl"]),
+            "out.h: \\\n a.fidl \\\n my\\ dir/b$$.fidl\n"
+            "\na.fidl:\n\nmy\\ dir/b$$.fidl:\n")
+        self.assertEqual(format_dependencies("out.h", []), "out.h:\n")
+
+    def test_round_trip(self):
+        dependencies = ["a.fidl", "my dir/b$.fidl", "c#.fidl", "d\\e.fidl"]
+        write_dependencies(self._fspec("x.d"), "out dir/x.h", dependencies)
+        self.assertEqual(read_dependencies(self._fspec("x.d")),
+                         ("out dir/x.h", dependencies))
+
+    def test_invalid(self):
+        self._write("x.d", "no rule\n")
+        with self.assertRaises(ValueError):
+            read_dependencies(self._fspec("x.d"))
+
+    def test_processor(self):
+        self._write("common.fidl", "package C")
+        self._write("b.fidl", """
+            package B
+            import model "common.fidl"
+        """)
+        self._write("a.fidl", """
+            package A
+            import model "b.fidl"
+            import model "common.fidl"
+        """)
+        processor = Processor()
+        processor.package_paths.append(self.tmp_dir)
+        processor.import_file("a.fidl")
+        processor.import_string("other.fidl", "package O")
+        fspecs = [self._fspec(name)
+                  for name in ("a.fidl", "b.fidl", "common.fidl")]
+        self.assertEqual(processor.dependencies(["a.fidl"]), fspecs)
+        self.assertEqual(processor.dependencies(["b.fidl"]), fspecs[1:])
+        self.assertEqual(sorted(processor.dependencies()),
+                         sorted(fspecs + ["other.fidl"]))
+        processor.write_dependencies(self._fspec("a.d"), "a.h", ["a.fidl"])
+        self.assertEqual(read_dependencies(self._fspec("a.d")),
+                         ("a.h", fspecs))
+
+    def test_up_to_date(self):
+        stamp = self._fspec("x.stamp")
+        a = self._fspec("a.fidl")
+        b = self._fspec("b.fidl")
+        self._write("a.fidl", "package A", 1000)
+        self._write("b.fidl", "package B", 1000)
+        self.assertFalse(up_to_date(stamp, [a]))
+        write_dependencies(stamp, stamp, [a, b])
+        os.utime(stamp, (2000, 2000))
+        self.assertTrue(up_to_date(stamp, [a]))
+        # New entry file
+        self.assertFalse(up_to_date(stamp, [a, self._fspec("c.fidl")]))
+        # Modified import
+        os.utime(b, (3000, 3000))
+        self.assertFalse(up_to_date(stamp, [a]))
+        # Deleted import
+        os.remove(b)
+        self.assertFalse(up_to_date(stamp, [a]))
+
+    def test_processor_up_to_date(self):
+        self._write("common.fidl", "package C", 1000)
+        self._write("a.fidl", """
+            package A
+            import model "common.fidl"
+        """, 1000)
+        stamp = self._fspec("a.stamp")
+        processor = Processor()
+        processor.package_paths.append(self.tmp_dir)
+        processor.import_file("a.fidl")
+        processor.write_dependencies(stamp, stamp, ["a.fidl"])
+        os.utime(stamp, (2000, 2000))
+        # Entry files found in the package paths are recorded with their
+        #   paths.
+        processor = Processor()
+        processor.package_paths.append(self.tmp_dir)
+        self.assertFalse(up_to_date(stamp, ["a.fidl"]))
+        self.assertTrue(processor.up_to_date(stamp, ["a.fidl"]))
+        self.assertFalse(processor.up_to_date(stamp, ["nosuch.fidl"]))
+        os.utime(self._fspec("common.fidl"), (3000, 3000))
+        self.assertFalse(processor.up_to_date(stamp, ["a.fidl"]))
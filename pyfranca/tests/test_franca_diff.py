@@ -0,0 +1,290 @@
+"""
+Pyfranca model comparison tests.
+"""
+
+import unittest
+
+from pyfranca import Processor, Change, Differ
+
+
+class BaseTestCase(unittest.TestCase):
+
+    @staticmethod
+    def _load(fidl):
+        processor = Processor()
+        processor.import_string("test.fidl", fidl)
+        return processor
+
+    def _compare(self, old, new):
+        return Differ().compare(self._load(old), self._load(new))
+
+    def _assertChanges(self, changes, expected):
+        self.assertEqual(
+            [(change.element, change.action, change.fqn)
+             for change in changes], expected)
+
+
+class TestNamespaces(BaseTestCase):
+    """Test namespace level changes."""
+
+    def test_unchanged(self):
+        fidl = """
+            package P
+            typeCollection TC {
+                version { major 1 minor 0 }
+                typedef A is Int32
+            }
+            interface I {
+                method M { in { A a } }
+            }
+        """
+        self.assertEqual(self._compare(fidl, fidl), [])
+
+    def test_namespace_added_and_removed(self):
+        changes = self._compare("""
+            package P
+            interface I { }
+        """, """
+            package P
+            interface I2 { }
+        """)
+        self._assertChanges(changes, [
+            ("interface", Change.REMOVED, "P.I"),
+            ("interface", Change.ADDED, "P.I2"),
+        ])
+        self.assertTrue(changes[0].breaking)
+        self.assertFalse(changes[1].breaking)
+
+    def test_package_renamed(self):
+        changes = self._compare("package P", "package P2")
+        self._assertChanges(changes, [
+            ("package", Change.REMOVED, "P"),
+            ("package", Change.ADDED, "P2"),
+        ])
+
+    def test_version_bump_missing(self):
+        changes = self._compare("""
+            package P
+            interface I {
+                version { major 1 minor 0 }
+                method M { }
+            }
+        """, """
+            package P
+            interface I {
+                version { major 1 minor 1 }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("method", Change.REMOVED, "P.I.M"),
+            ("interface", Change.VERSION_BUMP_MISSING, "P.I"),
+        ])
+        self.assertEqual(str(changes[1]),
+                         "Interface 'P.I' version bump missing (1.0 -> 1.1).")
+
+    def test_version_bumped(self):
+        changes = self._compare("""
+            package P
+            interface I {
+                version { major 1 minor 0 }
+            }
+        """, """
+            package P
+            interface I {
+                version { major 1 minor 1 }
+                method M { }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("method", Change.ADDED, "P.I.M"),
+        ])
+
+
+class TestMembers(BaseTestCase):
+    """Test namespace member changes."""
+
+    def test_argument_type_changed(self):
+        changes = self._compare("""
+            package P
+            interface I {
+                method M { in { Int32 a } out { String b } }
+            }
+        """, """
+            package P
+            interface I {
+                method M { in { Int64 a } out { String b String c } }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("argument", Change.TYPE_CHANGED, "P.I.M.in.a"),
+            ("argument", Change.ADDED, "P.I.M.out.c"),
+            ("interface", Change.VERSION_BUMP_MISSING, "P.I"),
+        ])
+        self.assertEqual(changes[0].old, "Int32")
+        self.assertEqual(changes[0].new, "Int64")
+
+    def test_reference_type_name(self):
+        changes = self._compare("""
+            package P
+            typeCollection TC {
+                typedef A is Int32
+                typedef B is Int32
+                typedef C is A[]
+            }
+        """, """
+            package P
+            typeCollection TC {
+                typedef A is Int32
+                typedef B is Int32
+                typedef C is B[]
+            }
+        """)
+        self.assertEqual(changes[0].old, "P.TC.A[]")
+        self.assertEqual(changes[0].new, "P.TC.B[]")
+
+    def test_enumerator_value_changed(self):
+        changes = self._compare("""
+            package P
+            typeCollection TC {
+                enumeration E { A B C = 5 D }
+            }
+        """, """
+            package P
+            typeCollection TC {
+                enumeration E { A B = 2 C = 5 D E }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("enumerator", Change.VALUE_CHANGED, "P.TC.E.B"),
+            ("enumerator", Change.ADDED, "P.TC.E.E"),
+            ("typeCollection", Change.VERSION_BUMP_MISSING, "P.TC"),
+        ])
+        self.assertEqual((changes[0].old, changes[0].new), (1, 2))
+
+    def test_hash_collision(self):
+        # hash(-1) == hash(-2) in CPython
+        changes = self._compare("""
+            package P
+            typeCollection TC {
+                enumeration E { A = -1 }
+            }
+        """, """
+            package P
+            typeCollection TC {
+                enumeration E { A = -2 }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("enumerator", Change.VALUE_CHANGED, "P.TC.E.A"),
+            ("typeCollection", Change.VERSION_BUMP_MISSING, "P.TC"),
+        ])
+
+    def test_extends_spelling(self):
+        changes = self._compare("""
+            package P
+            typeCollection TC {
+                enumeration Base { A }
+                enumeration E extends Base { B }
+                struct S { Int32 a }
+                struct D extends S { }
+            }
+            interface Base { }
+            interface I extends Base { }
+        """, """
+            package P
+            typeCollection TC {
+                enumeration Base { A }
+                enumeration E extends P.TC.Base { B }
+                struct S { Int32 a }
+                struct D extends P.TC.S { }
+            }
+            interface Base { }
+            interface I extends P.Base { }
+        """)
+        self.assertEqual(changes, [])
+
+    def test_extends_changed(self):
+        changes = self._compare("""
+            package P
+            typeCollection TC {
+                struct S { Int32 a }
+                struct S2 { Int32 a }
+                struct D extends S { }
+            }
+        """, """
+            package P
+            typeCollection TC {
+                struct S { Int32 a }
+                struct S2 { Int32 a }
+                struct D extends S2 { }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("struct", Change.EXTENDS_CHANGED, "P.TC.D"),
+            ("typeCollection", Change.VERSION_BUMP_MISSING, "P.TC"),
+        ])
+        self.assertEqual((changes[0].old, changes[0].new),
+                         ("P.TC.S", "P.TC.S2"))
+
+    def test_kind_changed(self):
+        changes = self._compare("""
+            package P
+            typeCollection TC {
+                typedef A is Int32
+            }
+        """, """
+            package P
+            typeCollection TC {
+                struct A { Int32 a }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("typedef", Change.KIND_CHANGED, "P.TC.A"),
+            ("typeCollection", Change.VERSION_BUMP_MISSING, "P.TC"),
+        ])
+
+    def test_struct_fields(self):
+        changes = self._compare("""
+            package P
+            typeCollection TC {
+                struct S { Int32 a Int32 b String c }
+            }
+        """, """
+            package P
+            typeCollection TC {
+                struct S { Int32 b Int32 a }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("field", Change.REMOVED, "P.TC.S.c"),
+            ("field", Change.ORDER_CHANGED, "P.TC.S"),
+            ("typeCollection", Change.VERSION_BUMP_MISSING, "P.TC"),
+        ])
+
+    def test_flags_changed(self):
+        changes = self._compare("""
+            package P
+            interface I {
+                method M { }
+            }
+        """, """
+            package P
+            interface I {
+                method M fireAndForget { }
+            }
+        """)
+        self._assertChanges(changes, [
+            ("method", Change.FLAGS_CHANGED, "P.I.M"),
+            ("interface", Change.VERSION_BUMP_MISSING, "P.I"),
+        ])
+
+    def test_structural_hash_memoized(self):
+        old = self._load("""
+            package P
+            interface I { method M { } }
+        """)
+        differ = Differ()
+        namespace = old.packages["P"].interfaces["I"]
+        self.assertEqual(differ.structural_hash(namespace),
+                         differ.structural_hash(namespace))
+        self.assertEqual(differ.compare(old, old), [])
@@ -0,0 +1,106 @@
+"""
+Pyfranca model graph tests.
+"""
+
+import unittest
+
+from pyfranca import Processor, ProcessorException
+from pyfranca.franca_graph import cycles, import_cycles, \
+    strongly_connected_components, type_cycles
+from pyfranca.franca_loaders import DictLoader
+
+
+class TestComponents(unittest.TestCase):
+    """Test strongly connected components."""
+
+    def test_components(self):
+        graph = {"a": ["b"], "b": ["c", "a"], "c": ["d"], "d": [],
+                 "e": ["e"]}
+        components = strongly_connected_components(sorted(graph),
+                                                   graph.__getitem__)
+        self.assertEqual([sorted(component) for component in components],
+                         [["d"], ["c"], ["a", "b"], ["e"]])
+        self.assertEqual([sorted(component) for component in
+                          cycles(sorted(graph), graph.__getitem__)],
+                         [["a", "b"], ["e"]])
+
+    def test_large(self):
+        # Deeper than the recursion limit
+        count = 100000
+        components = strongly_connected_components(
+            [0], lambda node: [(node + 1) % count])
+        self.assertEqual(len(components), 1)
+        self.assertEqual(len(components[0]), count)
+        chain = strongly_connected_components(
+            [0], lambda node: [node + 1] if node + 1 < count else [])
+        self.assertEqual(len(chain), count)
+        self.assertEqual(chain[0], [count - 1])
+
+    def test_imports(self):
+        self.assertEqual(import_cycles({"a.fidl": ["b.fidl"],
+                                        "b.fidl": ["c.fidl"],
+                                        "c.fidl": ["b.fidl"]}),
+                         [["c.fidl", "b.fidl"]])
+        processor = Processor()
+        processor.loaders = [DictLoader({
+            "a.fidl": 'package A import model "b.fidl"',
+            "b.fidl": 'package B import model "a.fidl"',
+            "c.fidl": 'package C import model "a.fidl"',
+        })]
+        processor.import_file("c.fidl")
+        self.assertEqual(processor.import_cycles(), [["b.fidl", "a.fidl"]])
+
+
+class TestTypeCycles(unittest.TestCase):
+    """Test recursive type detection."""
+
+    def test_recursive(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", """
+            package P
+            typeCollection TC {
+                struct Node { UInt32 value Node[] children }
+                map Tree { String to Tree }
+                struct S { UInt8 u }
+            }
+        """)
+        tc = package.typecollections["TC"]
+        self.assertEqual(
+            [sorted(type(item).__name__ for item in component)
+             for component in type_cycles([tc])],
+            [["Array", "Struct"], ["Map"]])
+        self.assertEqual(type_cycles([tc], infinite=True), [])
+
+    def test_infinite(self):
+        processor = Processor()
+        processor.diagnostics = []
+        processor.import_string("test.fidl", """
+            package P
+            typeCollection TC {
+                struct S { UInt8 u T t }
+                typedef T is S
+                struct Base { Derived d }
+                struct Derived extends Base { }
+                struct Valid { S[] items }
+            }
+        """)
+        self.assertEqual(
+            sorted((item.line, item.message)
+                   for item in processor.diagnostics),
+            [(4, "Recursive type 'S'."),
+             (5, "Circular reference 'T'."),
+             (6, "Recursive type 'Base'."),
+             (7, "Recursive type 'Derived'.")])
+
+    def test_raise(self):
+        processor = Processor()
+        with self.assertRaises(ProcessorException) as context:
+            processor.import_string("test.fidl", """
+                package P
+                interface I { struct S { S s } }
+            """)
+        self.assertEqual(str(context.exception), "Recursive type 'S'.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+"""
+Pyfranca incremental parser tests.
+"""
+
+import random
+import unittest
+
+from pyfranca import Parser, ast
+from pyfranca.franca_incremental import IncrementalParser, TextEdit
+from pyfranca.franca_locations import SourceMap
+
+
+FIDL = u"""package P
+import model "x.fidl"
+typeCollection TC {
+    enumeration E { A B = 2 }
+    struct S { E e UInt8 f }
+}
+interface I {
+    attribute TC.S a
+    method M { in { UInt8 x } error E }
+    broadcast B { out { S s } }
+}
+interface J extends I {
+    version { major 1 minor 0 }
+    attribute UInt16 z
+}
+"""
+
+
+def _summary(package, sources):
+    """
+    Summarize the definitions and locations of a package.
+    """
+    if package is None:
+        return None
+
+    def location(node):
+        resolved = sources.resolve(node.location)
+        return resolved[1:] if resolved else None
+
+    summary = [package.name]
+    for package_import in package.imports:
+        summary.append((package_import.file, location(package_import)))
+    for namespace in list(package.typecollections.values()) + \
+            list(package.interfaces.values()):
+        summary.append((namespace.name, location(namespace)))
+        for name in ("typedefs", "enumerations", "structs", "attributes",
+                     "methods", "broadcasts"):
+            for item in getattr(namespace, name, {}).values():
+                summary.append((item.name, location(item)))
+                for field in getattr(item, "fields", {}).values():
+                    summary.append((field.name, location(field),
+                                    location(field.type)))
+    return summary
+
+
+class TestIncrementalParser(unittest.TestCase):
+    """Test incremental parsing."""
+
+    def setUp(self):
+        self.parser = IncrementalParser("test.fidl")
+
+    def _edit(self, old, new, count=1):
+        start = self.parser.text.index(old)
+        for _ in range(count - 1):
+            start = self.parser.text.index(old, start + 1)
+        return self.parser.edit([TextEdit(start, start + len(old), new)])
+
+    def _check(self):
+        """
+        Compare the incremental parse to a complete one.
+        """
+        sources = SourceMap()
+        parser = Parser()
+        parser.file_index = sources.add("test.fidl", self.parser.text)
+        diagnostics = []
+        package = parser.parse(self.parser.text, None, diagnostics)
+        self.assertEqual(_summary(self.parser.package, self.parser.sources),
+                         _summary(package, sources))
+        self.assertEqual(
+            [(item.line, item.message) for item in self.parser.diagnostics],
+            [(item.line, item.message) for item in diagnostics])
+
+    def test_parse(self):
+        package = self.parser.parse(FIDL)
+        self.assertEqual(package.name, "P")
+        self.assertEqual(package.files, ["test.fidl"])
+        self.assertEqual(self.parser.reparsed, 5)
+        self._check()
+
+    def test_edit(self):
+        package = self.parser.parse(FIDL)
+        tc = package.typecollections["TC"]
+        i = package.interfaces["I"]
+        j = package.interfaces["J"]
+        package = self._edit("attribute TC.S a", "attribute TC.S b\n")
+        # Only the edited definition is parsed again.
+        self.assertEqual(self.parser.reparsed, 1)
+        self.assertIs(package.interfaces["J"], j)
+        self.assertIs(package.typecollections["TC"], tc)
+        self.assertIsNot(package.interfaces["I"], i)
+        self.assertEqual(list(package.interfaces["I"].attributes.keys()),
+                         ["b"])
+        # Locations of reused definitions follow the edit.
+        self.assertEqual(self.parser.sources.resolve(j.location),
+                         ("test.fidl", 13, 11))
+        self._check()
+
+    def test_multiple_edits(self):
+        self.parser.parse(FIDL)
+        start = FIDL.index("interface J")
+        package = self.parser.edit([TextEdit(start, start, u"\n\n"),
+                                    TextEdit(0, 9, u"package Q")])
+        self.assertEqual(package.name, "Q")
+        # I and J, as the edit may continue I, and the package statement
+        self.assertEqual(self.parser.reparsed, 3)
+        self._check()
+
+    def test_new_definition(self):
+        self.parser.parse(FIDL)
+        package = self._edit("interface J", "interface K { }\ninterface J")
+        self.assertEqual(list(package.interfaces.keys()), ["I", "K", "J"])
+        self._check()
+
+    def test_errors(self):
+        self.parser.parse(FIDL)
+        self._edit("UInt8 x", "UInt8 $")
+        self._edit("UInt16 z", "UInt16")
+        self.assertEqual(
+            [(item.file, item.line, item.message)
+             for item in self.parser.diagnostics],
+            [("test.fidl", 9, "Illegal character '$' at line 9."),
+             ("test.fidl", 9, "Syntax error at line 9 near '}'."),
+             ("test.fidl", 15, "Syntax error at line 15 near '}'.")])
+        self._check()
+        # Errors below an edit changing line numbers are updated.
+        self._edit("{\n", "{\n\n")
+        self.assertEqual(self.parser.diagnostics[-1].line, 16)
+        self._check()
+        self._edit("UInt8 $", "UInt8 x")
+        self._edit("UInt16", "UInt16 z")
+        self.assertEqual(self.parser.diagnostics, [])
+        self.assertEqual(list(self.parser.package.interfaces["J"].attributes),
+                         ["z"])
+
+    def test_package(self):
+        self.parser.parse(FIDL)
+        self.assertIsNone(self._edit("package", "packag"))
+        self._check()
+        self.assertIsNone(self.parser.edit(
+            [TextEdit(0, len(self.parser.text), u" ")]))
+        self.assertEqual(self.parser.diagnostics[0].message,
+                         "Reached unexpected end of file.")
+
+    def test_package_comment(self):
+        self.parser.parse(FIDL)
+        # The edited definition contains no tokens.
+        self.assertIsNone(self.parser.edit([TextEdit(0, 9, u"//")]))
+        self.assertEqual(
+            [(item.line, item.message) for item in self.parser.diagnostics],
+            [(2, "Syntax error at line 2 near 'import'.")])
+        self._check()
+        package = self.parser.edit([TextEdit(0, 2, u"package R")])
+        self.assertEqual(package.name, "R")
+        self._check()
+
+    def test_random_edits(self):
+        generator = random.Random(42)
+        fragments = [u"{", u"}", u" ", u"\n", u"interface K { }", u"x",
+                     u"attribute UInt8 q\n", u"$", u"typeCollection",
+                     u"package Q ", u"//c\n", u""]
+        self.parser.parse(FIDL)
+        for _ in range(100):
+            start = generator.randint(0, len(self.parser.text))
+            end = min(len(self.parser.text),
+                      start + generator.choice([0, 0, 1, 3, 10]))
+            self.parser.edit([TextEdit(start, end,
+                                       generator.choice(fragments))])
+            self._check()
+
+    def test_comments(self):
+        self.parser.parse(FIDL)
+        self._edit("    attribute UInt16 z", "    */ attribute UInt16 z")
+        self._check()
+        # A comment continuing into the following definition
+        package = self._edit("error E }", "error E } /*")
+        self.assertEqual(list(package.interfaces.keys()), ["I"])
+        self._check()
+        package = self._edit("*/", "")
+        self.assertEqual(list(package.interfaces.keys()), ["I", "J"])
+        self._check()
+        self._edit("/*", "//")
+        self._check()
+        self._edit("//", "")
+        self._check()
+        # A comment ending after an unterminated one in a preceding
+        #   definition
+        self._edit("typeCollection TC {", "typeCollection TC { /*")
+        self._check()
+        package = self._edit("attribute UInt16 z", "attribute UInt16 z */")
+        self.assertEqual(list(package.interfaces.keys()), [])
+        self._check()
+
+    def test_random_comment_edits(self):
+        generator = random.Random(7)
+        fragments = [u"/*", u"*/", u"//", u"/", u"*", u"\n", u"<**",
+                     u"**>", u"\"", u"interface K { }", u" ", u""]
+        for _ in range(5):
+            self.parser.parse(FIDL)
+            for _ in range(20):
+                start = generator.randint(0, len(self.parser.text))
+                end = min(len(self.parser.text),
+                          start + generator.choice([0, 0, 1, 2, 10]))
+                self.parser.edit([TextEdit(start, end,
+                                           generator.choice(fragments))])
+                self._check()
+
+    def test_positions(self):
+        self.parser.parse(FIDL)
+        offset = self.parser.offset(8, 15)
+        self.assertEqual(FIDL[offset:offset + 4], u"TC.S")
+        self.assertEqual(self.parser.position(offset), (8, 15))
+        nodes = self.parser.nodes_at(offset)
+        self.assertEqual([node.name for node in nodes], ["I"])
+        self.assertIsInstance(self.parser.nodes_at(15)[0], ast.Import)
+
+    def test_invalid_edit(self):
+        with self.assertRaises(ValueError):
+            self.parser.edit([TextEdit(0, 0, u"")])
+        self.parser.parse(FIDL)
+        with self.assertRaises(ValueError):
+            self.parser.edit([TextEdit(0, len(FIDL) + 1, u"")])
+
+
+if __name__ == '__main__':
+    unittest.main()
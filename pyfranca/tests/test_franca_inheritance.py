@@ -0,0 +1,264 @@
+"""
+Pyfranca inheritance table tests.
+"""
+
+import unittest
+
+from pyfranca import Parser, Processor, ProcessorException
+from pyfranca.franca_inheritance import InheritanceException, \
+    enumeration_table, interface_table, struct_table, update_tables
+
+
+class TestEnumerationTables(unittest.TestCase):
+    """Test flattened enumeration tables."""
+
+    def _import(self, fidl, diagnostics=None):
+        processor = Processor()
+        processor.diagnostics = diagnostics
+        package = processor.import_string("test.fidl", fidl)
+        return package.typecollections["TC"]
+
+    def test_tables(self):
+        tc = self._import("""
+            package P
+            typeCollection TC {
+                enumeration E extends Base { C D = 2 F }
+                enumeration Base { A B = 5 }
+            }
+        """)
+        table = tc.enumerations["E"].table
+        self.assertEqual(table.names, ("A", "B", "C", "D", "F"))
+        self.assertEqual(table.values, (0, 5, 6, 2, 3))
+        self.assertEqual(table.by_name["F"], 3)
+        self.assertEqual(table.by_value[6], "C")
+        self.assertEqual(len(table), 5)
+        self.assertIs(enumeration_table(tc.enumerations["E"]), table)
+        self.assertEqual(tc.enumerations["Base"].table.items(),
+                         [("A", 0), ("B", 5)])
+
+    def test_imported_base(self):
+        processor = Processor()
+        processor.import_string("base.fidl", """
+            package B
+            typeCollection TC { enumeration Base { A B } }
+        """)
+        package = processor.import_string("test.fidl", """
+            package P
+            import B.TC.* from "base.fidl"
+            typeCollection TC { enumeration E extends Base { C } }
+        """)
+        self.assertEqual(
+            package.typecollections["TC"].enumerations["E"].table.values,
+            (0, 1, 2))
+
+    def test_conflicts(self):
+        with self.assertRaises(ProcessorException) as context:
+            self._import("""
+                package P
+                typeCollection TC {
+                    enumeration Base { A B }
+                    enumeration E extends Base { B }
+                }
+            """)
+        self.assertEqual(str(context.exception),
+                         "Duplicate enumerator 'B' in 'E'.")
+
+    def test_aliases(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", """
+            package P
+            typeCollection TC {
+                enumeration Base { A B = 3 }
+                enumeration E extends Base { C = 0 }
+                enumeration F { A = 1 B = 0 C }
+            }
+        """)
+        tc = package.typecollections["TC"]
+        table = tc.enumerations["E"].table
+        self.assertEqual(table.values, (0, 3, 0))
+        self.assertEqual(table.by_name["C"], 0)
+        self.assertEqual(table.by_value[0], "A")
+        self.assertEqual(table.aliases, (("C", 0, "A"),))
+        table = tc.enumerations["F"].table
+        self.assertEqual(table.items(), [("A", 1), ("B", 0), ("C", 1)])
+        self.assertEqual(table.by_value[1], "A")
+        self.assertEqual(
+            [(item.line, item.message) for item in processor.warnings],
+            [(5, "Enumerator 'C' in 'E' repeats the value 0 of 'A'."),
+             (6, "Enumerator 'C' in 'F' repeats the value 1 of 'A'.")])
+
+    def test_cycles(self):
+        diagnostics = []
+        tc = self._import("""
+            package P
+            typeCollection TC {
+                enumeration A extends B { X }
+                enumeration B extends A { Y }
+                enumeration C extends A { Z }
+            }
+        """, diagnostics)
+        # Errors are reported once, for the enumerations in the cycle.
+        self.assertEqual([(item.line, item.message) for item in diagnostics],
+                         [(4, "Enumeration inheritance cycle at 'A'."),
+                          (5, "Enumeration inheritance cycle at 'B'.")])
+        self.assertIsNone(tc.enumerations["C"].table)
+        with self.assertRaises(InheritanceException):
+            enumeration_table(tc.enumerations["C"])
+
+    def test_update(self):
+        tc = self._import("""
+            package P
+            typeCollection TC {
+                enumeration Base { A B }
+                enumeration E extends Base { C }
+                enumeration F { D }
+            }
+        """)
+        f_table = tc.enumerations["F"].table
+        e = tc.enumerations["E"]
+        # Link E to a new version of its base enumeration.
+        e.reference = Parser().parse(
+            "package P typeCollection TC { enumeration Base { A B X } }"
+        ).typecollections["TC"].enumerations["Base"]
+        self.assertEqual(update_tables([tc]), [])
+        self.assertEqual(e.table.names, ("A", "B", "X", "C"))
+        self.assertIs(tc.enumerations["F"].table, f_table)
+
+    def test_unlinked(self):
+        package = Parser().parse("package P typeCollection TC "
+                                 "{ enumeration E extends X { A } }")
+        e = package.typecollections["TC"].enumerations["E"]
+        self.assertIsNone(e.table)
+        with self.assertRaises(InheritanceException) as context:
+            enumeration_table(e)
+        self.assertEqual(str(context.exception), "Unresolved reference 'X'.")
+        e.extends = None
+        errors = update_tables([package.typecollections["TC"]])
+        self.assertEqual(errors, [])
+        self.assertEqual(e.table.items(), [("A", 0)])
+
+
+class TestStructTables(unittest.TestCase):
+    """Test flattened struct tables."""
+
+    def test_tables(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", """
+            package P
+            typeCollection TC {
+                struct D extends S { String name }
+                struct S { UInt8 u Int16 i }
+            }
+        """)
+        tc = package.typecollections["TC"]
+        table = tc.structs["D"].table
+        self.assertEqual([field.name for field in table.fields],
+                         ["u", "i", "name"])
+        self.assertIs(table.by_name["u"], tc.structs["S"].fields["u"])
+        self.assertIs(table.base, tc.structs["S"].table)
+        self.assertIs(struct_table(tc.structs["D"]), table)
+        # Linking again keeps current tables.
+        self.assertEqual(update_tables([tc]), [])
+        self.assertIs(tc.structs["D"].table, table)
+
+    def test_errors(self):
+        processor = Processor()
+        processor.diagnostics = []
+        package = processor.import_string("test.fidl", """
+            package P
+            typeCollection TC {
+                struct S { UInt8 u }
+                struct D extends S { UInt8 u }
+                struct A extends B { }
+                struct B extends A { }
+            }
+        """)
+        self.assertEqual(
+            [(item.line, item.message) for item in processor.diagnostics],
+            [(5, "Duplicate struct field 'u' in 'D'."),
+             (6, "Struct inheritance cycle at 'A'."),
+             (7, "Struct inheritance cycle at 'B'.")])
+        self.assertIsNone(package.typecollections["TC"].structs["D"].table)
+
+    def test_long_chain(self):
+        # Bases declared after the derived structs
+        count = 3000
+        fidl = ["package P", "typeCollection TC {"]
+        fidl += ["struct S{} extends S{} {{ UInt8 f{} }}".format(
+            index, index + 1, index) for index in range(count)]
+        fidl += ["struct S{} {{ UInt8 f{} }}".format(count, count), "}"]
+        package = Processor().import_string("test.fidl", "\n".join(fidl))
+        tc = package.typecollections["TC"]
+        table = tc.structs["S0"].table
+        self.assertEqual(len(table), count + 1)
+        self.assertEqual(table.fields[0].name, "f{}".format(count))
+        self.assertEqual(update_tables([tc]), [])
+        self.assertIs(tc.structs["S0"].table, table)
+        tc.structs["S{}".format(count)].table = None
+        self.assertEqual(update_tables([tc]), [])
+        self.assertIsNot(tc.structs["S0"].table, table)
+
+
+class TestInterfaceTables(unittest.TestCase):
+    """Test interface inheritance tables."""
+
+    def test_tables(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", """
+            package P
+            interface Base {
+                attribute UInt8 a
+                method m { }
+            }
+            interface I extends Base {
+                method n { }
+                broadcast b { }
+            }
+        """)
+        base = package.interfaces["Base"]
+        table = package.interfaces["I"].table
+        self.assertEqual(list(table.attributes), ["a"])
+        self.assertEqual(list(table.methods), ["m", "n"])
+        self.assertEqual(list(table.broadcasts), ["b"])
+        self.assertIs(table.methods["m"], base.methods["m"])
+        # Interfaces without a base share their members.
+        self.assertIs(interface_table(base).methods, base.methods)
+
+    def test_shadowing(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", """
+            package P
+            interface I {
+                attribute UInt8 a
+                method m { }
+                method n { }
+            }
+            interface J extends I {
+                attribute UInt16 a
+                method m { in { UInt8 x } }
+            }
+        """)
+        i = package.interfaces["I"]
+        j = package.interfaces["J"]
+        table = j.table
+        # Redeclared members replace the inherited ones in place.
+        self.assertEqual(list(table.methods), ["m", "n"])
+        self.assertIs(table.methods["m"], j.methods["m"])
+        self.assertIs(table.methods["n"], i.methods["n"])
+        self.assertIs(table.attributes["a"], j.attributes["a"])
+        self.assertEqual(processor.warnings, [])
+
+    def test_errors(self):
+        processor = Processor()
+        with self.assertRaises(ProcessorException) as context:
+            processor.import_string("test.fidl", """
+                package P
+                interface A extends B { }
+                interface B extends A { }
+            """)
+        self.assertEqual(str(context.exception),
+                         "Interface inheritance cycle at 'A'.")
+
+
+if __name__ == '__main__':
+    unittest.main()
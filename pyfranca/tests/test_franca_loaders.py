@@ -0,0 +1,149 @@
+"""
+Pyfranca model file loader tests.
+"""
+
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from pyfranca import Processor, ProcessorException
+from pyfranca.franca_loaders import DictLoader, DirectoryLoader, \
+    TarLoader, ZipLoader
+
+
+FILES = {
+    "models/a.fidl": """
+        package A
+        import C.TC.* from "common/common.fidl"
+        interface I { attribute T a }
+    """,
+    "models/common/common.fidl": """
+        package C
+        typeCollection TC { typedef T is Int32 }
+    """,
+}
+
+
+class TestLoaders(unittest.TestCase):
+    """Test the loaders directly."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_directory(self):
+        fspec = os.path.join(self.tmp_dir, "a.fidl")
+        with open(fspec, "w") as f:
+            f.write("package A")
+        loader = DirectoryLoader([self.tmp_dir])
+        self.assertEqual(loader.find("a.fidl"), fspec)
+        self.assertEqual(loader.find(fspec), fspec)
+        self.assertIsNone(loader.find("b.fidl"))
+        self.assertEqual(loader.read(fspec), "package A")
+        mapped = loader.map(fspec, 0)
+        try:
+            self.assertEqual(mapped[:], b"package A")
+        finally:
+            mapped.close()
+        self.assertIsNone(loader.map(fspec, 1024))
+
+    def test_dict(self):
+        loader = DictLoader({"a.fidl": "package A"})
+        self.assertEqual(loader.find("a.fidl"), "a.fidl")
+        self.assertIsNone(loader.find("b.fidl"))
+        self.assertEqual(loader.read("a.fidl"), "package A")
+
+    def test_zip(self):
+        archive = os.path.join(self.tmp_dir, "models.zip")
+        with zipfile.ZipFile(archive, "w") as f:
+            for name, fidl in FILES.items():
+                f.writestr(name, fidl)
+        with ZipLoader(archive, ["models"]) as loader:
+            fspec = archive + "/models/a.fidl"
+            self.assertEqual(loader.find("a.fidl"), fspec)
+            self.assertEqual(loader.find("models/a.fidl"), fspec)
+            self.assertEqual(loader.find("./models/../models/a.fidl"), fspec)
+            self.assertEqual(loader.find(fspec), fspec)
+            self.assertIsNone(loader.find("common.fidl"))
+            self.assertIsNone(loader.find("/models/a.fidl"))
+            self.assertEqual(loader.read(fspec), FILES["models/a.fidl"])
+        self.assertEqual(os.listdir(self.tmp_dir), ["models.zip"])
+
+    def test_tar(self):
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w:gz") as f:
+            for name, fidl in FILES.items():
+                member = tarfile.TarInfo(name)
+                member.size = len(fidl)
+                f.addfile(member, io.BytesIO(fidl.encode("utf-8")))
+        data.seek(0)
+        with TarLoader(data, ["models"]) as loader:
+            fspec = "<archive>/models/common/common.fidl"
+            self.assertEqual(loader.find("common/common.fidl"), fspec)
+            self.assertEqual(loader.read(fspec),
+                             FILES["models/common/common.fidl"])
+
+
+class TestProcessorLoaders(unittest.TestCase):
+    """Test model loading with loaders."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.archive = os.path.join(self.tmp_dir, "models.zip")
+        with zipfile.ZipFile(self.archive, "w") as f:
+            for name, fidl in FILES.items():
+                f.writestr(name, fidl)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _check(self, processor):
+        a = processor.packages["A"]
+        t = processor.packages["C"].typecollections["TC"].typedefs["T"]
+        self.assertIs(a.interfaces["I"].attributes["a"].type.reference, t)
+
+    def test_dict(self):
+        processor = Processor()
+        processor.loaders = [DictLoader(dict(
+            (name[len("models/"):], fidl)
+            for name, fidl in FILES.items()))]
+        processor.import_file("a.fidl")
+        self._check(processor)
+        self.assertEqual(sorted(processor.files),
+                         ["a.fidl", "common/common.fidl"])
+        with self.assertRaises(ProcessorException) as context:
+            processor.import_file("nosuch.fidl")
+        self.assertEqual(str(context.exception),
+                         "Model 'nosuch.fidl' not found.")
+
+    def test_zip(self):
+        processor = Processor()
+        loader = ZipLoader(self.archive, ["models"])
+        processor.loaders.append(loader)
+        try:
+            processor.import_file("a.fidl")
+        finally:
+            loader.close()
+        self._check(processor)
+        self.assertEqual(sorted(processor.files), [
+            self.archive + "/models/a.fidl",
+            self.archive + "/models/common/common.fidl"])
+
+    def test_mapped(self):
+        for name, fidl in FILES.items():
+            fspec = os.path.join(self.tmp_dir, name)
+            if not os.path.isdir(os.path.dirname(fspec)):
+                os.makedirs(os.path.dirname(fspec))
+            with open(fspec, "w") as f:
+                f.write(fidl)
+        processor = Processor()
+        processor.package_paths.append(os.path.join(self.tmp_dir, "models"))
+        processor.map_size = 0
+        processor.import_file("a.fidl")
+        self._check(processor)
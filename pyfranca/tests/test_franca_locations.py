@@ -0,0 +1,147 @@
+"""
+Pyfranca source location tests.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyfranca import Processor
+from pyfranca.franca_locations import SourceMap, line_offsets, pack, unpack
+
+
+class TestSourceMap(unittest.TestCase):
+    """Test packing and resolving locations."""
+
+    def test_pack(self):
+        location = pack(3, 1234)
+        self.assertEqual(unpack(location), (3, 1234))
+        self.assertEqual(unpack(pack(0, 0)), (0, 0))
+
+    def test_line_offsets(self):
+        self.assertEqual(list(line_offsets(u"a\nbc\n\nd")), [0, 2, 5, 6])
+        self.assertEqual(list(line_offsets(b"a\nbc\n")), [0, 2, 5])
+        self.assertEqual(list(line_offsets(u"")), [0])
+
+    def test_resolve(self):
+        sources = SourceMap()
+        self.assertEqual(sources.add("a.fidl", u"ab\ncd\n"), 0)
+        self.assertEqual(sources.add("b.fidl", u"x"), 1)
+        self.assertEqual(sources.resolve(pack(0, 0)), ("a.fidl", 1, 1))
+        self.assertEqual(sources.resolve(pack(0, 2)), ("a.fidl", 1, 3))
+        self.assertEqual(sources.resolve(pack(0, 4)), ("a.fidl", 2, 2))
+        self.assertEqual(sources.format(pack(1, 0)), "b.fidl:1:1")
+        self.assertIsNone(sources.resolve(pack(2, 0)))
+        self.assertIsNone(sources.resolve(None))
+        # Files added again keep their index.
+        self.assertEqual(sources.add("a.fidl", u"\nab"), 0)
+        self.assertEqual(sources.resolve(pack(0, 2)), ("a.fidl", 2, 2))
+        self.assertEqual(sources.files, ["a.fidl", "b.fidl"])
+
+    def test_offset(self):
+        sources = SourceMap()
+        sources.add("a.fidl", u"ab\ncd\n")
+        self.assertEqual(sources.offset(0, 1, 1), 0)
+        self.assertEqual(sources.offset(0, 2, 2), 4)
+        # Past the end of the line or of the file
+        self.assertEqual(sources.offset(0, 1, 10), 2)
+        self.assertEqual(sources.offset(0, 5, 1), 6)
+
+
+class TestNodeLocations(unittest.TestCase):
+    """Test the locations of parsed AST nodes."""
+
+    FIDL = u"""package P
+import P.TC2.* from "b.fidl"
+typeCollection TC {
+    enumeration E { A B = 2 }
+    struct S { E e P.TC.E[] f }
+}
+interface I {
+    attribute S a
+    method M { in { UInt8 x } error E }
+    broadcast B { out { S s } }
+}
+"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.processor = Processor()
+        self.processor.package_paths.append(self.tmp_dir)
+        with open(os.path.join(self.tmp_dir, "b.fidl"), "w") as f:
+            f.write("package P\ntypeCollection TC2 { typedef T is UInt8 }\n")
+        self.fspec = os.path.join(self.tmp_dir, "a.fidl")
+        with open(self.fspec, "w") as f:
+            f.write(self.FIDL)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _check(self):
+        package = self.processor.import_file(self.fspec)
+
+        def location(node):
+            fspec, line, column = self.processor.location(node)
+            self.assertEqual(fspec, self.fspec)
+            return line, column
+
+        tc = package.typecollections["TC"]
+        self.assertEqual(location(package.imports[0]), (2, 1))
+        self.assertEqual(location(tc), (3, 16))
+        e = tc.enumerations["E"]
+        self.assertEqual(location(e), (4, 17))
+        self.assertEqual(location(e.enumerators["B"]), (4, 23))
+        s = tc.structs["S"]
+        self.assertEqual(location(s), (5, 12))
+        self.assertEqual(location(s.fields["e"]), (5, 18))
+        self.assertEqual(location(s.fields["e"].type), (5, 16))
+        self.assertEqual(location(s.fields["f"].type.type), (5, 20))
+        i = package.interfaces["I"]
+        self.assertEqual(location(i), (7, 11))
+        self.assertEqual(location(i.attributes["a"]), (8, 17))
+        m = i.methods["M"]
+        self.assertEqual(location(m), (9, 12))
+        self.assertEqual(location(m.in_args["x"]), (9, 27))
+        self.assertEqual(location(m.errors), (9, 37))
+        self.assertEqual(location(i.broadcasts["B"]), (10, 15))
+        # Nodes of other files
+        t = package.typecollections["TC2"].typedefs["T"]
+        self.assertEqual(self.processor.location(t),
+                         (os.path.join(self.tmp_dir, "b.fidl"), 2, 30))
+        self.assertIsNone(self.processor.location(t.type))
+
+    def test_locations(self):
+        self._check()
+
+    def test_mapped_locations(self):
+        self.processor.map_size = 1
+        self._check()
+
+    def test_array_references(self):
+        processor = Processor()
+        processor.diagnostics = []
+        package = processor.import_string("test.fidl", u"""package P
+typeCollection TC {
+    struct S1 { Foo[] a }
+    struct S2 { Foo[] b }
+}
+""")
+        self.assertEqual(
+            [(item.line, item.message) for item in processor.diagnostics],
+            [(3, "Unresolved reference 'Foo'."),
+             (4, "Unresolved reference 'Foo'.")])
+        tc = package.typecollections["TC"]
+        # The anonymous arrays are shared, the occurrences are located at
+        #   the fields.
+        a = tc.structs["S1"].fields["a"]
+        b = tc.structs["S2"].fields["b"]
+        self.assertIs(a.type, b.type)
+        self.assertEqual(processor.sources.resolve(a.type_location),
+                         ("test.fidl", 3, 17))
+        self.assertEqual(processor.sources.resolve(b.type_location),
+                         ("test.fidl", 4, 17))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,430 @@
+"""
+Pyfranca language server tests.
+"""
+
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pyfranca.franca_lsp import INTERNAL_ERROR, INVALID_PARAMS, \
+    LanguageClient, LanguageServer, LspException, METHOD_NOT_FOUND, \
+    Workspace, path_to_uri, read_message, uri_to_path, write_message
+
+
+COMMON = """package C
+typeCollection TC {
+    typedef T is Int32
+    struct S { T a }
+}
+"""
+
+MODEL = """package A
+import C.TC.* from "common.fidl"
+interface I {
+    attribute S s
+    method M { in { T x } }
+}
+"""
+
+
+class TestTransport(unittest.TestCase):
+    """Test message framing."""
+
+    def test_messages(self):
+        stream = io.BytesIO()
+        write_message(stream, {"id": 1, "method": u"\u00e4"})
+        write_message(stream, {"id": 2})
+        stream.seek(0)
+        self.assertEqual(read_message(stream), {"id": 1, "method": u"\u00e4"})
+        self.assertEqual(read_message(stream), {"id": 2})
+        self.assertIsNone(read_message(stream))
+
+    def test_invalid(self):
+        with self.assertRaises(LspException):
+            read_message(io.BytesIO(b"Content-Length: 2\r\n\r\n{]"))
+        with self.assertRaises(LspException):
+            read_message(io.BytesIO(b"X: 1\r\n\r\n"))
+
+    def test_uri(self):
+        fspec = os.path.abspath(os.path.join("a b", "c.fidl"))
+        self.assertEqual(uri_to_path(path_to_uri(fspec)), fspec)
+        self.assertIsNone(uri_to_path("untitled:1"))
+
+
+class BaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self._write("common.fidl", COMMON)
+        self._write("a.fidl", MODEL)
+        self.uri = path_to_uri(self._fspec("a.fidl"))
+        self.common_uri = path_to_uri(self._fspec("common.fidl"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _fspec(self, file_name):
+        return os.path.join(self.tmp_dir, file_name)
+
+    def _write(self, file_name, fidl):
+        with open(self._fspec(file_name), "w") as f:
+            f.write(fidl)
+
+    @staticmethod
+    def _position(text, name, count=1, delta=0):
+        offset = -1
+        for _ in range(count):
+            offset = text.index(name, offset + 1)
+        offset += delta
+        line = text.count("\n", 0, offset)
+        return {"line": line,
+                "character": offset - (text.rfind("\n", 0, offset) + 1)}
+
+
+class TestWorkspace(BaseTestCase):
+    """Test the workspace model."""
+
+    def setUp(self):
+        super(TestWorkspace, self).setUp()
+        self.workspace = Workspace([self.tmp_dir], jobs=2)
+        self.workspace.index(Workspace.find_files([self.tmp_dir]))
+
+    def test_index(self):
+        self.assertEqual(self.workspace.fspecs,
+                         [self._fspec("a.fidl"), self._fspec("common.fidl")])
+        self.assertEqual(sorted(self.workspace.processor.packages),
+                         ["A", "C"])
+        self.assertEqual(self.workspace.changed_diagnostics(), {})
+
+    def test_index_errors(self):
+        self._write("b.fidl", "package B\ninterface J { attribute X x }\n")
+        self.workspace.index(Workspace.find_files([self.tmp_dir]))
+        diagnostics = self.workspace.changed_diagnostics()
+        self.assertEqual(
+            [str(item) for item in diagnostics[self._fspec("b.fidl")]],
+            ["{}:2: Unresolved reference 'X'.".format(self._fspec("b.fidl"))])
+        self._write("b.fidl", "package B\n")
+        self.workspace.index(Workspace.find_files([self.tmp_dir]))
+        self.assertEqual(self.workspace.changed_diagnostics(),
+                         {self._fspec("b.fidl"): []})
+
+    def test_reload(self):
+        self._write("b.fidl", "package B\ninterface J { }\n")
+        self.workspace.index(Workspace.find_files([self.tmp_dir]))
+        self.workspace.changed_diagnostics()
+        processor = self.workspace.processor
+        j = processor.packages["B"].interfaces["J"]
+        self._write("common.fidl", COMMON.replace("typedef T ", "typedef U "))
+        self.workspace.reload([self._fspec("common.fidl")], [self.tmp_dir])
+        # Files importing the changed file are linked again.
+        diagnostics = self.workspace.changed_diagnostics()
+        self.assertEqual(
+            [str(item) for item in diagnostics[self._fspec("a.fidl")]],
+            ["{}:5: Unresolved reference 'T'.".format(self._fspec("a.fidl"))])
+        self.assertNotIn("T", processor.packages["C"].typecollections["TC"])
+        self.assertIn("U", processor.packages["C"].typecollections["TC"])
+        # Other files are kept.
+        self.assertIs(self.workspace.processor, processor)
+        self.assertIs(processor.packages["B"].interfaces["J"], j)
+        self._write("common.fidl", COMMON)
+        self.workspace.reload([self._fspec("common.fidl")], [self.tmp_dir])
+        self.assertEqual(self.workspace.changed_diagnostics(),
+                         {self._fspec("a.fidl"): [],
+                          self._fspec("common.fidl"): []})
+        # References are indexed again.
+        self.workspace.open(self.common_uri, COMMON)
+        self.assertEqual(
+            len(self.workspace.references(
+                self.common_uri, self._position(COMMON, "T a"), False)), 2)
+
+    def test_reload_files(self):
+        self._write("b.fidl", "package A\ninterface J extends I { }\n")
+        self.workspace.reload([self._fspec("b.fidl")], [self.tmp_dir])
+        processor = self.workspace.processor
+        self.assertEqual(list(processor.packages["A"].interfaces),
+                         ["I", "J"])
+        self.assertEqual(
+            self.workspace.fspecs,
+            [self._fspec(name) for name in ("a.fidl", "common.fidl",
+                                            "b.fidl")])
+        os.remove(self._fspec("a.fidl"))
+        self.workspace.reload([self._fspec("a.fidl")], [self.tmp_dir])
+        self.assertEqual(list(processor.packages["A"].interfaces), ["J"])
+        self.assertEqual(processor.packages["A"].files,
+                         [self._fspec("b.fidl")])
+        diagnostics = self.workspace.changed_diagnostics()
+        self.assertEqual(
+            [str(item) for item in diagnostics[self._fspec("b.fidl")]],
+            ["{}:2: Unresolved namespace reference 'I'.".format(
+                self._fspec("b.fidl"))])
+        self.assertNotIn(self._fspec("a.fidl"), self.workspace.fspecs)
+
+    def test_definition(self):
+        self.workspace.open(self.uri, MODEL)
+        location = self.workspace.definition(
+            self.uri, self._position(MODEL, "S s"))
+        self.assertEqual(location["uri"], self.common_uri)
+        self.assertEqual(location["range"]["start"],
+                         {"line": 3, "character": 11})
+        # Namespace import
+        location = self.workspace.definition(
+            self.uri, self._position(MODEL, "TC"))
+        self.assertEqual(location["range"]["start"],
+                         {"line": 1, "character": 15})
+        self.assertIsNone(self.workspace.definition(
+            self.uri, self._position(MODEL, "attribute")))
+
+    def test_open_definitions(self):
+        # Definitions of open files are taken from the open version.
+        text = "\n\n" + COMMON
+        self.workspace.open(self.common_uri, text)
+        self.workspace.open(self.uri, MODEL)
+        location = self.workspace.definition(
+            self.uri, self._position(MODEL, "T x"))
+        self.assertEqual(location["uri"], self.common_uri)
+        self.assertEqual(location["range"]["start"],
+                         {"line": 4, "character": 12})
+
+    def test_references(self):
+        self.workspace.open(self.uri, MODEL)
+        locations = self.workspace.references(
+            self.uri, self._position(MODEL, "T x"))
+        self.assertEqual(
+            sorted((item["uri"], item["range"]["start"]["line"])
+                   for item in locations),
+            sorted([(self.common_uri, 2), (self.common_uri, 3),
+                    (self.uri, 4)]))
+        locations = self.workspace.references(
+            self.uri, self._position(MODEL, "T x"), False)
+        self.assertEqual(len(locations), 2)
+
+    def test_array_references(self):
+        text = ("package B\ntypeCollection TB {\n    struct Foo { }\n"
+                "    struct S1 { Foo[] a }\n    struct S2 { Foo[] b }\n}\n")
+        self._write("b.fidl", text)
+        self.workspace.index(Workspace.find_files([self.tmp_dir]))
+        uri = path_to_uri(self._fspec("b.fidl"))
+        sources = self.workspace.sources
+        self.assertEqual(
+            [sources.resolve(location)[1:] for location, _
+             in self.workspace._references["B.TB.Foo"]],
+            [(4, 17), (5, 17)])
+        self.workspace.open(uri, text)
+        expected = [(uri, 2), (uri, 3), (uri, 4)]
+        locations = self.workspace.references(
+            uri, self._position(text, "Foo"))
+        self.assertEqual(
+            [(item["uri"], item["range"]["start"]["line"])
+             for item in locations], expected)
+
+    def test_check(self):
+        text = MODEL.replace("T x", "X x")
+        document = self.workspace.open(self.uri, text)
+        self.workspace.check(document)
+        self.assertEqual([(item.line, item.message)
+                          for item in document.diagnostics],
+                         [(5, "Unresolved reference 'X'.")])
+        self.workspace.change(self.uri, [{
+            "range": {"start": self._position(text, "X x"),
+                      "end": self._position(text, "X x", delta=1)},
+            "text": "T"}])
+        self.workspace.check(document)
+        self.assertEqual(document.diagnostics, [])
+        self.workspace.change(self.uri, [{"text": "package\n"}])
+        self.workspace.check(document)
+        self.assertEqual([(item.line, item.message)
+                          for item in document.diagnostics],
+                         [(1, "Reached unexpected end of file.")])
+
+    def test_hover(self):
+        self.workspace.open(self.uri, MODEL)
+        hover = self.workspace.hover(self.uri,
+                                     self._position(MODEL, "S s", delta=1))
+        self.assertEqual(hover["contents"]["value"],
+                         "```franca\nstruct C.TC.S\n    C.TC.T a\n```")
+        self.assertEqual(hover["range"]["start"],
+                         {"line": 3, "character": 14})
+        hover = self.workspace.hover(self.uri, self._position(MODEL, "M"))
+        self.assertEqual(hover["contents"]["value"],
+                         "```franca\nmethod A.I.M\n    in { T x }\n```")
+
+    def test_completion(self):
+        text = MODEL.replace("attribute S s", "attribute In")
+        self.workspace.open(self.uri, text)
+        items = self.workspace.completion(
+            self.uri, self._position(text, "In", delta=2))
+        self.assertEqual([item["label"] for item in items],
+                         ["Int8", "Int16", "Int32", "Int64"])
+        items = self.workspace.completion(
+            self.uri, self._position(text, "in {", delta=0))
+        labels = [item["label"] for item in items]
+        for label in ("M", "T", "S", "I", "UInt8", "struct"):
+            self.assertIn(label, labels)
+        self.assertEqual(items[labels.index("S")]["detail"],
+                         "struct C.TC.S")
+        # Qualified names
+        text = MODEL.replace("attribute S s", "attribute C.TC.")
+        self.workspace.change(self.uri, [{"text": text}])
+        items = self.workspace.completion(
+            self.uri, self._position(text, "C.TC.", delta=5))
+        self.assertEqual([item["label"] for item in items], ["T", "S"])
+
+
+class TestLanguageServer(BaseTestCase):
+    """Test a server session with a scripted client."""
+
+    def setUp(self):
+        super(TestLanguageServer, self).setUp()
+        client_read, server_write = os.pipe()
+        server_read, client_write = os.pipe()
+        self.server = LanguageServer(os.fdopen(server_read, "rb"),
+                                     os.fdopen(server_write, "wb"))
+        self.server.delay = 0.01
+        self.thread = threading.Thread(target=self.server.serve)
+        self.thread.start()
+        self.client = LanguageClient(os.fdopen(client_read, "rb"),
+                                     os.fdopen(client_write, "wb"))
+
+    def tearDown(self):
+        self.client.writer.close()
+        self.thread.join()
+        self.client.reader.close()
+        self.server.reader.close()
+        self.server.writer.close()
+        super(TestLanguageServer, self).tearDown()
+
+    def _initialize(self):
+        result = self.client.request("initialize", {
+            "rootUri": path_to_uri(self.tmp_dir),
+            "initializationOptions": {"jobs": 2}})
+        self.client.notify("initialized")
+        return result
+
+    def test_session(self):
+        capabilities = self._initialize()["capabilities"]
+        self.assertTrue(capabilities["definitionProvider"])
+        self.assertEqual(capabilities["textDocumentSync"]["change"], 2)
+        self.client.notify("textDocument/didOpen", {"textDocument": {
+            "uri": self.uri, "languageId": "franca", "version": 1,
+            "text": MODEL}})
+        self.assertEqual(
+            self.client.notification("textDocument/publishDiagnostics"),
+            {"uri": self.uri, "diagnostics": []})
+        location = self.client.request("textDocument/definition", {
+            "textDocument": {"uri": self.uri},
+            "position": self._position(MODEL, "T x")})
+        self.assertEqual(location["uri"], self.common_uri)
+        self.client.notify("textDocument/didChange", {
+            "textDocument": {"uri": self.uri, "version": 2},
+            "contentChanges": [{
+                "range": {"start": self._position(MODEL, "T x"),
+                          "end": self._position(MODEL, "T x", delta=1)},
+                "text": "X"}]})
+        diagnostics = self.client.notification(
+            "textDocument/publishDiagnostics")["diagnostics"]
+        self.assertEqual(len(diagnostics), 1)
+        self.assertEqual(diagnostics[0]["message"],
+                         "Unresolved reference 'X'.")
+        self.assertEqual(diagnostics[0]["range"]["start"]["line"], 4)
+        self.assertIsNone(self.client.request("shutdown"))
+        self.client.notify("exit")
+        self.thread.join()
+        self.assertFalse(self.server.running)
+
+    def test_save(self):
+        self._initialize()
+        self._write("common.fidl", COMMON.replace("typedef T ", "typedef U "))
+        self.client.notify("textDocument/didSave", {
+            "textDocument": {"uri": self.common_uri}})
+        diagnostics = self.client.notification(
+            "textDocument/publishDiagnostics")
+        self.assertEqual(diagnostics["uri"], self.uri)
+        self.assertEqual(diagnostics["diagnostics"][0]["message"],
+                         "Unresolved reference 'T'.")
+        self.assertEqual(self.client.notification(
+            "textDocument/publishDiagnostics")["uri"], self.common_uri)
+        self._write("common.fidl", COMMON)
+        self.client.notify("workspace/didChangeWatchedFiles", {
+            "changes": [{"uri": self.common_uri, "type": 2}]})
+        self.assertEqual(
+            self.client.notification("textDocument/publishDiagnostics"),
+            {"uri": self.uri, "diagnostics": []})
+        self.assertIsNone(self.client.request("shutdown"))
+        self.client.notify("exit")
+
+    def test_errors(self):
+        with self.assertRaises(LspException):
+            self.client.request("textDocument/hover", {})
+        self._initialize()
+        with self.assertRaises(LspException) as context:
+            self.client.request("textDocument/rename", {})
+        self.assertEqual(context.exception.code, METHOD_NOT_FOUND)
+        with self.assertRaises(LspException):
+            self.client.request("textDocument/hover", {
+                "textDocument": {"uri": self.uri},
+                "position": {"line": 0, "character": 0}})
+        # Unsupported notifications are ignored.
+        self.client.notify("$/cancelRequest", {"id": 1})
+        self.assertIsNone(self.client.request("shutdown"))
+
+    def test_invalid_params(self):
+        self._initialize()
+        self.client.notify("textDocument/didOpen", {"textDocument": {
+            "uri": self.uri, "languageId": "franca", "version": 1,
+            "text": MODEL}})
+        for params in [
+                {},
+                {"textDocument": {"uri": 1},
+                 "position": {"line": 0, "character": 0}},
+                {"textDocument": {"uri": self.uri}},
+                {"textDocument": {"uri": self.uri},
+                 "position": {"line": -1, "character": 0}},
+                {"textDocument": {"uri": self.uri},
+                 "position": {"line": 0, "character": "0"}}]:
+            with self.assertRaises(LspException) as context:
+                self.client.request("textDocument/hover", params)
+            self.assertEqual(context.exception.code, INVALID_PARAMS)
+        with self.assertRaises(LspException) as context:
+            self.client.request("textDocument/references", {
+                "textDocument": {"uri": self.uri},
+                "position": {"line": 0, "character": 0},
+                "context": []})
+        self.assertEqual(context.exception.code, INVALID_PARAMS)
+        self.assertIsNone(self.client.request("textDocument/hover", {
+            "textDocument": {"uri": self.uri},
+            "position": {"line": 0, "character": 0}}))
+
+    def test_internal_error(self):
+        self._initialize()
+
+        def hover(params):
+            raise RuntimeError("Broken.")
+
+        self.server._handlers["textDocument/hover"] = hover
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger = logging.getLogger("pyfranca.franca_lsp")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            with self.assertRaises(LspException) as context:
+                self.client.request("textDocument/hover", {})
+        finally:
+            logger.removeHandler(handler)
+            logger.propagate = True
+        self.assertEqual(context.exception.code, INTERNAL_ERROR)
+        self.assertEqual(context.exception.message,
+                         "Internal error: Broken.")
+        self.assertEqual(len(records), 1)
+        self.assertIsNotNone(records[0].exc_info)
+        # The server keeps running.
+        self.assertIsNone(self.client.request("shutdown"))
+
+
+if __name__ == '__main__':
+    unittest.main()
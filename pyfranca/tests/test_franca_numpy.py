@@ -0,0 +1,102 @@
+"""
+Pyfranca NumPy bulk codec tests.
+"""
+
+import unittest
+
+from pyfranca import Processor
+from pyfranca.franca_codec import Codec, CodecException
+from pyfranca.franca_numpy import NumpyCodec
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FIDL = """
+package P
+typeCollection TC {
+    enumeration E { A B = 5 }
+    struct Point { Float x Float y }
+    struct Sample extends Point { UInt16 id E e Boolean valid }
+    struct Named { String name }
+    array Floats of Float
+    array Samples of Sample
+    array Names of Named
+}
+"""
+
+
+@unittest.skipIf(numpy is None, "Requires NumPy.")
+class TestNumpyCodec(unittest.TestCase):
+    """Test NumPy bulk encoding and decoding."""
+
+    def setUp(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", FIDL)
+        self.tc = package.typecollections["TC"]
+        self.codec = NumpyCodec()
+
+    def test_dtype(self):
+        self.assertEqual(self.codec.dtype(self.tc.arrays["Floats"].type),
+                         numpy.dtype(">f4"))
+        dtype = self.codec.dtype(self.tc.structs["Sample"])
+        self.assertEqual(dtype.names, ("x", "y", "id", "e", "valid"))
+        self.assertEqual(dtype.itemsize, 15)
+        self.assertIsNone(self.codec.dtype(self.tc.structs["Named"]))
+        self.assertIsNone(self.codec.dtype(self.tc.arrays["Floats"]))
+
+    def test_primitive_arrays(self):
+        floats = self.tc.arrays["Floats"]
+        value = numpy.array([1.5, -2.0, 3.25], numpy.float32)
+        data = self.codec.encode(floats, value)
+        # The wire format is the one of the scalar codec.
+        self.assertEqual(data, Codec().encode(floats, [1.5, -2.0, 3.25]))
+        decoded = self.codec.decode(floats, data)
+        self.assertIsInstance(decoded, numpy.ndarray)
+        self.assertEqual(decoded.tolist(), [1.5, -2.0, 3.25])
+        self.assertEqual(self.codec.decode(floats, b"\x00" * 4).size, 0)
+
+    def test_struct_arrays(self):
+        samples = self.tc.arrays["Samples"]
+        dtype = self.codec.dtype(self.tc.structs["Sample"])
+        value = numpy.zeros(2, dtype)
+        value["x"] = [1.0, 2.0]
+        value["id"] = [7, 8]
+        value["e"] = 5
+        data = self.codec.encode(samples, value)
+        items = [{"x": 1.0, "y": 0.0, "id": 7, "e": "B", "valid": False},
+                 {"x": 2.0, "y": 0.0, "id": 8, "e": "B", "valid": False}]
+        # Lists are encoded by the scalar code.
+        self.assertEqual(self.codec.encode(samples, items), data)
+        decoded = self.codec.decode(samples, data)
+        self.assertEqual(decoded.dtype, dtype)
+        self.assertEqual(decoded["id"].tolist(), [7, 8])
+        self.assertEqual(decoded["e"].tolist(), [5, 5])
+
+    def test_variable_size(self):
+        names = self.tc.arrays["Names"]
+        value = [{"name": "a"}, {"name": "b"}]
+        self.assertEqual(
+            self.codec.decode(names, self.codec.encode(names, value)), value)
+
+    def test_byte_order(self):
+        codec = NumpyCodec("<")
+        floats = self.tc.arrays["Floats"]
+        value = numpy.array([1.0], ">f4")
+        self.assertEqual(codec.encode(floats, value),
+                         b"\x04\x00\x00\x00\x00\x00\x80\x3f")
+        with self.assertRaises(CodecException):
+            codec.decode(floats, b"\x03\x00\x00\x00\x00\x00\x80")
+
+
+@unittest.skipIf(numpy is not None, "NumPy is installed.")
+class TestWithoutNumpy(unittest.TestCase):
+
+    def test_unavailable(self):
+        with self.assertRaises(CodecException):
+            NumpyCodec()
+
+
+if __name__ == '__main__':
+    unittest.main()
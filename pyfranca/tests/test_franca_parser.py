@@ -2,9 +2,16 @@
 Pyfranca lexer and parser tests.
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 
-from pyfranca import LexerException, ParserException, Parser, ast
+from pyfranca import LexerException, ParserException, Lexer, Parser, \
+    Processor, ast
+from pyfranca.franca_diagnostics import Diagnostic, DiagnosticList
+from pyfranca.franca_lexer import MappedLexer
+from pyfranca.franca_locations import unpack
 
 
 class BaseTestCase(unittest.TestCase):
@@ -799,6 +806,42 @@ class TestStructs(BaseTestCase):
                          "Duplicate structure field 'a'.")
 
 
+class TestAnonymousArrays(BaseTestCase):
+    """Test anonymous array interning."""
+
+    def test_interning(self):
+        package = self._assertParse("""
+            package P
+            typeCollection TC {
+                typedef A is Int32[]
+                struct S { Int32[] a String[] b T[] c }
+                map M { T[] to Int32[] }
+            }
+            interface I {
+                attribute Int32[] A
+                method M { in { Int32[] a } out { T[] b } }
+                broadcast B { out { T[] c } }
+            }
+        """)
+        tc = package.typecollections["TC"]
+        a = tc.typedefs["A"].type
+        self.assertIsNone(a.name)
+        self.assertEqual(a.namespace, tc)
+        s = tc.structs["S"]
+        self.assertIs(s.fields["a"].type, a)
+        self.assertIsNot(s.fields["b"].type, a)
+        self.assertIs(tc.maps["M"].key_type, s.fields["c"].type)
+        self.assertIs(tc.maps["M"].value_type, a)
+        i = package.interfaces["I"]
+        ia = i.attributes["A"].type
+        self.assertIsNot(ia, a)
+        self.assertEqual(ia.namespace, i)
+        self.assertIs(i.methods["M"].in_args["a"].type, ia)
+        self.assertIs(i.methods["M"].out_args["b"].type,
+                      i.broadcasts["B"].out_args["c"].type)
+        self.assertEqual(i.broadcasts["B"].out_args["c"].type.namespace, i)
+
+
 class TestMethods(BaseTestCase):
     """Test parsing methods."""
 
@@ -836,3 +879,241 @@ class TestBroadcasts(BaseTestCase):
                 }
             """)
         self.assertEqual(str(context.exception), "Duplicate argument 'a'.")
+
+
+class TestMappedFiles(BaseTestCase):
+    """Test lexing and parsing of memory-mapped files."""
+
+    FIDL = u"""
+        package P
+        // Comment
+        import model "f\u00efle.fidl"
+        /* Block
+           comment */
+        interface I {
+            <** @description: Structured
+                comment **>
+            version { major 1 minor 0 }
+            method M { in { Int32[] a } }
+        }
+        typeCollection TC {
+            enumeration E { A = -1 B = 2 }
+        }
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, fidl):
+        fspec = os.path.join(self.tmp_dir, "test.fidl")
+        with open(fspec, "wb") as f:
+            f.write(fidl.encode("utf-8"))
+        return fspec
+
+    @staticmethod
+    def _native(text):
+        """
+        Convert text to a native string, as read from a file.
+        """
+        if str is bytes:
+            # Python 2
+            return text.encode("utf-8")
+        return text
+
+    @staticmethod
+    def _tokens(lexer, data):
+        lexer.input(data)
+        tokens = []
+        while True:
+            tok = lexer.token()
+            if not tok:
+                break
+            tokens.append((tok.type, tok.value, tok.lineno))
+        return tokens
+
+    def test_same_tokens(self):
+        tokens = self._tokens(MappedLexer(), self.FIDL.encode("utf-8"))
+        self.assertEqual(tokens, self._tokens(Lexer().lexer,
+                                              self._native(self.FIDL)))
+        self.assertIn(("FILE_NAME", self._native(u"f\u00efle.fidl"), 4),
+                      tokens)
+        self.assertIn(("INTEGER", -1, 14), tokens)
+
+    def test_illegal_character(self):
+        with self.assertRaises(LexerException) as context:
+            self._tokens(MappedLexer(), b"package P\n$")
+        self.assertEqual(str(context.exception),
+                         "Illegal character '$' at line 2.")
+
+    def test_parse_file(self):
+        package = Parser().parse_file(self._write(self.FIDL))
+        self.assertEqual(package.name, "P")
+        self.assertEqual(package.imports[0].file,
+                         self._native(u"f\u00efle.fidl"))
+        self.assertEqual(package.files,
+                         [os.path.join(self.tmp_dir, "test.fidl")])
+        e = package.typecollections["TC"].enumerations["E"]
+        self.assertEqual(e.enumerators["A"].value, -1)
+
+    def test_crlf(self):
+        fidl = self.FIDL.replace("\n", "\r\n")
+        tokens = self._tokens(MappedLexer(), fidl.encode("utf-8"))
+        self.assertEqual(tokens, self._tokens(Lexer().lexer,
+                                              self._native(self.FIDL)))
+        self.assertEqual(self._tokens(Lexer().lexer, self._native(fidl)),
+                         tokens)
+        package = Parser().parse_file(self._write(fidl))
+        e = package.typecollections["TC"].enumerations["E"]
+        self.assertEqual(e.enumerators["B"].value, 2)
+        processor = Processor()
+        processor.map_size = 0
+        processor.import_file(self._write(
+            "package Q\r\ntypeCollection TC {\r\n"
+            "    typedef T is Int32\r\n}\r\n"))
+        self.assertIn("T", processor.packages["Q"].typecollections["TC"])
+
+    def test_parse_file_errors(self):
+        with self.assertRaises(ParserException) as context:
+            Parser().parse_file(self._write("package P\ninterface {"))
+        self.assertEqual(str(context.exception),
+                         "Syntax error at line 2 near '{'.")
+        with self.assertRaises(ParserException) as context:
+            Parser().parse_file(self._write(""))
+        self.assertEqual(str(context.exception),
+                         "Reached unexpected end of file.")
+
+
+class TestRecovery(BaseTestCase):
+    """Test collecting multiple errors."""
+
+    @staticmethod
+    def _recover(data):
+        diagnostics = []
+        package = Parser().parse(data, None, diagnostics)
+        return package, [(d.line, d.message) for d in diagnostics]
+
+    def test_valid(self):
+        package, errors = self._recover("package P interface I { }")
+        self.assertEqual(errors, [])
+        self.assertEqual(list(package.interfaces.keys()), ["I"])
+
+    def test_members(self):
+        package, errors = self._recover("""package P
+            interface I {
+                method M { in { UInt8 a } }
+                attribute UInt8 $ A
+                attribute B
+                attribute UInt16 C
+            }
+            typeCollection TC {
+                enumeration E { A B }
+                struct S { UInt8 }
+                typedef T is UInt32
+            }
+        """)
+        self.assertEqual(errors, [
+            (4, "Illegal character '$' at line 4."),
+            (6, "Syntax error at line 6 near 'attribute'."),
+            (10, "Syntax error at line 10 near '}'."),
+        ])
+        i = package.interfaces["I"]
+        self.assertEqual(list(i.methods.keys()), ["M"])
+        self.assertEqual(list(i.attributes.keys()), ["A", "C"])
+        tc = package.typecollections["TC"]
+        self.assertEqual(list(tc.enumerations.keys()), ["E"])
+        self.assertEqual(list(tc.structs.keys()), [])
+        self.assertEqual(list(tc.typedefs.keys()), ["T"])
+
+    def test_definitions(self):
+        package, errors = self._recover("""package P
+            import model
+            interface { }
+            typeCollection TC { typedef T is UInt8 } }
+            interface I { version { major 1 minor 0 }
+        """)
+        self.assertEqual(errors, [
+            (3, "Syntax error at line 3 near 'interface'."),
+            (3, "Syntax error at line 3 near '{'."),
+            (4, "Syntax error at line 4 near '}'."),
+            (5, "Reached unexpected end of file."),
+        ])
+        self.assertEqual(package.imports, [])
+        self.assertEqual(list(package.typecollections.keys()), ["TC"])
+        self.assertEqual(list(package.interfaces.keys()), ["I"])
+        self.assertEqual(package.interfaces["I"].version.major, 1)
+
+    def test_invalid_package(self):
+        package, errors = self._recover("packag P interface I { }")
+        self.assertIsNone(package)
+        self.assertEqual(errors,
+                         [(1, "Syntax error at line 1 near 'packag'.")])
+
+    def test_duplicate_members(self):
+        package, errors = self._recover("""package P
+            interface I {
+                attribute UInt8 A
+                attribute UInt8 A
+            }
+        """)
+        self.assertEqual(errors, [
+            (2, "Duplicate namespace member 'A'.")])
+        self.assertEqual(list(package.interfaces.keys()), [])
+
+    def test_definition_parsing(self):
+        parser = Parser()
+        errors = []
+        tokens = parser.tokenize(u"package P\ninterface I { $ }\n"
+                                 u"typeCollection TC { }", errors, 3, 100)
+        self.assertEqual([(offset, d.line, d.message) for offset, d in errors],
+                         [(124, 4, "Illegal character '$' at line 4.")])
+        self.assertEqual(tokens[2].lexpos, 110)
+        self.assertEqual(tokens[2].lineno, 4)
+        chunks = Parser.split_definitions(tokens)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 4, 4])
+        diagnostics = DiagnosticList()
+        parser.file_index = 5
+        header = parser.parse_header(chunks[0], chunks[1][0], diagnostics)
+        self.assertEqual(header.name, "P")
+        nodes = parser.parse_definition(chunks[1], chunks[2][0],
+                                        diagnostics)
+        nodes += parser.parse_definition(chunks[2], None, diagnostics)
+        self.assertEqual(diagnostics, [])
+        self.assertEqual(unpack(nodes[0].location), (5, 120))
+        package = Parser.build_package(header.name, nodes)
+        self.assertEqual(list(package.interfaces.keys()), ["I"])
+        self.assertEqual(list(package.typecollections.keys()), ["TC"])
+        # Missing package statement, reported once
+        for _ in range(2):
+            self.assertIsNone(parser.parse_header([], chunks[1][0],
+                                                  diagnostics))
+        self.assertEqual([(d.line, d.message) for d in diagnostics],
+                         [(4, "Syntax error at line 4 near 'interface'.")])
+
+    def test_synchronize(self):
+        parser = Parser()
+        fidl = u"package P\ninterface I { }\ninterface J { }\ninterface K"
+        offsets = [fidl.index(name) for name in ("I {", "J {", "K")]
+        self.assertEqual(parser.synchronize(fidl, 0, offsets), 0)
+        # Offsets inside the comment are skipped.
+        fidl = fidl.replace("I {", "/* I {").replace("J {", "J */ {")
+        offsets = [fidl.index(name) for name in ("I {", "J */", "K")]
+        self.assertEqual(parser.synchronize(fidl, 0, offsets), 2)
+        self.assertEqual(parser.synchronize(fidl, 0, offsets[:2]), 2)
+
+    def test_diagnostic_list(self):
+        diagnostics = DiagnosticList()
+        self.assertTrue(diagnostics.add(Diagnostic("Error.", line=1)))
+        self.assertFalse(diagnostics.add(Diagnostic("Error.", line=1)))
+        self.assertTrue(diagnostics.add(Diagnostic("Error.", line=2)))
+        self.assertTrue(diagnostics.add(Diagnostic("Other.", line=1)))
+        self.assertEqual([(d.line, d.message) for d in diagnostics],
+                         [(1, "Error."), (2, "Error."), (1, "Other.")])
+
+    def test_repeated_lexer_errors(self):
+        package, errors = self._recover("package P $ $ interface I { }")
+        self.assertEqual(errors, [(1, "Illegal character '$' at line 1."),
+                                  (1, "Illegal character '$' at line 1.")])
+        self.assertEqual(list(package.interfaces.keys()), ["I"])
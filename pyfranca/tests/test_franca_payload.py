@@ -0,0 +1,173 @@
+"""
+Pyfranca payload validation tests.
+"""
+
+import unittest
+
+from pyfranca import Parser, Processor, ast
+from pyfranca.franca_payload import PayloadException, PayloadValidator, \
+    enumerator_values, struct_fields
+
+
+FIDL = """
+package P
+typeCollection TC {
+    enumeration Base { A B = 5 }
+    enumeration E extends Base { C D = 2 F }
+    struct S { UInt8 u Int16 i }
+    struct D extends S { String name E e Boolean flag Float f Double d
+                         ByteBuffer b }
+    array A of UInt16
+    map M { String to S }
+    typedef T is UInt64
+    struct Node { UInt32 value Node[] children }
+}
+interface I {
+    method m { in { D d A a M m T t } out { Node n } }
+    broadcast b { out { Int8 x } }
+}
+"""
+
+
+class TestPayloadValidator(unittest.TestCase):
+    """Test compiled payload validators."""
+
+    def setUp(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", FIDL)
+        self.tc = package.typecollections["TC"]
+        self.method = package.interfaces["I"].methods["m"]
+        self.validator = PayloadValidator()
+
+    def _error(self, the_type, value):
+        with self.assertRaises(PayloadException) as context:
+            self.validator.validate(the_type, value)
+        return str(context.exception)
+
+    def test_flattening(self):
+        self.assertEqual([field.name for field in
+                          struct_fields(self.tc.structs["D"])],
+                         ["u", "i", "name", "e", "flag", "f", "d", "b"])
+        self.assertEqual(enumerator_values(self.tc.enumerations["E"]),
+                         [("A", 0), ("B", 5), ("C", 6), ("D", 2), ("F", 3)])
+
+    def test_integers(self):
+        s = self.tc.structs["S"]
+        self.validator.validate(s, {"u": 255, "i": -32768})
+        self.assertEqual(self._error(s, {"u": 256, "i": 0}),
+                         "u: Value 256 out of range for UInt8.")
+        self.assertEqual(self._error(s, {"u": 1, "i": 1.0}),
+                         "i: Expected Int16, got float.")
+        self.assertEqual(self._error(s, {"u": True, "i": 0}),
+                         "u: Expected UInt8, got bool.")
+        t = self.tc.typedefs["T"]
+        self.validator.validate(t, 2 ** 64 - 1)
+        self.assertEqual(self._error(t, -1),
+                         "Value -1 out of range for UInt64.")
+
+    def test_struct(self):
+        d = self.tc.structs["D"]
+        value = {"u": 1, "i": 2, "name": "x", "e": "C", "flag": True,
+                 "f": 1.5, "d": 1e300, "b": b"\x00"}
+        self.validator.validate(d, value)
+        value["e"] = 6
+        self.validator.validate(d, value)
+        value["e"] = 4
+        self.assertEqual(self._error(d, value),
+                         "e: Invalid enumerator 4 for E.")
+        value["e"] = "A"
+        value["f"] = 1e300
+        self.assertEqual(self._error(d, value),
+                         "f: Value 1e+300 out of range for Float.")
+        value["f"] = 0
+        del value["b"]
+        self.assertEqual(self._error(d, value), "Missing struct 'b'.")
+        value["b"] = bytearray()
+        value["x"] = 1
+        self.assertEqual(self._error(d, value), "Unknown struct 'x'.")
+        self.assertEqual(self._error(d, []), "Expected dict, got list.")
+
+    def test_containers(self):
+        a = self.tc.arrays["A"]
+        self.validator.validate(a, [0, 65535])
+        self.validator.validate(a, ())
+        self.assertEqual(self._error(a, [0, 65536]),
+                         "[1]: Value 65536 out of range for UInt16.")
+        self.assertEqual(self._error(a, [0, "1"]),
+                         "[1]: Expected UInt16, got str.")
+        m = self.tc.maps["M"]
+        self.validator.validate(m, {"k": {"u": 0, "i": 0}})
+        self.assertEqual(self._error(m, {"k": {"u": -1, "i": 0}}),
+                         "['k'].u: Value -1 out of range for UInt8.")
+        self.assertEqual(self._error(m, {1: {"u": 0, "i": 0}}),
+                         "[1]: Expected String, got int.")
+
+    def test_recursive(self):
+        node = self.tc.structs["Node"]
+        self.validator.validate(node, {"value": 1, "children": [
+            {"value": 2, "children": []}]})
+        self.assertEqual(
+            self._error(node, {"value": 1, "children": [
+                {"value": 2, "children": [{"value": -1, "children": []}]}]}),
+            "children[0].children[0].value: "
+            "Value -1 out of range for UInt32.")
+
+    def test_arguments(self):
+        self.validator.validate_arguments(self.method.out_args, {
+            "n": {"value": 1, "children": []}})
+        with self.assertRaises(PayloadException) as context:
+            self.validator.validate_arguments(self.method.in_args, {
+                "d": None, "a": [], "m": {}, "t": 0})
+        self.assertEqual(str(context.exception),
+                         "d: Expected dict, got NoneType.")
+
+    def test_cache(self):
+        check = self.validator.compile(self.tc.structs["D"])
+        self.assertIs(self.validator.compile(self.tc.structs["D"]), check)
+        self.assertIs(self.validator.compile(self.tc.typedefs["T"]),
+                      self.validator.compile(self.method.in_args["t"].type))
+        self.assertIs(self.validator.compile_arguments(self.method.in_args),
+                      self.validator.compile_arguments(self.method.in_args))
+
+    def test_unlinked(self):
+        package = Parser().parse("package P typeCollection TC "
+                                 "{ struct S { X x } }")
+        with self.assertRaises(PayloadException) as context:
+            self.validator.compile(package.typecollections["TC"].structs["S"])
+        self.assertEqual(str(context.exception), "Unresolved reference 'X'.")
+
+    def test_failed_compile(self):
+        package = Parser().parse("package P typeCollection TC { "
+                                 "struct S1 { S2[] arr X x } "
+                                 "struct S2 { S1 back } }")
+        structs = package.typecollections["TC"].structs
+        structs["S1"].fields["arr"].type.type.reference = structs["S2"]
+        structs["S2"].fields["back"].type.reference = structs["S1"]
+        with self.assertRaises(PayloadException):
+            self.validator.compile(structs["S1"])
+        # Types compiled along the way do not refer to the failed struct.
+        with self.assertRaises(PayloadException) as context:
+            self.validator.compile(structs["S2"])
+        self.assertEqual(str(context.exception), "Unresolved reference 'X'.")
+        structs["S1"].fields["x"].type.reference = ast.UInt8()
+        self.validator.validate(structs["S2"], {"back": {"arr": [], "x": 1}})
+        self.assertEqual(self._error(structs["S2"], {"back": {}}),
+                         "back: Missing struct 'arr'.")
+
+    def test_typedef_chain(self):
+        count = 3000
+        fidl = ["package Q", "typeCollection TC {"]
+        fidl += ["typedef T{} is T{}".format(index, index + 1)
+                 for index in range(count)]
+        fidl += ["typedef T{} is UInt16".format(count), "}"]
+        package = Processor().import_string("chain.fidl", "\n".join(fidl))
+        typedefs = package.typecollections["TC"].typedefs
+        check = self.validator.compile(typedefs["T0"])
+        check(1)
+        self.assertIs(self.validator.compile(typedefs["T10"]), check)
+        self.assertEqual(self._error(typedefs["T0"], -1),
+                         "Value -1 out of range for UInt16.")
+
+
+if __name__ == '__main__':
+    unittest.main()
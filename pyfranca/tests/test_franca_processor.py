@@ -2,9 +2,14 @@
 Pyfranca processor tests.
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 
-from pyfranca import ProcessorException, Processor, ast
+from pyfranca import LexerException, ProcessorException, Processor, ast
+from pyfranca.franca_loaders import DictLoader
+from pyfranca.franca_stats import ProcessorStats
 
 
 class BaseTestCase(unittest.TestCase):
@@ -95,6 +100,44 @@ class TestImports(BaseTestCase):
         self.assertEqual(str(context.exception),
                          "Namespace 'P.Nonexistent.*' not found.")
 
+    def test_import_from_package_path(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tmp_dir, "common.fidl"), "w") as f:
+                f.write("package C")
+            self.processor.package_paths.append(tmp_dir)
+            self.processor.import_string("test.fidl", """
+                package P
+                import model "common.fidl"
+            """)
+            self.processor.import_string("test2.fidl", """
+                package P2
+                import model "common.fidl"
+            """)
+            c = self.processor.packages["C"]
+            p = self.processor.packages["P"]
+            p2 = self.processor.packages["P2"]
+            # The file is parsed only once.
+            self.assertIs(p.imports[0].package_reference, c)
+            self.assertIs(p2.imports[0].package_reference, c)
+            # The import graph refers to the resolved file.
+            common = os.path.join(tmp_dir, "common.fidl")
+            self.assertEqual(self.processor.imports, {
+                "test.fidl": [common], "test2.fidl": [common], common: []})
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_reassigned_package_paths(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tmp_dir, "common.fidl"), "w") as f:
+                f.write("package C")
+            self.processor.package_paths = [tmp_dir]
+            self.processor.import_file("common.fidl")
+            self.assertIn("C", self.processor.packages)
+        finally:
+            shutil.rmtree(tmp_dir)
+
     # TODO: Temporary file creation needed.
     # def test_circular_dependency(self):
     #     self.processor.import_string("test.fidl", """
@@ -147,6 +190,29 @@ class TestPackagesInMultipleFiles(BaseTestCase):
         self.assertEqual(b.type.name, "A")
         self.assertEqual(b.type.reference, a)
 
+    def test_package_in_multiple_files_imports(self):
+        self.processor.import_string("test.fidl", """
+            package P
+            typeCollection TC {
+                typedef A is Int32
+            }
+        """)
+        self.processor.import_string("test2.fidl", """
+            package P2
+        """)
+        self.processor.import_string("test3.fidl", """
+            package P2
+            import P.TC.* from "test.fidl"
+            typeCollection TC2 {
+                typedef B is A
+            }
+        """)
+        p2 = self.processor.packages["P2"]
+        self.assertEqual(len(p2.imports), 1)
+        a = self.processor.packages["P"].typecollections["TC"].typedefs["A"]
+        b = p2.typecollections["TC2"].typedefs["B"]
+        self.assertEqual(b.type.reference, a)
+
 
 class TestReferences(BaseTestCase):
     """Test type references."""
@@ -219,7 +285,6 @@ class TestReferences(BaseTestCase):
         self.assertEqual(b.type.name, "A")
         self.assertEqual(b.type.reference, a)
 
-    @unittest.skip("Currently not checked.")
     def test_circular_reference(self):
         with self.assertRaises(ProcessorException) as context:
             self.processor.import_string("test.fidl", """
@@ -550,3 +615,100 @@ class TestReferences(BaseTestCase):
         self.assertEqual(m.out_args["tda"].type.type.reference, td)
         b = i.broadcasts["B"]
         self.assertEqual(b.out_args["tda"].type.type.reference, td)
+        # Identical anonymous arrays are shared within a namespace.
+        self.assertIs(s.fields["tda"].type, tda.type)
+        self.assertIs(m.in_args["tda"].type, b.out_args["tda"].type)
+
+
+class TestStats(BaseTestCase):
+    """Test processing statistics."""
+
+    def test_stats(self):
+        self.processor.stats = ProcessorStats()
+        fidl = """
+            package P
+            typeCollection TC {
+                typedef A is Int32
+                typedef B is A
+                struct S { A[] a A[] b }
+            }
+        """
+        self.processor.import_string("test.fidl", fidl)
+        stats = self.processor.stats
+        self.assertEqual(list(stats.files.keys()), ["test.fidl"])
+        file_stats = stats.files["test.fidl"]
+        self.assertEqual(file_stats.bytes, len(fidl))
+        self.assertEqual(file_stats.tokens, 26)
+        self.assertGreater(file_stats.parse_seconds, 0.0)
+        self.assertGreaterEqual(file_stats.parse_seconds,
+                                file_stats.lex_seconds)
+        self.assertEqual(stats.resolve_calls, 2)
+        self.assertEqual(stats.lookup_probes, 2)
+        # The shared anonymous array element is resolved only once.
+        self.assertEqual(stats.cache_hits, 1)
+        self.assertEqual(stats.slowest(5), [file_stats])
+        self.assertEqual(stats.as_dict()["tokens"], 26)
+
+    def test_no_stats(self):
+        self.processor.import_string("test.fidl", "package P")
+        self.assertIsNone(self.processor.stats)
+
+
+class TestDiagnostics(BaseTestCase):
+    """Test collecting multiple model errors."""
+
+    def setUp(self):
+        super(TestDiagnostics, self).setUp()
+        self.processor.diagnostics = []
+        self.processor.loaders = [DictLoader({
+            "a.fidl": """package P
+                import model "missing.fidl"
+                import P.TC.* from "b.fidl"
+                interface I extends TC {
+                    method M { in { Unknown a } error S }
+                    attribute S A
+                    attribute UInt8 @ B
+                }
+            """,
+            "b.fidl": """package P
+                typeCollection TC {
+                    struct S extends E { Other a }
+                    enumeration E { A }
+                    typedef T is
+                }
+            """,
+        })]
+
+    def _errors(self):
+        return [(d.file, d.line, d.message)
+                for d in self.processor.diagnostics]
+
+    def test_all_errors(self):
+        package = self.processor.import_file("a.fidl")
+        self.assertEqual(self._errors(), [
+            ("a.fidl", 7, "Illegal character '@' at line 7."),
+            ("a.fidl", None, "Model 'missing.fidl' not found."),
+            ("b.fidl", 6, "Syntax error at line 6 near '}'."),
+            ("b.fidl", 3, "Unresolved reference 'Other'."),
+            ("b.fidl", 3, "Invalid struct reference 'E'."),
+            ("a.fidl", 5, "Unresolved reference 'Unknown'."),
+            ("a.fidl", 5, "Invalid error reference 'S'."),
+            ("a.fidl", 4, "Invalid interface reference 'TC'."),
+        ])
+        # Valid definitions are processed.
+        i = package.interfaces["I"]
+        self.assertIs(i.attributes["A"].type.reference,
+                      package.typecollections["TC"].structs["S"])
+        self.assertEqual(list(i.attributes.keys()), ["A", "B"])
+        self.assertEqual(self.processor.imports["a.fidl"], ["b.fidl"])
+
+    def test_invalid_package(self):
+        self.assertIsNone(self.processor.import_string("c.fidl", "P"))
+        self.assertEqual(self._errors(), [
+            ("c.fidl", 1, "Syntax error at line 1 near 'P'.")])
+        self.assertNotIn("c.fidl", self.processor.files)
+
+    def test_raise(self):
+        self.processor.diagnostics = None
+        with self.assertRaises(LexerException):
+            self.processor.import_file("a.fidl")
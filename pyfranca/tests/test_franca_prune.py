@@ -0,0 +1,154 @@
+"""
+Pyfranca model pruning tests.
+"""
+
+import unittest
+
+from pyfranca import Processor, ast
+from pyfranca.franca_prune import TYPE_MEMBERS, _dependencies, prune, \
+    reachable_types, unused_types
+from pyfranca.franca_types import fqn, resolve
+
+
+class TestPrune(unittest.TestCase):
+    """Test unused type detection and pruning."""
+
+    def setUp(self):
+        self.processor = Processor()
+        self.processor.import_string("common.fidl", """
+            package C
+            typeCollection Types {
+                enumeration Base { A }
+                enumeration Error extends Base { B }
+                struct Point { Float x Float y }
+                struct Point3 extends Point { Float z }
+                typedef Points is Point3[]
+                map Names { UInt8 to Name }
+                typedef Name is String
+                struct Unused { UInt8 u }
+                array UnusedArray of Unused
+            }
+        """)
+        package = self.processor.import_string("test.fidl", """
+            package P
+            import C.Types.* from "common.fidl"
+            interface Base {
+                attribute Names names
+            }
+            interface I extends Base {
+                struct Local { UInt8 u }
+                method m { in { Points points } error Error }
+                broadcast b { out { Local l } }
+            }
+            interface Other {
+                struct Own { UInt8 u }
+                method n { in { Unused u } }
+            }
+        """)
+        self.interface = package.interfaces["I"]
+
+    def _names(self, nodes):
+        return sorted(node.name for node in nodes if node.name is not None)
+
+    def test_reachable(self):
+        self.assertEqual(
+            self._names(reachable_types([self.interface])),
+            ["Base", "Error", "Local", "Name", "Names", "Point", "Point3",
+             "Points"])
+        self.assertEqual(self._names(reachable_types([])), [])
+
+    def test_unused(self):
+        packages = self.processor.packages
+        self.assertEqual(
+            [node.name for node in unused_types(packages, [self.interface])],
+            ["Unused", "UnusedArray", "Own"])
+        other = packages["P"].interfaces["Other"]
+        self.assertEqual(
+            [node.name for node in unused_types(packages, [self.interface,
+                                                           other])],
+            ["UnusedArray", "Own"])
+
+    def _dangling(self, packages):
+        """
+        Find the references of a model to definitions not in the model.
+        """
+        defined = set()
+        nodes = []
+        for package in packages.values():
+            for namespace in list(package.typecollections.values()) + \
+                    list(package.interfaces.values()):
+                defined.add(fqn(namespace))
+                nodes.append(namespace)
+                for name in TYPE_MEMBERS:
+                    members = getattr(namespace, name).values()
+                    defined.update(fqn(member) for member in members)
+                    nodes.extend(members)
+        dangling = []
+        while nodes:
+            for node in _dependencies(nodes.pop()):
+                target = resolve(node)
+                if isinstance(target, ast.Array) and target.name is None:
+                    nodes.append(target)
+                elif target is not None and \
+                        not isinstance(target, ast.PrimitiveType) and \
+                        fqn(target) not in defined:
+                    dangling.append(fqn(target))
+        return dangling
+
+    def test_prune(self):
+        packages = self.processor.packages
+        pruned = prune(packages, [self.interface])
+        types = pruned["C"].typecollections["Types"]
+        self.assertIs(types.package, pruned["C"])
+        self.assertNotIn("Unused", types)
+        self.assertNotIn("UnusedArray", types)
+        self.assertIs(types.structs["Point"],
+                      packages["C"].typecollections["Types"].structs["Point"])
+        # Interfaces other than the roots and their bases are left out.
+        self.assertEqual(list(pruned["P"].interfaces), ["Base", "I"])
+        self.assertIs(pruned["P"].interfaces["I"].methods["m"],
+                      packages["P"].interfaces["I"].methods["m"])
+        self.assertEqual(self._dangling(pruned), [])
+        # The original model is not modified.
+        self.assertIn("Unused", packages["C"].typecollections["Types"])
+        self.assertIn("Other", packages["P"].interfaces)
+        self.assertEqual(self._dangling(packages), [])
+
+    def test_prune_roots(self):
+        packages = self.processor.packages
+        other = packages["P"].interfaces["Other"]
+        pruned = prune(packages, [self.interface, other])
+        self.assertEqual(list(pruned["P"].interfaces), ["Base", "I", "Other"])
+        self.assertIn("Unused", pruned["C"].typecollections["Types"])
+        self.assertEqual(list(pruned["P"].interfaces["Other"].structs), [])
+        self.assertEqual(self._dangling(pruned), [])
+
+    def test_prune_copies_members(self):
+        packages = self.processor.packages
+        pruned = prune(packages, [self.interface])
+        interface = pruned["P"].interfaces["I"]
+        del interface.methods["m"]
+        pruned["P"].imports.pop()
+        pruned["P"].files.append("other.fidl")
+        self.assertIn("m", self.interface.methods)
+        self.assertEqual(len(packages["P"].imports), 1)
+        self.assertNotIn("other.fidl", packages["P"].files)
+
+    def test_inline_errors(self):
+        package = self.processor.import_string("errors.fidl", """
+            package E
+            interface J {
+                method m { in { UInt8 x } error { A B = 5 } }
+            }
+        """)
+        interface = package.interfaces["J"]
+        self.assertEqual(self._names(reachable_types([interface])), [])
+        pruned = prune(self.processor.packages, [interface])
+        self.assertEqual(list(pruned["E"].interfaces["J"].methods), ["m"])
+        self.assertEqual(list(pruned["P"].interfaces), [])
+        self.assertEqual(list(pruned["C"].typecollections["Types"].structs),
+                         [])
+
+
+if __name__ == '__main__':
+    unittest.main()
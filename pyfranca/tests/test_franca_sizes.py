@@ -0,0 +1,132 @@
+"""
+Pyfranca wire size analysis tests.
+"""
+
+import unittest
+
+from pyfranca import Processor, ast
+from pyfranca.franca_codec import Codec
+from pyfranca.franca_sizes import SizeAnalyzer, SizeException, WireSize
+
+FIDL = """
+package P
+typeCollection TC {
+    enumeration E { A B }
+    struct S { UInt8 u Int16 i E e }
+    struct D extends S { Double d Boolean flag }
+    struct V extends S { String name UInt8[] data }
+    typedef T is D
+    map M { UInt16 to S }
+    struct Node { UInt32 value Node[] children }
+}
+interface Base {
+    broadcast b { out { T t } }
+}
+interface I extends Base {
+    method fixed { in { S s UInt64 x } out { D d } }
+    method variable { in { V v } out { M m } }
+    method empty { }
+}
+"""
+
+
+class TestSizeAnalyzer(unittest.TestCase):
+    """Test minimum and maximum encoded sizes."""
+
+    def setUp(self):
+        processor = Processor()
+        package = processor.import_string("test.fidl", FIDL)
+        self.tc = package.typecollections["TC"]
+        self.interface = package.interfaces["I"]
+        self.analyzer = SizeAnalyzer()
+
+    def test_fixed(self):
+        s = self.analyzer.size(self.tc.structs["S"])
+        self.assertEqual(s, WireSize(7, 7))
+        self.assertTrue(s.fixed)
+        self.assertEqual(self.analyzer.size(self.tc.typedefs["T"]),
+                         WireSize(16, 16))
+        self.assertEqual(SizeAnalyzer(ast.UInt8).size(self.tc.structs["D"]),
+                         WireSize(13, 13))
+        # Sizes match the codec.
+        data = Codec().encode(self.tc.structs["D"], {
+            "u": 1, "i": 2, "e": "B", "d": 0.5, "flag": True})
+        self.assertEqual(len(data), 16)
+
+    def test_variable(self):
+        v = self.analyzer.size(self.tc.structs["V"])
+        self.assertEqual(v, WireSize(16))
+        self.assertFalse(v.fixed)
+        self.assertEqual(self.analyzer.size(self.tc.maps["M"]), WireSize(4))
+        self.assertEqual(self.analyzer.size(self.tc.structs["Node"]),
+                         WireSize(8))
+        data = Codec().encode(self.tc.structs["V"], {
+            "u": 1, "i": 2, "e": "A", "name": "", "data": []})
+        self.assertEqual(len(data), 16)
+
+    def test_messages(self):
+        messages = [(node.name, direction, size) for node, direction, size
+                    in self.analyzer.messages(self.interface)]
+        self.assertEqual(messages, [
+            ("fixed", "in", WireSize(15, 15)),
+            ("fixed", "out", WireSize(16, 16)),
+            ("variable", "in", WireSize(16)),
+            ("variable", "out", WireSize(4)),
+            ("empty", "in", WireSize(0, 0)),
+            ("empty", "out", WireSize(0, 0)),
+            ("b", "out", WireSize(16, 16)),
+        ])
+        node, direction, size = self.analyzer.worst_case(self.interface)
+        self.assertEqual((node.name, direction), ("variable", "in"))
+
+    def test_cache(self):
+        d = self.tc.structs["D"]
+        self.assertIs(self.analyzer.size(d), self.analyzer.size(d))
+
+    def test_errors(self):
+        processor = Processor()
+        # Reported by the processor as well
+        processor.diagnostics = []
+        package = processor.import_string("test.fidl", """
+            package Q
+            typeCollection TC {
+                struct R { UInt8 u R r }
+                struct L { R[] rs }
+            }
+        """)
+        tc = package.typecollections["TC"]
+        for name in ("R", "L"):
+            with self.assertRaises(SizeException) as context:
+                self.analyzer.size(tc.structs[name])
+            self.assertEqual(str(context.exception), "Recursive type 'R'.")
+        with self.assertRaises(ValueError):
+            SizeAnalyzer(ast.Float)
+
+    def test_recursion_order(self):
+        package = Processor().import_string("test.fidl", """
+            package Q
+            typeCollection TC {
+                struct A { B[] x }
+                struct B { A a }
+            }
+        """)
+        tc = package.typecollections["TC"]
+        # Sizes do not depend on the order of the analysis.
+        for names in (("A", "B"), ("B", "A")):
+            analyzer = SizeAnalyzer()
+            for name in names:
+                self.assertEqual(analyzer.size(tc.structs[name]), WireSize(4))
+
+    def test_typedef_chain(self):
+        count = 3000
+        fidl = ["package Q", "typeCollection TC {"]
+        fidl += ["typedef T{} is T{}".format(index, index + 1)
+                 for index in range(count)]
+        fidl += ["typedef T{} is UInt16".format(count), "}"]
+        package = Processor().import_string("chain.fidl", "\n".join(fidl))
+        typedefs = package.typecollections["TC"].typedefs
+        self.assertEqual(self.analyzer.size(typedefs["T0"]), WireSize(2, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Pyfranca tracer tests.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyfranca import Processor, ProcessorException
+from pyfranca.franca_trace import Tracer
+
+
+class TestTracer(unittest.TestCase):
+    """Test trace event recording."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.processor = Processor()
+        self.processor.package_paths.append(self.tmp_dir)
+        self.processor.tracer = Tracer()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, file_name, fidl):
+        with open(os.path.join(self.tmp_dir, file_name), "w") as f:
+            f.write(fidl)
+
+    def _events(self):
+        return [(event["ph"], event["name"])
+                for event in self.processor.tracer.events]
+
+    def test_nested_events(self):
+        self._write("a.fidl", """
+            package A
+            typeCollection TC { typedef T is Int32 }
+        """)
+        self._write("b.fidl", """
+            package B
+            import A.TC.* from "a.fidl"
+            typeCollection TC { typedef T2 is T }
+        """)
+        self.processor.import_file(os.path.join(self.tmp_dir, "b.fidl"))
+        a = os.path.join(self.tmp_dir, "a.fidl")
+        b = os.path.join(self.tmp_dir, "b.fidl")
+        self.assertEqual(self._events(), [
+            ("B", b), ("B", "read"), ("E", "read"),
+            ("B", "parse"), ("E", "parse"),
+            ("B", "B"),
+            ("B", a), ("B", "read"), ("E", "read"),
+            ("B", "parse"), ("E", "parse"),
+            ("B", "A"), ("B", "link"), ("E", "link"), ("E", "A"),
+            ("E", a),
+            ("B", "link"), ("E", "link"), ("E", "B"),
+            ("E", b),
+        ])
+        timestamps = [event["ts"] for event in self.processor.tracer.events]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_error_closes_events(self):
+        with self.assertRaises(ProcessorException):
+            self.processor.import_string("test.fidl", """
+                package P
+                typeCollection TC { typedef T is Unknown }
+            """)
+        self.assertEqual(self._events(), [
+            ("B", "parse"), ("E", "parse"),
+            ("B", "P"), ("B", "link"), ("E", "link"), ("E", "P"),
+        ])
+
+    def test_write(self):
+        self.processor.import_string("test.fidl", "package P")
+        fspec = os.path.join(self.tmp_dir, "trace.json")
+        self.processor.tracer.write(fspec)
+        with open(fspec) as f:
+            trace = json.load(f)
+        self.assertEqual(len(trace["traceEvents"]), 6)
+        self.assertEqual(trace["traceEvents"][2]["args"],
+                         {"file": "test.fidl"})
@@ -0,0 +1,135 @@
+"""
+Pyfranca type resolution and type cache tests.
+"""
+
+import unittest
+
+from pyfranca import Parser, Processor
+from pyfranca.franca_types import TypeCache, fqn, resolve, resolve_alias
+
+
+class CacheException(Exception):
+
+    def __init__(self, message):
+        super(CacheException, self).__init__()
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class TestResolution(unittest.TestCase):
+    """Test FQNs and type resolution."""
+
+    def setUp(self):
+        package = Processor().import_string("test.fidl", """
+            package P
+            typeCollection TC {
+                typedef T is S
+                typedef U is T
+                struct S { UInt8 u }
+            }
+        """)
+        self.tc = package.typecollections["TC"]
+
+    def test_fqn(self):
+        self.assertEqual(fqn(self.tc), "P.TC")
+        self.assertEqual(fqn(self.tc.structs["S"]), "P.TC.S")
+
+    def test_resolve(self):
+        t = self.tc.typedefs["T"]
+        self.assertIs(resolve(t.type), self.tc.structs["S"])
+        self.assertIs(resolve(t), t)
+        self.assertIs(resolve_alias(self.tc.typedefs["U"], CacheException),
+                      self.tc.structs["S"])
+
+    def test_unresolved(self):
+        package = Parser().parse("package P typeCollection TC "
+                                 "{ typedef T is X typedef U is U }")
+        typedefs = package.typecollections["TC"].typedefs
+        self.assertIsNone(resolve(typedefs["T"].type))
+        with self.assertRaises(CacheException) as context:
+            resolve_alias(typedefs["T"], CacheException)
+        self.assertEqual(str(context.exception), "Unresolved reference 'X'.")
+        typedefs["U"].type.reference = typedefs["U"]
+        with self.assertRaises(CacheException) as context:
+            resolve_alias(typedefs["U"], CacheException)
+        self.assertEqual(str(context.exception), "Circular reference 'U'.")
+
+
+class Node(object):
+
+    def __init__(self, name, children=()):
+        self.name = name
+        self.children = list(children)
+
+
+class TestTypeCache(unittest.TestCase):
+    """Test per-type caching."""
+
+    def _compute(self, node):
+        if node.name == "bad":
+            raise CacheException("Bad node.")
+        value = [node.name]
+        self.cache.set(node, value)
+        value.extend(self.cache.get(child) for child in node.children)
+        return value
+
+    def setUp(self):
+        self.cache = TypeCache(self._compute, CacheException)
+
+    def test_cache(self):
+        leaf = Node("leaf")
+        root = Node("root", [leaf])
+        value = self.cache.get(root)
+        self.assertEqual(value, ["root", ["leaf"]])
+        self.assertIs(self.cache.get(root), value)
+        self.assertIs(self.cache.get(leaf), value[1])
+
+    def test_recursion(self):
+        node = Node("node")
+        node.children.append(node)
+        cache = TypeCache(lambda item: cache.get(item.children[0]),
+                          CacheException)
+        with self.assertRaises(CacheException) as context:
+            cache.get(node)
+        self.assertEqual(str(context.exception), "Recursive type 'node'.")
+        cache.recursion = lambda item: cache.position(item)
+        self.assertEqual(cache.get(node), 0)
+
+    def test_rollback(self):
+        leaf = Node("leaf")
+        inner = Node("inner", [leaf])
+        root = Node("root", [inner, Node("bad")])
+        with self.assertRaises(CacheException):
+            self.cache.get(root)
+        # Nothing compiled for the failed root is kept.
+        inner.children.append(Node("other"))
+        self.assertEqual(self.cache.get(inner),
+                         ["inner", ["leaf"], ["other"]])
+        self.assertEqual(self.cache.stack, [])
+
+    def test_get_type(self):
+        package = Processor().import_string("test.fidl", """
+            package P
+            typeCollection TC {
+                typedef T is U
+                typedef U is S
+                struct S { UInt8 u }
+            }
+        """)
+        tc = package.typecollections["TC"]
+        computed = []
+        cache = TypeCache(lambda node: computed.append(node) or node.name,
+                          CacheException)
+        self.assertEqual(cache.get_type(tc.typedefs["T"]), "S")
+        self.assertEqual(cache.get_type(tc.typedefs["U"]), "S")
+        self.assertEqual(computed, [tc.structs["S"]])
+        # Aliases are stored with the value of the actual type.
+        cache.discard(tc.structs["S"])
+        self.assertEqual(cache.get_type(tc.typedefs["T"]), "S")
+        self.assertEqual(computed, [tc.structs["S"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Pyfranca model watcher tests.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyfranca.franca_watch import Watcher, dependents
+
+
+class TestDependents(unittest.TestCase):
+    """Test the import graph traversal."""
+
+    def test_dependents(self):
+        imports = {"a": ["b", "c"], "b": ["d"], "c": [], "e": ["a"]}
+        self.assertEqual(dependents(imports, {"d"}), {"a", "b", "d", "e"})
+        self.assertEqual(dependents(imports, {"c"}), {"a", "c", "e"})
+        self.assertEqual(dependents(imports, {"e"}), {"e"})
+        self.assertEqual(dependents(imports, set()), set())
+
+    def test_cycle(self):
+        imports = {"a": ["b"], "b": ["a"]}
+        self.assertEqual(dependents(imports, {"a"}), {"a", "b"})
+
+
+class TestWatcher(unittest.TestCase):
+    """Test change detection and revalidation."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self._write("common.fidl", """
+            package C
+            typeCollection TC { typedef T is Int32 }
+        """)
+        self._write("a.fidl", """
+            package A
+            import C.TC.* from "common.fidl"
+            interface I { attribute T a }
+        """)
+        self._write("b.fidl", """
+            package B
+            interface I { attribute Int32 a }
+        """)
+        self.watcher = Watcher(["a.fidl", "b.fidl"], [self.tmp_dir])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _fspec(self, file_name):
+        return os.path.join(self.tmp_dir, file_name)
+
+    def _write(self, file_name, fidl):
+        fspec = self._fspec(file_name)
+        mtime = os.stat(fspec).st_mtime if os.path.exists(fspec) else None
+        with open(fspec, "w") as f:
+            f.write(fidl)
+        if mtime is not None:
+            # Make sure the modification is visible on coarse clocks.
+            os.utime(fspec, (mtime + 1, mtime + 1))
+
+    def _validated(self, cycle):
+        return [result.fspec for result in cycle.results]
+
+    def test_initial_validation(self):
+        self.watcher.check()
+        cycle = self.watcher.revalidate(set(self.watcher.fspecs))
+        self.assertEqual(self._validated(cycle), ["a.fidl", "b.fidl"])
+        self.assertTrue(all(result.valid for result in cycle.results))
+        self.assertEqual(self.watcher.check(), set())
+
+    def test_dependency_change(self):
+        self.watcher.check()
+        self.watcher.revalidate(set(self.watcher.fspecs))
+        self._write("common.fidl", """
+            package C
+            typeCollection TC { typedef T2 is Int32 }
+        """)
+        changed = self.watcher.check()
+        self.assertEqual(changed, {self._fspec("common.fidl")})
+        cycle = self.watcher.revalidate(changed)
+        # Only the dependent entry is validated again.
+        self.assertEqual(self._validated(cycle), ["a.fidl"])
+        self.assertEqual(cycle.results[0].errors, [
+            "{}:4: Unresolved reference 'T'.".format(self._fspec("a.fidl"))])
+        self.assertEqual(self.watcher.check(), set())
+
+    def test_entry_change(self):
+        self.watcher.check()
+        self.watcher.revalidate(set(self.watcher.fspecs))
+        self._write("b.fidl", """
+            package B
+            interface I { attribute Int32 a attribute Int32 a }
+        """)
+        cycle = self.watcher.revalidate(self.watcher.check())
+        self.assertEqual(self._validated(cycle), ["b.fidl"])
+        self.assertFalse(cycle.results[0].valid)
+
+    def test_missing_import(self):
+        os.remove(self._fspec("common.fidl"))
+        self.watcher.check()
+        cycle = self.watcher.revalidate(set(self.watcher.fspecs))
+        self.assertEqual(cycle.results[0].errors, [
+            "{}: Model 'common.fidl' not found.".format(self._fspec("a.fidl")),
+            "{}:4: Unresolved reference 'T'.".format(self._fspec("a.fidl"))])
+        # A new file in the package path triggers the invalid entry.
+        self._write("common.fidl", """
+            package C
+            typeCollection TC { typedef T is Int32 }
+        """)
+        changed = self.watcher.check()
+        self.assertEqual(changed, {self._fspec("common.fidl")})
+        cycle = self.watcher.revalidate(changed)
+        self.assertEqual(self._validated(cycle), ["a.fidl"])
+        self.assertTrue(cycle.results[0].valid)
+
+    def test_run(self):
+        cycles = []
+
+        def report(cycle):
+            cycles.append(cycle)
+            if len(cycles) == 1:
+                self._write("b.fidl", "package B")
+
+        self.watcher.interval = 0.01
+        self.watcher.debounce = 0.0
+        self.watcher.run(report, cycles=1)
+        self.assertEqual([self._validated(cycle) for cycle in cycles],
+                         [["a.fidl", "b.fidl"], ["b.fidl"]])
@@ -5,7 +5,12 @@ Pyfranca setup script.
 
 import os
 import re
+import sys
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
+
+# Modules using syntax of Python 3.5 or later
+PY35_MODULES = [("pyfranca", "franca_async")]
 
 
 def read_package_variable(key):
@@ -18,6 +23,19 @@ def read_package_variable(key):
     return None
 
 
+class BuildPy(build_py):
+    """
+    Leaves out the modules requiring Python 3.5 on earlier versions.
+    """
+
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            modules = [item for item in modules
+                       if (item[0], item[1]) not in PY35_MODULES]
+        return modules
+
+
 version = read_package_variable("__version__")
 
 setup(
@@ -40,8 +58,11 @@ setup(
         'sphinx',
     ],    
     test_suite="pyfranca.tests.get_suite",
+    cmdclass={"build_py": BuildPy},
     scripts=[
+        "tools/fidl_diff.py",
         "tools/fidl_dump.py",
+        "tools/fidl_lsp.py",
         "tools/fidl_validator.py",
     ],
 )
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+import argparse
+from pyfranca import Processor, Differ, LexerException, ParserException, \
+    ProcessorException
+
+
+def parse_command_line():
+    parser = argparse.ArgumentParser(
+        description="Franca model compatibility checker.")
+    parser.add_argument(
+        "old", help="Old (released) FIDL file.")
+    parser.add_argument(
+        "new", help="New FIDL file.")
+    parser.add_argument(
+        "-I", "--import", dest="import_dirs", metavar="import_dir",
+        action="append", help="Model import directories for the new model.")
+    parser.add_argument(
+        "-O", "--old-import", dest="old_import_dirs", metavar="import_dir",
+        action="append", help="Model import directories for the old model.")
+    args = parser.parse_args()
+    return args
+
+
+def load(fidl, import_dirs):
+    processor = Processor()
+    if import_dirs:
+        processor.package_paths.extend(import_dirs)
+    processor.import_file(fidl)
+    return processor
+
+
+def main():
+    args = parse_command_line()
+
+    try:
+        old = load(args.old, args.old_import_dirs)
+        new = load(args.new, args.import_dirs)
+    except (LexerException, ParserException, ProcessorException) as e:
+        print("ERROR: {}".format(e))
+        exit(1)
+
+    changes = Differ().compare(old, new)
+    breaking = False
+    for change in changes:
+        if change.breaking:
+            breaking = True
+            print("BREAKING: {}".format(change))
+        else:
+            print("{}".format(change))
+    if breaking:
+        exit(2)
+
+
+if __name__ == "__main__":
+    main()
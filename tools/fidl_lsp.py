@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+import sys
+from pyfranca.franca_lsp import LanguageServer
+
+
+def parse_command_line():
+    parser = argparse.ArgumentParser(
+        description="Franca IDL language server using the stdio "
+                    "transport.")
+    parser.add_argument(
+        "-I", "--import", dest="import_dirs", metavar="import_dir",
+        action="append", help="Model import directories, in addition to "
+                              "the workspace folders.")
+    parser.add_argument(
+        "-j", "--jobs", metavar="N", type=int,
+        help="Index the workspace with N worker processes. Defaults to the "
+             "number of CPUs.")
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_command_line()
+    # Binary streams
+    reader = getattr(sys.stdin, "buffer", sys.stdin)
+    writer = getattr(sys.stdout, "buffer", sys.stdout)
+    server = LanguageServer(reader, writer, args.import_dirs, args.jobs)
+    server.serve()
+    writer.flush()
+    # Exit without waiting for the reader thread, which may still block on
+    #   stdin.
+    os._exit(server.exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,200 @@
 #!/usr/bin/env python
 
 import argparse
+import json
+import socket
+import sys
 from pyfranca import Processor, LexerException, ParserException, \
     ProcessorException
+from pyfranca.franca_batch import BatchValidator
+from pyfranca.franca_daemon import DaemonException, ValidatorClient, \
+    ValidatorServer
+from pyfranca.franca_stats import ProcessorStats
+from pyfranca.franca_trace import Tracer
+from pyfranca.franca_watch import Watcher
 
 
 def parse_command_line():
     parser = argparse.ArgumentParser(
         description="Behavioral cloning model trainer.")
     parser.add_argument(
-        "fidl", nargs="+",
+        "fidl", nargs="*",
         help="Input FIDL file.")
     parser.add_argument(
         "-I", "--import", dest="import_dirs", metavar="import_dir",
         action="append", help="Model import directories.")
+    parser.add_argument(
+        "-k", "--keep-going", action="store_true",
+        help="Report all model errors instead of stopping at the first "
+             "one.")
+    parser.add_argument(
+        "-s", "--stats", metavar="N", type=int, nargs="?", const=10,
+        help="Print processing statistics and the N slowest files.")
+    parser.add_argument(
+        "-t", "--trace", metavar="trace_file",
+        help="Write a Chrome trace-event file of the model loading.")
+    parser.add_argument(
+        "-j", "--jobs", metavar="N", type=int,
+        help="Validate the input files independently with N worker "
+             "processes, reporting every invalid file.")
+    parser.add_argument(
+        "--json", metavar="summary_file",
+        help="Write a JSON validation summary with per-file timings "
+             "('-' for stdout). Implies --jobs 1 if --jobs is not given.")
+    parser.add_argument(
+        "--serve", metavar="socket",
+        help="Run as a daemon keeping the model resident and answering "
+             "requests on a Unix domain socket.")
+    parser.add_argument(
+        "--connect", metavar="socket",
+        help="Validate using a daemon listening on a Unix domain socket.")
+    parser.add_argument(
+        "--shutdown", action="store_true",
+        help="Stop the daemon specified with --connect.")
+    parser.add_argument(
+        "-M", "--depfile", metavar="dep_file",
+        help="Write a Make dependency file listing the input files and all "
+             "files they import.")
+    parser.add_argument(
+        "--target", metavar="target",
+        help="Make target of the dependency file. Defaults to the stamp "
+             "file.")
+    parser.add_argument(
+        "--stamp", metavar="stamp_file",
+        help="Skip the validation if the stamp file is newer than the input "
+             "files and all files they import, otherwise write it after a "
+             "successful validation.")
+    parser.add_argument(
+        "-w", "--watch", action="store_true",
+        help="Watch the input files and their imports and revalidate them "
+             "on changes.")
+    parser.add_argument(
+        "--interval", metavar="seconds", type=float, default=0.5,
+        help="Watch mode polling interval.")
     args = parser.parse_args()
+    if args.stats is not None and args.stats < 1:
+        parser.error("--stats requires a positive number of files.")
+    if args.shutdown and not args.connect:
+        parser.error("--shutdown requires --connect.")
+    if not args.fidl and not args.serve and not args.shutdown:
+        parser.error("No input FIDL files.")
+    if args.json and not args.jobs:
+        args.jobs = 1
+    if args.jobs and (args.stats or args.trace):
+        parser.error("--stats and --trace cannot be used with --jobs.")
+    if args.jobs and (args.depfile or args.stamp):
+        parser.error("--depfile and --stamp cannot be used with --jobs.")
+    if args.depfile and not (args.target or args.stamp):
+        parser.error("--depfile requires --target or --stamp.")
     return args
 
 
+def print_stats(stats, count):
+    print("Files: {}, bytes: {}, tokens: {}".format(
+        len(stats.files), stats.bytes, stats.tokens))
+    print("Read: {:.3f}s, parse: {:.3f}s (lex: {:.3f}s), merge: {:.3f}s, "
+          "link: {:.3f}s".format(stats.read_seconds, stats.parse_seconds,
+                                 stats.lex_seconds, stats.merge_seconds,
+                                 stats.link_seconds))
+    print("Resolve calls: {}, lookup probes: {}, cache hits: {}".format(
+        stats.resolve_calls, stats.lookup_probes, stats.cache_hits))
+    print("Slowest files:")
+    for file_stats in stats.slowest(count):
+        print("\t{:.3f}s {}".format(file_stats.total_seconds,
+                                    file_stats.fspec))
+
+
+def validate_batch(args):
+    validator = BatchValidator(args.import_dirs, args.jobs)
+    results = validator.validate(args.fidl)
+    print_summary(validator.summary(results), args.json)
+
+
+def print_summary(summary, json_file):
+    if json_file == "-":
+        print(json.dumps(summary, indent=4))
+    else:
+        for result in summary["files"]:
+            for error in result["errors"]:
+                print("ERROR: {}: {}".format(result["file"], error))
+        print("{} valid, {} invalid Franca models.".format(
+            summary["valid"], summary["invalid"]))
+        if json_file:
+            with open(json_file, "w") as f:
+                json.dump(summary, f, indent=4)
+    if summary["invalid"]:
+        exit(1)
+
+
+def serve(args):
+    server = ValidatorServer(args.serve, args.import_dirs)
+    print("Listening on '{}'.".format(args.serve))
+    server.serve()
+
+
+def connect(args):
+    try:
+        client = ValidatorClient(args.connect)
+        try:
+            if args.shutdown:
+                client.shutdown()
+                return
+            summary = client.validate(args.fidl)
+        finally:
+            client.close()
+    except (socket.error, DaemonException) as e:
+        print("ERROR: {}".format(e))
+        exit(1)
+    print_summary(summary, args.json)
+
+
+def print_cycle(cycle):
+    for result in cycle.results:
+        for error in result.errors:
+            print("ERROR: {}: {}".format(result.fspec, error))
+        if result.valid:
+            print("{}: valid".format(result.fspec))
+    print("Revalidated {} files in {:.3f}s.".format(
+        len(cycle.results), cycle.seconds))
+    sys.stdout.flush()
+
+
+def watch(args):
+    watcher = Watcher(args.fidl, args.import_dirs, args.interval)
+    try:
+        watcher.run(print_cycle)
+    except KeyboardInterrupt:
+        pass
+
+
 def main():
     args = parse_command_line()
+    if args.watch:
+        watch(args)
+        return
+    if args.serve:
+        serve(args)
+        return
+    if args.connect:
+        connect(args)
+        return
+    if args.jobs:
+        validate_batch(args)
+        return
 
     processor = Processor()
     if args.import_dirs:
         processor.package_paths.extend(args.import_dirs)
+    if args.stamp and processor.up_to_date(args.stamp, args.fidl):
+        print("Franca model is up to date.")
+        return
+
+    if args.stats:
+        processor.stats = ProcessorStats()
+    if args.trace:
+        processor.tracer = Tracer()
+    if args.keep_going:
+        processor.diagnostics = []
 
     try:
         for fidl in args.fidl:
@@ -31,7 +202,22 @@ def main():
     except (LexerException, ParserException, ProcessorException) as e:
         print("ERROR: {}".format(e))
         exit(1)
+    finally:
+        if args.stats:
+            print_stats(processor.stats, args.stats)
+        if args.trace:
+            processor.tracer.write(args.trace)
+    if processor.diagnostics:
+        for diagnostic in processor.diagnostics:
+            print("ERROR: {}".format(diagnostic))
+        print("{} errors.".format(len(processor.diagnostics)))
+        exit(1)
 
+    if args.stamp:
+        processor.write_dependencies(args.stamp, args.stamp, args.fidl)
+    if args.depfile:
+        processor.write_dependencies(args.depfile, args.target or args.stamp,
+                                     args.fidl)
     print("Valid Franca model.")
 
 